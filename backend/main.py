@@ -1,5 +1,5 @@
 from fastapi import FastAPI, Request, WebSocket, UploadFile, File, WebSocketDisconnect
-from fastapi.responses import JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 import os
@@ -7,7 +7,7 @@ import uvicorn
 import asyncio
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 import httpx
 import cv2
 import numpy as np
@@ -17,7 +17,17 @@ import sys
 import platform
 import psutil
 import threading
-import toml  # TOML 설정 파일 처리를 위한 라이브러리 추가
+from pipeline.config_patch import (PatchConflict, PatchError, SettingsValidationError, SettingsValidator,
+                                   apply_json_patch, apply_merge_patch, diff, format_pointer)
+from pipeline.config_store import ConfigStore, ConfigWriter, thaw
+from pipeline import rollups
+from pipeline.event_export import ExportJobs, export_filename, export_format, media_type, stream_export
+from pipeline.event_store import EventQuery, EventStore, parse_time
+from pipeline.number_search import ConfusionTable
+from pipeline.frame_bus import FrameBusReader
+from pipeline.log_bus import LogBus, LogFilter
+from pipeline.ocr import run_ocr_test
+from pipeline.tracker import run_tracking_test
 
 app = FastAPI()
 
@@ -28,8 +38,8 @@ CONFIG_DIR = "backend/settings"
 # 설정 폴더 생성
 os.makedirs(CONFIG_DIR, exist_ok=True)
 
-# 설정 변경에 대한 스레드 세이프 락
-settings_lock = threading.Lock()
+# 설정 변경에 대한 스레드 세이프 락 (설정 파일 읽기/쓰기 직렬화)
+settings_lock = threading.RLock()
 
 # 기본 설정값 정의 (모든 설정을 포함하도록 확장 필요)
 DEFAULT_CONFIG = {
@@ -227,38 +237,114 @@ DEFAULT_CONFIG = {
     ]
 }
 
+# 파싱한 설정을 메모리에 두고 파일이 바뀐 경우에만 다시 읽음
+config_store = ConfigStore(CONFIG_TOML_FILE, DEFAULT_CONFIG, lock=settings_lock)
+# 설정 변경은 하나의 큐로 직렬화하고, 짧은 시간 안의 변경은 한 번의 파일 쓰기로 합침
+config_writer = ConfigWriter(config_store)
+
+def current_config():
+    """
+    현재 설정의 읽기 전용 스냅샷을 반환합니다. (요청마다 파일을 파싱하지 않음)
+    조회 API는 이것을 그대로 반환하고, 수정할 때는 update_config()를 사용합니다.
+    """
+    return config_store.get()
+
 # TOML 설정 로드 함수
 def load_config():
     """
-    config.toml 파일에서 설정을 로드합니다.
-    파일이 없거나 오류 발생 시 기본 설정을 반환합니다.
+    수정 가능한 설정 사본을 반환합니다.
+    파일이 없으면 기본 설정으로 파일을 만들고, 읽기 오류 시 마지막 정상 설정을 반환합니다.
     """
-    if not os.path.exists(CONFIG_TOML_FILE):
-        print(f"'{CONFIG_TOML_FILE}'을 찾을 수 없습니다. 기본 설정으로 파일을 생성합니다.")
-        save_config(DEFAULT_CONFIG)
-        return DEFAULT_CONFIG.copy()
-    try:
-        with open(CONFIG_TOML_FILE, 'r', encoding='utf-8') as f:
-            config = toml.load(f)
-            print(f"설정 파일을 로드했습니다: {CONFIG_TOML_FILE}")
-            return config
-    except Exception as e:
-        print(f"설정 파일 로드 오류 ({CONFIG_TOML_FILE}): {e}. 기본 설정을 반환합니다.")
-        return DEFAULT_CONFIG.copy()  # 오류 발생 시 기본 설정 반환
+    return thaw(config_store.get())
 
 # TOML 설정 저장 함수
 def save_config(config_data):
     """
-    설정을 config.toml 파일에 저장합니다.
+    설정을 config.toml 파일에 저장하고 메모리의 스냅샷을 교체합니다.
+    요청 처리 중의 변경은 update_config()를 사용합니다.
+    """
+    return config_store.save(config_data)
+
+async def notify_config_change():
+    """
+    비디오 서버에 설정 변경을 알려 실행 중인 단계에 바로 반영하게 합니다. (서버가 꺼져 있으면 무시)
+    알림이 없어도 비디오 서버가 config.toml을 주기적으로 확인하므로 늦게라도 반영됩니다.
     """
     try:
-        with open(CONFIG_TOML_FILE, 'w', encoding='utf-8') as f:
-            toml.dump(config_data, f)
-        print(f"설정 파일을 저장했습니다: {CONFIG_TOML_FILE}")
-        return True
-    except Exception as e:
-        print(f"설정 파일 저장 오류 ({CONFIG_TOML_FILE}): {e}")
+        async with httpx.AsyncClient() as client:
+            await client.post("http://localhost:8000/config/reload", timeout=1.0)
+    except Exception:
+        pass
+
+notify_tasks = set()  # 진행 중인 알림 태스크 (GC 방지)
+
+async def update_config(mutate):
+    """
+    mutate(config)를 설정 쓰기 큐에 넣고 (mutate 반환값, 새 설정 버전)을 반환합니다.
+    mutate 안에서 발생한 예외는 그 변경만 취소된 채 그대로 전달됩니다.
+    저장에 성공하면 비디오 서버에 알림을 보냅니다. (응답은 기다리지 않음)
+    """
+    result = await config_writer.submit(mutate)
+    task = asyncio.create_task(notify_config_change())
+    notify_tasks.add(task)
+    task.add_done_callback(notify_tasks.discard)
+    return result
+
+# === 조건부 조회 (ETag) / 설정 변경 알림 ===
+RENDERED_CACHE_SIZE = 256  # 직렬화해 둔 응답 본문 최대 개수
+SETTINGS_EVENTS_HEARTBEAT = 15.0  # SSE 연결 유지 주석 간격 (초, 이때 파일 변경도 확인)
+
+rendered_cache = {}  # 응답 키: (ETag, 직렬화된 본문)
+
+def etag_matches(header, etag):
+    """If-None-Match 헤더에 etag가 있는지 (약한 비교, '*'는 항상 일치)"""
+    if not header:
         return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+def conditional_json(request: Request, key, etag, build):
+    """
+    If-None-Match가 현재 ETag와 같으면 본문 없이 304를 반환합니다.
+    그 외에는 build()의 결과를 JSON으로 반환하되, 같은 ETag의 본문은 한 번만 직렬화합니다.
+    """
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    cached = rendered_cache.get(key)
+    if cached is None or cached[0] != etag:
+        if len(rendered_cache) >= RENDERED_CACHE_SIZE:
+            rendered_cache.clear()
+        cached = rendered_cache[key] = (etag, JSONResponse(build()).body)
+    return Response(content=cached[1], media_type="application/json", headers=headers)
+
+settings_listeners = set()  # SSE 연결별 변경 알림 큐
+settings_subscription = None  # (이벤트 루프, 구독 해제 함수)
+
+def publish_settings_change(version, sections):
+    for queue in list(settings_listeners):
+        try:
+            queue.put_nowait((version, sections))
+        except asyncio.QueueFull:
+            pass  # 읽지 못하는 연결: 다음 알림이나 재연결 때 최신 버전을 받음
+
+def watch_settings():
+    """설정 변경 알림 큐를 등록합니다. 이 이벤트 루프에서 처음 호출될 때 ConfigStore를 구독합니다."""
+    global settings_subscription
+    loop = asyncio.get_running_loop()
+    if settings_subscription is None or settings_subscription[0] is not loop:
+        if settings_subscription is not None:
+            settings_subscription[1]()
+
+        def on_change(snapshot, version, sections):
+            # 설정 저장은 작업 스레드에서 일어나므로 이벤트 루프로 넘겨서 전달
+            loop.call_soon_threadsafe(publish_settings_change, version, sections)
+
+        settings_subscription = (loop, config_store.subscribe(on_change))
+    queue = asyncio.Queue(maxsize=64)
+    settings_listeners.add(queue)
+    return queue
 
 # CORS 미들웨어 추가
 app.add_middleware(
@@ -267,6 +353,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # 모든 HTTP 메서드 허용
     allow_headers=["*"],  # 모든 헤더 허용
+    expose_headers=["ETag", "X-Next-Cursor"],  # 조건부 조회 / 로그 다음 페이지를 위해 브라우저 코드에서 읽을 수 있게 함
 )
 
 # 정적 파일 폴더 생성
@@ -397,13 +484,58 @@ async def check_video_server_status():
     
     return {"running": is_running}
 
+# === 공유 메모리 프레임 버스 (비디오 서버 → 백엔드) ===
+# 비디오 서버가 게시한 원본 프레임을 카메라를 다시 열지 않고 읽음
+frame_bus_readers: Dict[str, FrameBusReader] = {}
+
+def get_frame_bus_reader(camera_id: str) -> Optional[FrameBusReader]:
+    reader = frame_bus_readers.get(camera_id)
+    # 비디오 서버가 재시작 (비정상 종료 포함)되어 세그먼트가 바뀐 경우 다시 연결
+    if reader is not None and reader.stale:
+        reader.close()
+        reader = None
+    if reader is None:
+        reader = FrameBusReader.try_attach(camera_id)
+        if reader is None:
+            frame_bus_readers.pop(camera_id, None)
+            return None
+        frame_bus_readers[camera_id] = reader
+    return reader
+
+@app.get("/api/video-server/frame/{camera_id}")
+async def get_video_server_frame(camera_id: str, quality: int = 85):
+    """프레임 버스의 최신 프레임을 JPEG 스냅샷으로 반환합니다."""
+    reader = get_frame_bus_reader(camera_id)
+    if reader is None:
+        return JSONResponse(
+            status_code=404,
+            content={"message": f"카메라 '{camera_id}'의 프레임 버스가 없습니다. (비디오 서버 캡처 중인지 확인)"}
+        )
+
+    frame = reader.read(copy=True)
+    if frame is None:
+        return JSONResponse(status_code=503, content={"message": "아직 게시된 프레임이 없습니다."})
+
+    quality = max(1, min(100, quality))
+    ok, buffer = await asyncio.to_thread(cv2.imencode, ".jpg", frame.image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        return JSONResponse(status_code=500, content={"message": "JPEG 인코딩 실패"})
+    return Response(
+        content=buffer.tobytes(),
+        media_type="image/jpeg",
+        headers={
+            "X-Frame-Seq": str(frame.seq),
+            "X-Frame-Time": str(frame.wall_time),
+        },
+    )
+
 # Pydantic 모델 정의
 class CameraSettings(BaseModel):
     rtspUrl: str
     ipCameraUrl: str
     usbCameraIndex: str
-    resolution: str
-    fps: int
+    resolution: str = Field(pattern=r"^\d+x\d+$")
+    fps: int = Field(gt=0)
     enableAutoReconnect: bool
     reconnectInterval: int
     bufferSize: int
@@ -412,12 +544,12 @@ class ModelSettings(BaseModel):
     modelVersion: str
     modelSize: str
     customModelPath: str
-    confidenceThreshold: float
-    iouThreshold: float
-    maxDetections: int
+    confidenceThreshold: float = Field(ge=0, le=1)
+    iouThreshold: float = Field(ge=0, le=1)
+    maxDetections: int = Field(ge=1)
     enableGPU: bool
     enableBatchProcessing: bool
-    batchSize: int
+    batchSize: int = Field(ge=1)
     enableTensorRT: bool
     enableQuantization: bool
     quantizationType: str
@@ -426,14 +558,14 @@ class OcrSettings(BaseModel):
     engine: str
     language: str
     customModelPath: str
-    confidenceThreshold: float
+    confidenceThreshold: float = Field(ge=0, le=1)
     enablePreprocessing: bool
     preprocessingSteps: List[str]
     enableAutoRotation: bool
     maxRotationAngle: int
     enableDigitsOnly: bool
-    minDigits: int
-    maxDigits: int
+    minDigits: int = Field(ge=0)
+    maxDigits: int = Field(ge=0)
     enableWhitelist: bool
     whitelist: str
     enableBlacklist: bool
@@ -444,8 +576,8 @@ class TrackingSettings(BaseModel):
     algorithm: str
     maxDisappeared: int
     maxDistance: int
-    minConfidence: float
-    iouThreshold: float
+    minConfidence: float = Field(ge=0, le=1)
+    iouThreshold: float = Field(ge=0, le=1)
     enableKalmanFilter: bool
     enableDirectionDetection: bool
     directionThreshold: float
@@ -591,9 +723,20 @@ class RoiData(BaseModel):
     color: str
     enabled: bool
     actions: RoiActions
-    minDetectionTime: int
+    minDetectionTime: float = Field(ge=0)
     description: str
 
+# 섹션별 설정 검증기 (서버 시작 시 한 번 컴파일해 PATCH 요청마다 재사용)
+settings_validator = SettingsValidator({
+    "camera": CameraSettings,
+    "model": ModelSettings,
+    "ocr": OcrSettings,
+    "tracking": TrackingSettings,
+    "system": SystemSettings,
+    "training.hyperparameters": Hyperparameters,
+    "rois": List[RoiData],
+})
+
 # 감지 통계와 OCR 결과 API 제거됨
 
 @app.get("/api/detection/system-status")
@@ -614,10 +757,10 @@ def get_system_status():
 # 비디오 제어 API 제거됨
 
 @app.get("/api/detection/settings")
-async def get_detection_settings():
+async def get_detection_settings(request: Request):
     """기존 설정 API를 새 통합 설정 API로 리다이렉션"""
     # 통합 설정 API 호출
-    return await get_section_settings_api("detection")
+    return await get_section_settings_api("detection", request)
 
 @app.post("/api/detection/settings")
 async def update_detection_settings(request: Request):
@@ -661,7 +804,7 @@ async def update_ocr_settings(request: Request):
 def get_plc_settings():
     """기존 설정 API를 새 통합 설정 API로 리다이렉션"""
     # 통합 설정 API 호출 (비동기 함수를 동기 환경에서 호출할 수 없으므로 직접 구현)
-    config = load_config()
+    config = current_config()
     return config.get("plc", {})
 
 @app.put("/api/plc/device")
@@ -706,33 +849,36 @@ async def update_plc_protocol(request: Request):
         )
 
 @app.get("/api/plc/mappings")
-def get_data_mappings():
-    config = load_config()
-    mappings = config.get("plc", {}).get("mappings", [])
-    
-    # 매핑이 없는 경우, 기본값 반환
-    if not mappings:
-        mappings = DEFAULT_CONFIG.get("plc", {}).get("mappings", [])
-    
-    return mappings
+def get_data_mappings(request: Request):
+    config = current_config()
+
+    def build():
+        mappings = config.get("plc", {}).get("mappings", [])
+
+        # 매핑이 없는 경우, 기본값 반환
+        if not mappings:
+            mappings = DEFAULT_CONFIG.get("plc", {}).get("mappings", [])
+
+        return mappings
+
+    return conditional_json(request, "plc.mappings", config_store.etag("plc"), build)
 
 @app.post("/api/plc/mappings")
 async def add_data_mapping(request: Request):
     try:
         data = await request.json()
         
-        # 전체 설정 로드
-        config = load_config()
-        
-        # 'plc' 섹션이 없으면 생성
-        if "plc" not in config:
-            config["plc"] = {}
-        if "mappings" not in config["plc"]:
-            config["plc"]["mappings"] = []
+        def add_mapping(config):
+            # 'plc' 섹션이 없으면 생성
+            if "plc" not in config:
+                config["plc"] = {}
+            if "mappings" not in config["plc"]:
+                config["plc"]["mappings"] = []
+            
+            # 매핑 추가
+            config["plc"]["mappings"].append(data)
         
-        # 매핑 추가
-        config["plc"]["mappings"].append(data)
-        save_config(config)
+        await update_config(add_mapping)
         
         return data
     except Exception as e:
@@ -748,34 +894,23 @@ async def update_data_mapping(mapping_id: str, request: Request):
         data = await request.json()
         data["id"] = mapping_id  # ID 일관성 유지
         
-        # 전체 설정 로드
-        config = load_config()
-        
-        # 'plc' 섹션 확인
-        if "plc" not in config or "mappings" not in config["plc"]:
-            return JSONResponse(
-                status_code=404,
-                content={"message": "PLC 매핑 설정을 찾을 수 없습니다."}
-            )
-        
-        # 매핑 ID로 업데이트할 항목 찾기
-        found = False
-        for i, mapping in enumerate(config["plc"]["mappings"]):
-            if mapping.get("id") == mapping_id:
-                config["plc"]["mappings"][i] = data
-                found = True
-                break
-        
-        if not found:
-            return JSONResponse(
-                status_code=404,
-                content={"message": f"ID가 '{mapping_id}'인 매핑을 찾을 수 없습니다."}
-            )
+        def replace_mapping(config):
+            # 'plc' 섹션 확인
+            if "plc" not in config or "mappings" not in config["plc"]:
+                raise LookupError("PLC 매핑 설정을 찾을 수 없습니다.")
+            
+            # 매핑 ID로 업데이트할 항목 찾기
+            for i, mapping in enumerate(config["plc"]["mappings"]):
+                if mapping.get("id") == mapping_id:
+                    config["plc"]["mappings"][i] = data
+                    return
+            raise LookupError(f"ID가 '{mapping_id}'인 매핑을 찾을 수 없습니다.")
         
-        # 변경된 설정 저장
-        save_config(config)
+        await update_config(replace_mapping)
         
         return data
+    except LookupError as e:
+        return JSONResponse(status_code=404, content={"message": str(e)})
     except Exception as e:
         print(f"PLC 데이터 매핑 업데이트 오류: {str(e)}")
         return JSONResponse(
@@ -784,35 +919,28 @@ async def update_data_mapping(mapping_id: str, request: Request):
         )
 
 @app.delete("/api/plc/mappings/{mapping_id}")
-def delete_data_mapping(mapping_id: str):
+async def delete_data_mapping(mapping_id: str):
     try:
-        # 전체 설정 로드
-        config = load_config()
-        
-        # 'plc' 섹션 확인
-        if "plc" not in config or "mappings" not in config["plc"]:
-            return JSONResponse(
-                status_code=404,
-                content={"message": "PLC 매핑 설정을 찾을 수 없습니다."}
-            )
-        
-        # 매핑 ID로 삭제할 항목 찾기
-        original_length = len(config["plc"]["mappings"])
-        config["plc"]["mappings"] = [
-            mapping for mapping in config["plc"]["mappings"]
-            if mapping.get("id") != mapping_id
-        ]
-        
-        if len(config["plc"]["mappings"]) == original_length:
-            return JSONResponse(
-                status_code=404,
-                content={"message": f"ID가 '{mapping_id}'인 매핑을 찾을 수 없습니다."}
-            )
+        def remove_mapping(config):
+            # 'plc' 섹션 확인
+            if "plc" not in config or "mappings" not in config["plc"]:
+                raise LookupError("PLC 매핑 설정을 찾을 수 없습니다.")
+            
+            # 매핑 ID로 삭제할 항목 찾기
+            original_length = len(config["plc"]["mappings"])
+            config["plc"]["mappings"] = [
+                mapping for mapping in config["plc"]["mappings"]
+                if mapping.get("id") != mapping_id
+            ]
+            
+            if len(config["plc"]["mappings"]) == original_length:
+                raise LookupError(f"ID가 '{mapping_id}'인 매핑을 찾을 수 없습니다.")
         
-        # 변경된 설정 저장
-        save_config(config)
+        await update_config(remove_mapping)
         
         return {}
+    except LookupError as e:
+        return JSONResponse(status_code=404, content={"message": str(e)})
     except Exception as e:
         print(f"PLC 데이터 매핑 삭제 오류: {str(e)}")
         return JSONResponse(
@@ -833,33 +961,36 @@ def disconnect_plc(device_id: str):
     return {"id": device_id, "status": "disconnected"}
 
 @app.get("/api/plc/mappings")
-def get_data_mappings():
-    config = load_config()
-    mappings = config.get("plc", {}).get("mappings", [])
-    
-    # 매핑이 없는 경우, 기본값 반환
-    if not mappings:
-        mappings = DEFAULT_CONFIG.get("plc", {}).get("mappings", [])
-    
-    return mappings
+def get_data_mappings(request: Request):
+    config = current_config()
+
+    def build():
+        mappings = config.get("plc", {}).get("mappings", [])
+
+        # 매핑이 없는 경우, 기본값 반환
+        if not mappings:
+            mappings = DEFAULT_CONFIG.get("plc", {}).get("mappings", [])
+
+        return mappings
+
+    return conditional_json(request, "plc.mappings", config_store.etag("plc"), build)
 
 @app.post("/api/plc/mappings")
 async def add_data_mapping(request: Request):
     try:
         data = await request.json()
         
-        # 전체 설정 로드
-        config = load_config()
-        
-        # 'plc' 섹션이 없으면 생성
-        if "plc" not in config:
-            config["plc"] = {}
-        if "mappings" not in config["plc"]:
-            config["plc"]["mappings"] = []
+        def add_mapping(config):
+            # 'plc' 섹션이 없으면 생성
+            if "plc" not in config:
+                config["plc"] = {}
+            if "mappings" not in config["plc"]:
+                config["plc"]["mappings"] = []
+            
+            # 매핑 추가
+            config["plc"]["mappings"].append(data)
         
-        # 매핑 추가
-        config["plc"]["mappings"].append(data)
-        save_config(config)
+        await update_config(add_mapping)
         
         return data
     except Exception as e:
@@ -875,34 +1006,23 @@ async def update_data_mapping(mapping_id: str, request: Request):
         data = await request.json()
         data["id"] = mapping_id  # ID 일관성 유지
         
-        # 전체 설정 로드
-        config = load_config()
-        
-        # 'plc' 섹션 확인
-        if "plc" not in config or "mappings" not in config["plc"]:
-            return JSONResponse(
-                status_code=404,
-                content={"message": "PLC 매핑 설정을 찾을 수 없습니다."}
-            )
-        
-        # 매핑 ID로 업데이트할 항목 찾기
-        found = False
-        for i, mapping in enumerate(config["plc"]["mappings"]):
-            if mapping.get("id") == mapping_id:
-                config["plc"]["mappings"][i] = data
-                found = True
-                break
-        
-        if not found:
-            return JSONResponse(
-                status_code=404,
-                content={"message": f"ID가 '{mapping_id}'인 매핑을 찾을 수 없습니다."}
-            )
+        def replace_mapping(config):
+            # 'plc' 섹션 확인
+            if "plc" not in config or "mappings" not in config["plc"]:
+                raise LookupError("PLC 매핑 설정을 찾을 수 없습니다.")
+            
+            # 매핑 ID로 업데이트할 항목 찾기
+            for i, mapping in enumerate(config["plc"]["mappings"]):
+                if mapping.get("id") == mapping_id:
+                    config["plc"]["mappings"][i] = data
+                    return
+            raise LookupError(f"ID가 '{mapping_id}'인 매핑을 찾을 수 없습니다.")
         
-        # 변경된 설정 저장
-        save_config(config)
+        await update_config(replace_mapping)
         
         return data
+    except LookupError as e:
+        return JSONResponse(status_code=404, content={"message": str(e)})
     except Exception as e:
         print(f"PLC 데이터 매핑 업데이트 오류: {str(e)}")
         return JSONResponse(
@@ -911,35 +1031,28 @@ async def update_data_mapping(mapping_id: str, request: Request):
         )
 
 @app.delete("/api/plc/mappings/{mapping_id}")
-def delete_data_mapping(mapping_id: str):
+async def delete_data_mapping(mapping_id: str):
     try:
-        # 전체 설정 로드
-        config = load_config()
-        
-        # 'plc' 섹션 확인
-        if "plc" not in config or "mappings" not in config["plc"]:
-            return JSONResponse(
-                status_code=404,
-                content={"message": "PLC 매핑 설정을 찾을 수 없습니다."}
-            )
-        
-        # 매핑 ID로 삭제할 항목 찾기
-        original_length = len(config["plc"]["mappings"])
-        config["plc"]["mappings"] = [
-            mapping for mapping in config["plc"]["mappings"]
-            if mapping.get("id") != mapping_id
-        ]
-        
-        if len(config["plc"]["mappings"]) == original_length:
-            return JSONResponse(
-                status_code=404,
-                content={"message": f"ID가 '{mapping_id}'인 매핑을 찾을 수 없습니다."}
-            )
+        def remove_mapping(config):
+            # 'plc' 섹션 확인
+            if "plc" not in config or "mappings" not in config["plc"]:
+                raise LookupError("PLC 매핑 설정을 찾을 수 없습니다.")
+            
+            # 매핑 ID로 삭제할 항목 찾기
+            original_length = len(config["plc"]["mappings"])
+            config["plc"]["mappings"] = [
+                mapping for mapping in config["plc"]["mappings"]
+                if mapping.get("id") != mapping_id
+            ]
+            
+            if len(config["plc"]["mappings"]) == original_length:
+                raise LookupError(f"ID가 '{mapping_id}'인 매핑을 찾을 수 없습니다.")
         
-        # 변경된 설정 저장
-        save_config(config)
+        await update_config(remove_mapping)
         
         return {}
+    except LookupError as e:
+        return JSONResponse(status_code=404, content={"message": str(e)})
     except Exception as e:
         print(f"PLC 데이터 매핑 삭제 오류: {str(e)}")
         return JSONResponse(
@@ -986,88 +1099,205 @@ def get_plc_statistics():
         "lastErrorTimestamp": __import__("datetime").datetime.utcnow().isoformat(),
     }
 
+# 비디오 서버가 기록하는 인식 이벤트 DB (SQLite WAL, 읽기 전용으로 사용)
+event_store = EventStore()
+export_jobs = ExportJobs(event_store)
+
+# 새 인식 로그 실시간 구독 (/api/logs/subscribe). 구독자가 있는 동안 pump 태스크 하나가 이벤트 DB를 확인
+log_bus = LogBus()
+log_pump_task = None
+
+def ensure_log_pump():
+    global log_pump_task
+    if log_pump_task is None or log_pump_task.done():
+        log_pump_task = asyncio.create_task(log_bus.pump(event_store.tail))
+
+@app.on_event("startup")
+def resume_export_jobs():
+    # 서버가 중간에 꺼져 끝나지 않은 로그 내보내기 작업을 이어서 진행
+    export_jobs.resume()
+
 @app.post("/api/logs/ocr")
 async def post_logs_ocr(request: Request):
-    filters = await request.json()
-    # 기본 예시 응답 (filters 무시)
-    return [
-        {
-            "id": f"log-{i}",
-            "timestamp": datetime.utcnow().isoformat(),
-            "recognizedNumber": f"{1000 + i}",
-            "confidence": 90 + i,
-            "roiName": "입구 영역",
-            "imageUrl": f"/static/img/sample{i}.jpg",
-            "processingTime": 50 + i,
-            "status": "success",
-            "sentToPLC": True,
-            "truckId": f"TRUCK-{100 + i}",
-        }
-        for i in range(1, 6)
-    ]
+    """
+    OcrLogFilter 조건으로 인식 로그를 조회합니다. (limit 기본 100, 최대 1000)
+    다음 페이지가 있으면 X-Next-Cursor 헤더를 주며, 그 값을 본문의 cursor로 보내면 이어서 조회합니다.
+    numberQuery는 numberMatch (auto, exact, prefix, contains, fuzzy)에 따라 검색하며, 기본 auto는
+    부분 일치와 한 글자 차이 (8/B, 0/O 등 OCR 혼동 글자는 반 글자로 계산)를 함께 찾습니다.
+    """
+    try:
+        query = EventQuery.from_filter(await request.json())
+    except Exception as e:
+        return JSONResponse(status_code=400, content={"message": f"잘못된 로그 조회 조건: {e}"})
+    try:
+        # 검색어의 혼동 글자는 ocr.whitelist 기준으로 바꿔서 찾음 (숫자 전용이면 "8B12" → "8812")
+        table = ConfusionTable.from_ocr_config(current_config().get("ocr", {}))
+        logs, next_cursor = await asyncio.to_thread(event_store.query, query, table)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"message": str(e)})
+    except Exception as e:
+        print(f"OCR 로그 조회 오류: {str(e)}")
+        return JSONResponse(status_code=500, content={"message": f"OCR 로그 조회 중 오류 발생: {str(e)}"})
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return JSONResponse(content=logs, headers=headers)
+
+# === 통계 (미리 집계된 분/시간/일 버킷을 더해 계산, pipeline.rollups) ===
+# 날짜와 시각은 집계 버킷과 같은 서버 지역 시간대 (rollups.STATS_TZ) 기준. 시간대 없는 기간 (예: 2024-05-01)도 그 시간대로 해석
+def stats_time(value):
+    return parse_time(value, rollups.STATS_TZ)
+
+def day_label(day: int, iso: bool = False) -> str:
+    moment = datetime.fromtimestamp(day, rollups.STATS_TZ)
+    return moment.strftime("%Y-%m-%d") if iso else f"{moment.month}/{moment.day}"
+
+def hour_bands(summary: rollups.RollupSummary, hours: int) -> List[tuple]:
+    """시간 단위 집계를 하루 중 hours시간 간격 구간으로 묶습니다. [(시작 시각, Totals)] (지역 시간)"""
+    bands = [rollups.Totals() for _ in range(24 // hours)]
+    for hour, totals in summary.series():
+        bands[datetime.fromtimestamp(hour, rollups.STATS_TZ).hour // hours].merge(totals)
+    return [(index * hours, totals) for index, totals in enumerate(bands)]
+
+def stats_error(e: Exception) -> JSONResponse:
+    if isinstance(e, ValueError):
+        return JSONResponse(status_code=400, content={"message": f"잘못된 통계 기간: {e}"})
+    print(f"통계 조회 오류: {str(e)}")
+    return JSONResponse(status_code=500, content={"message": f"통계 조회 중 오류 발생: {str(e)}"})
 
 @app.post("/api/logs/stats")
 async def post_logs_stats(request: Request):
-    _ = await request.json()
+    """{from, to} 기간의 인식 로그 요약. 기간이 없으면 첫 이벤트부터 지금까지입니다."""
+    try:
+        data = await request.json()
+        date_range = data.get("dateRange") or data
+        summary = await asyncio.to_thread(event_store.summarize, stats_time(date_range.get("from")),
+                                          stats_time(date_range.get("to")))
+    except Exception as e:
+        return stats_error(e)
+    totals = summary.totals
     return {
-        "totalCount": 127,
-        "successCount": 98,
-        "avgConfidence": 87.5,
-        "plcSentCount": 92,
-        "dailyStats": [
-            {"date": "2025-05-13", "count": 12},
-            {"date": "2025-05-14", "count": 15},
-            {"date": "2025-05-15", "count": 18},
-            {"date": "2025-05-16", "count": 22},
-            {"date": "2025-05-17", "count": 19},
-        ],
-        "confidenceDistribution": {
-            "0-50%": 5,
-            "51-70%": 12,
-            "71-85%": 25,
-            "86-95%": 45,
-            "96-100%": 40,
-        },
-        "roiDistribution": {
-            "입구 영역": 35,
-            "출구 영역": 28,
-            "주차장 입구": 22,
-            "하차장": 19,
-            "검수 구역": 23,
-        },
+        "totalCount": totals.events,
+        "successCount": totals.successes,
+        "avgConfidence": totals.avg_confidence,
+        "plcSentCount": totals.plc_sent,
+        "dailyStats": [{"date": day_label(day, iso=True), "count": day_totals.events} for day, day_totals in summary.series()],
+        "confidenceDistribution": summary.confidence_counts(rollups.LOG_CONFIDENCE_RANGES),
+        "roiDistribution": {roi: roi_totals.events for roi, roi_totals in summary.by_roi.items()},
     }
 
 @app.post("/api/logs/export")
 async def post_logs_export(request: Request):
-    data = await request.json()
-    fmt = data.get("format", "csv")
-    return {"downloadUrl": f"/static/exports/logs.{fmt}"}
+    """
+    OcrLogFilter 조건의 로그 전체를 시간 순으로 내보냅니다. 본문에 format (csv, jsonl, json, parquet)과
+    gzip (true면 .gz 파일)을 함께 보냅니다. 결과를 메모리에 모으지 않고 5,000건씩 읽어 바로 전송합니다.
+    background가 true면 바로 보내는 대신 파일을 만드는 작업을 등록하고 작업 상태를 반환합니다. (202)
+    """
+    try:
+        data = await request.json()
+        fmt = export_format(data.get("format"))
+        compress = bool(data.get("gzip"))
+        table = ConfusionTable.from_ocr_config(current_config().get("ocr", {}))
+        if data.get("background"):
+            job = await asyncio.to_thread(export_jobs.start, data, fmt, compress, table)
+            return JSONResponse(status_code=202, content=job)
+        stream = stream_export(event_store, EventQuery.from_filter(data), fmt, compress, table)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"message": str(e)})
+    headers = {"Content-Disposition": f'attachment; filename="{export_filename(fmt, compress)}"'}
+    return StreamingResponse(stream, media_type=media_type(fmt, compress), headers=headers)
+
+@app.post("/api/logs/ocr/export")
+async def post_logs_ocr_export(request: Request, format: str = "csv", gzip: bool = False):
+    """로그 화면의 내보내기 버튼. 파일을 만드는 작업을 등록하고 downloadUrl과 작업 상태를 반환합니다."""
+    try:
+        table = ConfusionTable.from_ocr_config(current_config().get("ocr", {}))
+        job = await asyncio.to_thread(export_jobs.start, await request.json(), format, gzip, table)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"message": str(e)})
+    return JSONResponse(status_code=202, content=job)
+
+@app.get("/api/logs/export/{job_id}")
+def get_logs_export_job(job_id: str):
+    """내보내기 작업 상태 (state: queued, running, done, failed, 지금까지 쓴 rows/bytes)"""
+    status = export_jobs.status(job_id)
+    if status is None:
+        return JSONResponse(status_code=404, content={"message": f"내보내기 작업을 찾을 수 없습니다: {job_id}"})
+    return status
+
+@app.get("/api/logs/export/{job_id}/download")
+def download_logs_export(job_id: str):
+    job = export_jobs.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"message": f"내보내기 작업을 찾을 수 없습니다: {job_id}"})
+    if job["state"] != "done":
+        return JSONResponse(status_code=409, content={"message": f"내보내기가 아직 끝나지 않았습니다 ({job['state']})",
+                                                      "job": export_jobs.status(job_id)})
+    return FileResponse(export_jobs.path(job_id), media_type=media_type(job["format"], job["gzip"]),
+                        filename=job["filename"])
+
+@app.delete("/api/logs/export/{job_id}")
+def delete_logs_export(job_id: str):
+    """진행 중이면 멈추고, 만든 파일과 함께 작업을 지웁니다."""
+    if not export_jobs.cancel(job_id):
+        return JSONResponse(status_code=404, content={"message": f"내보내기 작업을 찾을 수 없습니다: {job_id}"})
+    return {"success": True}
 
 @app.websocket("/api/logs/subscribe")
+@app.websocket("/api/logs/ocr/ws")
 async def ws_logs_subscribe(websocket: WebSocket):
+    """
+    새 인식 로그 실시간 구독. 쿼리 (roi, minConfidence, status) 또는 {"type": "filter", ...} 메시지로
+    조건을 정하면 맞는 로그만 받습니다. 로그가 한 건이면 {"type": "newLog", "log"}, 몰려 오면
+    {"type": "newLogs", "logs"} 한 프레임으로 보내며, 느려서 버려진 로그가 있으면 dropped에 그 수를 담습니다.
+    """
     await websocket.accept()
-    while True:
-        log = {
-            "id": f"log-{int(datetime.utcnow().timestamp())}",
-            "timestamp": datetime.utcnow().isoformat(),
-            "recognizedNumber": "1234",
-            "confidence": 95,
-            "roiName": "입구 영역",
-            "imageUrl": "/static/img/test1.jpg",
-            "processingTime": 60,
-            "status": "success",
-            "sentToPLC": True,
-            "truckId": None,
-        }
-        await websocket.send_json({"type": "newLog", "log": log})
-        await asyncio.sleep(5)
+    try:
+        subscription = log_bus.subscribe(LogFilter.from_params(websocket.query_params))
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+    ensure_log_pump()
+
+    async def receive_filters():
+        while True:
+            message = await websocket.receive_json()
+            if not isinstance(message, dict) or message.get("type") != "filter":
+                continue
+            try:
+                subscription.filter = LogFilter.from_params(message)
+                await websocket.send_json({"type": "filter", "filter": subscription.filter.describe()})
+            except ValueError as e:
+                await websocket.send_json({"type": "error", "message": str(e)})
+
+    receiver = asyncio.create_task(receive_filters())
+    try:
+        while True:
+            batch_task = asyncio.create_task(subscription.next_batch())
+            await asyncio.wait({batch_task, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if receiver.done():  # 연결 끊김
+                batch_task.cancel()
+                break
+            logs = batch_task.result()
+            frame = {"type": "newLog", "log": logs[0]} if len(logs) == 1 else {"type": "newLogs", "logs": logs}
+            dropped = subscription.take_dropped()
+            if dropped:
+                frame["dropped"] = dropped
+            await websocket.send_json(frame)
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    except Exception as e:
+        print(f"💥 로그 구독 송신 오류: {e}")
+    finally:
+        subscription.close()
+        receiver.cancel()
+        if receiver.done() and not receiver.cancelled():
+            receiver.exception()  # 연결 끊김 예외는 여기서 확인하고 버림
 
 @app.get("/api/settings/camera")
-def get_camera_settings():
+async def get_camera_settings(request: Request):
     """기존 설정 API를 새 통합 설정 API로 리다이렉션"""
-    # 통합 설정 API 호출 (비동기 함수를 동기 환경에서 호출할 수 없으므로 직접 구현)
-    config = load_config()
-    return config.get("camera", {})
+    # 통합 설정 API와 같은 ETag / 304 처리 (섹션이 없으면 빈 객체)
+    section = current_config().get("camera", {})
+    return conditional_json(request, "section:camera", config_store.etag("camera"), lambda: section)
 
 @app.put("/api/settings/camera")
 async def update_camera_settings(request: Request):
@@ -1102,11 +1332,11 @@ async def connect_camera(request: Request):
         )
 
 @app.get("/api/settings/model")
-def get_model_settings():
+async def get_model_settings(request: Request):
     """기존 설정 API를 새 통합 설정 API로 리다이렉션"""
-    # 통합 설정 API 호출 (비동기 함수를 동기 환경에서 호출할 수 없으므로 직접 구현)
-    config = load_config()
-    return config.get("model", {})
+    # 통합 설정 API와 같은 ETag / 304 처리 (섹션이 없으면 빈 객체)
+    section = current_config().get("model", {})
+    return conditional_json(request, "section:model", config_store.etag("model"), lambda: section)
 
 @app.put("/api/settings/model")
 async def update_model_settings(request: Request):
@@ -1128,11 +1358,11 @@ async def load_model(request: Request):
         )
 
 @app.get("/api/settings/ocr")
-def get_ocr_settings():
+async def get_ocr_settings(request: Request):
     """기존 설정 API를 새 통합 설정 API로 리다이렉션"""
-    # 통합 설정 API 호출 (비동기 함수를 동기 환경에서 호출할 수 없으므로 직접 구현)
-    config = load_config()
-    return config.get("ocr", {})
+    # 통합 설정 API와 같은 ETag / 304 처리 (섹션이 없으면 빈 객체)
+    section = current_config().get("ocr", {})
+    return conditional_json(request, "section:ocr", config_store.etag("ocr"), lambda: section)
 
 @app.put("/api/settings/ocr")
 async def update_ocr_settings(request: Request):
@@ -1144,8 +1374,17 @@ async def update_ocr_settings(request: Request):
 async def test_ocr(request: Request):
     try:
         data = await request.json()
-        # 실제 OCR 테스트 로직 (구현 필요)
-        return {"success": True, "message": "OCR 테스트 성공", "text": "123456"}
+        # 저장된 설정 위에 화면에서 보낸 값을 덮어써서 합성 번호 이미지로 후보 선택 → OCR → 투표 실행
+        ocr = {**current_config().get("ocr", {}), **(data or {})}
+        result = await asyncio.to_thread(run_ocr_test, ocr)
+        matched = result["text"] == result["expected"]
+        message = (f"OCR 테스트 {'성공' if matched else '완료'}: 기대값 {result['expected']}, "
+                   f"인식 {result['text'] or '없음'} (신뢰도 {result['confidence']}, "
+                   f"후보 {result['candidates']}개 중 {result['ocrCalls']}개 OCR)")
+        return {"success": True, "message": message, "text": result["text"], "result": result}
+    except RuntimeError as e:
+        # OCR 엔진 패키지 미설치 등
+        return JSONResponse(status_code=503, content={"message": str(e)})
     except Exception as e:
         print(f"OCR 테스트 오류: {str(e)}")
         return JSONResponse(
@@ -1154,11 +1393,11 @@ async def test_ocr(request: Request):
         )
 
 @app.get("/api/settings/tracking")
-def get_tracking_settings():
+async def get_tracking_settings(request: Request):
     """기존 설정 API를 새 통합 설정 API로 리다이렉션"""
-    # 통합 설정 API 호출 (비동기 함수를 동기 환경에서 호출할 수 없으므로 직접 구현)
-    config = load_config()
-    return config.get("tracking", {})
+    # 통합 설정 API와 같은 ETag / 304 처리 (섹션이 없으면 빈 객체)
+    section = current_config().get("tracking", {})
+    return conditional_json(request, "section:tracking", config_store.etag("tracking"), lambda: section)
 
 @app.put("/api/settings/tracking")
 async def update_tracking_settings(request: Request):
@@ -1170,8 +1409,13 @@ async def update_tracking_settings(request: Request):
 async def test_tracking(request: Request):
     try:
         data = await request.json()
-        # 실제 트래킹 테스트 로직 (구현 필요)
-        return {"success": True, "message": "추적 테스트 성공"}
+        # 저장된 설정 위에 화면에서 보낸 (아직 저장 전) 값을 덮어써서 합성 시나리오로 실행
+        config = current_config()
+        tracking = {**config.get("tracking", {}), **(data or {})}
+        result = await asyncio.to_thread(run_tracking_test, tracking, config.get("rois", []))
+        message = (f"추적 테스트 성공: 트럭 {result['trucks']}대, 확정 트랙 {result['tracksConfirmed']}개, "
+                   f"ID 전환 {result['idSwitches']}회, 프레임당 {result['avgUpdateUs']}µs")
+        return {"success": True, "message": message, "result": result}
     except Exception as e:
         print(f"트래킹 테스트 오류: {str(e)}")
         return JSONResponse(
@@ -1180,11 +1424,11 @@ async def test_tracking(request: Request):
         )
 
 @app.get("/api/settings/system")
-def get_system_settings():
+async def get_system_settings(request: Request):
     """기존 설정 API를 새 통합 설정 API로 리다이렉션"""
-    # 통합 설정 API 호출 (비동기 함수를 동기 환경에서 호출할 수 없으므로 직접 구현)
-    config = load_config()
-    return config.get("system", {})
+    # 통합 설정 API와 같은 ETag / 304 처리 (섹션이 없으면 빈 객체)
+    section = current_config().get("system", {})
+    return conditional_json(request, "section:system", config_store.etag("system"), lambda: section)
 
 @app.put("/api/settings/system")
 async def update_system_settings(request: Request):
@@ -1237,23 +1481,28 @@ def backup_system():
         )
 
 @app.post("/api/settings/save")
-def save_all_settings():
+async def save_all_settings():
     """모든 설정을 저장합니다."""
-    config = load_config()
-    if save_config(config):
-        return {"success": True, "message": "모든 설정이 성공적으로 저장되었습니다."}
-    else:
+    try:
+        _, version = await update_config(lambda config: None)
+        return {"success": True, "message": "모든 설정이 성공적으로 저장되었습니다.", "version": version}
+    except Exception:
         return JSONResponse(
             status_code=500,
             content={"success": False, "message": "설정 저장 중 오류가 발생했습니다."}
         )
 
 @app.post("/api/settings/reset")
-def reset_settings():
+async def reset_settings():
     """모든 설정을 기본값으로 재설정합니다."""
-    if save_config(DEFAULT_CONFIG):
-        return {"success": True, "message": "모든 설정이 기본값으로 재설정되었습니다."}
-    else:
+    def reset(config):
+        config.clear()
+        config.update(thaw(DEFAULT_CONFIG))
+    
+    try:
+        _, version = await update_config(reset)
+        return {"success": True, "message": "모든 설정이 기본값으로 재설정되었습니다.", "version": version}
+    except Exception:
         return JSONResponse(
             status_code=500,
             content={"success": False, "message": "설정 재설정 중 오류가 발생했습니다."}
@@ -1289,7 +1538,7 @@ def delete_dataset(dataset_id: str):
 
 @app.get("/api/training/hyperparameters")
 def get_hyperparameters():
-    config = load_config()
+    config = current_config()
     hyperparameters = config.get("training", {}).get("hyperparameters", {})
     
     # 하이퍼파라미터 설정이 없는 경우, 기본값 반환
@@ -1303,20 +1552,15 @@ async def update_hyperparameters(request: Request):
     try:
         data = await request.json()
         
-        # 전체 설정 로드
-        config = load_config()
-        
-        # 'training' 섹션이 없으면 생성
-        if "training" not in config:
-            config["training"] = {}
-        if "hyperparameters" not in config["training"]:
-            config["training"]["hyperparameters"] = {}
-        
-        # 하이퍼파라미터 설정 업데이트
-        config["training"]["hyperparameters"] = data
+        def set_hyperparameters(config):
+            # 'training' 섹션이 없으면 생성
+            if "training" not in config:
+                config["training"] = {}
+            
+            # 하이퍼파라미터 설정 업데이트
+            config["training"]["hyperparameters"] = data
         
-        # 변경된 설정 저장
-        save_config(config)
+        await update_config(set_hyperparameters)
         
         return data
     except Exception as e:
@@ -1434,7 +1678,7 @@ def get_test_results(model_id: str):
 
 @app.get("/api/training/deployment/settings")
 def get_deployment_settings():
-    config = load_config()
+    config = current_config()
     deployment_settings = config.get("training", {}).get("deployment_settings", {})
     
     # 배포 설정이 없는 경우, 기본값 반환
@@ -1448,20 +1692,15 @@ async def update_deployment_settings(request: Request):
     try:
         data = await request.json()
         
-        # 전체 설정 로드
-        config = load_config()
-        
-        # 'training' 섹션이 없으면 생성
-        if "training" not in config:
-            config["training"] = {}
-        if "deployment_settings" not in config["training"]:
-            config["training"]["deployment_settings"] = {}
-        
-        # 배포 설정 업데이트
-        config["training"]["deployment_settings"] = data
+        def set_deployment_settings(config):
+            # 'training' 섹션이 없으면 생성
+            if "training" not in config:
+                config["training"] = {}
+            
+            # 배포 설정 업데이트
+            config["training"]["deployment_settings"] = data
         
-        # 변경된 설정 저장
-        save_config(config)
+        await update_config(set_deployment_settings)
         
         return data
     except Exception as e:
@@ -1499,32 +1738,24 @@ def get_deployed_models():
     ]
 
 @app.delete("/api/roi/{roi_id}")
-def delete_roi(roi_id: str):
+async def delete_roi(roi_id: str):
     try:
-        # 전체 설정 로드
-        config = load_config()
-        
-        # 'rois' 섹션 확인
-        if "rois" not in config:
-            return JSONResponse(
-                status_code=404,
-                content={"message": "ROI 설정을 찾을 수 없습니다."}
-            )
-        
-        # 지정된 ID의 ROI 찾기 및 삭제
-        original_length = len(config["rois"])
-        config["rois"] = [roi for roi in config["rois"] if roi.get("id") != roi_id]
-        
-        if len(config["rois"]) == original_length:
-            return JSONResponse(
-                status_code=404,
-                content={"message": f"ID가 '{roi_id}'인 ROI를 찾을 수 없습니다."}
-            )
-        
-        # 변경된 설정 저장
-        save_config(config)
+        def remove_roi(config):
+            # 'rois' 섹션 확인
+            if "rois" not in config:
+                raise LookupError("ROI 설정을 찾을 수 없습니다.")
+            
+            # 지정된 ID의 ROI 찾기 및 삭제
+            original_length = len(config["rois"])
+            config["rois"] = [roi for roi in config["rois"] if roi.get("id") != roi_id]
+            
+            if len(config["rois"]) == original_length:
+                raise LookupError(f"ID가 '{roi_id}'인 ROI를 찾을 수 없습니다.")
         
-        return {"success": True, "message": "ROI 삭제 성공"}
+        _, version = await update_config(remove_roi)
+        return {"success": True, "message": "ROI 삭제 성공", "version": version}
+    except LookupError as e:
+        return JSONResponse(status_code=404, content={"message": str(e)})
     except Exception as e:
         print(f"ROI 삭제 오류: {str(e)}")
         return JSONResponse(
@@ -1533,31 +1764,31 @@ def delete_roi(roi_id: str):
         )
 
 @app.get("/api/roi/export")
-def export_roi_config():
-    config = load_config()
-    rois = config.get("rois", [])
-    
-    # ROI가 없는 경우, 기본값 반환
-    if not rois:
-        rois = DEFAULT_CONFIG.get("rois", [])
-    
-    return rois
+def export_roi_config(request: Request):
+    config = current_config()
+
+    def build():
+        rois = config.get("rois", [])
+
+        # ROI가 없는 경우, 기본값 반환
+        if not rois:
+            rois = DEFAULT_CONFIG.get("rois", [])
+
+        return rois
+
+    return conditional_json(request, "rois", config_store.etag("rois"), build)
 
 @app.post("/api/roi/import")
 async def import_roi_config(request: Request):
     try:
         rois = await request.json()
         
-        # 전체 설정 로드
-        config = load_config()
+        def set_rois(config):
+            # 'rois' 섹션 업데이트
+            config["rois"] = rois
         
-        # 'rois' 섹션 업데이트
-        config["rois"] = rois
-        
-        # 변경된 설정 저장
-        save_config(config)
-        
-        return {"success": True, "message": "ROI 설정 가져오기 성공"}
+        _, version = await update_config(set_rois)
+        return {"success": True, "message": "ROI 설정 가져오기 성공", "version": version}
     except Exception as e:
         print(f"ROI 가져오기 오류: {str(e)}")
         return JSONResponse(
@@ -1581,126 +1812,153 @@ def stop_roi_test():
     return {"success": True, "message": "ROI 테스트 중지"}
 
 @app.get("/api/stats/detection")
-def get_detection_statistics(from_date: str, to_date: str):
+async def get_detection_statistics(from_date: str, to_date: str):
+    # 시간대별 분포가 필요하므로 시간 버킷으로 집계 (합계와 ROI별 값도 같은 결과에서 계산)
+    try:
+        summary = await asyncio.to_thread(event_store.summarize, stats_time(from_date), stats_time(to_date),
+                                          rollups.HOUR, False)
+    except Exception as e:
+        return stats_error(e)
+    totals = summary.totals
+    areas = sorted(summary.by_roi.items(), key=lambda item: item[1].events, reverse=True)
     return {
         "detectionByType": [
-            {"name": "트럭", "value": 12500},
-            {"name": "컨테이너", "value": 8200},
-            {"name": "기타 차량", "value": 4192}
+            {"name": "번호 인식", "value": totals.successes},
+            {"name": "인식 실패", "value": totals.failures},
         ],
         "detectionByTime": [
-            {"date": "00-04", "count": 1250, "success": 1180},
-            {"date": "04-08", "count": 2100, "success": 1950},
-            {"date": "08-12", "count": 5200, "success": 4900},
-            {"date": "12-16", "count": 4800, "success": 4500},
-            {"date": "16-20", "count": 6300, "success": 5900},
-            {"date": "20-24", "count": 3200, "success": 3000}
+            {"date": f"{hour:02d}-{hour + 4:02d}", "count": band.events, "success": band.successes}
+            for hour, band in hour_bands(summary, 4)
         ],
         "detectionByArea": [
-            {"area": "입구", "count": 8500, "success": 8100},
-            {"area": "출구", "count": 7200, "success": 6800},
-            {"area": "주차장", "count": 5100, "success": 4700},
-            {"area": "하차장", "count": 4092, "success": 3800}
+            {"area": roi or "ROI 없음", "count": roi_totals.events, "success": roi_totals.successes}
+            for roi, roi_totals in areas
         ],
-        "averageAccuracy": 92.8,
-        "averageProcessingSpeed": 185,
-        "falseDetectionRate": 3.2
+        "averageAccuracy": totals.success_rate,
+        "averageProcessingSpeed": totals.avg_processing,
+        "falseDetectionRate": round(100 - totals.success_rate, 1) if totals.events else 0.0,
     }
 
 @app.get("/api/stats/ocr")
-def get_ocr_statistics(from_date: str, to_date: str):
+async def get_ocr_statistics(from_date: str, to_date: str):
+    try:
+        summary = await asyncio.to_thread(event_store.summarize, stats_time(from_date), stats_time(to_date))
+    except Exception as e:
+        return stats_error(e)
+    totals = summary.totals
+    levels = summary.confidence_counts(rollups.OCR_CONFIDENCE_RANGES)
     return {
-        "accuracyTrend": [
-            {"date": "5/1", "accuracy": 85.2},
-            {"date": "5/5", "accuracy": 86.1},
-            {"date": "5/10", "accuracy": 87.5},
-            {"date": "5/15", "accuracy": 88.2},
-            {"date": "5/20", "accuracy": 89.0},
-            {"date": "5/25", "accuracy": 89.5},
-            {"date": "5/30", "accuracy": 89.7}
-        ],
-        "confidenceLevels": [
-            {"name": "90-100%", "value": 12500},
-            {"name": "80-90%", "value": 6800},
-            {"name": "70-80%", "value": 3200},
-            {"name": "60-70%", "value": 1500},
-            {"name": "<60%", "value": 892}
-        ],
+        "accuracyTrend": [{"date": day_label(day), "accuracy": day_totals.success_rate} for day, day_totals in summary.series()],
+        "confidenceLevels": [{"name": name, "value": count} for name, count in reversed(levels.items())],
         "errorTypes": [
-            {"type": "숫자 오인식", "count": 450},
-            {"type": "부분 누락", "count": 320},
-            {"type": "번호판 미감지", "count": 280},
-            {"type": "저해상도", "count": 210},
-            {"type": "기타", "count": 140}
+            {"type": "번호 미인식", "count": totals.failures},
+            {"type": "PLC 미전송", "count": totals.successes - totals.plc_sent},
         ],
-        "averageAccuracy": 89.7,
-        "averageProcessingTime": 75,
-        "errorRate": 10.3
+        "averageAccuracy": totals.success_rate,
+        "averageProcessingTime": totals.avg_processing,
+        "errorRate": round(100 - totals.success_rate, 1) if totals.events else 0.0,
     }
 
 @app.get("/api/stats/processing-time")
-def get_processing_time_statistics(from_date: str, to_date: str):
+async def get_processing_time_statistics(from_date: str, to_date: str):
+    """
+    OCR 처리 시간 통계. 이벤트에는 OCR 단계 시간만 기록되므로 단계별 시간은 OCR 처리 하나입니다.
+    백분위 (percentiles)는 로그 칸 히스토그램에서 계산하며 상대 오차는 2% 이내입니다.
+    """
+    try:
+        start, end = stats_time(from_date), stats_time(to_date)
+        daily = await asyncio.to_thread(event_store.summarize, start, end)
+        hourly = await asyncio.to_thread(event_store.summarize, start, end, rollups.HOUR, False)
+    except Exception as e:
+        return stats_error(e)
+    totals = daily.totals
+    bands = hour_bands(hourly, 2)
+    peak = max(band.events for _, band in bands) or 1
     return {
-        "processingSteps": [
-            {"name": "영상 획득", "time": 15},
-            {"name": "전처리", "time": 25},
-            {"name": "객체 감지", "time": 120},
-            {"name": "객체 추적", "time": 35},
-            {"name": "OCR 처리", "time": 75},
-            {"name": "후처리", "time": 20}
-        ],
+        "processingSteps": [{"name": "OCR 처리", "time": totals.avg_processing}],
         "timeTrend": [
-            {"date": "5/1", "total": 310, "detection": 135, "ocr": 85},
-            {"date": "5/5", "total": 300, "detection": 130, "ocr": 82},
-            {"date": "5/10", "total": 285, "detection": 125, "ocr": 80},
-            {"date": "5/15", "total": 275, "detection": 122, "ocr": 78},
-            {"date": "5/20", "total": 265, "detection": 120, "ocr": 76},
-            {"date": "5/25", "total": 255, "detection": 118, "ocr": 75},
-            {"date": "5/30", "total": 245, "detection": 115, "ocr": 75}
+            {"date": day_label(day), "total": day_totals.avg_processing, "ocr": day_totals.avg_processing,
+             "p95": daily.percentile(0.95, day)}
+            for day, day_totals in daily.series()
         ],
-        "loadDistribution": [
-            {"date": "00:00", "load": 15},
-            {"date": "02:00", "load": 10},
-            {"date": "04:00", "load": 8},
-            {"date": "06:00", "load": 20},
-            {"date": "08:00", "load": 45},
-            {"date": "10:00", "load": 65},
-            {"date": "12:00", "load": 70},
-            {"date": "14:00", "load": 75},
-            {"date": "16:00", "load": 80},
-            {"date": "18:00", "load": 70},
-            {"date": "20:00", "load": 55},
-            {"date": "22:00", "load": 30}
-        ],
-        "averageTotalTime": 245,
-        "maxProcessingTime": 520,
-        "processingsPerSecond": 4.1
+        # 시간대별 처리량 (가장 바쁜 구간 대비 %)
+        "loadDistribution": [{"date": f"{hour:02d}:00", "load": round(band.events / peak * 100)} for hour, band in bands],
+        "percentiles": {f"p{int(q * 100)}": daily.percentile(q) for q in (0.5, 0.9, 0.95, 0.99)},
+        "averageTotalTime": totals.avg_processing,
+        "maxProcessingTime": totals.processing_max,
+        "processingsPerSecond": round(totals.events / max(daily.end - daily.start, 1), 2),
     }
 
 @app.get("/api/settings/all")
-async def get_all_settings_api():
-    """모든 설정을 반환합니다."""
-    return load_config()
+async def get_all_settings_api(request: Request):
+    """모든 설정을 반환합니다. If-None-Match가 현재 ETag와 같으면 304를 반환합니다."""
+    config = current_config()
+    return conditional_json(request, "all", config_store.etag(), lambda: config)
+
+@app.get("/api/settings/events")
+async def settings_events(request: Request):
+    """
+    설정 변경 알림 (Server-Sent Events). 대시보드는 주기적으로 설정을 다시 받는 대신
+    이 스트림을 열어 두고, 알림을 받은 섹션만 (If-None-Match와 함께) 다시 조회합니다.
+
+    event: settings / id: 버전 / data: {"version", "sections"}
+    재연결 시 브라우저가 보내는 Last-Event-ID 이후에 바뀐 섹션은 연결 직후 바로 알려 줍니다.
+    """
+    queue = watch_settings()
+    last_event_id = request.headers.get("last-event-id", "")
+
+    def event(version, sections):
+        data = json.dumps({"version": version, "sections": sections}, ensure_ascii=False)
+        return f"event: settings\nid: {config_store.epoch}-{version}\ndata: {data}\n\n"
+
+    async def stream():
+        try:
+            yield "retry: 3000\n\n"
+            current_config()
+            if last_event_id:
+                epoch, _, version = last_event_id.rpartition("-")
+                if epoch != config_store.epoch or not version.isdigit():
+                    # 서버가 재시작됨: 모든 섹션을 다시 받게 함
+                    yield event(config_store.version, sorted(config_store.section_versions))
+                else:
+                    sections = config_store.changed_since(int(version))
+                    if sections:
+                        yield event(config_store.version, sections)
+            while True:
+                try:
+                    version, sections = await asyncio.wait_for(queue.get(), SETTINGS_EVENTS_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    current_config()  # 파일을 직접 편집한 경우도 확인 (바뀌었으면 알림이 큐로 들어옴)
+                    yield ": keepalive\n\n"
+                    continue
+                yield event(version, sections)
+        finally:
+            settings_listeners.discard(queue)
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 @app.get("/api/settings/{section_path:path}")
-async def get_section_settings_api(section_path: str):
+async def get_section_settings_api(section_path: str, request: Request):
     """
     지정된 섹션의 설정을 반환합니다. 
     섹션 경로는 '.'으로 구분됩니다 (예: 'training.hyperparameters').
+    ETag는 최상위 섹션이 바뀔 때만 바뀌며, If-None-Match가 같으면 304를 반환합니다.
     """
-    config = load_config()
+    config = current_config()
     parts = section_path.split('.')
     current_level = config
     try:
         for part in parts:
-            if isinstance(current_level, list):
+            if isinstance(current_level, (list, tuple)):
                 # 리스트인 경우, 정확한 경로가 아니면 오류 발생
                 return JSONResponse(
                     status_code=400, 
                     content={"message": f"경로 '{section_path}'는 리스트에 키로 접근하려고 합니다. 전체 리스트를 반환합니다."}
                 )
             current_level = current_level[part]
-        return current_level
+        value = current_level
+        return conditional_json(request, f"section:{section_path}", config_store.etag(parts[0]), lambda: value)
     except KeyError:
         return JSONResponse(
             status_code=404, 
@@ -1723,12 +1981,11 @@ async def update_section_settings_api(section_path: str, request: Request):
             content={"message": "요청 본문의 JSON 형식이 유효하지 않습니다"}
         )
 
-    config = load_config()  # 현재 전체 설정을 로드
-    
     parts = section_path.split('.')
-    current_level = config
     
-    try:
+    def apply_section(config):
+        current_level = config
+        
         # 마지막 부분을 제외하고 경로 탐색
         for i, part in enumerate(parts[:-1]):
             if part not in current_level:
@@ -1736,13 +1993,11 @@ async def update_section_settings_api(section_path: str, request: Request):
                 current_level[part] = {}
             elif not isinstance(current_level[part], dict):
                 # 경로 중간에 dict가 아닌 경우, 오류 반환
-                return JSONResponse(
-                    status_code=400, 
-                    content={"message": f"경로 '{'.'.join(parts[:i+1])}'는 사전이 아니라 '{type(current_level[part]).__name__}'입니다. 이 위치에 새 데이터를 추가할 수 없습니다."}
-                )
+                raise ValueError(f"경로 '{'.'.join(parts[:i+1])}'는 사전이 아니라 '{type(current_level[part]).__name__}'입니다. 이 위치에 새 데이터를 추가할 수 없습니다.")
             current_level = current_level[part]
         
         target_key = parts[-1]
+        old_data = thaw(current_level.get(target_key))  # 깊은 병합이 하위 dict를 제자리에서 바꾸므로 사본
         
         # 기존 데이터가 없으면 새 데이터로 설정
         if target_key not in current_level:
@@ -1766,22 +2021,40 @@ async def update_section_settings_api(section_path: str, request: Request):
                 
                 # 깊은 병합 수행
                 current_level[target_key] = deep_merge(new_section_data, existing_data.copy())
-            elif isinstance(existing_data, list) and isinstance(new_section_data, list):
-                # 둘 다 리스트인 경우, 새 리스트로 대체 (리스트는 통째로 업데이트)
-                current_level[target_key] = new_section_data
             else:
-                # 다른 타입인 경우, 새 데이터로 대체
+                # 리스트이거나 다른 타입인 경우, 새 데이터로 대체 (리스트는 통째로 업데이트)
                 current_level[target_key] = new_section_data
         
-        # 변경된 설정 저장
-        save_config(config)
+        # PATCH와 같은 섹션 스키마로 바뀐 값만 검증 (잘못된 값은 저장하지 않고 422)
+        # 설정 화면의 입력 폼은 숫자도 문자열로 보내므로 PUT은 타입 변환을 허용하고 변환된 값으로 저장
+        changed, removed = diff(old_data, current_level[target_key])
+        settings_validator.validate(config, [tuple(parts) + path for path in list(changed) + removed],
+                                    [tuple(parts) + path for path in removed], strict=False)
+        
+        # 같은 쓰기에 합쳐진 다음 변경이 응답 내용을 바꾸지 않도록 사본 반환
+        return thaw(current_level[target_key])
+    
+    try:
+        # 쓰기 큐에서 최신 설정에 적용 (동시에 들어온 변경은 한 번에 저장)
+        updated_section_data, version = await update_config(apply_section)
         
         # 업데이트된 전체 섹션 데이터 반환
         return {
             "success": True, 
             "message": f"섹션 '{section_path}' 업데이트 성공", 
-            "updated_section_data": current_level[target_key]
+            "updated_section_data": updated_section_data,
+            "version": version
         }
+    except SettingsValidationError as e:
+        return JSONResponse(
+            status_code=422,
+            content={"message": f"설정 값 검증 실패: {e}", "errors": e.errors}
+        )
+    except ValueError as e:
+        return JSONResponse(
+            status_code=400, 
+            content={"message": str(e)}
+        )
     except Exception as e:
         print(f"섹션 '{section_path}' 업데이트 오류: {str(e)}")
         return JSONResponse(
@@ -1789,6 +2062,79 @@ async def update_section_settings_api(section_path: str, request: Request):
             content={"message": f"섹션 '{section_path}' 업데이트 오류: {str(e)}"}
         )
 
+@app.patch("/api/settings/{section_path:path}")
+async def patch_section_settings_api(section_path: str, request: Request):
+    """
+    지정된 섹션의 일부만 변경합니다. (섹션 경로가 비어 있으면 설정 전체 기준)
+    - 배열 본문: JSON Patch (RFC 6902) 연산. 예) [{"op": "replace", "path": "/confidenceThreshold", "value": 0.4}]
+    - 객체 본문: 바꿀 키만 담은 최소 변경 (RFC 7396). 값이 null인 키는 삭제
+    바뀐 값은 섹션 스키마로 검증한 뒤 저장하고, 응답에는 바뀐 경로와 새 버전만 담습니다.
+    """
+    try:
+        patch = await request.json()
+    except Exception:
+        return JSONResponse(
+            status_code=400,
+            content={"message": "요청 본문의 JSON 형식이 유효하지 않습니다"}
+        )
+    if not isinstance(patch, (list, dict)):
+        return JSONResponse(
+            status_code=400,
+            content={"message": "요청 본문은 JSON Patch 연산 배열이나 변경할 키를 담은 객체여야 합니다"}
+        )
+
+    parts = [part for part in section_path.split('.') if part]
+
+    def apply_patch(config):
+        parent = config
+        for part in parts[:-1]:
+            parent = parent.get(part) if isinstance(parent, dict) else None
+        if parts and (not isinstance(parent, dict) or parts[-1] not in parent):
+            raise LookupError(f"섹션 또는 키 '{section_path}'를 찾을 수 없습니다")
+        old = parent[parts[-1]] if parts else config
+        if isinstance(patch, list):
+            new = apply_json_patch(thaw(old), patch)
+        else:
+            new = apply_merge_patch(thaw(old), patch)
+        changed, removed = diff(old, new)
+        if not parts and not isinstance(new, dict):
+            raise PatchError("설정 전체를 객체가 아닌 값으로 바꿀 수 없습니다")
+        if parts:
+            parent[parts[-1]] = new
+        else:
+            config.clear()
+            config.update(new)
+        base = tuple(parts)
+        settings_validator.validate(config, [base + path for path in list(changed) + removed],
+                                    [base + path for path in removed])
+        return ({format_pointer(path): thaw(value) for path, value in changed.items()},
+                [format_pointer(path) for path in removed])
+
+    try:
+        # 쓰기 큐에 넣기 전에 현재 스냅샷으로 먼저 적용해 봄: 잘못된 요청은 바로 거부하고 바뀐 값이 없으면 쓰지 않음
+        changed, removed = apply_patch(thaw(current_config()))
+        if not changed and not removed:
+            return {"success": True, "changed": {}, "removed": [], "version": config_store.version}
+        (changed, removed), version = await update_config(apply_patch)
+        return {"success": True, "changed": changed, "removed": removed, "version": version}
+    except LookupError as e:
+        return JSONResponse(status_code=404, content={"message": str(e)})
+    except PatchConflict as e:
+        return JSONResponse(status_code=409, content={"message": str(e)})
+    except SettingsValidationError as e:
+        return JSONResponse(
+            status_code=422,
+            content={"message": f"설정 값 검증 실패: {e}", "errors": e.errors}
+        )
+    except PatchError as e:
+        return JSONResponse(status_code=400, content={"message": str(e)})
+    except Exception as e:
+        print(f"섹션 '{section_path}' 부분 업데이트 오류: {str(e)}")
+        return JSONResponse(
+            status_code=500,
+            content={"message": f"섹션 '{section_path}' 부분 업데이트 오류: {str(e)}"}
+        )
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run( "main:app", host="127.0.0.1", port=8010 , reload=True )
\ No newline at end of file
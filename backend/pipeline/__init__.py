@@ -0,0 +1,3 @@
+"""
+영상 처리 파이프라인 모듈 모음 (캡처, 송출, 감지 등)
+"""
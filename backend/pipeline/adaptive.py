@@ -0,0 +1,209 @@
+import json
+import math
+import time
+from typing import List, Optional
+
+from pipeline.encoder import EncodeProfile
+
+MIN_FPS = 1.0
+MIN_QUALITY = 30
+QUALITY_STEP = 10
+CONGESTION_RATIO = 0.8  # 송신 지연이 프레임 간격의 80%를 넘으면 혼잡으로 판단
+UPGRADE_RATIO = 0.3  # 송신 지연이 프레임 간격의 30% 미만일 때만 해상도/화질 상향
+DECREASE_COOLDOWN = 0.5  # 연속 감소를 막기 위한 최소 간격 (초)
+
+
+def _finite(value, name: str) -> float:
+    value = float(value)
+    if not math.isfinite(value):
+        raise ValueError(f"{name}는 유한한 숫자여야 합니다: {value}")
+    return value
+
+
+# === 클라이언트별 적응형 송출 제어 ===
+class AdaptiveStream:
+    """
+    클라이언트가 요청한 fps / 최대 가로 크기 / JPEG 품질을 상한으로 두고,
+    측정된 송신 지연에 따라 AIMD 방식으로 실제 송출 수준을 조절합니다.
+
+    - 혼잡(송신 지연 초과, 큐 프레임 폐기): fps를 절반으로 줄이고,
+      이미 최저 fps이면 해상도 단계를, 그 다음엔 품질을 낮춥니다.
+    - 약 1초 동안 정상 송신이 이어지면 fps를 1씩 올리고, 요청 fps에
+      도달한 뒤 여유가 있으면 해상도와 품질을 한 단계씩 복구합니다.
+    """
+
+    def __init__(self, ladder: List[EncodeProfile], source_fps: float = 30.0):
+        # 큰 해상도부터 작은 해상도 순서 (0번이 원본)
+        self.ladder = sorted(ladder, key=lambda p: p.max_width or 1 << 30, reverse=True)
+        self.source_fps = source_fps if source_fps and source_fps > 0 else 30.0
+        self.max_quality = self.ladder[0].quality
+
+        self.requested_fps = 0.0  # 0이면 카메라 fps 그대로
+        self.requested_rung = 0
+        self.requested_quality = self.max_quality
+        self.adaptive = True
+
+        self.fps = self.source_fps
+        self.rung = 0
+        self.quality = self.max_quality
+        self._last_due = 0.0
+        self._last_decrease = 0.0
+        self._good_sends = 0
+        self._profile_cache = {}
+
+        # 통계
+        self.congestion_events = 0
+        self.frames_skipped = 0
+
+    # --- 요청 처리 ---
+    def configure(self, fps=None, max_width=None, quality=None, adaptive=None):
+        """
+        클라이언트 요청을 반영하고 실제 송출 수준을 요청값으로 재설정합니다.
+        숫자가 아니거나 유한하지 않은 값 (1e999 → inf, NaN)이 있으면 아무것도 바꾸지 않고 ValueError.
+        """
+        fps, max_width, quality = (None if value is None else _finite(value, name) for name, value in
+                                   (("fps", fps), ("maxWidth", max_width), ("quality", quality)))
+        if fps is not None:
+            self.requested_fps = max(0.0, fps)
+        if max_width is not None:
+            self.requested_rung = self._rung_for_width(int(max_width))
+        if quality is not None:
+            self.requested_quality = self._snap_quality(int(quality))
+        if adaptive is not None:
+            self.adaptive = bool(adaptive)
+
+        self.fps = self.target_fps
+        self.rung = self.requested_rung
+        self.quality = self.requested_quality
+        self._good_sends = 0
+
+    def configure_from_message(self, message: dict):
+        self.configure(
+            fps=message.get("fps"),
+            max_width=message.get("maxWidth"),
+            quality=message.get("quality"),
+            adaptive=message.get("adaptive"),
+        )
+
+    @property
+    def target_fps(self) -> float:
+        if self.requested_fps <= 0:
+            return self.source_fps
+        return min(self.requested_fps, self.source_fps)
+
+    def _rung_for_width(self, max_width: int) -> int:
+        if max_width <= 0:
+            return 0
+        # 요청 가로 크기 이하인 가장 큰 단계 (없으면 가장 작은 단계)
+        for index, profile in enumerate(self.ladder):
+            if profile.max_width and profile.max_width <= max_width:
+                return index
+        return len(self.ladder) - 1
+
+    def _snap_quality(self, quality: int) -> int:
+        # 인코딩 조합 수를 제한하기 위해 품질은 QUALITY_STEP 단위로 맞춤
+        quality = int(round(quality / QUALITY_STEP) * QUALITY_STEP)
+        return max(MIN_QUALITY, min(self.max_quality, quality))
+
+    # --- 송출 판단 ---
+    @property
+    def profile(self) -> EncodeProfile:
+        rung = self.ladder[self.rung]
+        quality = min(self.quality, rung.quality)
+        key = (self.rung, quality)
+        profile = self._profile_cache.get(key)
+        if profile is None:
+            profile = EncodeProfile(f"{rung.name}-q{quality}", rung.max_width, quality)
+            self._profile_cache[key] = profile
+        return profile
+
+    def due(self, timestamp: float) -> bool:
+        """현재 fps 기준으로 이 프레임을 보낼 차례인지 판단합니다."""
+        interval = 1.0 / self.fps
+        # 카메라 프레임 간격의 절반만큼 여유를 두어 fps 분주 시 떨림 방지
+        tolerance = 0.5 / self.source_fps
+        if timestamp - self._last_due < interval - tolerance:
+            self.frames_skipped += 1
+            return False
+        self._last_due = timestamp
+        return True
+
+    # --- 피드백 ---
+    def on_sent(self, elapsed_ms: float):
+        if not self.adaptive:
+            return
+        budget_ms = 1000.0 / self.fps
+        if elapsed_ms > budget_ms * CONGESTION_RATIO:
+            self.on_congestion()
+            return
+
+        self._good_sends += 1
+        if self._good_sends < max(1, int(self.fps)):
+            return
+        self._good_sends = 0
+
+        # 가산 증가: fps → 해상도 → 품질 순서로 복구
+        if self.fps < self.target_fps:
+            self.fps = min(self.target_fps, self.fps + 1.0)
+        elif elapsed_ms < budget_ms * UPGRADE_RATIO:
+            if self.rung > self.requested_rung:
+                self.rung -= 1
+            elif self.quality < self.requested_quality:
+                self.quality = min(self.requested_quality, self.quality + QUALITY_STEP)
+
+    def on_dropped(self):
+        if self.adaptive:
+            self.on_congestion()
+
+    def on_congestion(self):
+        now = time.monotonic()
+        if now - self._last_decrease < DECREASE_COOLDOWN:
+            return
+        self._last_decrease = now
+        self._good_sends = 0
+        self.congestion_events += 1
+
+        # 승산 감소: fps를 먼저 줄이고, 최저 fps이면 해상도, 그 다음 품질
+        if self.fps > MIN_FPS:
+            self.fps = max(MIN_FPS, self.fps * 0.5)
+        elif self.rung < len(self.ladder) - 1:
+            self.rung += 1
+        elif self.quality > MIN_QUALITY:
+            self.quality = max(MIN_QUALITY, self.quality - QUALITY_STEP)
+
+    def describe(self) -> dict:
+        profile = self.profile
+        return {
+            "type": "config",
+            "adaptive": self.adaptive,
+            "requested": {
+                "fps": self.requested_fps,
+                "maxWidth": self.ladder[self.requested_rung].max_width,
+                "quality": self.requested_quality,
+            },
+            "effective": {
+                "fps": round(self.fps, 1),
+                "maxWidth": profile.max_width,
+                "quality": profile.quality,
+            },
+        }
+
+    def stats(self) -> dict:
+        stats = self.describe()
+        stats.pop("type")
+        stats["congestionEvents"] = self.congestion_events
+        stats["framesSkipped"] = self.frames_skipped
+        return stats
+
+
+def parse_control_message(message: str) -> Optional[dict]:
+    """비디오 WebSocket 텍스트 메시지 중 JSON 제어 메시지만 파싱합니다."""
+    if not message or message[0] != "{":
+        return None
+    try:
+        data = json.loads(message)
+    except ValueError:
+        return None
+    if not isinstance(data, dict) or data.get("type") != "config":
+        return None
+    return data
@@ -0,0 +1,444 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Union
+
+from pipeline.adaptive import AdaptiveStream
+from pipeline.capture import CaptureWorker, FrameRingBuffer, ProcessCaptureWorker
+from pipeline.encoder import FrameEncoder, build_profiles, parse_resolution
+from pipeline.fanout import FrameFanout
+from pipeline.frame_bus import FrameBusPublisher, bus_name
+
+SOURCE_TYPES = ("usb", "rtsp", "http", "file")
+SWAP_READY_TIMEOUT = 15.0  # 소스 교체 시 새 캡처의 첫 프레임을 기다리는 최대 시간 (초)
+
+
+# === 카메라 소스 정의 ===
+@dataclass(frozen=True)
+class CameraSource:
+    id: str
+    type: str  # usb | rtsp | http | file
+    uri: Union[int, str]  # USB 인덱스, 스트림 URL 또는 동영상 파일 경로
+    name: str = ""
+    resolution: str = "640x480"
+    fps: float = 30.0
+    enabled: bool = True
+
+    @property
+    def size(self):
+        return parse_resolution(self.resolution)
+
+
+def _source_from_entry(entry: dict, defaults: dict) -> Optional[CameraSource]:
+    source_type = str(entry.get("type", "usb")).lower()
+    if source_type not in SOURCE_TYPES:
+        print(f"⚠️ 알 수 없는 카메라 소스 유형 무시: {entry}")
+        return None
+
+    if source_type == "usb":
+        uri = entry.get("index", entry.get("usbCameraIndex", 0))
+        try:
+            uri = int(uri)
+        except (TypeError, ValueError):
+            print(f"⚠️ 잘못된 USB 카메라 인덱스 무시: {entry}")
+            return None
+    elif source_type == "file":
+        uri = entry.get("path", "")
+    else:
+        uri = entry.get("url", "")
+
+    if uri == "":
+        return None
+
+    return CameraSource(
+        id=str(entry["id"]),
+        type=source_type,
+        uri=uri,
+        name=entry.get("name", entry["id"]),
+        resolution=entry.get("resolution", defaults.get("resolution", "640x480")),
+        fps=float(entry.get("fps", defaults.get("fps", 30)) or 30),
+        enabled=bool(entry.get("enabled", True)),
+    )
+
+
+def build_camera_sources(config: dict) -> List[CameraSource]:
+    """
+    설정에서 카메라 목록을 만듭니다.
+
+    camera.sources 배열이 있으면 그대로 사용하고 (게이트별 다중 카메라),
+    없으면 기존 usbCameraIndex / rtspUrl / ipCameraUrl 값으로
+    "usb", "rtsp", "http" 카메라를 등록합니다.
+
+    예)
+    [[camera.sources]]
+    id = "gate-1"
+    type = "rtsp"          # usb | rtsp | http | file
+    url = "rtsp://..."     # usb는 index, file은 path
+    """
+    camera = config.get("camera", {})
+    entries = camera.get("sources")
+    if not entries:
+        entries = [
+            {"id": "usb", "name": "USB 카메라", "type": "usb", "index": camera.get("usbCameraIndex", "0")},
+            {"id": "rtsp", "name": "RTSP 카메라", "type": "rtsp", "url": camera.get("rtspUrl", "")},
+            {"id": "http", "name": "IP 카메라", "type": "http", "url": camera.get("ipCameraUrl", "")},
+        ]
+
+    sources = []
+    seen = set()
+    for entry in entries:
+        if "id" not in entry or entry["id"] in seen:
+            print(f"⚠️ id가 없거나 중복된 카메라 설정 무시: {entry}")
+            continue
+        source = _source_from_entry(entry, camera)
+        if source is not None and source.enabled:
+            sources.append(source)
+            seen.add(source.id)
+    return sources
+
+
+class _StandbySink:
+    """
+    교체 대기 중인 캡처 워커가 링 버퍼 대신 쓰는 송신기.
+    프레임은 버리고 첫 프레임이 들어오면 ready를 알립니다. (연결/디코딩 준비 확인용)
+    """
+
+    def __init__(self):
+        self.ready = threading.Event()
+        self.seq = 0
+
+    def publish(self, image, timestamp=None):
+        self.seq += 1
+        self.ready.set()
+
+
+# === 카메라별 스트림 ===
+class CameraStream:
+    """
+    카메라 하나의 캡처 워커, 링 버퍼, 인코더, 구독자 팬아웃과 송출 태스크를 묶습니다.
+    첫 구독자가 acquire()할 때 캡처를 시작하고, 구독자가 없으면 idle 상태가 됩니다.
+    """
+
+    def __init__(
+        self,
+        source: CameraSource,
+        encoder: FrameEncoder,
+        queue_depth: int = 2,
+        use_process: bool = False,
+        reconnect_interval: float = 10.0,
+    ):
+        self.source = source
+        self.encoder = encoder
+        self.use_process = use_process
+        self.reconnect_interval = reconnect_interval
+        self.buffer = FrameRingBuffer(capacity=4)
+        self.fanout = FrameFanout(depth=queue_depth)
+        self.worker = None
+        self.broadcast_task: Optional[asyncio.Task] = None
+        self.subscribers = 0  # 비디오 구독자 + 감지 등 내부 소비자
+        self.idle_since = time.monotonic()
+        self.started_at = None
+
+    @property
+    def id(self) -> str:
+        return self.source.id
+
+    @property
+    def running(self) -> bool:
+        return self.worker is not None and self.worker.is_alive()
+
+    # --- 구독 관리 ---
+    def acquire(self):
+        self.subscribers += 1
+        self.start()
+
+    def release(self):
+        self.subscribers = max(0, self.subscribers - 1)
+        if self.subscribers == 0:
+            self.idle_since = time.monotonic()
+
+    def idle_for(self) -> float:
+        if self.subscribers > 0:
+            return 0.0
+        return time.monotonic() - self.idle_since
+
+    # --- 캡처 시작/종료 ---
+    def _create_worker(self, source: Optional[CameraSource] = None, sink=None):
+        source = source or self.source
+        width, height = source.size
+        kwargs = dict(
+            width=width,
+            height=height,
+            max_consecutive_failures=5,
+            reconnect_interval=self.reconnect_interval,
+            name=f"capture-{self.id}",
+        )
+        if source.type == "file":
+            kwargs.update(loop=True, pace_fps=source.fps)
+        if sink is not None:
+            # 교체 대기 워커: 프레임 버스는 교체 시점에 넘겨받음
+            return CaptureWorker(source.uri, sink, **kwargs)
+        # 두 방식 모두 원본 프레임을 공유 메모리 프레임 버스에도 게시 (다른 프로세스 소비용)
+        if self.use_process:
+            return ProcessCaptureWorker(source.uri, self.buffer, camera_id=self.id, **kwargs)
+        return CaptureWorker(source.uri, self.buffer, bus=FrameBusPublisher(self.id), **kwargs)
+
+    def start(self):
+        if self.running:
+            return
+        print(f"▶️ 카메라 '{self.id}' 캡처 시작 ({self.source.type}, {'프로세스' if self.use_process else '스레드'})")
+        self.worker = self._create_worker()
+        self.worker.start()
+        self.started_at = time.time()
+        if self.broadcast_task is None or self.broadcast_task.done():
+            self.broadcast_task = asyncio.create_task(self.broadcast())
+
+    async def stop(self):
+        if self.broadcast_task is not None:
+            self.broadcast_task.cancel()
+            try:
+                await self.broadcast_task
+            except asyncio.CancelledError:
+                pass
+            self.broadcast_task = None
+        await self.fanout.close_all()
+        if self.worker is not None:
+            await asyncio.to_thread(self.worker.stop)
+            self.worker = None
+            print(f"⏹️ 카메라 '{self.id}' 캡처 중지")
+
+    async def replace_source(self, source: CameraSource, ready_timeout: float = SWAP_READY_TIMEOUT) -> bool:
+        """
+        카메라 소스를 교체합니다. 캡처 중이면 새 소스를 대기 워커로 먼저 열어 첫 프레임이
+        들어온 뒤에 이전 워커를 멈추고 링 버퍼/프레임 버스를 넘기므로, 소비자는 같은 버퍼에서
+        끊김 없이 새 소스의 프레임을 받습니다. 새 소스가 열리지 않으면 이전 소스를 유지합니다.
+        """
+        if source == self.source:
+            return False
+        if not self.running:
+            self.source = source
+            return True
+        if self.use_process:
+            # 자식 프로세스는 프레임 버스에 직접 쓰므로 대기 워커를 함께 띄울 수 없음 → 바로 재시작
+            await asyncio.to_thread(self.worker.stop)
+            self.source = source
+            self.worker = self._create_worker()
+            self.worker.start()
+            print(f"🔁 카메라 '{self.id}' 소스 교체 (프로세스 재시작)")
+            return True
+
+        standby = _StandbySink()
+        worker = self._create_worker(source, sink=standby)
+        worker.start()
+        print(f"⏳ 카메라 '{self.id}' 새 소스 준비 중: {source.uri}")
+        ready = await asyncio.to_thread(standby.ready.wait, ready_timeout)
+        if not ready or self.worker is None:
+            await asyncio.to_thread(worker.stop)
+            if not ready:
+                print(f"🚨 카메라 '{self.id}' 새 소스에서 {ready_timeout:.0f}초 동안 프레임을 받지 못해 이전 소스를 유지합니다")
+            return False
+
+        previous = self.worker
+        await asyncio.to_thread(previous.stop)
+        # 이전 워커가 멈춘 뒤 넘겨야 링 버퍼의 단일 작성자 조건이 지켜짐.
+        # 대기 워커는 계속 돌고 있으므로 버퍼를 먼저 넘기고 프레임 버스는 그 다음에 연결
+        # (대기 송신기가 돌려준 프레임 없음(None)과 버스가 한 반복에 섞이는 경우는 run()에서 건너뜀)
+        worker.buffer = self.buffer
+        worker.bus = FrameBusPublisher(self.id)
+        self.worker = worker
+        self.source = source
+        print(f"🔁 카메라 '{self.id}' 소스 교체 완료: {source.uri}")
+        return True
+
+    # --- 송출 ---
+    def create_controller(self, params) -> AdaptiveStream:
+        """
+        클라이언트별 적응형 송출 제어기를 만듭니다.
+        쿼리 파라미터(fps, maxWidth, quality, rendition)로 초기 요청을 지정할 수 있습니다.
+        """
+        controller = AdaptiveStream(self.encoder.ladder(), source_fps=self.source.fps)
+        max_width = params.get("maxWidth")
+        rendition = params.get("rendition")
+        if max_width is None and rendition in self.encoder.profiles:
+            max_width = self.encoder.profiles[rendition].max_width
+        try:
+            controller.configure(
+                fps=params.get("fps"),
+                max_width=max_width,
+                quality=params.get("quality"),
+                adaptive=params.get("adaptive", "true").lower() != "false",
+            )
+        except ValueError:
+            print(f"⚠️ 잘못된 비디오 요청 파라미터 무시: {dict(params)}")
+        return controller
+
+    async def broadcast(self):
+        # 캡처는 별도 스레드/프로세스에서 수행되므로 여기서는 새 프레임만 기다림
+        last_seq = 0
+        last_published_seq = 0
+        # 인코딩 스레드 수만큼 프레임을 동시에 인코딩
+        encode_slots = asyncio.Semaphore(self.encoder.workers)
+
+        async def encode_and_publish(frame, targets):
+            nonlocal last_published_seq
+            try:
+                encoded = await self.encoder.encode(frame, {profile for _, profile in targets})
+            except Exception as e:
+                print(f"💥 프레임 인코딩 중 예외 발생 ({self.id}): {e}")
+                return
+            finally:
+                encode_slots.release()
+            # 늦게 끝난 이전 프레임은 버림
+            if encoded.seq <= last_published_seq:
+                return
+            last_published_seq = encoded.seq
+            for channel, profile in targets:
+                self.fanout.deliver(channel, encoded.renditions[profile.name])
+
+        while True:
+            # 클라이언트가 없으면 프레임 처리 생략
+            if not self.fanout:
+                await asyncio.sleep(0.5)
+                continue
+
+            await encode_slots.acquire()
+            frame = await self.buffer.wait_next(last_seq, timeout=1.0)
+            if frame is None:
+                encode_slots.release()
+                continue
+            last_seq = frame.seq
+
+            # 이번 프레임을 받을 차례인 구독자만 골라, 필요한 프로파일만 한 번씩 인코딩
+            targets = [(channel, channel.profile) for channel in self.fanout.due_channels(frame.timestamp)]
+            if not targets:
+                encode_slots.release()
+                continue
+            asyncio.create_task(encode_and_publish(frame, targets))
+
+    def stats(self) -> dict:
+        return {
+            "id": self.id,
+            "name": self.source.name,
+            "type": self.source.type,
+            "resolution": self.source.resolution,
+            "running": self.running,
+            "subscribers": self.subscribers,
+            "idleSeconds": round(self.idle_for(), 1),
+            "capture": self.worker.stats() if self.worker is not None else None,
+            "video": self.fanout.stats(),
+            "encoder": self.encoder.stats(),
+        }
+
+
+# === 카메라 레지스트리 ===
+class CameraRegistry:
+    """설정으로부터 카메라별 CameraStream을 만들고 유휴 카메라를 정리합니다."""
+
+    def __init__(self, config: dict, encode_workers: int = 2, queue_depth: int = 2, use_process: bool = False):
+        self.encode_workers = max(1, encode_workers)
+        # 모든 카메라가 하나의 인코딩 스레드 풀을 공유
+        self.executor = ThreadPoolExecutor(max_workers=self.encode_workers, thread_name_prefix="jpeg-encode")
+        self.queue_depth = queue_depth
+        self.use_process = use_process
+        self.streams: Dict[str, CameraStream] = {}
+        camera = config.get("camera", {})
+        reconnect_interval = float(camera.get("reconnectInterval", 10000)) / 1000
+
+        for source in build_camera_sources(config):
+            self.streams[source.id] = self._create_stream(config, source, reconnect_interval)
+        self._select_default(camera)
+
+    def _create_encoder(self, config: dict, source: CameraSource) -> FrameEncoder:
+        return FrameEncoder(
+            build_profiles(config, source.resolution),
+            workers=self.encode_workers,
+            executor=self.executor,
+        )
+
+    def _create_stream(self, config: dict, source: CameraSource, reconnect_interval: float) -> CameraStream:
+        return CameraStream(
+            source,
+            self._create_encoder(config, source),
+            queue_depth=self.queue_depth,
+            use_process=self.use_process,
+            reconnect_interval=reconnect_interval,
+        )
+
+    def _select_default(self, camera: dict):
+        default_id = camera.get("defaultCamera")
+        if default_id not in self.streams:
+            default_id = next(iter(self.streams), None)
+        self.default_id = default_id
+
+    async def apply(self, config: dict) -> Dict[str, List[str]]:
+        """
+        바뀐 camera 설정을 실행 중인 스트림에 반영합니다.
+        새 카메라는 등록만 하고 (첫 구독 때 시작), 빠진 카메라는 중지하며,
+        소스가 바뀐 카메라는 replace_source()로 끊김 없이 교체합니다.
+        """
+        camera = config.get("camera", {})
+        reconnect_interval = float(camera.get("reconnectInterval", 10000)) / 1000
+        sources = {source.id: source for source in build_camera_sources(config)}
+        changes = {"added": [], "removed": [], "replaced": []}
+
+        for camera_id in [camera_id for camera_id in self.streams if camera_id not in sources]:
+            stream = self.streams.pop(camera_id)
+            await stream.stop()
+            changes["removed"].append(camera_id)
+        for camera_id, source in sources.items():
+            stream = self.streams.get(camera_id)
+            if stream is None:
+                self.streams[camera_id] = self._create_stream(config, source, reconnect_interval)
+                changes["added"].append(camera_id)
+                continue
+            stream.reconnect_interval = reconnect_interval
+            if source == stream.source:
+                continue
+            if source.resolution != stream.source.resolution:
+                stream.encoder = self._create_encoder(config, source)
+            if await stream.replace_source(source):
+                changes["replaced"].append(camera_id)
+        self._select_default(camera)
+        return changes
+
+    def __iter__(self):
+        return iter(self.streams.values())
+
+    def __len__(self):
+        return len(self.streams)
+
+    def get(self, camera_id: Optional[str] = None) -> Optional[CameraStream]:
+        return self.streams.get(camera_id or self.default_id)
+
+    def total_clients(self) -> int:
+        return sum(len(stream.fanout) for stream in self.streams.values())
+
+    async def stop_idle(self, idle_timeout: float):
+        """구독자가 없는 상태로 idle_timeout초가 지난 카메라의 캡처를 중지합니다."""
+        for stream in self.streams.values():
+            if stream.worker is not None and stream.idle_for() >= idle_timeout:
+                print(f"💤 카메라 '{stream.id}' {int(stream.idle_for())}초 동안 구독자 없음")
+                await stream.stop()
+
+    async def stop_all(self):
+        for stream in self.streams.values():
+            await stream.stop()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def describe(self) -> List[dict]:
+        return [
+            {
+                "id": stream.id,
+                "name": stream.source.name,
+                "type": stream.source.type,
+                "resolution": stream.source.resolution,
+                "fps": stream.source.fps,
+                "running": stream.running,
+                "subscribers": stream.subscribers,
+                "default": stream.id == self.default_id,
+                "frameBus": bus_name(stream.id),
+            }
+            for stream in self.streams.values()
+        ]
@@ -0,0 +1,478 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from pipeline.frame_bus import FrameBusPublisher, FrameBusReader, bus_name
+
+# DirectShow 백엔드 상수 (Windows에서 더 안정적일 수 있음)
+CAP_DSHOW = 700
+
+
+# === 프레임 데이터 ===
+@dataclass(frozen=True)
+class Frame:
+    seq: int  # 1부터 증가하는 프레임 번호
+    timestamp: float  # time.monotonic() 기준 캡처 시각
+    wall_time: float  # time.time() 기준 캡처 시각
+    image: np.ndarray = field(repr=False)
+
+
+# === 최신 프레임 우선 링 버퍼 ===
+class FrameRingBuffer:
+    """
+    캡처 스레드 하나가 쓰고 여러 소비자가 읽는 "최신 프레임 우선" 링 버퍼.
+
+    프레임 슬롯을 먼저 채운 뒤 시퀀스 번호를 갱신하므로 읽기 쪽은 락 없이
+    최신 프레임을 가져갈 수 있습니다. 락은 비동기 대기자 목록에만 사용합니다.
+    """
+
+    def __init__(self, capacity: int = 4):
+        if capacity < 2:
+            raise ValueError("capacity는 2 이상이어야 합니다")
+        self.capacity = capacity
+        self._slots = [None] * capacity
+        self._seq = 0
+        self._waiters = []
+        self._waiters_lock = threading.Lock()
+        self._listeners = []  # 다른 스레드 소비자용 threading.Event
+
+    @property
+    def seq(self) -> int:
+        return self._seq
+
+    def publish(self, image: np.ndarray, timestamp: Optional[float] = None) -> Frame:
+        """프레임을 기록하고 대기 중인 소비자를 깨웁니다. (단일 작성자 전용)"""
+        seq = self._seq + 1
+        frame = Frame(
+            seq=seq,
+            timestamp=timestamp if timestamp is not None else time.monotonic(),
+            wall_time=time.time(),
+            image=image,
+        )
+        self._slots[seq % self.capacity] = frame
+        self._seq = seq  # 슬롯 기록 후 시퀀스 공개
+        self._wake_waiters()
+        return frame
+
+    def add_listener(self, event: threading.Event):
+        """새 프레임이 게시될 때마다 set()할 이벤트를 등록합니다. (스레드 소비자용)"""
+        with self._waiters_lock:
+            self._listeners = self._listeners + [event]
+
+    def remove_listener(self, event: threading.Event):
+        with self._waiters_lock:
+            self._listeners = [listener for listener in self._listeners if listener is not event]
+
+    def latest(self) -> Optional[Frame]:
+        seq = self._seq
+        if seq == 0:
+            return None
+        return self._slots[seq % self.capacity]
+
+    def get(self, seq: int) -> Optional[Frame]:
+        """아직 덮어쓰이지 않은 경우 지정한 번호의 프레임을 반환합니다."""
+        frame = self._slots[seq % self.capacity]
+        if frame is not None and frame.seq == seq:
+            return frame
+        return None
+
+    async def wait_next(self, after_seq: int, timeout: Optional[float] = None) -> Optional[Frame]:
+        """
+        after_seq 이후의 프레임이 나올 때까지 기다린 뒤 최신 프레임을 반환합니다.
+        타임아웃 시 None을 반환합니다.
+        """
+        frame = self.latest()
+        if frame is not None and frame.seq > after_seq:
+            return frame
+
+        loop = asyncio.get_running_loop()
+        waiter = (loop, loop.create_future())
+        with self._waiters_lock:
+            self._waiters.append(waiter)
+
+        try:
+            # 등록 직전에 프레임이 게시되었을 수 있으므로 다시 확인
+            frame = self.latest()
+            if frame is not None and frame.seq > after_seq:
+                return frame
+            # wait_for는 완료와 취소가 겹치면 취소를 잃을 수 있어 asyncio.wait 사용
+            done, _ = await asyncio.wait([waiter[1]], timeout=timeout)
+            if not done:
+                return None
+        finally:
+            with self._waiters_lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+
+        return self.latest()
+
+    def _wake_waiters(self):
+        for event in self._listeners:
+            event.set()
+        if not self._waiters:
+            return
+        with self._waiters_lock:
+            waiters = self._waiters
+            self._waiters = []
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve_future, future)
+            except RuntimeError:
+                # 이벤트 루프가 이미 종료된 경우
+                pass
+
+
+def _resolve_future(future):
+    if not future.done():
+        future.set_result(None)
+
+
+# === 카메라 캡처 스레드 ===
+class CaptureWorker(threading.Thread):
+    """
+    cv2.VideoCapture를 전용 스레드에서 읽어 FrameRingBuffer에 게시합니다.
+    읽기 실패가 이어지면 reconnect_interval 간격으로 카메라를 다시 엽니다.
+
+    loop=True이면 동영상 파일 끝에서 처음으로 되감고, pace_fps를 주면
+    파일을 실시간 속도로 재생합니다. (테스트용 녹화 영상 소스)
+    bus를 주면 같은 프레임을 공유 메모리 프레임 버스에도 게시합니다.
+    """
+
+    def __init__(
+        self,
+        source,
+        buffer: FrameRingBuffer,
+        width: int = 640,
+        height: int = 480,
+        max_consecutive_failures: int = 5,
+        reconnect_interval: float = 10.0,
+        name: str = "capture",
+        loop: bool = False,
+        pace_fps: float = 0.0,
+        stop_event=None,
+        bus: Optional[FrameBusPublisher] = None,
+    ):
+        super().__init__(name=name, daemon=True)
+        self.source = source
+        self.buffer = buffer
+        self.width = width
+        self.height = height
+        self.max_consecutive_failures = max_consecutive_failures
+        self.reconnect_interval = reconnect_interval
+        self.loop = loop
+        self.pace_fps = pace_fps
+        self.bus = bus
+        self.cap = None
+        self.opened = threading.Event()
+        # 프로세스 모드에서는 multiprocessing.Event를 넘겨받아 사용
+        self._stop_event = stop_event or threading.Event()
+
+        # 통계
+        self.frames_captured = 0
+        self.read_failures = 0
+        self.reconnects = 0
+        self.fps = 0.0
+
+    def open_capture(self) -> bool:
+        """DirectShow 백엔드를 먼저 시도하고, 실패하면 기본 백엔드로 카메라를 엽니다."""
+        self.release()
+
+        backends = []
+        if isinstance(self.source, int):
+            backends.append(("DirectShow", CAP_DSHOW))
+        backends.append(("기본", None))
+
+        for label, backend in backends:
+            try:
+                print(f"🔍 {label} 백엔드로 카메라 연결 시도... (source={self.source})")
+                if backend is None:
+                    cap = cv2.VideoCapture(self.source)
+                else:
+                    cap = cv2.VideoCapture(self.source, backend)
+
+                # 해상도 설정
+                cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+                cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+                # 버퍼 사이즈 줄이기 (지연 감소)
+                cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+                if cap.isOpened():
+                    print(f"✅ {label} 백엔드로 카메라 연결 성공")
+                    self.cap = cap
+                    return True
+                cap.release()
+            except Exception as e:
+                print(f"⚠️ {label} 백엔드 연결 실패: {e}")
+
+        return False
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+    def stop(self, timeout: Optional[float] = 2.0):
+        self._stop_event.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop_event.is_set()
+
+    def run(self):
+        cv2.setUseOptimized(True)
+
+        if not self.open_capture():
+            print("🚨 어떤 백엔드로도 카메라 열기 실패")
+        else:
+            w = self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)
+            h = self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
+            fps = self.cap.get(cv2.CAP_PROP_FPS)
+            print(f"📷 카메라 캡처 시작됨 해상도: {int(w)}×{int(h)}, FPS: {fps}")
+            self.opened.set()
+
+        consecutive_failures = 0
+        last_reconnect_time = time.monotonic()
+        fps_window_start = time.monotonic()
+        fps_window_frames = 0
+        next_frame_time = time.monotonic()
+
+        try:
+            while not self._stop_event.is_set():
+                if self.pace_fps > 0:
+                    # 파일 소스는 실시간 속도에 맞춰 읽음
+                    delay = next_frame_time - time.monotonic()
+                    if delay > 0:
+                        self._stop_event.wait(delay)
+                    next_frame_time = max(next_frame_time + 1.0 / self.pace_fps, time.monotonic() - 1.0)
+
+                ok, image = (False, None)
+                if self.cap is not None:
+                    ok, image = self.cap.read()
+                    if not ok and self.loop:
+                        # 동영상 파일 끝 → 처음으로 되감기
+                        self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                        ok, image = self.cap.read()
+
+                if not ok:
+                    consecutive_failures += 1
+                    self.read_failures += 1
+                    print(f"⚠️ 프레임 읽기 실패 ({consecutive_failures}/{self.max_consecutive_failures})")
+
+                    if consecutive_failures >= self.max_consecutive_failures:
+                        now = time.monotonic()
+                        if now - last_reconnect_time > self.reconnect_interval:
+                            print("🔄 카메라 재연결 시도...")
+                            last_reconnect_time = now
+                            self.reconnects += 1
+                            if self.open_capture():
+                                print("✅ 카메라 재연결 성공")
+                                self.opened.set()
+                                consecutive_failures = 0
+                            else:
+                                print("❌ 카메라 재연결 실패")
+
+                    self._stop_event.wait(min(0.1 * consecutive_failures, 2.0))
+                    continue
+
+                consecutive_failures = 0
+                frame = self.buffer.publish(image)
+                bus = self.bus
+                if bus is not None and frame is not None:
+                    bus.publish(image, frame.timestamp, frame.wall_time)
+                self.frames_captured += 1
+
+                # 1초 단위 FPS 측정
+                fps_window_frames += 1
+                now = time.monotonic()
+                if now - fps_window_start >= 1.0:
+                    self.fps = fps_window_frames / (now - fps_window_start)
+                    fps_window_start = now
+                    fps_window_frames = 0
+        finally:
+            self.release()
+            if self.bus is not None:
+                self.bus.close()
+            print("🛑 카메라 리소스 해제 완료")
+
+    def stats(self) -> dict:
+        return {
+            "mode": "thread",
+            "source": str(self.source),
+            "running": self.is_alive(),
+            "framesCaptured": self.frames_captured,
+            "readFailures": self.read_failures,
+            "reconnects": self.reconnects,
+            "fps": round(self.fps, 1),
+            "seq": self.buffer.seq,
+            "bus": self.bus.name if self.bus is not None else None,
+        }
+
+
+# === 프로세스 기반 캡처 ===
+class _BusSink:
+    """
+    자식 프로세스의 CaptureWorker가 FrameRingBuffer 대신 사용하는 송신기.
+    프레임은 공유 메모리 버스에 쓰고, 파이프로는 시퀀스 번호만 알립니다.
+    """
+
+    def __init__(self, conn, bus: FrameBusPublisher):
+        self.conn = conn
+        self.bus = bus
+
+    def publish(self, image, timestamp=None):
+        seq = self.bus.publish(image, timestamp)
+        if seq:
+            self.conn.send(seq)
+
+
+def _capture_process_main(conn, stop_event, source, camera_id, capture_kwargs):
+    bus = FrameBusPublisher(camera_id)
+    worker = CaptureWorker(source, _BusSink(conn, bus), stop_event=stop_event, **capture_kwargs)
+    try:
+        worker.run()
+    except (BrokenPipeError, EOFError, OSError):
+        # 부모 프로세스가 종료된 경우
+        pass
+    finally:
+        bus.close()
+
+
+class ProcessCaptureWorker(threading.Thread):
+    """
+    캡처(디코딩 포함)를 별도 프로세스에서 수행하고, 수신 스레드가 프레임을
+    로컬 FrameRingBuffer에 게시합니다. 느린 RTSP 디코딩이 다른 카메라나
+    서버 프로세스의 GIL을 점유하지 않도록 카메라마다 프로세스를 분리합니다.
+
+    프레임은 자식 프로세스가 공유 메모리 프레임 버스(camera_id)에 직접 쓰고
+    파이프로는 시퀀스 번호만 전달하므로, 프레임을 피클링해 보내지 않습니다.
+    """
+
+    def __init__(self, source, buffer: FrameRingBuffer, name: str = "capture-proc", camera_id: Optional[str] = None, **capture_kwargs):
+        super().__init__(name=name, daemon=True)
+        self.source = source
+        self.buffer = buffer
+        self.camera_id = camera_id or name
+        self.reader: Optional[FrameBusReader] = None
+        self.capture_kwargs = capture_kwargs
+        self.capture_kwargs.setdefault("name", name)
+        self.reconnect_interval = capture_kwargs.get("reconnect_interval", 10.0)
+        self.process = None
+        self.opened = threading.Event()
+        self._stop_event = threading.Event()
+        self._context = multiprocessing.get_context("spawn")
+        self._process_stop = self._context.Event()
+
+        # 통계
+        self.frames_captured = 0
+        self.restarts = 0
+        self.fps = 0.0
+
+    def stop(self, timeout: Optional[float] = 2.0):
+        self._stop_event.set()
+        self._process_stop.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop_event.is_set()
+
+    def _spawn(self):
+        receiver, sender = self._context.Pipe(duplex=False)
+        self.process = self._context.Process(
+            target=_capture_process_main,
+            args=(sender, self._process_stop, self.source, self.camera_id, self.capture_kwargs),
+            name=self.name,
+            daemon=True,
+        )
+        self.process.start()
+        sender.close()  # 부모 쪽 송신단을 닫아야 자식 종료 시 EOF 감지 가능
+        print(f"🧩 캡처 프로세스 시작 (source={self.source}, pid={self.process.pid})")
+        return receiver
+
+    def _close_reader(self):
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+
+    def _read_latest(self):
+        # 자식이 세그먼트를 다시 만들었으면 (해상도 변경) 새로 연결
+        if self.reader is not None and self.reader.stale:
+            self._close_reader()
+        if self.reader is None:
+            self.reader = FrameBusReader.try_attach(self.camera_id)
+            if self.reader is None:
+                return None
+        return self.reader.read(copy=True)
+
+    def run(self):
+        fps_window_start = time.monotonic()
+        fps_window_frames = 0
+        receiver = self._spawn()
+
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    if not receiver.poll(0.5):
+                        continue
+                    # 밀린 알림은 버리고 최신 프레임만 읽음
+                    while receiver.poll():
+                        receiver.recv()
+                except (EOFError, OSError):
+                    if self._stop_event.is_set():
+                        break
+                    # 자식 프로세스가 비정상 종료된 경우 재시작
+                    print(f"⚠️ 캡처 프로세스 종료 감지 (source={self.source}), 재시작 대기...")
+                    receiver.close()
+                    self._close_reader()
+                    self.process.join(1.0)
+                    if self._stop_event.wait(self.reconnect_interval):
+                        break
+                    self.restarts += 1
+                    receiver = self._spawn()
+                    continue
+
+                frame = self._read_latest()
+                if frame is None:
+                    continue
+                # 공유 메모리 슬롯은 곧 덮어쓰이므로 복사본을 로컬 버퍼에 게시
+                self.buffer.publish(frame.image, frame.timestamp)
+                self.frames_captured += 1
+                self.opened.set()
+
+                fps_window_frames += 1
+                now = time.monotonic()
+                if now - fps_window_start >= 1.0:
+                    self.fps = fps_window_frames / (now - fps_window_start)
+                    fps_window_start = now
+                    fps_window_frames = 0
+        finally:
+            self._process_stop.set()
+            receiver.close()
+            self._close_reader()
+            if self.process is not None:
+                self.process.join(2.0)
+                if self.process.is_alive():
+                    self.process.terminate()
+            print(f"🛑 캡처 프로세스 종료 (source={self.source})")
+
+    def stats(self) -> dict:
+        return {
+            "mode": "process",
+            "source": str(self.source),
+            "running": self.is_alive(),
+            "pid": self.process.pid if self.process is not None else None,
+            "framesCaptured": self.frames_captured,
+            "restarts": self.restarts,
+            "fps": round(self.fps, 1),
+            "seq": self.buffer.seq,
+            "bus": bus_name(self.camera_id),
+        }
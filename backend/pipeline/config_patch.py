@@ -0,0 +1,325 @@
+import copy
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pydantic import BaseModel, ConfigDict, TypeAdapter, ValidationError, create_model
+from pydantic.fields import FieldInfo
+
+Path = Tuple[Any, ...]  # 설정 루트 (또는 섹션)부터의 키 / 인덱스 경로
+
+PATCH_OPS = ("add", "remove", "replace", "move", "copy", "test")
+
+
+class PatchError(ValueError):
+    """패치 문서가 잘못되었거나 적용할 수 없는 경로를 가리킴 (400)"""
+
+
+class PatchConflict(PatchError):
+    """test 연산이 실패함 (409)"""
+
+
+class SettingsValidationError(ValueError):
+    """바뀐 값이 섹션 스키마에 맞지 않음 (422). errors: [{"path", "message"}]"""
+
+    def __init__(self, errors: List[Dict[str, str]]):
+        super().__init__("; ".join(f"{e['path']}: {e['message']}" for e in errors))
+        self.errors = errors
+
+
+# === JSON Pointer (RFC 6901) ===
+def parse_pointer(pointer: str) -> List[str]:
+    if not isinstance(pointer, str):
+        raise PatchError(f"경로는 문자열이어야 합니다: {pointer!r}")
+    if pointer == "":
+        return []
+    if not pointer.startswith("/"):
+        raise PatchError(f"경로는 '/'로 시작해야 합니다: '{pointer}'")
+    return [token.replace("~1", "/").replace("~0", "~") for token in pointer[1:].split("/")]
+
+
+def format_pointer(path: Iterable[Any]) -> str:
+    return "".join("/" + str(token).replace("~", "~0").replace("/", "~1") for token in path)
+
+
+def _list_index(container: list, token: str, pointer: str, allow_end: bool) -> int:
+    if allow_end and token == "-":
+        return len(container)
+    if not token.isdigit() or (token != "0" and token.startswith("0")):
+        raise PatchError(f"리스트 인덱스가 아닙니다: '{pointer}'")
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise PatchError(f"리스트 범위를 벗어났습니다: '{pointer}'")
+    return index
+
+
+def _parent(document: Any, tokens: List[str], pointer: str) -> Any:
+    current = document
+    for token in tokens[:-1]:
+        if isinstance(current, dict):
+            if token not in current:
+                raise PatchError(f"경로를 찾을 수 없습니다: '{pointer}'")
+            current = current[token]
+        elif isinstance(current, list):
+            current = current[_list_index(current, token, pointer, allow_end=False)]
+        else:
+            raise PatchError(f"값 안으로 들어갈 수 없는 경로입니다: '{pointer}'")
+    return current
+
+
+def _get(document: Any, pointer: str) -> Any:
+    tokens = parse_pointer(pointer)
+    if not tokens:
+        return document
+    parent = _parent(document, tokens, pointer)
+    token = tokens[-1]
+    if isinstance(parent, dict):
+        if token not in parent:
+            raise PatchError(f"경로를 찾을 수 없습니다: '{pointer}'")
+        return parent[token]
+    if isinstance(parent, list):
+        return parent[_list_index(parent, token, pointer, allow_end=False)]
+    raise PatchError(f"값 안으로 들어갈 수 없는 경로입니다: '{pointer}'")
+
+
+def _json_equal(a: Any, b: Any) -> bool:
+    """JSON 기준 비교 (Python과 달리 true != 1)"""
+    if isinstance(a, bool) or isinstance(b, bool):
+        return type(a) is type(b) and a == b
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(_json_equal(a[key], b[key]) for key in a)
+    if isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)):
+        return len(a) == len(b) and all(_json_equal(x, y) for x, y in zip(a, b))
+    return a == b
+
+
+# === JSON Patch (RFC 6902) ===
+def apply_json_patch(document: Any, operations: List[dict]) -> Any:
+    """
+    JSON Patch 연산 목록을 차례로 적용한 결과를 반환합니다.
+    document는 제자리에서 바뀔 수 있으므로 수정해도 되는 사본을 넘깁니다.
+    연산 하나라도 실패하면 예외가 나고, 호출한 쪽은 결과를 버립니다. (전부 적용 또는 전부 취소)
+    """
+    if not isinstance(operations, list):
+        raise PatchError("JSON Patch 본문은 연산 배열이어야 합니다")
+    # 루트 경로("")를 교체할 수 있도록 한 단계 감싸서 처리
+    holder = {"": document}
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict) or operation.get("op") not in PATCH_OPS:
+            raise PatchError(f"{index}번째 연산이 올바르지 않습니다. op는 {', '.join(PATCH_OPS)} 중 하나여야 합니다")
+        op = operation["op"]
+        if "path" not in operation:
+            raise PatchError(f"{index}번째 연산 ({op})에 path가 없습니다")
+        path = operation["path"]
+        if op in ("add", "replace", "test") and "value" not in operation:
+            raise PatchError(f"{index}번째 연산 ({op})에 value가 없습니다")
+        if op in ("move", "copy") and "from" not in operation:
+            raise PatchError(f"{index}번째 연산 ({op})에 from이 없습니다")
+
+        if op == "test":
+            if not _json_equal(_get(holder[""], path), operation["value"]):
+                raise PatchConflict(f"test 실패: '{path}'의 값이 일치하지 않습니다")
+            continue
+        if op == "move":
+            source = operation["from"]
+            if path != source and path.startswith(source + "/"):
+                raise PatchError(f"'{source}'를 자기 하위 경로 '{path}'로 옮길 수 없습니다")
+            value = _remove(holder, source)
+            _add(holder, path, value)
+        elif op == "copy":
+            _add(holder, path, copy.deepcopy(_get(holder[""], operation["from"])))
+        elif op == "remove":
+            _remove(holder, path)
+        elif op == "replace":
+            _remove(holder, path)
+            _add(holder, path, copy.deepcopy(operation["value"]))
+        else:
+            _add(holder, path, copy.deepcopy(operation["value"]))
+    return holder[""]
+
+
+def _add(holder: dict, pointer: str, value: Any):
+    tokens = [""] + parse_pointer(pointer)
+    parent = _parent(holder, tokens, pointer)
+    token = tokens[-1]
+    if isinstance(parent, dict):
+        parent[token] = value
+    elif isinstance(parent, list):
+        parent.insert(_list_index(parent, token, pointer, allow_end=True), value)
+    else:
+        raise PatchError(f"값 안으로 들어갈 수 없는 경로입니다: '{pointer}'")
+
+
+def _remove(holder: dict, pointer: str) -> Any:
+    tokens = [""] + parse_pointer(pointer)
+    parent = _parent(holder, tokens, pointer)
+    token = tokens[-1]
+    if isinstance(parent, dict):
+        if token not in parent:
+            raise PatchError(f"경로를 찾을 수 없습니다: '{pointer}'")
+        return parent.pop(token)
+    if isinstance(parent, list):
+        return parent.pop(_list_index(parent, token, pointer, allow_end=False))
+    raise PatchError(f"값 안으로 들어갈 수 없는 경로입니다: '{pointer}'")
+
+
+# === 최소 변경 (JSON Merge Patch, RFC 7396) ===
+def apply_merge_patch(target: Any, patch: Any) -> Any:
+    """바꿀 키만 담은 객체를 병합합니다. 값이 null인 키는 삭제되고 리스트는 통째로 교체됩니다."""
+    if not isinstance(patch, dict):
+        return copy.deepcopy(patch)
+    if not isinstance(target, dict):
+        target = {}
+    for key, value in patch.items():
+        if value is None:
+            target.pop(key, None)
+        else:
+            target[key] = apply_merge_patch(target.get(key), value)
+    return target
+
+
+def diff(old: Any, new: Any, prefix: Path = ()) -> Tuple[Dict[Path, Any], List[Path]]:
+    """
+    두 값의 차이를 (바뀌거나 추가된 경로: 새 값, 삭제된 경로 목록)으로 반환합니다.
+    dict는 키 단위로, 길이가 같은 리스트는 항목 단위로 내려가고 그 외에는 통째로 비교합니다.
+    """
+    changed: Dict[Path, Any] = {}
+    removed: List[Path] = []
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key, value in new.items():
+            if key not in old:
+                changed[prefix + (key,)] = value
+            else:
+                sub_changed, sub_removed = diff(old[key], value, prefix + (key,))
+                changed.update(sub_changed)
+                removed.extend(sub_removed)
+        removed.extend(prefix + (key,) for key in old if key not in new)
+    elif isinstance(old, (list, tuple)) and isinstance(new, list) and len(old) == len(new):
+        for index, (before, after) in enumerate(zip(old, new)):
+            sub_changed, sub_removed = diff(before, after, prefix + (index,))
+            changed.update(sub_changed)
+            removed.extend(sub_removed)
+    elif not _json_equal(old, new):
+        changed[prefix] = new
+    return changed, removed
+
+
+# === 섹션별 스키마 검증 ===
+def _partial_model(model: type) -> type:
+    """모든 필드를 선택 사항으로 바꾼 모델. 바뀐 키만 넘겨 검증하고, 모르는 키는 그대로 둡니다."""
+    fields = {
+        name: (field.annotation, FieldInfo.merge_field_infos(field, default=None))
+        for name, field in model.model_fields.items()
+    }
+    return create_model(f"Partial{model.__name__}", __config__=ConfigDict(extra="allow"), **fields)
+
+
+class SettingsValidator:
+    """
+    설정 섹션별 검증기. 서버 시작 시 한 번 만들어 두고 (pydantic 스키마 컴파일) 요청마다 재사용합니다.
+
+    schemas는 {"섹션 경로 (점 구분)": 스키마}입니다.
+    - BaseModel: 섹션 안에서 바뀐 키만 검증 (스키마에 없는 키는 통과). 필수 필드는 삭제할 수 없음
+    - 그 외 타입 (예: List[RoiData]): 섹션 값 전체를 검증
+    스키마가 있는 섹션 자체 (또는 그 상위)는 삭제할 수 없습니다.
+    검증은 strict 모드라서 "30" 같은 문자열을 숫자로 바꿔 저장하지 않고 거부합니다.
+    """
+
+    def __init__(self, schemas: Dict[str, Any]):
+        self._sections: Dict[Path, Tuple[bool, TypeAdapter, frozenset]] = {}
+        for section, schema in schemas.items():
+            by_field = isinstance(schema, type) and issubclass(schema, BaseModel)
+            adapter = TypeAdapter(_partial_model(schema) if by_field else schema)
+            required = frozenset(
+                name for name, field in schema.model_fields.items() if field.is_required()
+            ) if by_field else frozenset()
+            self._sections[tuple(section.split("."))] = (by_field, adapter, required)
+
+    def _section_of(self, path: Path) -> Optional[Path]:
+        for length in range(len(path), 0, -1):
+            if path[:length] in self._sections:
+                return path[:length]
+        return None
+
+    def _removal_errors(self, removed: Iterable[Path]) -> List[Dict[str, str]]:
+        errors = []
+        for path in removed:
+            path = tuple(path)
+            covered = [known for known in self._sections if known[:len(path)] == path]
+            for known in covered:
+                errors.append({"path": format_pointer(known), "message": "스키마가 있는 설정 섹션은 삭제할 수 없습니다"})
+            section = self._section_of(path)
+            if covered or section is None or len(path) != len(section) + 1:
+                continue
+            if path[-1] in self._sections[section][2]:
+                errors.append({"path": format_pointer(path), "message": "필수 설정 항목은 삭제할 수 없습니다"})
+        return errors
+
+    def validate(self, config: dict, paths: Iterable[Path], removed: Iterable[Path] = (), strict: bool = True):
+        """
+        paths (설정 루트부터의 경로) 중 스키마가 있는 섹션의 값을 검증합니다.
+        removed에는 삭제된 경로를 넘기며, 스키마가 있는 섹션이나 필수 필드를 지우는 경우 거부합니다.
+        strict=False면 "120" 같은 문자열도 숫자로 받아들이고, 변환한 값을 config에 다시 씁니다.
+        (입력 폼이 문자열로 보내는 기존 PUT 요청용)
+        """
+        errors = self._removal_errors(removed)
+        touched: Dict[Path, Optional[set]] = {}
+        for path in paths:
+            section = self._section_of(tuple(path))
+            if section is None:
+                # 섹션 자체나 그 상위가 바뀐 경우: 그 아래 스키마가 있는 섹션 전체 검증
+                for known in self._sections:
+                    if known[:len(path)] == tuple(path):
+                        touched[known] = None
+                continue
+            keys = touched.get(section, set())
+            if keys is not None:
+                if len(path) > len(section):
+                    keys.add(path[len(section)])
+                else:
+                    keys = None
+            touched[section] = keys
+
+        for section, keys in touched.items():
+            value = config
+            for token in section:
+                if not isinstance(value, dict) or token not in value:
+                    break
+                value = value[token]
+            else:
+                by_field, adapter, _ = self._sections[section]
+                section_errors, coerced = self._check(section, by_field, adapter, value, keys, strict)
+                errors.extend(section_errors)
+                if not strict and not section_errors:
+                    _merge_coerced(value, coerced)
+        if errors:
+            raise SettingsValidationError(errors)
+
+    @staticmethod
+    def _check(section: Path, by_field: bool, adapter: TypeAdapter, value: Any, keys: Optional[set],
+               strict: bool = True) -> Tuple[List[Dict[str, str]], Any]:
+        """(오류 목록, 검증을 통과한 값을 스키마 타입으로 변환한 값)"""
+        errors = []
+        if by_field and isinstance(value, dict):
+            value = {key: value[key] for key in (value if keys is None else keys) if key in value}
+        try:
+            validated = adapter.validate_python(value, strict=strict)
+        except ValidationError as e:
+            for error in e.errors(include_url=False):
+                errors.append({"path": format_pointer(section + tuple(error["loc"])), "message": error["msg"]})
+            return errors, None
+        return errors, adapter.dump_python(validated, exclude_unset=True)
+
+
+def _merge_coerced(target: Any, coerced: Any) -> Any:
+    """
+    변환된 값을 target에 제자리에서 덮어씁니다. coerced에 없는 키 (스키마가 무시한 추가 키)는 그대로 둡니다.
+    target을 바꿀 수 없는 위치 (값 자체가 바뀌는 경우)면 변환된 값을 반환합니다.
+    """
+    if isinstance(target, dict) and isinstance(coerced, dict):
+        for key, value in coerced.items():
+            target[key] = _merge_coerced(target.get(key), value)
+        return target
+    if isinstance(target, list) and isinstance(coerced, list) and len(target) == len(coerced):
+        for index, value in enumerate(coerced):
+            target[index] = _merge_coerced(target[index], value)
+        return target
+    return coerced
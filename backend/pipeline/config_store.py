@@ -0,0 +1,329 @@
+import asyncio
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import toml
+
+CHECK_INTERVAL = 0.5  # 파일 변경 확인 (stat) 최소 간격 (초)
+WRITE_DEBOUNCE = 0.05  # 이 시간 안에 들어온 변경은 한 번의 파일 쓰기로 합침 (초)
+
+
+# === 읽기 전용 스냅샷 ===
+class FrozenDict(dict):
+    """수정할 수 없는 dict. JSON 직렬화는 일반 dict와 같습니다."""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("설정 스냅샷은 읽기 전용입니다. thaw()로 복사한 뒤 수정하세요")
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+
+def freeze(value: Any) -> Any:
+    """dict → FrozenDict, list → tuple로 바꿔 스냅샷을 공유해도 안전하게 만듭니다."""
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """freeze()의 반대. 수정 가능한 dict / list 사본을 만듭니다."""
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(item) for item in value]
+    return value
+
+
+def changed_sections(old: dict, new: dict) -> List[str]:
+    """최상위 섹션 중 값이 달라진 이름"""
+    return sorted(key for key in set(old) | set(new) if old.get(key) != new.get(key))
+
+
+def write_atomic(path: Path, data: dict):
+    """
+    같은 디렉토리의 임시 파일에 쓰고 fsync한 뒤 rename으로 교체합니다.
+    쓰는 도중 프로세스가 죽어도 이전 파일이나 새 파일 중 하나만 남습니다.
+    """
+    temp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(temp, "w", encoding="utf-8") as f:
+            toml.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, path)
+    except BaseException:
+        try:
+            os.unlink(temp)
+        except OSError:
+            pass
+        raise
+    if hasattr(os, "O_DIRECTORY"):
+        # rename 자체도 디스크에 남도록 디렉토리 fsync (POSIX)
+        fd = os.open(path.parent, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+# === 설정 저장소 ===
+class ConfigStore:
+    """
+    config.toml을 파싱한 읽기 전용 스냅샷을 메모리에 두고 공유합니다.
+
+    - get(): check_interval이 지났을 때만 stat (mtime, 크기, inode)으로 파일 변경을 확인하고,
+      바뀐 경우에만 다시 파싱합니다. 요청마다 파일을 열지 않습니다.
+    - version: 스냅샷이 바뀔 때마다 1씩 증가
+    - etag(섹션...): 해당 섹션이 마지막으로 바뀐 버전으로 만든 강한 ETag (다른 섹션 변경에는 그대로)
+    - subscribe(callback): 스냅샷이 바뀌면 callback(snapshot, version, 바뀐 섹션 목록) 호출
+    - save(config): 임시 파일 + rename으로 원자적으로 쓰고 곧바로 스냅샷을 교체 (다시 읽지 않음)
+
+    lock을 주면 (재진입 가능한 락) 파일 읽기/쓰기를 그 락으로 직렬화합니다.
+    """
+
+    def __init__(self, path, defaults: Optional[dict] = None, check_interval: float = CHECK_INTERVAL,
+                 lock: Optional[threading.RLock] = None):
+        self.path = Path(path)
+        self.defaults = freeze(defaults or {})
+        self.check_interval = float(check_interval)
+        self._lock = lock if lock is not None else threading.RLock()
+        self._snapshot: FrozenDict = FrozenDict()
+        self._stat: Optional[Tuple[int, int, int]] = None
+        self._checked_at = 0.0
+        self._subscribers: List[Callable] = []
+        self.version = 0
+        self.section_versions: Dict[str, int] = {}  # 섹션: 마지막으로 바뀐 버전
+        # 버전은 프로세스마다 1부터 다시 시작하므로, 재시작 전후의 ETag가 겹치지 않게 구분
+        self.epoch = format(time.time_ns(), "x")
+        self.loads = 0
+        self.stats_checked = 0
+
+    def _file_stat(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def get(self) -> FrozenDict:
+        """현재 설정 스냅샷 (수정 불가). 수정하려면 thaw()로 복사합니다."""
+        now = time.monotonic()
+        if self._stat is not None and now - self._checked_at < self.check_interval:
+            return self._snapshot
+        with self._lock:
+            self._checked_at = now
+            self.stats_checked += 1
+            stat = self._file_stat()
+            if stat is not None and stat == self._stat:
+                return self._snapshot
+            self._reload(stat)
+            return self._snapshot
+
+    def section(self, name: str, default: Any = None) -> Any:
+        return self.get().get(name, FrozenDict() if default is None else default)
+
+    def _reload(self, stat):
+        if stat is None:
+            if self.defaults:
+                print(f"'{self.path}'을 찾을 수 없습니다. 기본 설정으로 파일을 생성합니다.")
+                self.save(thaw(self.defaults))
+            elif self.version == 0:
+                print(f"⚠️ 설정 파일이 없습니다 ({self.path}). 기본값을 사용합니다.")
+                self._replace(FrozenDict(), None)
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                config = toml.load(f)
+            self.loads += 1
+            print(f"설정 파일을 로드했습니다: {self.path} (v{self.version + 1})")
+        except Exception as e:
+            print(f"설정 파일 로드 오류 ({self.path}): {e}. 이전 설정을 유지합니다.")
+            # 쓰는 도중 읽은 경우 등: 다음 확인 때 다시 시도
+            if self.version == 0:
+                self._replace(self.defaults, None)
+            return
+        self._replace(freeze(config), stat)
+
+    def _replace(self, snapshot: FrozenDict, stat):
+        old = self._snapshot
+        self._snapshot = snapshot
+        self._stat = stat
+        self.version += 1
+        sections = changed_sections(old, snapshot)
+        for name in sections:
+            self.section_versions[name] = self.version
+        for callback in list(self._subscribers):
+            try:
+                callback(snapshot, self.version, sections)
+            except Exception as e:
+                print(f"💥 설정 변경 알림 처리 중 예외 발생: {e}")
+
+    def save(self, config: dict) -> bool:
+        """설정 전체를 파일에 쓰고 스냅샷을 교체합니다."""
+        data = thaw(config)
+        with self._lock:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                write_atomic(self.path, data)
+            except Exception as e:
+                print(f"설정 파일 저장 오류 ({self.path}): {e}")
+                return False
+            self._checked_at = time.monotonic()
+            self._replace(freeze(data), self._file_stat())
+        print(f"설정 파일을 저장했습니다: {self.path} (v{self.version})")
+        return True
+
+    def etag(self, *sections: str) -> str:
+        """
+        섹션 내용이 같으면 같은 값인 강한 ETag. 섹션을 주지 않으면 설정 전체 기준입니다.
+        호출하기 전에 get()으로 파일 변경을 확인합니다.
+        """
+        if sections:
+            version = max((self.section_versions.get(name, 0) for name in sections), default=0)
+            return f'"{self.epoch}-{"+".join(sections)}-{version}"'
+        return f'"{self.epoch}-{self.version}"'
+
+    def changed_since(self, version: int) -> List[str]:
+        """version 이후에 바뀐 섹션 이름"""
+        return sorted(name for name, changed in self.section_versions.items() if changed > version)
+
+    def invalidate(self):
+        """다음 get()에서 바로 파일 변경을 확인하게 합니다."""
+        self._checked_at = 0.0
+
+    def subscribe(self, callback: Callable[[FrozenDict, int, List[str]], None]) -> Callable[[], None]:
+        """변경 알림을 등록하고 해제 함수를 반환합니다. 알림은 변경한 스레드에서 호출됩니다."""
+        with self._lock:
+            self._subscribers.append(callback)
+
+        def unsubscribe():
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+
+        return unsubscribe
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": str(self.path),
+            "version": self.version,
+            "loads": self.loads,
+            "statChecks": self.stats_checked,
+            "subscribers": len(self._subscribers),
+        }
+
+
+
+# === 변경 직렬화 / 쓰기 합치기 ===
+class ConfigWriter:
+    """
+    설정 변경을 하나의 asyncio 큐로 직렬화합니다.
+
+    submit(mutate)는 mutate(config)를 큐에 넣고, 작업 태스크는 WRITE_DEBOUNCE 동안 들어온
+    변경을 모아 같은 작업 사본에 차례로 적용한 뒤 파일은 한 번만 씁니다.
+    mutate가 예외를 내면 그 변경만 되돌리고 호출한 쪽에 예외를 그대로 전달합니다.
+    반환값은 (mutate의 반환값, 새 설정 버전)입니다.
+    """
+
+    def __init__(self, store: ConfigStore, debounce: float = WRITE_DEBOUNCE):
+        self.store = store
+        self.debounce = float(debounce)
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.mutations = 0
+        self.rejected = 0
+        self.writes = 0
+
+    def _ensure_task(self):
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, mutate: Callable[[dict], Any]) -> Tuple[Any, int]:
+        self._ensure_task()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((mutate, future))
+        return await future
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            # 잠시 기다려 연달아 들어오는 변경 (슬라이더 여러 개 저장 등)을 한 번에 처리
+            await asyncio.sleep(self.debounce)
+            while not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await self._apply(batch)
+            except Exception as e:
+                print(f"💥 설정 쓰기 처리 중 예외 발생: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    async def _apply(self, batch):
+        working = thaw(self.store.get())
+        applied = []
+        for mutate, future in batch:
+            if future.done():  # 요청이 취소된 경우
+                continue
+            backup = thaw(working)
+            try:
+                result = mutate(working)
+            except Exception as e:
+                working = backup
+                self.rejected += 1
+                future.set_exception(e)
+                continue
+            applied.append((future, result))
+        if not applied:
+            return
+
+        saved = await asyncio.to_thread(self.store.save, working)
+        if not saved:
+            for future, _ in applied:
+                if not future.done():
+                    future.set_exception(OSError(f"설정 파일 저장 실패 ({self.store.path})"))
+            return
+        self.mutations += len(applied)
+        self.writes += 1
+        version = self.store.version
+        for future, result in applied:
+            if not future.done():
+                future.set_result((result, version))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mutations": self.mutations,
+            "rejected": self.rejected,
+            "writes": self.writes,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+        }
+
+
+if __name__ == "__main__":
+    # 예) python -m pipeline.config_store : 매번 파싱 대비 캐시 조회 시간 비교
+    import timeit
+
+    path = Path(__file__).resolve().parent.parent / "settings" / "config.toml"
+    store = ConfigStore(path)
+    store.get()
+
+    def parse():
+        with open(path, "r", encoding="utf-8") as f:
+            return toml.load(f)
+
+    runs = 200
+    parse_us = timeit.timeit(parse, number=runs) / runs * 1e6
+    cached_us = timeit.timeit(store.get, number=runs * 100) / (runs * 100) * 1e6
+    store.check_interval = 0.0
+    stat_us = timeit.timeit(store.get, number=runs * 10) / (runs * 10) * 1e6
+    print(f"⏱️ 매번 파싱 {parse_us:.0f}µs, 캐시 조회 {cached_us:.2f}µs, 매번 stat 확인 {stat_us:.1f}µs "
+          f"(v{store.version}, 로드 {store.loads}회)")
@@ -0,0 +1,763 @@
+import ast
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from pipeline.dwell import DwellEvent, DwellMonitor
+from pipeline.encoder import LatencyStats
+from pipeline.postprocess import class_ids_for_names, postprocess_yolo, scale_boxes
+from pipeline.roi import DETECT, RoiEngine, RoiHits
+from pipeline.tracker import Tracker, Tracks
+
+try:
+    import onnxruntime as ort
+except ImportError:  # onnxruntime 미설치 시 감지 기능만 비활성화
+    ort = None
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+LETTERBOX_COLOR = 114
+ROI_CROP_PADDING = 0.05  # ROI 외접 박스 바깥으로 더 잘라낼 여유 (프레임 크기 대비)
+ROI_CROP_MAX_AREA = 0.8  # 잘라낼 영역이 프레임의 이 비율보다 크면 전체 프레임 사용
+# model 설정 중 실행 중인 감지기/감지 단계에 바로 반영할 수 있는 키 (나머지는 모델 다시 로드)
+MODEL_LIVE_KEYS = ("confidenceThreshold", "iouThreshold", "maxDetections",
+                   "enableBatchProcessing", "batchSize", "roiCropping", "roiCropPadding")
+
+
+# === 감지 결과 ===
+@dataclass
+class Detections:
+    boxes: np.ndarray  # (N, 4) 원본 이미지 기준 x1, y1, x2, y2
+    scores: np.ndarray  # (N,)
+    class_ids: np.ndarray  # (N,)
+
+    def __len__(self):
+        return len(self.scores)
+
+    @classmethod
+    def empty(cls) -> "Detections":
+        return cls(np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, np.int64))
+
+    def to_meta(self, shape, class_names: Sequence[str] = ()) -> List[dict]:
+        """/ws/meta 형식으로 변환합니다. 좌표는 프레임 크기 대비 0~1 비율입니다."""
+        height, width = shape[:2]
+        items = []
+        for (x1, y1, x2, y2), score, class_id in zip(self.boxes.tolist(), self.scores.tolist(), self.class_ids.tolist()):
+            items.append({
+                "x": round(x1 / width, 4),
+                "y": round(y1 / height, 4),
+                "width": round((x2 - x1) / width, 4),
+                "height": round((y2 - y1) / height, 4),
+                "confidence": round(score, 3),
+                "label": class_names[class_id] if class_id < len(class_names) else f"class_{class_id}",
+                "classId": class_id,
+                "number": None,
+            })
+        return items
+
+
+# === 전처리 ===
+def letterbox(image: np.ndarray, size: int, out: Optional[np.ndarray] = None):
+    """
+    비율을 유지한 채 size×size 정사각형에 맞추고 남는 영역은 회색으로 채웁니다.
+    (캔버스, 축소 비율, (좌 패딩, 상 패딩))을 반환합니다.
+    """
+    height, width = image.shape[:2]
+    ratio = min(size / height, size / width)
+    new_w, new_h = max(1, round(width * ratio)), max(1, round(height * ratio))
+    pad_x, pad_y = (size - new_w) // 2, (size - new_h) // 2
+
+    if out is None:
+        out = np.empty((size, size, 3), dtype=np.uint8)
+    out.fill(LETTERBOX_COLOR)
+    if (new_w, new_h) != (width, height):
+        image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    out[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = image
+    return out, ratio, (pad_x, pad_y)
+
+
+def crop_region(box, shape, padding: float = ROI_CROP_PADDING) -> Optional[Tuple[int, int, int, int]]:
+    """
+    ROI 외접 박스에 여유를 더해 추론할 영역 (x1, y1, x2, y2)을 만듭니다.
+    영역이 없거나 프레임 대부분을 덮으면 None (전체 프레임 추론)
+    """
+    if box is None:
+        return None
+    height, width = shape[:2]
+    pad_x, pad_y = round(width * padding), round(height * padding)
+    x1, y1 = max(0, box[0] - pad_x), max(0, box[1] - pad_y)
+    x2, y2 = min(width, box[2] + pad_x), min(height, box[3] + pad_y)
+    if x2 - x1 < 2 or y2 - y1 < 2 or (x2 - x1) * (y2 - y1) > ROI_CROP_MAX_AREA * width * height:
+        return None
+    return int(x1), int(y1), int(x2), int(y2)
+
+
+# === 감지기 기본 클래스 ===
+class Detector:
+    """
+    감지기 공통 처리. BGR 이미지 목록을 레터박스해 (N, 3, S, S) float32 배치로 만들고,
+    하위 클래스의 infer() 결과를 이미지별 Detections로 변환합니다.
+    다른 추론 엔진을 붙이려면 infer()만 구현하면 됩니다.
+    class_filter(model.classes)를 주면 해당 이름의 클래스만 남깁니다.
+    """
+
+    name = "base"
+
+    def __init__(
+        self,
+        input_size: int = 640,
+        class_names: Sequence[str] = (),
+        confidence_threshold: float = 0.5,
+        iou_threshold: float = 0.45,
+        max_detections: int = 100,
+        has_objectness: bool = False,
+        class_filter: Sequence[str] = (),
+    ):
+        self.input_size = int(input_size)
+        self.class_names = list(class_names)
+        self.allowed_classes = class_ids_for_names(self.class_names, class_filter)
+        self.confidence_threshold = float(confidence_threshold)
+        self.iou_threshold = float(iou_threshold)
+        self.max_detections = int(max_detections)
+        self.has_objectness = has_objectness
+        # 배치 입력과 레터박스 캔버스는 재사용
+        self._batch = np.empty((0, 3, self.input_size, self.input_size), dtype=np.float32)
+        self._canvases: List[np.ndarray] = []
+
+    def preprocess(self, images: Sequence[np.ndarray], regions: Optional[Sequence] = None):
+        """regions를 주면 이미지마다 해당 영역 (x1, y1, x2, y2, None이면 전체)만 잘라 레터박스합니다."""
+        count = len(images)
+        if len(self._batch) < count:
+            self._batch = np.empty((count, 3, self.input_size, self.input_size), dtype=np.float32)
+        while len(self._canvases) < count:
+            self._canvases.append(np.empty((self.input_size, self.input_size, 3), dtype=np.uint8))
+
+        batch = self._batch[:count]
+        metas = []
+        for index, image in enumerate(images):
+            region = regions[index] if regions is not None else None
+            offset = (0, 0)
+            if region is not None:
+                # 복사 없이 뷰로 잘라 레터박스 (축소/확대는 잘린 영역 기준)
+                x1, y1, x2, y2 = region
+                image = image[y1:y2, x1:x2]
+                offset = (x1, y1)
+            canvas, ratio, pad = letterbox(image, self.input_size, self._canvases[index])
+            # BGR → RGB, HWC → CHW, 0~1 정규화를 한 번에 기록
+            np.multiply(canvas.transpose(2, 0, 1)[::-1], 1.0 / 255.0, out=batch[index], casting="unsafe")
+            metas.append((ratio, pad, image.shape, offset))
+        return batch, metas
+
+    def configure(self, model: dict):
+        """모델을 다시 로드하지 않고 바꿀 수 있는 값 (임계값 등)을 반영합니다. 다음 배치부터 적용"""
+        self.confidence_threshold = float(model.get("confidenceThreshold", self.confidence_threshold))
+        self.iou_threshold = float(model.get("iouThreshold", self.iou_threshold))
+        self.max_detections = int(model.get("maxDetections", self.max_detections))
+
+    def infer(self, batch: np.ndarray) -> Sequence[np.ndarray]:
+        """배치 입력에 대해 이미지별 (후보 수, 4 + 클래스 수) 예측을 반환합니다."""
+        raise NotImplementedError
+
+    def postprocess(self, prediction: np.ndarray, meta) -> Detections:
+        ratio, pad, shape, offset = meta
+        boxes, scores, class_ids = postprocess_yolo(
+            prediction,
+            self.confidence_threshold,
+            self.iou_threshold,
+            self.max_detections,
+            has_objectness=self.has_objectness,
+            allowed_classes=self.allowed_classes,
+        )
+        boxes = scale_boxes(boxes, ratio, pad, shape)
+        if offset != (0, 0):
+            # 잘라낸 영역 좌표 → 전체 프레임 좌표
+            boxes[:, 0::2] += offset[0]
+            boxes[:, 1::2] += offset[1]
+        return Detections(boxes, scores, class_ids)
+
+    def detect(self, images: Sequence[np.ndarray], regions: Optional[Sequence] = None) -> List[Detections]:
+        if not images:
+            return []
+        batch, metas = self.preprocess(images, regions)
+        predictions = self.infer(batch)
+        return [self.postprocess(prediction, meta) for prediction, meta in zip(predictions, metas)]
+
+    def describe(self) -> dict:
+        return {
+            "engine": self.name,
+            "inputSize": self.input_size,
+            "classes": self.class_names,
+            "allowedClasses": None if self.allowed_classes is None else self.allowed_classes.tolist(),
+            "confidenceThreshold": self.confidence_threshold,
+            "iouThreshold": self.iou_threshold,
+            "maxDetections": self.max_detections,
+        }
+
+
+# === ONNX Runtime CPU 감지기 ===
+class OnnxDetector(Detector):
+    """
+    YOLO 계열 ONNX 모델을 onnxruntime CPU로 실행합니다.
+    출력은 (N, 4 + 클래스 수, 후보 수) (YOLOv8) 또는 (N, 후보 수, 5 + 클래스 수) (YOLOv5)를 지원합니다.
+    배치 차원이 1로 고정된 모델은 이미지를 한 장씩 나눠 실행합니다.
+    모델 메타데이터에 클래스 이름(names)이 있으면 그것을 쓰고 class_names는
+    클래스 필터로 사용하며, 없으면 class_names를 클래스 이름으로 사용합니다.
+    """
+
+    name = "onnxruntime"
+
+    def __init__(self, model_path: str, intra_op_threads: int = 0, inter_op_threads: int = 1, **kwargs):
+        if ort is None:
+            raise RuntimeError("onnxruntime이 설치되어 있지 않습니다 (pip install onnxruntime)")
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = max(0, int(intra_op_threads))  # 0이면 onnxruntime 기본값
+        options.inter_op_num_threads = max(0, int(inter_op_threads))
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(str(model_path), sess_options=options, providers=["CPUExecutionProvider"])
+        self.model_path = str(model_path)
+        self.intra_op_threads = options.intra_op_num_threads
+        self.inter_op_threads = options.inter_op_num_threads
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        batch_dim, _, input_h, _ = model_input.shape
+        # 입력 크기가 모델에 고정되어 있으면 모델 값을 우선
+        if isinstance(input_h, int) and input_h > 0:
+            kwargs["input_size"] = input_h
+        self.fixed_batch = batch_dim if isinstance(batch_dim, int) and batch_dim > 0 else 0
+
+        model_names = self._model_class_names()
+        if model_names:
+            kwargs["class_filter"] = kwargs.get("class_names", ())
+            kwargs["class_names"] = model_names
+        super().__init__(**kwargs)
+
+    def _model_class_names(self) -> List[str]:
+        # ultralytics 내보내기 모델은 {0: 'person', 1: 'bicycle', ...} 문자열을 names에 저장
+        raw = self.session.get_modelmeta().custom_metadata_map.get("names")
+        if not raw:
+            return []
+        try:
+            names = ast.literal_eval(raw)
+        except (ValueError, SyntaxError):
+            return []
+        if isinstance(names, dict):
+            return [str(names[key]) for key in sorted(names)]
+        return [str(name) for name in names]
+
+    def _run(self, batch: np.ndarray) -> np.ndarray:
+        output = self.session.run(None, {self.input_name: batch})[0]
+        # YOLOv8: (N, 4 + nc, 후보) → (N, 후보, 4 + nc)
+        if not self.has_objectness and output.shape[1] < output.shape[2]:
+            output = output.transpose(0, 2, 1)
+        return output
+
+    def infer(self, batch: np.ndarray) -> Sequence[np.ndarray]:
+        if not self.fixed_batch or len(batch) == self.fixed_batch:
+            return list(self._run(batch))
+        outputs = []
+        for start in range(0, len(batch), self.fixed_batch):
+            chunk = batch[start:start + self.fixed_batch]
+            if len(chunk) < self.fixed_batch:
+                # 고정 배치 크기에 맞게 채운 뒤 결과는 버림
+                padded = np.zeros((self.fixed_batch,) + batch.shape[1:], dtype=batch.dtype)
+                padded[:len(chunk)] = chunk
+                outputs.extend(self._run(padded)[:len(chunk)])
+            else:
+                outputs.extend(self._run(chunk))
+        return outputs
+
+    def describe(self) -> dict:
+        info = super().describe()
+        info.update(
+            modelPath=self.model_path,
+            fixedBatch=self.fixed_batch,
+            intraOpThreads=self.intra_op_threads,
+            interOpThreads=self.inter_op_threads,
+        )
+        return info
+
+
+def resolve_model_path(model: dict) -> Optional[Path]:
+    """
+    model.customModelPath에서 ONNX 모델 경로를 찾습니다.
+    .pt 경로이면 같은 위치의 .onnx 파일(내보낸 모델)을 사용합니다.
+    상대 경로는 backend 디렉토리 기준입니다.
+    """
+    raw = model.get("onnxModelPath") or model.get("customModelPath")
+    if not raw:
+        return None
+    path = Path(raw)
+    if not path.is_absolute():
+        path = BACKEND_DIR / path
+    if path.suffix.lower() != ".onnx":
+        path = path.with_suffix(".onnx")
+    return path if path.is_file() else None
+
+
+def model_reload_needed(old: dict, new: dict) -> bool:
+    """MODEL_LIVE_KEYS 외의 model 값 (모델 경로, 입력 크기 등)이 바뀌었으면 True"""
+    keys = (set(old) | set(new)) - set(MODEL_LIVE_KEYS)
+    return any(old.get(key) != new.get(key) for key in keys)
+
+
+def batch_size_for(model: dict) -> int:
+    return int(model.get("batchSize", 1)) if model.get("enableBatchProcessing", False) else 1
+
+
+def create_warm_detector(config: dict, shape=(1080, 1920, 3)) -> Optional[Detector]:
+    """
+    감지기를 만들고 빈 프레임으로 한 번 추론해 둡니다. (세션 초기화/메모리 할당을 미리 끝냄)
+    실행 중인 감지 단계에 교체해 넣을 때 첫 프레임이 느려지지 않도록 백그라운드 스레드에서 호출합니다.
+    """
+    detector = create_detector(config)
+    if detector is None:
+        return None
+    started = time.perf_counter()
+    detector.detect([np.zeros(shape, dtype=np.uint8)])
+    print(f"🔥 감지 모델 준비 완료 ({(time.perf_counter() - started) * 1000:.0f}ms)")
+    return detector
+
+
+def create_detector(config: dict) -> Optional[Detector]:
+    """설정으로 감지기를 만듭니다. 모델이나 onnxruntime이 없으면 None을 반환합니다."""
+    model = config.get("model", {})
+    if ort is None:
+        print("⚠️ onnxruntime이 설치되어 있지 않아 객체 감지를 비활성화합니다")
+        return None
+    path = resolve_model_path(model)
+    if path is None:
+        print(f"⚠️ ONNX 모델 파일을 찾을 수 없어 객체 감지를 비활성화합니다 (customModelPath={model.get('customModelPath')})")
+        return None
+
+    system = config.get("system", {})
+    intra = int(model.get("intraOpThreads", system.get("maxThreads", 0)))
+    try:
+        detector = OnnxDetector(
+            path,
+            intra_op_threads=min(intra, os.cpu_count() or 1),
+            inter_op_threads=int(model.get("interOpThreads", 1)),
+            input_size=int(model.get("inputSize", 640)),
+            class_names=model.get("classes", []),
+            confidence_threshold=float(model.get("confidenceThreshold", 0.5)),
+            iou_threshold=float(model.get("iouThreshold", 0.45)),
+            max_detections=int(model.get("maxDetections", 100)),
+            has_objectness=str(model.get("modelVersion", "")).lower() in ("v5", "yolov5"),
+        )
+    except Exception as e:
+        print(f"🚨 ONNX 모델 로드 실패 ({path}): {e}")
+        return None
+    print(f"🧠 감지 모델 로드 완료: {path.name} (입력 {detector.input_size}, 스레드 {detector.intra_op_threads})")
+    return detector
+
+
+# === 감지 단계 (카메라 간 배치 추론 스레드) ===
+@dataclass
+class DetectionResult:
+    camera_id: str
+    seq: int
+    timestamp: float
+    wall_time: float
+    shape: Tuple[int, ...]
+    detections: Detections = field(repr=False)
+    infer_ms: float = 0.0
+    tracks: Optional[Tracks] = field(default=None, repr=False)  # 추적기를 쓰면 이번 프레임의 트랙
+    roi_hits: Optional[RoiHits] = field(default=None, repr=False)  # 트랙(없으면 감지) 박스별 ROI 판정
+    image: Optional[np.ndarray] = field(default=None, repr=False)  # 추론한 프레임 (OCR 후보 추출용)
+    dwell_events: List[DwellEvent] = field(default_factory=list)  # 이번 프레임의 ROI 진입/확정/이탈
+
+
+class DetectionStage(threading.Thread):
+    """
+    감시 중인 카메라들의 링 버퍼에서 아직 처리하지 않은 최신 프레임을 모아
+    batch_size 단위로 한 번에 추론하고, 결과를 on_result 콜백으로 넘깁니다.
+    배치가 찰 때까지 기다리지 않으므로 카메라 하나일 때도 지연이 늘지 않습니다.
+    scheduler(InferenceScheduler)를 주면 프레임마다 추론 여부를 먼저 판단합니다.
+    tracker_factory를 주면 카메라마다 추적기를 만들어 감지 결과를 이어 붙입니다.
+    roi_engine(RoiEngine)을 주면 결과 박스마다 속한 ROI와 동작 플래그를 계산합니다.
+    dwell_monitor(DwellMonitor)를 주면 트랙별 ROI 체류 상태를 갱신해 이벤트를 함께 넘깁니다.
+    crop_to_rois이면 detectTrucks가 켜진 ROI의 외접 영역만 잘라 추론하고 좌표는 전체 프레임으로 되돌립니다.
+    on_result는 감지 스레드에서 호출됩니다.
+    """
+
+    def __init__(
+        self,
+        detector: Detector,
+        on_result: Callable[[DetectionResult], None],
+        batch_size: int = 1,
+        scheduler=None,
+        tracker_factory: Optional[Callable[[str], Tracker]] = None,
+        roi_engine: Optional[RoiEngine] = None,
+        dwell_monitor: Optional[DwellMonitor] = None,
+        crop_to_rois: bool = False,
+        crop_padding: float = ROI_CROP_PADDING,
+        name: str = "detector",
+    ):
+        super().__init__(name=name, daemon=True)
+        self.detector = detector
+        self.on_result = on_result
+        self.scheduler = scheduler
+        self.tracker_factory = tracker_factory
+        self.roi_engine = roi_engine
+        self.dwell_monitor = dwell_monitor
+        self.crop_to_rois = crop_to_rois and roi_engine is not None
+        self.crop_padding = float(crop_padding)
+        self.trackers: Dict[str, Tracker] = {}  # 감지 스레드에서만 접근
+        self.batch_size = max(1, int(batch_size))
+        self._streams: Dict[str, list] = {}  # camera_id → [stream, 감시 수]
+        self._last_seq: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+        self._rotation = 0
+
+        # 통계
+        self.batches = 0
+        self.frames_processed: Dict[str, int] = {}
+        self.frames_missed: Dict[str, int] = {}
+        self.batch_latency = LatencyStats()
+        self.detector_swaps = 0
+        self.pixels_full = 0  # 전체 프레임 기준 픽셀 수 합계
+        self.pixels_inferred = 0  # 실제로 잘라 추론한 픽셀 수 합계
+
+    # --- 감시 카메라 관리 ---
+    def watch(self, stream):
+        with self._lock:
+            entry = self._streams.get(stream.id)
+            if entry is None:
+                self._streams[stream.id] = [stream, 1]
+                self._last_seq[stream.id] = stream.buffer.seq
+                stream.buffer.add_listener(self._wakeup)
+            else:
+                entry[1] += 1
+
+    def unwatch(self, stream):
+        with self._lock:
+            entry = self._streams.get(stream.id)
+            if entry is None:
+                return
+            entry[1] -= 1
+            if entry[1] <= 0:
+                del self._streams[stream.id]
+                stream.buffer.remove_listener(self._wakeup)
+
+    def watching(self, camera_id: str) -> bool:
+        return camera_id in self._streams
+
+    # --- 실행 중 설정 변경 ---
+    def configure(self, model: dict):
+        """배치 크기, ROI 잘라내기, 감지 임계값을 바꿉니다. 다음 배치부터 적용"""
+        self.batch_size = max(1, batch_size_for(model))
+        self.crop_to_rois = bool(model.get("roiCropping", True)) and self.roi_engine is not None
+        self.crop_padding = float(model.get("roiCropPadding", self.crop_padding))
+        self.detector.configure(model)
+
+    def swap_detector(self, detector: Detector):
+        """미리 준비한 감지기로 교체합니다. 진행 중인 배치는 이전 감지기로 끝남"""
+        previous, self.detector = self.detector, detector
+        self.detector_swaps += 1
+        print(f"🔁 감지 모델 교체: {previous.describe().get('modelPath')} → {detector.describe().get('modelPath')}")
+
+    def set_tracker_settings(self, settings):
+        """카메라별 추적기의 설정을 바꿉니다. (트랙 상태는 유지, 다음 프레임부터 적용)"""
+        for tracker in list(self.trackers.values()):
+            tracker.settings = settings
+
+    def stop(self, timeout: Optional[float] = 2.0):
+        self._stop_event.set()
+        self._wakeup.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
+
+    # --- 추론 루프 ---
+    def _collect(self):
+        with self._lock:
+            streams = [entry[0] for entry in self._streams.values()]
+        if not streams:
+            return []
+        # 카메라 수가 배치보다 많을 때 매번 다른 카메라부터 채움
+        self._rotation = (self._rotation + 1) % len(streams)
+        streams = streams[self._rotation:] + streams[:self._rotation]
+
+        batch = []
+        for stream in streams:
+            frame = stream.buffer.latest()
+            last_seq = self._last_seq.get(stream.id, 0)
+            if frame is None or frame.seq <= last_seq:
+                continue
+            if last_seq and frame.seq > last_seq + 1:
+                self.frames_missed[stream.id] = self.frames_missed.get(stream.id, 0) + frame.seq - last_seq - 1
+            self._last_seq[stream.id] = frame.seq
+            if self.scheduler is not None and not self.scheduler.should_infer(stream.id, frame):
+                continue
+            batch.append((stream.id, frame))
+            if len(batch) >= self.batch_size:
+                break
+        return batch
+
+    def run(self):
+        print(f"🧠 감지 단계 시작 (배치 {self.batch_size}, {self.detector.name})")
+        while not self._stop_event.is_set():
+            # 확인 전에 지워야 확인 직후 게시된 프레임을 놓치지 않음
+            self._wakeup.clear()
+            batch = self._collect()
+            if not batch:
+                self._wakeup.wait(0.5)
+                continue
+
+            started = time.perf_counter()
+            try:
+                regions = [self._region(camera_id, frame) for camera_id, frame in batch]
+                detector = self.detector  # 교체되어도 이번 배치는 같은 감지기로 처리
+                results = detector.detect([frame.image for _, frame in batch], regions)
+            except Exception as e:
+                print(f"💥 객체 감지 중 예외 발생: {e}")
+                self._stop_event.wait(1.0)
+                continue
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.batches += 1
+            self.batch_latency.record(elapsed_ms)
+
+            for (camera_id, frame), detections in zip(batch, results):
+                self.frames_processed[camera_id] = self.frames_processed.get(camera_id, 0) + 1
+                if self.scheduler is not None:
+                    self.scheduler.on_result(camera_id, len(detections), frame.timestamp)
+                tracks = self._track(camera_id, frame, detections)
+                roi_hits = None
+                if self.roi_engine is not None:
+                    boxes = tracks.boxes if tracks is not None else detections.boxes
+                    roi_hits = self.roi_engine.evaluate(boxes, frame.image.shape, camera_id)
+                dwell_events = []
+                if self.dwell_monitor is not None and tracks is not None:
+                    dwell_events = self.dwell_monitor.update(camera_id, tracks.ids, roi_hits,
+                                                             frame.timestamp, frame.wall_time)
+                try:
+                    self.on_result(DetectionResult(
+                        camera_id=camera_id,
+                        seq=frame.seq,
+                        timestamp=frame.timestamp,
+                        wall_time=frame.wall_time,
+                        shape=frame.image.shape,
+                        detections=detections,
+                        infer_ms=elapsed_ms,
+                        tracks=tracks,
+                        roi_hits=roi_hits,
+                        image=frame.image,
+                        dwell_events=dwell_events,
+                    ))
+                except Exception as e:
+                    print(f"💥 감지 결과 처리 중 예외 발생: {e}")
+        print("🛑 감지 단계 종료")
+
+    def _region(self, camera_id: str, frame):
+        """추론할 영역 (ROI 잘라내기가 꺼져 있거나 ROI가 없으면 None, 전체 프레임)"""
+        height, width = frame.image.shape[:2]
+        self.pixels_full += height * width
+        region = None
+        if self.crop_to_rois:
+            box = self.roi_engine.union_box(frame.image.shape, camera_id, DETECT)
+            region = crop_region(box, frame.image.shape, self.crop_padding)
+        if region is None:
+            self.pixels_inferred += height * width
+        else:
+            self.pixels_inferred += (region[2] - region[0]) * (region[3] - region[1])
+        return region
+
+    def _track(self, camera_id: str, frame, detections: Detections) -> Optional[Tracks]:
+        if self.tracker_factory is None:
+            return None
+        tracker = self.trackers.get(camera_id)
+        if tracker is None:
+            tracker = self.trackers[camera_id] = self.tracker_factory(camera_id)
+        return tracker.update(detections.boxes, detections.scores, detections.class_ids,
+                              timestamp=frame.wall_time, shape=frame.image.shape)
+
+    def stats(self) -> dict:
+        processed = sum(self.frames_processed.values())
+        return {
+            "running": self.is_alive(),
+            "detector": self.detector.describe(),
+            "batchSize": self.batch_size,
+            "batches": self.batches,
+            "avgBatch": round(processed / self.batches, 2) if self.batches else 0.0,
+            "cameras": sorted(self._streams),
+            "framesProcessed": dict(self.frames_processed),
+            "framesMissed": dict(self.frames_missed),
+            "batchLatency": self.batch_latency.summary(),
+            "detectorSwaps": self.detector_swaps,
+            "roiCrop": self.crop_to_rois,
+            "inferredPixelRatio": round(self.pixels_inferred / self.pixels_full, 3) if self.pixels_full else None,
+            "scheduler": self.scheduler.stats() if self.scheduler is not None else None,
+            "rois": self.roi_engine.stats() if self.roi_engine is not None else None,
+            "dwell": self.dwell_monitor.stats() if self.dwell_monitor is not None else None,
+            "tracking": {camera_id: tracker.stats() for camera_id, tracker in list(self.trackers.items())},
+        }
+
+
+# === 동작 확인용 더미 모델 / 실행 ===
+def build_dummy_model(path: str, num_classes: int = 3, candidates: int = 100, input_size: int = 320):
+    """
+    입력과 무관하게 고정된 후보 박스를 내는 YOLOv8 형식의 작은 ONNX 모델을 만듭니다.
+    (onnx 패키지 필요, 배치 크기는 동적)
+    """
+    import onnx
+    from onnx import TensorProto, helper, numpy_helper
+
+    rng = np.random.default_rng(0)
+    centers = rng.uniform(0.2, 0.8, size=(2, candidates)) * input_size
+    sizes = rng.uniform(0.1, 0.3, size=(2, candidates)) * input_size
+    scores = rng.uniform(0.0, 1.0, size=(num_classes, candidates))
+    prediction = np.concatenate([centers, sizes, scores]).astype(np.float32)[None]
+
+    nodes = [
+        helper.make_node("Shape", ["images"], ["input_shape"]),
+        helper.make_node("Slice", ["input_shape", "zero", "one"], ["batch"]),
+        helper.make_node("Concat", ["batch", "tail"], ["output_shape"], axis=0),
+        helper.make_node("Expand", ["prediction", "output_shape"], ["output0"]),
+    ]
+    initializers = [
+        numpy_helper.from_array(prediction, "prediction"),
+        numpy_helper.from_array(np.array([0], np.int64), "zero"),
+        numpy_helper.from_array(np.array([1], np.int64), "one"),
+        numpy_helper.from_array(np.array(prediction.shape[1:], np.int64), "tail"),
+    ]
+    graph = helper.make_graph(
+        nodes,
+        "dummy_yolo",
+        [helper.make_tensor_value_info("images", TensorProto.FLOAT, ["batch", 3, input_size, input_size])],
+        [helper.make_tensor_value_info("output0", TensorProto.FLOAT, ["batch", 4 + num_classes, candidates])],
+        initializers,
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    onnx.save(model, path)
+    return path
+
+
+def benchmark_roi_crop(detector: Detector, image: np.ndarray, rois: Sequence[dict], runs: int = 30,
+                       padding: float = ROI_CROP_PADDING) -> dict:
+    """
+    같은 프레임을 전체 프레임과 ROI 잘라내기로 각각 추론해 처리량과 유효 해상도를 비교합니다.
+    모델 입력 크기는 같으므로 추론 시간은 비슷하고, 차이는 전처리(축소)와 ROI 영역의 해상도입니다.
+    """
+    box = RoiEngine(rois).union_box(image.shape, None, DETECT)
+    region = crop_region(box, image.shape, padding)
+    if region is None:
+        raise ValueError("잘라낼 ROI 영역이 없습니다 (detectTrucks ROI가 없거나 프레임 대부분을 덮음)")
+
+    def measure(regions):
+        detector.detect([image], regions)  # 준비 실행
+        preprocess, total = [], []
+        for _ in range(runs):
+            started = time.perf_counter()
+            detector.preprocess([image], regions)
+            preprocess.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            detections = detector.detect([image], regions)[0]
+            total.append(time.perf_counter() - started)
+        median = float(np.median(total))
+        return {"preprocessMs": round(float(np.median(preprocess)) * 1000, 2),
+                "detectMs": round(median * 1000, 2), "fps": round(1.0 / median, 1), "detections": len(detections)}, \
+            detections
+
+    height, width = image.shape[:2]
+    crop_w, crop_h = region[2] - region[0], region[3] - region[1]
+    full, _ = measure(None)
+    cropped, detections = measure([region])
+    inside = bool(len(detections) == 0 or (
+        (detections.boxes[:, 0] >= region[0] - 1).all() and (detections.boxes[:, 2] <= region[2] + 1).all()
+        and (detections.boxes[:, 1] >= region[1] - 1).all() and (detections.boxes[:, 3] <= region[3] + 1).all()))
+    return {
+        "frame": [width, height],
+        "region": list(region),
+        "inferredPixelRatio": round(crop_w * crop_h / (width * height), 3),
+        # 입력 한 변에 ROI 영역이 몇 배 더 큰 해상도로 들어가는지
+        "resolutionGain": round(max(width, height) / max(crop_w, crop_h), 2),
+        "full": full,
+        "cropped": cropped,
+        "speedup": round(full["detectMs"] / cropped["detectMs"], 2) if cropped["detectMs"] else None,
+        "boxesInRegion": inside,
+    }
+
+
+if __name__ == "__main__":
+    # 예) python -m pipeline.detector --video sample.mp4 --dummy
+    import argparse
+    import tempfile
+
+    from pipeline.capture import CaptureWorker, FrameRingBuffer
+
+    parser = argparse.ArgumentParser(description="녹화 영상으로 감지 단계를 실행합니다")
+    parser.add_argument("--video", help="입력 동영상 파일")
+    parser.add_argument("--model", help="ONNX 모델 경로")
+    parser.add_argument("--dummy", action="store_true", help="더미 ONNX 모델 사용")
+    parser.add_argument("--cameras", type=int, default=1, help="같은 영상을 재생할 가상 카메라 수")
+    parser.add_argument("--batch", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--roi-benchmark", action="store_true",
+                        help="config.toml의 ROI로 전체 프레임 대비 ROI 잘라내기 처리량 비교")
+    parser.add_argument("--input-size", type=int, default=640, help="--roi-benchmark 더미 모델 입력 크기")
+    args = parser.parse_args()
+    if not args.video and not args.roi_benchmark:
+        parser.error("--video 또는 --roi-benchmark가 필요합니다")
+
+    model_path = args.model
+    if args.dummy or not model_path:
+        model_path = build_dummy_model(os.path.join(tempfile.gettempdir(), "dummy_yolo.onnx"),
+                                       input_size=args.input_size)
+
+    if args.roi_benchmark:
+        import json
+
+        import toml
+
+        with open(BACKEND_DIR / "settings" / "config.toml", "r", encoding="utf-8") as f:
+            config = toml.load(f)
+        width, height = (int(v) for v in str(config.get("camera", {}).get("resolution", "1920x1080")).split("x"))
+        image = np.random.default_rng(0).integers(0, 255, (height, width, 3), dtype=np.uint8)
+        if args.video:
+            capture = cv2.VideoCapture(args.video)
+            ok, frame = capture.read()
+            capture.release()
+            if ok:
+                image = frame
+        detector = OnnxDetector(model_path, intra_op_threads=args.threads, class_names=["truck", "car", "bus"])
+        print(json.dumps(benchmark_roi_crop(detector, image, config.get("rois", [])), indent=2, ensure_ascii=False))
+        raise SystemExit(0)
+
+    class _Stream:
+        def __init__(self, camera_id):
+            self.id = camera_id
+            self.buffer = FrameRingBuffer()
+
+    detector = OnnxDetector(model_path, intra_op_threads=args.threads, class_names=["truck", "car", "bus"])
+    counts = {}
+
+    def on_result(result: DetectionResult):
+        counts[result.camera_id] = counts.get(result.camera_id, 0) + 1
+        if counts[result.camera_id] == 1:
+            print(result.camera_id, result.detections.to_meta(result.shape, detector.class_names)[:2])
+
+    stage = DetectionStage(detector, on_result, batch_size=args.batch)
+    workers = []
+    for index in range(args.cameras):
+        stream = _Stream(f"cam-{index}")
+        worker = CaptureWorker(args.video, stream.buffer, loop=True, pace_fps=30, name=stream.id)
+        workers.append(worker)
+        worker.start()
+        stage.watch(stream)
+    stage.start()
+    time.sleep(args.seconds)
+    stage.stop()
+    for worker in workers:
+        worker.stop()
+
+    stats = stage.stats()
+    print(f"처리 프레임: {stats['framesProcessed']}, 평균 배치 {stats['avgBatch']}, 배치 지연 {stats['batchLatency']}")
@@ -0,0 +1,397 @@
+import argparse
+import json
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from pipeline.roi import ACTIONS, RoiEngine, RoiHits
+
+EXIT_GRACE_SECONDS = 1.0  # 트랙이 이 시간 동안 보이지 않으면 ROI를 떠난 것으로 봄
+INITIAL_CAPACITY = 256  # 카메라별로 미리 확보하는 트랙 슬롯 수 (부족하면 두 배로)
+
+
+@dataclass
+class DwellEvent:
+    type: str  # enter | confirm | exit
+    camera_id: str
+    track_id: int
+    roi_id: str
+    timestamp: float  # time.monotonic()
+    wall_time: float
+    dwell: float  # ROI에 들어온 뒤 경과 시간 (초)
+    confirmed: bool  # exit 이벤트에서 확정된 적이 있었는지
+    actions: Tuple[str, ...]  # ROI에 켜진 동작 (sendToPLC, triggerAlarm 등)
+
+    def to_meta(self) -> dict:
+        return {
+            "type": self.type,
+            "trackId": self.track_id,
+            "roiId": self.roi_id,
+            "timestamp": self.wall_time,
+            "dwell": round(self.dwell, 3),
+            "confirmed": self.confirmed,
+            "actions": list(self.actions),
+        }
+
+
+# === 카메라별 상태 표 ===
+class DwellTable:
+    """
+    트랙 × ROI 체류 상태를 고정 크기 배열로 보관합니다. (트랙 ID → 슬롯은 dict)
+
+    - entered: ROI에 들어온 시각 (밖이면 NaN)
+    - confirmed: minDetectionTime을 넘겨 확정되었는지
+
+    매 업데이트는 미리 할당한 작업 배열에 out= 연산으로만 계산하므로 프레임마다
+    배열을 새로 만들지 않으며, 이벤트가 있을 때만 해당 위치를 찾습니다.
+    상태 전이: 밖 → (enter) → 안 → (confirm, 체류 ≥ minDetectionTime) → 확정 → (exit) → 밖
+    """
+
+    def __init__(self, camera_id: str, roi_ids: Sequence[str], min_times: np.ndarray, actions: np.ndarray,
+                 capacity: int = INITIAL_CAPACITY, exit_grace: float = EXIT_GRACE_SECONDS):
+        self.camera_id = camera_id
+        self.roi_ids = tuple(roi_ids)
+        self.min_times = np.asarray(min_times, dtype=np.float64)
+        self.roi_actions = [tuple(ACTIONS[a] for a in np.flatnonzero(row) if ACTIONS[a] != "detectTrucks")
+                            for row in np.asarray(actions, dtype=bool)]
+        self.exit_grace = float(exit_grace)
+        self.fingerprint = ""
+        self.slots: Dict[int, int] = {}
+        self._allocate(capacity)
+
+    def _allocate(self, capacity: int):
+        rois = len(self.roi_ids)
+        old = getattr(self, "track_ids", None)
+        self.capacity = capacity
+        track_ids = np.full(capacity, -1, dtype=np.int64)
+        entered = np.full((capacity, rois), np.nan)
+        confirmed = np.zeros((capacity, rois), dtype=bool)
+        last_seen = np.full(capacity, -np.inf)
+        if old is not None:
+            # 슬롯 번호는 유지한 채 늘림
+            count = len(old)
+            track_ids[:count] = old
+            entered[:count] = self.entered
+            confirmed[:count] = self.confirmed
+            last_seen[:count] = self.last_seen
+            self.free.extend(range(capacity - 1, count - 1, -1))
+            self.free.sort(reverse=True)
+        else:
+            self.free = list(range(capacity - 1, -1, -1))
+        self.track_ids, self.entered, self.confirmed, self.last_seen = track_ids, entered, confirmed, last_seen
+
+        # 작업 배열 (업데이트마다 재사용)
+        self._inside = np.zeros((capacity, rois), dtype=bool)
+        self._was = np.zeros((capacity, rois), dtype=bool)
+        self._enter = np.zeros((capacity, rois), dtype=bool)
+        self._leave = np.zeros((capacity, rois), dtype=bool)
+        self._confirm = np.zeros((capacity, rois), dtype=bool)
+        self._dwell = np.zeros((capacity, rois))
+        self._present = np.zeros(capacity, dtype=bool)
+        self._age = np.zeros(capacity)
+        self._stale = np.zeros(capacity, dtype=bool)
+        self._occupied = np.zeros(capacity, dtype=bool)
+        self._slot_buffer = np.zeros(capacity, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.slots)
+
+    def _slot(self, track_id: int) -> int:
+        slot = self.slots.get(track_id)
+        if slot is None:
+            if not self.free:
+                self._allocate(self.capacity * 2)
+            slot = self.free.pop()
+            self.slots[track_id] = slot
+            self.track_ids[slot] = track_id
+        return slot
+
+    def _event(self, kind: str, slot: int, roi: int, timestamp: float, wall_time: float, dwell: float,
+               confirmed: bool) -> DwellEvent:
+        return DwellEvent(kind, self.camera_id, int(self.track_ids[slot]), self.roi_ids[roi], timestamp, wall_time,
+                          float(dwell), bool(confirmed), self.roi_actions[roi])
+
+    def update(self, track_ids: Sequence[int], membership: np.ndarray, timestamp: float,
+               wall_time: Optional[float] = None) -> List[DwellEvent]:
+        """
+        이번 프레임의 트랙 ID와 ROI 포함 여부 (N, M)로 상태를 갱신하고 이벤트를 반환합니다.
+        이번 프레임에 없는 트랙은 exit_grace가 지날 때까지 상태를 유지합니다. (가려짐 대비)
+        """
+        wall_time = time.time() if wall_time is None else wall_time
+        track_ids = track_ids.tolist() if isinstance(track_ids, np.ndarray) else list(track_ids)
+        count = len(track_ids)
+        lookup = self.slots.get
+        found = [lookup(track_id) for track_id in track_ids]
+        if None in found:
+            # 새 트랙만 슬롯 할당 (용량이 늘면 작업 배열도 바뀌므로 먼저 처리)
+            found = [self._slot(int(track_id)) for track_id in track_ids]
+        slots = self._slot_buffer[:count]
+        slots[:] = found
+
+        inside, was, enter, leave, confirm, dwell = (self._inside, self._was, self._enter, self._leave,
+                                                     self._confirm, self._dwell)
+        present = self._present
+        inside.fill(False)
+        present.fill(False)
+        if count:
+            inside[slots] = membership
+            present[slots] = True
+            self.last_seen[slots] = timestamp
+
+        np.isnan(self.entered, out=was)
+        np.logical_not(was, out=was)
+        np.greater(inside, was, out=enter)  # 안 & 이전에 밖
+        np.greater(was, inside, out=leave)  # 이전에 안 & 지금 밖
+        np.logical_and(leave, present[:, None], out=leave)  # 이번 프레임에 보인 트랙만
+
+        events = []
+        if leave.any():
+            np.subtract(timestamp, self.entered, out=dwell)
+            for slot, roi in zip(*np.nonzero(leave)):
+                events.append(self._event("exit", slot, roi, timestamp, wall_time, dwell[slot, roi],
+                                          self.confirmed[slot, roi]))
+            self.entered[leave] = np.nan
+            self.confirmed[leave] = False
+        if enter.any():
+            self.entered[enter] = timestamp
+            for slot, roi in zip(*np.nonzero(enter)):
+                events.append(self._event("enter", slot, roi, timestamp, wall_time, 0.0, False))
+
+        # 체류 시간이 minDetectionTime 이상이면 확정 (NaN 비교는 False)
+        np.subtract(timestamp, self.entered, out=dwell)
+        with np.errstate(invalid="ignore"):
+            np.greater_equal(dwell, self.min_times, out=confirm)
+        np.logical_and(confirm, inside, out=confirm)
+        np.greater(confirm, self.confirmed, out=confirm)
+        if confirm.any():
+            self.confirmed |= confirm
+            for slot, roi in zip(*np.nonzero(confirm)):
+                events.append(self._event("confirm", slot, roi, timestamp, wall_time, dwell[slot, roi], True))
+
+        events.extend(self._expire(timestamp, wall_time))
+        return events
+
+    def _expire(self, timestamp: float, wall_time: float) -> List[DwellEvent]:
+        """exit_grace 동안 보이지 않은 트랙을 ROI에서 내보내고 슬롯을 반납합니다."""
+        np.subtract(timestamp, self.last_seen, out=self._age)
+        np.greater(self._age, self.exit_grace, out=self._stale)
+        np.greater_equal(self.track_ids, 0, out=self._occupied)
+        np.logical_and(self._stale, self._occupied, out=self._stale)
+        events = []
+        if not self._stale.any():
+            return events
+        stale = np.flatnonzero(self._stale)
+        for slot in stale:
+            for roi in np.flatnonzero(~np.isnan(self.entered[slot])):
+                # 체류 시간은 마지막으로 보인 시각까지
+                events.append(self._event("exit", slot, roi, timestamp, wall_time,
+                                          self.last_seen[slot] - self.entered[slot, roi],
+                                          self.confirmed[slot, roi]))
+            del self.slots[int(self.track_ids[slot])]
+            self.track_ids[slot] = -1
+            self.entered[slot] = np.nan
+            self.confirmed[slot] = False
+            self.last_seen[slot] = -np.inf
+            self.free.append(int(slot))
+        return events
+
+    def inside_counts(self) -> Dict[str, int]:
+        """ROI별 현재 안에 있는 트랙 수"""
+        counts = np.count_nonzero(~np.isnan(self.entered), axis=0)
+        return {roi_id: int(count) for roi_id, count in zip(self.roi_ids, counts)}
+
+
+# === 여러 카메라 관리 ===
+class DwellMonitor:
+    """
+    카메라별 DwellTable을 관리합니다. ROI 구성이 바뀌면 (RoiEngine.update) 해당 카메라의
+    상태를 새로 시작합니다. 한 스레드 (감지 스레드)에서만 호출합니다.
+    """
+
+    def __init__(self, roi_engine: RoiEngine, exit_grace: float = EXIT_GRACE_SECONDS):
+        self.roi_engine = roi_engine
+        self.exit_grace = exit_grace
+        self.tables: Dict[str, DwellTable] = {}
+        self.events = {"enter": 0, "confirm": 0, "exit": 0}
+        self.updates = 0
+        self.update_seconds = 0.0
+
+    def update(self, camera_id: str, track_ids: Sequence[int], hits: Optional[RoiHits], timestamp: float,
+               wall_time: Optional[float] = None) -> List[DwellEvent]:
+        if hits is None:
+            self.tables.pop(camera_id, None)
+            return []
+        started = time.perf_counter()
+        table = self.tables.get(camera_id)
+        roi_set = self.roi_engine.roi_set
+        if table is None or table.fingerprint != roi_set.fingerprint or table.roi_ids != hits.roi_ids:
+            table = self.tables[camera_id] = DwellTable(
+                camera_id, hits.roi_ids, roi_set.min_detection_time[hits.roi_index],
+                roi_set.actions[hits.roi_index], exit_grace=self.exit_grace)
+            table.fingerprint = roi_set.fingerprint
+        events = table.update(track_ids, hits.membership, timestamp, wall_time)
+        for event in events:
+            self.events[event.type] += 1
+        self.updates += 1
+        self.update_seconds += time.perf_counter() - started
+        return events
+
+    def stats(self) -> dict:
+        return {
+            "events": dict(self.events),
+            "avgUpdateUs": round(self.update_seconds / self.updates * 1e6, 1) if self.updates else 0.0,
+            "cameras": {camera_id: {"tracks": len(table), "capacity": table.capacity, "inside": table.inside_counts()}
+                        for camera_id, table in self.tables.items()},
+        }
+
+
+# === 재현 실행 (결정적 시나리오 / 기록 파일) ===
+REPLAY_ROIS = [
+    {
+        "id": "gate", "name": "입구", "enabled": True, "minDetectionTime": 2,
+        "points": [{"x": 0.3, "y": 0.2}, {"x": 0.7, "y": 0.2}, {"x": 0.7, "y": 0.8}, {"x": 0.3, "y": 0.8}],
+        "actions": {"detectTrucks": True, "performOcr": True, "sendToPLC": True, "triggerAlarm": False},
+    },
+    {
+        "id": "lane", "name": "대기 차로", "enabled": True, "minDetectionTime": 0,
+        "points": [{"x": 0.0, "y": 0.8}, {"x": 1.0, "y": 0.8}, {"x": 1.0, "y": 1.0}, {"x": 0.0, "y": 1.0}],
+        "actions": {"detectTrucks": True, "performOcr": False, "sendToPLC": False, "triggerAlarm": True},
+    },
+]
+
+
+def scenario_frames(fps: float = 10.0, shape=(1080, 1920)):
+    """
+    결정적 시나리오: (시각, 카메라, 트랙 ID 목록, 박스 목록)
+    - 트럭 1: 왼쪽에서 들어와 gate에 3초 정차 후 오른쪽으로 나감 → enter, confirm, exit
+    - 트럭 2: gate를 1초 만에 통과 → enter, exit (확정 없음)
+    - 트럭 3: gate 안에서 0.5초 가려졌다 다시 보임 → 상태 유지 후 confirm
+    - 트럭 4: lane에 들어왔다가 프레임에서 사라짐 → minDetectionTime 0이라 즉시 confirm, 1초 뒤 exit
+    """
+    height, width = shape
+    size = np.array([300.0, 200.0])
+
+    def box(cx, cy):
+        return [cx * width - size[0] / 2, cy * height - size[1] / 2, cx * width + size[0] / 2, cy * height + size[1] / 2]
+
+    frames = []
+    for step in range(int(12 * fps)):
+        t = step / fps
+        ids, boxes = [], []
+        # 트럭 1: 0~2초 이동 (0.1 → 0.5), 2~5초 정차, 5~7초 이동 (0.5 → 0.9)
+        if t < 7:
+            x = 0.1 + 0.2 * min(t, 2) + 0.2 * max(0.0, t - 5)
+            ids.append(1)
+            boxes.append(box(x, 0.5))
+        # 트럭 2: 6~8초에 빠르게 통과
+        if 6 <= t < 8:
+            ids.append(2)
+            boxes.append(box(0.1 + 0.4 * (t - 6), 0.35))
+        # 트럭 3: 8초부터 gate 중앙, 9~9.5초 가려짐
+        if t >= 8 and not (9 <= t < 9.5):
+            ids.append(3)
+            boxes.append(box(0.5, 0.4))
+        # 트럭 4: 1~2초 lane에 보이다 사라짐
+        if 1 <= t < 2:
+            ids.append(4)
+            boxes.append(box(0.2, 0.92))
+        frames.append((t, "cam1", ids, np.array(boxes, dtype=np.float64).reshape(-1, 4)))
+    return frames
+
+
+EXPECTED_EVENTS = [
+    ("enter", 1, "gate"), ("enter", 4, "lane"), ("confirm", 4, "lane"),
+    ("confirm", 1, "gate"), ("exit", 4, "lane"), ("exit", 1, "gate"),
+    ("enter", 2, "gate"), ("exit", 2, "gate"),
+    ("enter", 3, "gate"), ("confirm", 3, "gate"),
+]
+
+
+def replay(frames, rois=REPLAY_ROIS, shape=(1080, 1920)) -> List[DwellEvent]:
+    """(시각, 카메라, 트랙 ID, 박스) 목록을 순서대로 넣어 이벤트를 모읍니다."""
+    engine = RoiEngine(rois)
+    monitor = DwellMonitor(engine)
+    events = []
+    for timestamp, camera_id, track_ids, boxes in frames:
+        hits = engine.evaluate(boxes, shape, camera_id)
+        events.extend(monitor.update(camera_id, track_ids, hits, timestamp, wall_time=timestamp))
+    return events
+
+
+def load_replay(path: str):
+    """기록 파일 (JSONL: {"t", "camera", "trackIds", "boxes"})을 읽습니다."""
+    frames = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                item = json.loads(line)
+                frames.append((float(item["t"]), str(item.get("camera", "cam1")), list(item.get("trackIds", [])),
+                               np.asarray(item.get("boxes", []), dtype=np.float64).reshape(-1, 4)))
+    return frames
+
+
+def load_test(cameras: int = 4, tracks_per_camera: int = 100, frames: int = 300, seed: int = 0):
+    """카메라 여러 대 × 동시 트랙 수백 개에서 프레임당 갱신 시간을 측정합니다."""
+    import tracemalloc
+
+    rng = np.random.default_rng(seed)
+    shape = (1080, 1920)
+    rois = [dict(REPLAY_ROIS[0], id=f"roi-{i}", points=[
+        {"x": x, "y": y} for x, y in rng.uniform(0, 1, (5, 2)).tolist()]) for i in range(8)]
+    engine = RoiEngine(rois)
+    monitor = DwellMonitor(engine)
+    centers = rng.uniform([0, 0], [1920, 1080], (cameras, tracks_per_camera, 2))
+    velocity = rng.normal(0, 8, (cameras, tracks_per_camera, 2))
+    ids = np.arange(tracks_per_camera)
+    hits = []
+    for step in range(frames):
+        centers += velocity
+        np.clip(centers, 0, [1919, 1079], out=centers)
+        hits.append([engine.evaluate(np.concatenate([centers[c] - 60, centers[c] + 60], axis=1), shape, f"cam{c}")
+                     for c in range(cameras)])
+
+    events = 0
+    for step in range(frames // 2):  # 준비 (슬롯 할당)
+        for camera in range(cameras):
+            events += len(monitor.update(f"cam{camera}", ids, hits[step][camera], step / 30.0))
+    started = time.perf_counter()
+    for step in range(frames // 2, frames):
+        for camera in range(cameras):
+            events += len(monitor.update(f"cam{camera}", ids, hits[step][camera], step / 30.0))
+    elapsed = time.perf_counter() - started
+    # 같은 구간을 다시 돌리며 추가 메모리만 측정 (tracemalloc은 느려서 시간 측정과 분리)
+    tracemalloc.start()
+    for step in range(frames // 2, frames):
+        for camera in range(cameras):
+            monitor.update(f"cam{camera}", ids, hits[step][camera], (frames + step) / 30.0)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    updates = (frames - frames // 2) * cameras
+    print(f"⏱️ 카메라 {cameras}대 × 트랙 {tracks_per_camera}개 × ROI {len(rois)}개: "
+          f"갱신당 {elapsed / updates * 1e6:.1f}µs, 이벤트 {events}개, 측정 구간 최대 추가 메모리 {peak / 1024:.1f}KiB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ROI 체류 상태 머신 재현 실행")
+    parser.add_argument("--replay", help="기록 파일 (JSONL) 경로. 없으면 내장 시나리오 실행")
+    parser.add_argument("--load", action="store_true", help="동시 트랙 수백 개 부하 측정")
+    args = parser.parse_args()
+
+    if args.load:
+        load_test()
+    elif args.replay:
+        for event in replay(load_replay(args.replay)):
+            print(json.dumps(dict(event.to_meta(), camera=event.camera_id, t=event.timestamp), ensure_ascii=False))
+    else:
+        events = replay(scenario_frames())
+        for event in events:
+            print(f"  t={event.timestamp:5.1f}s {event.type:<7} 트랙 {event.track_id} {event.roi_id:<5} "
+                  f"체류 {event.dwell:4.1f}s {list(event.actions)}")
+        actual = [(event.type, event.track_id, event.roi_id) for event in events]
+        if actual == EXPECTED_EVENTS:
+            print("✅ 시나리오 이벤트가 기대값과 일치합니다")
+        else:
+            print(f"❌ 기대 이벤트와 다릅니다\n  기대: {EXPECTED_EVENTS}\n  실제: {actual}")
+            raise SystemExit(1)
@@ -0,0 +1,185 @@
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+# 해상도 사다리 (가로 픽셀). 카메라 해상도보다 작은 단계만 사용
+RESOLUTION_LADDER = [("hd", 1280), ("sd", 640), ("thumb", 320)]
+THUMBNAIL_MAX_QUALITY = 70  # 썸네일은 화질보다 용량 우선
+LATENCY_SAMPLES = 240  # 지연 통계에 사용할 최근 샘플 수
+
+
+# === 인코딩 프로파일 ===
+@dataclass(frozen=True)
+class EncodeProfile:
+    name: str
+    max_width: int  # 0이면 원본 크기 유지
+    quality: int  # JPEG 품질 (1~100)
+
+
+@dataclass
+class EncodedFrame:
+    seq: int
+    timestamp: float
+    wall_time: float
+    renditions: Dict[str, bytes] = field(repr=False)
+    encode_ms: float = 0.0
+
+
+def parse_resolution(value, default: Tuple[int, int] = (640, 480)) -> Tuple[int, int]:
+    """'1920x1080' 형식의 해상도 문자열을 (가로, 세로)로 변환합니다."""
+    try:
+        width, height = str(value).lower().split("x")
+        return int(width), int(height)
+    except (ValueError, AttributeError):
+        return default
+
+
+def build_profiles(config: dict, resolution: Optional[str] = None) -> List[EncodeProfile]:
+    """
+    config.toml의 camera.resolution과 system.imageQuality로 인코딩 사다리를 만듭니다.
+    카메라별 해상도가 따로 있으면 resolution으로 지정합니다.
+    첫 번째 항목("full")이 기본 프로파일입니다.
+    """
+    width, _ = parse_resolution(resolution or config.get("camera", {}).get("resolution"))
+    quality = int(config.get("system", {}).get("imageQuality", 90))
+    quality = max(1, min(100, quality))
+
+    profiles = [EncodeProfile("full", width, quality)]
+    for name, ladder_width in RESOLUTION_LADDER:
+        if ladder_width < width:
+            rung_quality = min(quality, THUMBNAIL_MAX_QUALITY) if name == "thumb" else quality
+            profiles.append(EncodeProfile(name, ladder_width, rung_quality))
+    return profiles
+
+
+def encode_jpeg(image: np.ndarray, profile: EncodeProfile) -> bytes:
+    """프로파일에 맞게 축소한 뒤 JPEG로 인코딩합니다. (cv2는 GIL을 해제함)"""
+    height, width = image.shape[:2]
+    if profile.max_width and width > profile.max_width:
+        scaled_height = max(1, round(height * profile.max_width / width))
+        image = cv2.resize(image, (profile.max_width, scaled_height), interpolation=cv2.INTER_AREA)
+    ok, buffer = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, profile.quality])
+    if not ok:
+        raise RuntimeError(f"JPEG 인코딩 실패 (profile={profile.name})")
+    return buffer.tobytes()
+
+
+# === 인코딩 지연 통계 ===
+class LatencyStats:
+    def __init__(self, samples: int = LATENCY_SAMPLES):
+        self.count = 0
+        self.max_ms = 0.0
+        self._samples = deque(maxlen=samples)
+
+    def record(self, elapsed_ms: float):
+        self.count += 1
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self._samples.append(elapsed_ms)
+
+    def summary(self) -> dict:
+        if not self._samples:
+            return {"count": self.count, "avgMs": 0.0, "p50Ms": 0.0, "p95Ms": 0.0, "maxMs": 0.0}
+        values = np.fromiter(self._samples, dtype=np.float64)
+        p50, p95 = np.percentile(values, [50, 95])
+        return {
+            "count": self.count,
+            "avgMs": round(float(values.mean()), 2),
+            "p50Ms": round(float(p50), 2),
+            "p95Ms": round(float(p95), 2),
+            "maxMs": round(self.max_ms, 2),
+        }
+
+
+# === 스레드 풀 기반 인코더 ===
+class FrameEncoder:
+    """
+    JPEG 인코딩을 이벤트 루프 밖의 스레드 풀에서 수행합니다.
+    한 캡처 프레임에서 여러 해상도(렌디션)를 동시에 만들 수 있습니다.
+    여러 카메라가 하나의 스레드 풀을 공유하려면 executor를 넘겨줍니다.
+    """
+
+    def __init__(self, profiles: List[EncodeProfile], workers: int = 2, executor: Optional[ThreadPoolExecutor] = None):
+        self.workers = max(1, workers)
+        self._owns_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="jpeg-encode")
+        self.profiles = {}
+        self.default_profile = None
+        self.latency: Dict[str, LatencyStats] = {}
+        self.frame_latency = LatencyStats()
+        self.set_profiles(profiles)
+
+    def set_profiles(self, profiles: List[EncodeProfile]):
+        self.profiles = {profile.name: profile for profile in profiles}
+        self.default_profile = profiles[0].name
+        for name in self.profiles:
+            self.latency.setdefault(name, LatencyStats())
+
+    def resolve(self, name: Optional[str]) -> str:
+        """알 수 없는 렌디션 이름은 기본 프로파일로 대체합니다."""
+        return name if name in self.profiles else self.default_profile
+
+    def ladder(self) -> List[EncodeProfile]:
+        return list(self.profiles.values())
+
+    def _encode_timed(self, image: np.ndarray, profile: EncodeProfile):
+        started = time.perf_counter()
+        data = encode_jpeg(image, profile)
+        return data, (time.perf_counter() - started) * 1000
+
+    async def encode(
+        self,
+        frame,
+        profiles: Optional[Iterable[Union[str, EncodeProfile]]] = None,
+    ) -> EncodedFrame:
+        """
+        지정한 렌디션들을 병렬로 인코딩합니다. 이름 또는 EncodeProfile을 받을 수 있으며,
+        지정하지 않으면 기본 프로파일만 인코딩합니다.
+        """
+        loop = asyncio.get_running_loop()
+        selected = {}
+        for profile in (profiles or [self.default_profile]):
+            if not isinstance(profile, EncodeProfile):
+                profile = self.profiles[self.resolve(profile)]
+            selected[profile.name] = profile
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*[
+            loop.run_in_executor(self.executor, self._encode_timed, frame.image, profile)
+            for profile in selected.values()
+        ])
+        encode_ms = (time.perf_counter() - started) * 1000
+
+        renditions = {}
+        for name, (data, elapsed_ms) in zip(selected, results):
+            renditions[name] = data
+            self.latency.setdefault(name, LatencyStats()).record(elapsed_ms)
+        self.frame_latency.record(encode_ms)
+
+        return EncodedFrame(
+            seq=frame.seq,
+            timestamp=frame.timestamp,
+            wall_time=frame.wall_time,
+            renditions=renditions,
+            encode_ms=encode_ms,
+        )
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "profiles": [
+                {"name": p.name, "maxWidth": p.max_width, "quality": p.quality}
+                for p in self.profiles.values()
+            ],
+            "frame": self.frame_latency.summary(),
+            "renditions": {name: stats.summary() for name, stats in self.latency.items()},
+        }
+
+    def shutdown(self):
+        if self._owns_executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,407 @@
+import csv
+import gzip
+import io
+import json
+import os
+import threading
+import time
+import uuid
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from pipeline.event_store import EVENT_DB_FILE, EventQuery, EventStore, row_to_log, to_iso
+from pipeline.number_search import ConfusionTable
+
+EXPORT_DIR = EVENT_DB_FILE.parent / "exports"
+
+EXPORT_FORMATS = ("csv", "jsonl", "json", "parquet")
+FORMAT_ALIASES = {"excel": "csv", "ndjson": "jsonl"}  # 프론트엔드의 excel은 엑셀에서 바로 열리는 CSV (BOM 포함)
+MEDIA_TYPES = {
+    "csv": "text/csv",  # StreamingResponse가 charset=utf-8을 붙임
+    "jsonl": "application/x-ndjson",
+    "json": "application/json",
+    "parquet": "application/vnd.apache.parquet",
+}
+GZIP_LEVEL = 6
+
+MAX_RUNNING_JOBS = 2  # 동시에 파일을 만드는 백그라운드 작업 수 (나머지는 queued로 대기)
+JOB_RETENTION = 7 * 86400  # 끝난 작업의 파일을 보관하는 기간 (초)
+
+# 내보내는 컬럼 (/api/logs/ocr 응답 항목과 같은 이름)
+FIELDS = ("id", "timestamp", "cameraId", "truckId", "recognizedNumber", "confidence", "roiName",
+          "processingTime", "status", "sentToPLC", "imageUrl")
+
+
+def export_format(fmt: Optional[str]) -> str:
+    fmt = FORMAT_ALIASES.get(str(fmt or "csv").lower(), str(fmt or "csv").lower())
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"지원하지 않는 내보내기 형식입니다: {fmt} ({', '.join(EXPORT_FORMATS)})")
+    return fmt
+
+
+def export_filename(fmt: str, compress: bool) -> str:
+    return f"ocr-logs-{datetime.now():%Y%m%d-%H%M%S}.{fmt}" + (".gz" if compress else "")
+
+
+def media_type(fmt: str, compress: bool) -> str:
+    return "application/gzip" if compress else MEDIA_TYPES[fmt]
+
+
+# === 형식별 인코더 ===
+# begin() → chunk(rows) 여러 번 → end() 순서로 호출하며 각각 바로 내보낼 bytes를 반환합니다.
+class CsvEncoder:
+    def __init__(self, resumed: bool = False):
+        self.resumed = resumed
+
+    def begin(self) -> bytes:
+        # 엑셀이 UTF-8로 인식하도록 BOM을 붙임 (ROI 이름이 한글)
+        return ("\ufeff" + ",".join(FIELDS) + "\r\n").encode("utf-8")
+
+    def chunk(self, rows: list) -> bytes:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            log = row_to_log(row)
+            writer.writerow([log[name] for name in FIELDS])
+        return buffer.getvalue().encode("utf-8")
+
+    def end(self) -> bytes:
+        return b""
+
+
+class JsonLinesEncoder:
+    def __init__(self, resumed: bool = False):
+        self.resumed = resumed
+
+    def begin(self) -> bytes:
+        return b""
+
+    def chunk(self, rows: list) -> bytes:
+        return "".join(json.dumps(row_to_log(row), ensure_ascii=False) + "\n" for row in rows).encode("utf-8")
+
+    def end(self) -> bytes:
+        return b""
+
+
+class JsonEncoder:
+    """JSON 배열. 항목을 모아 두지 않고 "[", 항목들, "]"을 차례로 내보냅니다."""
+
+    def __init__(self, resumed: bool = False):
+        self.written = resumed  # 이어 쓰는 경우 이미 항목이 있으므로 다음 항목 앞에 ","
+
+    def begin(self) -> bytes:
+        return b"["
+
+    def chunk(self, rows: list) -> bytes:
+        text = ",\n".join(json.dumps(row_to_log(row), ensure_ascii=False) for row in rows)
+        if self.written:
+            text = ",\n" + text
+        self.written = True
+        return text.encode("utf-8")
+
+    def end(self) -> bytes:
+        return b"]\n"
+
+
+class _Sink(io.RawIOBase):
+    """pyarrow가 쓰는 bytes를 모아 두었다가 drain()으로 넘기는 파일 객체"""
+
+    def __init__(self):
+        super().__init__()
+        self.pending: List[bytes] = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.pending.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b"".join(self.pending)
+        self.pending = []
+        return data
+
+
+class ParquetEncoder:
+    """묶음마다 row group 하나를 씁니다. 파일 끝 (footer)은 end()에서 나오므로 이어 쓸 수 없습니다."""
+
+    def __init__(self, resumed: bool = False):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("parquet 내보내기에는 pyarrow가 필요합니다 (pip install pyarrow)")
+        self.pa = pa
+        self.schema = pa.schema([
+            ("id", pa.int64()),
+            ("timestamp", pa.timestamp("ms", tz="UTC")),
+            ("cameraId", pa.string()),
+            ("trackId", pa.int64()),
+            ("recognizedNumber", pa.string()),
+            ("confidence", pa.float64()),
+            ("roiId", pa.string()),
+            ("roiName", pa.string()),
+            ("processingTime", pa.float64()),
+            ("status", pa.string()),
+            ("sentToPLC", pa.bool_()),
+            ("imageUrl", pa.string()),
+        ])
+        self.sink = _Sink()
+        self.writer = pq.ParquetWriter(self.sink, self.schema, compression="zstd")
+
+    def begin(self) -> bytes:
+        return self.sink.drain()
+
+    def chunk(self, rows: list) -> bytes:
+        columns = {
+            "id": [row["id"] for row in rows],
+            "timestamp": [int(row["timestamp"] * 1000) for row in rows],
+            "cameraId": [row["camera_id"] for row in rows],
+            "trackId": [row["track_id"] for row in rows],
+            "recognizedNumber": [row["recognized_number"] for row in rows],
+            "confidence": [row["confidence"] for row in rows],
+            "roiId": [row["roi_id"] for row in rows],
+            "roiName": [row["roi_name"] for row in rows],
+            "processingTime": [row["processing_time"] for row in rows],
+            "status": [row["status"] for row in rows],
+            "sentToPLC": [bool(row["sent_to_plc"]) for row in rows],
+            "imageUrl": [row["image_url"] for row in rows],
+        }
+        self.writer.write_table(self.pa.table(columns, schema=self.schema))
+        return self.sink.drain()
+
+    def end(self) -> bytes:
+        self.writer.close()
+        return self.sink.drain()
+
+
+ENCODERS = {"csv": CsvEncoder, "jsonl": JsonLinesEncoder, "json": JsonEncoder, "parquet": ParquetEncoder}
+
+
+# === 스트리밍 내보내기 ===
+def gzip_stream(chunks: Iterator[bytes], level: int = GZIP_LEVEL) -> Iterator[bytes]:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: gzip 헤더/트레일러
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(store: EventStore, query: EventQuery, fmt: str, compress: bool = False,
+                  table: Optional[ConfusionTable] = None) -> Iterator[bytes]:
+    """
+    조건에 맞는 이벤트를 fmt 형식 bytes 조각으로 내보내는 제너레이터.
+    EventStore.scan으로 묶음 단위로 읽어 바로 인코딩하므로 결과 크기와 관계없이 메모리 사용량이 일정합니다.
+    형식이 잘못되었거나 pyarrow가 없으면 첫 조각을 만들기 전에 ValueError가 납니다.
+    """
+    encoder = ENCODERS[export_format(fmt)]()
+
+    def chunks() -> Iterator[bytes]:
+        yield encoder.begin()
+        for rows in store.scan(query, table=table):
+            yield encoder.chunk(rows)
+        yield encoder.end()
+
+    stream = (chunk for chunk in chunks() if chunk)
+    return gzip_stream(stream) if compress else stream
+
+
+# === 백그라운드 내보내기 작업 ===
+class ExportCancelled(Exception):
+    pass
+
+
+class ExportJobs:
+    """
+    큰 기간 (예: 분기 전체)의 내보내기를 백그라운드 스레드에서 파일로 만듭니다.
+    파일은 directory/<작업 id>.<확장자>, 상태는 directory/<작업 id>.job.json에 저장합니다.
+
+    묶음을 쓸 때마다 파일 크기와 마지막 행의 (timestamp, id)를 상태 파일에 기록하므로, 서버가 중간에
+    재시작되면 resume()이 파일을 기록된 크기로 자르고 그 다음 이벤트부터 이어 씁니다.
+    gzip은 묶음마다 gzip 멤버를 따로 만들어 (이어 붙인 gzip도 정상 파일) 자른 위치에서 이어 쓸 수 있고,
+    parquet은 파일 끝에 footer가 있어 처음부터 다시 만듭니다.
+    """
+
+    def __init__(self, store: EventStore, directory=EXPORT_DIR):
+        self.store = store
+        self.directory = Path(directory)
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._slots = threading.Semaphore(MAX_RUNNING_JOBS)
+        self._cancelled = set()
+
+    def _state_path(self, job_id: str) -> Path:
+        return self.directory / f"{job_id}.job.json"
+
+    def _save(self, job: Dict[str, Any]):
+        path = self._state_path(job["id"])
+        temp = path.with_suffix(".tmp")
+        temp.write_text(json.dumps(job, ensure_ascii=False), encoding="utf-8")
+        os.replace(temp, path)
+
+    def _checkpoint(self, job: Dict[str, Any]):
+        """취소되어 목록에서 빠진 작업은 상태 파일을 다시 만들지 않음"""
+        with self._lock:
+            if job["id"] in self.jobs:
+                self._save(job)
+
+    def start(self, filters: Dict[str, Any], fmt: str, compress: bool = False,
+              table: Optional[ConfusionTable] = None) -> Dict[str, Any]:
+        """작업을 등록하고 시작합니다. 조건이나 형식이 잘못되었으면 ValueError."""
+        fmt = export_format(fmt)
+        if fmt == "parquet":
+            ParquetEncoder()  # pyarrow가 없으면 작업을 만들기 전에 알림
+        query = EventQuery.from_filter(filters)
+        # 번호 검색 결과를 작업에 고정 (이어 쓸 때 새로 생긴 번호 때문에 대상이 바뀌지 않도록)
+        self.store.resolve_numbers(query, table)
+        job_id = uuid.uuid4().hex[:12]
+        job = {
+            "id": job_id,
+            "format": fmt,
+            "gzip": bool(compress),
+            "filters": filters,
+            "numbers": query.numbers,
+            "file": f"{job_id}.{fmt}" + (".gz" if compress else ""),
+            "filename": export_filename(fmt, compress),
+            "state": "queued",  # queued | running | done | failed | cancelled
+            "rows": 0,
+            "bytes": 0,
+            "after": None,  # 마지막으로 쓴 행의 (timestamp, id)
+            "createdAt": to_iso(time.time()),
+            "finishedAt": None,
+            "error": None,
+        }
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            self.jobs[job_id] = job
+            self._save(job)
+        self._spawn(job)
+        return self.status(job_id)
+
+    def _spawn(self, job: Dict[str, Any]):
+        threading.Thread(target=self._run, args=(job,), name=f"export-{job['id']}", daemon=True).start()
+
+    def _run(self, job: Dict[str, Any]):
+        with self._slots:
+            if job["id"] in self._cancelled:
+                return
+            job["state"] = "running"
+            self._checkpoint(job)
+            started = time.perf_counter()
+            try:
+                self._write(job)
+                job["state"] = "done"
+                print(f"📦 로그 내보내기 완료: {job['id']} ({job['rows']:,}건, {job['bytes'] / 1e6:.1f}MB, "
+                      f"{time.perf_counter() - started:.1f}초)")
+            except ExportCancelled:
+                return
+            except Exception as e:
+                job["state"] = "failed"
+                job["error"] = str(e)
+                print(f"💥 로그 내보내기 실패: {job['id']}: {e}")
+            job["finishedAt"] = to_iso(time.time())
+            self._checkpoint(job)
+
+    def _write(self, job: Dict[str, Any]):
+        query = EventQuery.from_filter(job["filters"])
+        query.numbers = job["numbers"]
+        path = self.directory / job["file"]
+        if job["format"] == "parquet" or job["after"] is None or not path.exists():
+            job.update(rows=0, bytes=0, after=None)
+            handle = open(path, "wb")
+        else:
+            print(f"📦 로그 내보내기 이어서 진행: {job['id']} ({job['rows']:,}건 이후)")
+            handle = open(path, "r+b")
+            handle.truncate(job["bytes"])
+            handle.seek(job["bytes"])
+        encoder = ENCODERS[job["format"]](resumed=job["rows"] > 0)
+
+        def emit(data: bytes):
+            if data:
+                handle.write(gzip.compress(data, GZIP_LEVEL) if job["gzip"] else data)
+
+        with handle:
+            if job["after"] is None:
+                emit(encoder.begin())
+            after = tuple(job["after"]) if job["after"] else None
+            for rows in self.store.scan(query, after):
+                if job["id"] in self._cancelled:
+                    raise ExportCancelled()
+                emit(encoder.chunk(rows))
+                handle.flush()
+                job.update(rows=job["rows"] + len(rows), bytes=handle.tell(),
+                           after=[rows[-1]["timestamp"], rows[-1]["id"]])
+                self._checkpoint(job)
+            emit(encoder.end())
+            job["bytes"] = handle.tell()
+
+    def resume(self):
+        """서버 시작 시 상태 파일을 읽어 끝나지 않은 작업을 이어서 진행하고, 보관 기간이 지난 작업은 지웁니다."""
+        if not self.directory.exists():
+            return
+        now = time.time()
+        for state_path in sorted(self.directory.glob("*.job.json")):
+            try:
+                job = json.loads(state_path.read_text(encoding="utf-8"))
+            except (OSError, ValueError) as e:
+                print(f"⚠️ 내보내기 상태 파일을 읽지 못했습니다: {state_path.name}: {e}")
+                continue
+            if job["state"] in ("done", "failed", "cancelled") and now - state_path.stat().st_mtime > JOB_RETENTION:
+                self._delete_files(job)
+                continue
+            with self._lock:
+                self.jobs[job["id"]] = job
+            if job["state"] in ("queued", "running"):
+                job["state"] = "queued"
+                self._spawn(job)
+
+    def _delete_files(self, job: Dict[str, Any]):
+        for path in (self.directory / job["file"], self._state_path(job["id"])):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def cancel(self, job_id: str) -> bool:
+        """작업을 멈추고 파일을 지웁니다. 없는 작업이면 False"""
+        with self._lock:
+            job = self.jobs.pop(job_id, None)
+        if job is None:
+            return False
+        self._cancelled.add(job_id)
+        job["state"] = "cancelled"
+        self._delete_files(job)
+        return True
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.jobs.get(job_id)
+
+    def path(self, job_id: str) -> Path:
+        return self.directory / self.jobs[job_id]["file"]
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        return {
+            "jobId": job["id"],
+            "format": job["format"],
+            "gzip": job["gzip"],
+            "state": job["state"],
+            "rows": job["rows"],
+            "bytes": job["bytes"],
+            "createdAt": job["createdAt"],
+            "finishedAt": job["finishedAt"],
+            "error": job["error"],
+            "statusUrl": f"/api/logs/export/{job['id']}",
+            "downloadUrl": f"/api/logs/export/{job['id']}/download",
+        }
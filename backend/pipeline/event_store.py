@@ -0,0 +1,683 @@
+import base64
+import json
+import queue
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone, tzinfo
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from pipeline import rollups
+from pipeline.number_search import MATCH_MODES, ConfusionTable, NumberIndex
+
+EVENT_DB_FILE = Path(__file__).resolve().parent.parent / "data" / "events.db"
+
+WRITE_BATCH_SIZE = 500  # 한 트랜잭션에 넣는 최대 이벤트 수
+WRITE_FLUSH_INTERVAL = 0.2  # 배치가 덜 찼어도 이 시간이 지나면 기록 (초)
+WRITE_QUEUE_SIZE = 10000  # 쓰기 대기 이벤트 최대 수 (넘치면 버리고 집계)
+BUSY_TIMEOUT_MS = 5000  # 다른 프로세스가 쓰는 중일 때 기다리는 최대 시간
+
+NUMBER_REFRESH_INTERVAL = 1.0  # 번호 사전에 새 번호가 있는지 확인하는 최소 간격 (초)
+
+PAGE_SIZE = 100  # 한 번에 반환하는 기본 행 수
+MAX_PAGE_SIZE = 1000
+SCAN_CHUNK_ROWS = 5000  # 내보내기에서 한 번에 읽는 행 수
+
+# API 정렬 기준: 컬럼 (id를 보조 키로 붙여 keyset 페이지 나눔)
+SORT_COLUMNS = {
+    "timestamp": "timestamp",
+    "confidence": "confidence",
+    "recognizedNumber": "recognized_number",
+    "roiName": "roi_name",
+}
+
+# 정렬 기준 인덱스: 기간 조건에 걸리는 행이 많으면 이 인덱스 순서로 읽고 (첫 페이지를 금방 채움)
+# 적으면 기간 인덱스로 읽은 뒤 정렬하는 편이 빠름
+SORT_INDEXES = {
+    "confidence": "ix_ocr_events_confidence",
+    "recognizedNumber": "ix_ocr_events_number",
+}
+SORT_INDEX_MIN_ROWS = 20000  # 기간 안의 행이 이보다 많으면 정렬 인덱스 사용
+
+# 인덱스에는 rowid(id)가 자동으로 뒤에 붙으므로 (컬럼, id) 순서의 keyset 조회를 그대로 지원합니다.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ocr_events (
+    id INTEGER PRIMARY KEY,
+    timestamp REAL NOT NULL,
+    camera_id TEXT NOT NULL,
+    track_id INTEGER,
+    recognized_number TEXT NOT NULL DEFAULT '',
+    confidence REAL NOT NULL DEFAULT 0,
+    roi_id TEXT,
+    roi_name TEXT NOT NULL DEFAULT '',
+    processing_time REAL NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    sent_to_plc INTEGER NOT NULL DEFAULT 0,
+    image_url TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_ocr_events_timestamp ON ocr_events (timestamp);
+CREATE INDEX IF NOT EXISTS ix_ocr_events_number ON ocr_events (recognized_number);
+CREATE INDEX IF NOT EXISTS ix_ocr_events_roi ON ocr_events (roi_name, timestamp);
+CREATE INDEX IF NOT EXISTS ix_ocr_events_confidence ON ocr_events (confidence);
+
+-- 서로 다른 인식 번호의 사전 (번호 검색 인덱스를 만들 때 이벤트 전체 대신 이것만 읽음)
+-- 새 번호는 rowid가 늘어나므로 마지막으로 읽은 rowid 이후만 가져오면 됨
+CREATE TABLE IF NOT EXISTS event_numbers (
+    number TEXT PRIMARY KEY,
+    events INTEGER NOT NULL DEFAULT 0,
+    last_seen REAL
+);
+CREATE TRIGGER IF NOT EXISTS tr_ocr_events_number AFTER INSERT ON ocr_events
+WHEN NEW.recognized_number != ''
+BEGIN
+    INSERT INTO event_numbers (number, events, last_seen) VALUES (NEW.recognized_number, 1, NEW.timestamp)
+    ON CONFLICT (number) DO UPDATE SET events = events + 1, last_seen = MAX(last_seen, excluded.last_seen);
+END;
+""" + rollups.SCHEMA
+SCHEMA_VERSION = 4  # 1: 이벤트 테이블, 2: 번호 사전, 3: 통계 집계 (pipeline.rollups), 4: 집계 시간대 기록
+
+COLUMNS = ("timestamp", "camera_id", "track_id", "recognized_number", "confidence", "roi_id",
+           "roi_name", "processing_time", "status", "sent_to_plc", "image_url")
+
+
+def connect(path=EVENT_DB_FILE) -> sqlite3.Connection:
+    """
+    WAL 모드로 이벤트 DB를 엽니다. (없으면 테이블과 인덱스 생성)
+    WAL에서는 비디오 서버가 쓰는 동안에도 메인 백엔드가 막히지 않고 읽을 수 있습니다.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")  # WAL에서는 커밋마다 fsync하지 않아도 DB가 깨지지 않음
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.executescript(SCHEMA)
+    rollups.register_functions(conn)
+    if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+        migrate(conn)
+    if rollups.stored_offset(conn) != rollups.UTC_OFFSET:
+        realign(conn)
+    return conn
+
+
+def migrate(conn: sqlite3.Connection):
+    """
+    이전 버전 DB에 쌓인 이벤트로 새 테이블을 채웁니다.
+    두 프로세스가 동시에 열 수 있으므로 쓰기 잠금을 먼저 잡고 버전을 다시 확인합니다. (한 번만 채움)
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < 2:
+            # 번호 사전이 생기기 전에 쌓인 이벤트의 번호를 채움
+            conn.execute(
+                "INSERT OR IGNORE INTO event_numbers (number, events, last_seen) "
+                "SELECT recognized_number, COUNT(*), MAX(timestamp) FROM ocr_events "
+                "WHERE recognized_number != '' GROUP BY recognized_number"
+            )
+        if version < 3:
+            started = time.perf_counter()
+            rollups.backfill(conn)
+            print(f"🗃️ 통계 집계 테이블 생성: {time.perf_counter() - started:.1f}초")
+        elif version < 4:
+            # 버전 3의 집계는 UTC 기준으로 만들어짐 (지역 시간대와 다르면 connect()가 다시 만듦)
+            conn.execute("INSERT OR IGNORE INTO rollup_settings (name, value) VALUES ('utc_offset', 0)")
+        conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def realign(conn: sqlite3.Connection):
+    """서버 시간대가 집계를 만들 때와 다르면 집계를 새 시간대 기준으로 다시 만듭니다. (migrate와 같은 잠금)"""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        previous = rollups.stored_offset(conn)
+        if previous != rollups.UTC_OFFSET:
+            started = time.perf_counter()
+            rollups.rebuild(conn)
+            print(f"🗃️ 통계 집계를 UTC{rollups.UTC_OFFSET / 3600:+g} 기준으로 다시 만듦 "
+                  f"(이전 UTC{(previous or 0) / 3600:+g}): {time.perf_counter() - started:.1f}초")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def to_iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+
+def parse_time(value: Any, tz: tzinfo = timezone.utc) -> Optional[float]:
+    """ISO 문자열 (시간대가 없으면 tz, 기본 UTC) 또는 유닉스 시간을 초 단위로 변환합니다."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    moment = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=tz)
+    return moment.timestamp()
+
+
+# === 인식 이벤트 ===
+@dataclass
+class RecognitionEvent:
+    timestamp: float  # 유닉스 시간 (초)
+    camera_id: str
+    track_id: Optional[int]
+    recognized_number: str  # 인식 실패면 ""
+    confidence: float  # 0~100 (%)
+    roi_id: Optional[str]
+    roi_name: str
+    processing_time: float  # OCR 처리 시간 (ms)
+    status: str  # success | error
+    sent_to_plc: bool = False
+    image_url: Optional[str] = None
+
+    def to_row(self) -> tuple:
+        return (self.timestamp, self.camera_id, self.track_id, self.recognized_number,
+                round(float(self.confidence), 2), self.roi_id, self.roi_name,
+                round(float(self.processing_time), 2), self.status, int(bool(self.sent_to_plc)),
+                self.image_url)
+
+
+def row_to_log(row: sqlite3.Row) -> Dict[str, Any]:
+    """DB 행을 /api/logs/ocr 응답 항목 (OcrLogEntry) 형식으로 바꿉니다."""
+    return {
+        "id": str(row["id"]),
+        "timestamp": to_iso(row["timestamp"]),
+        "recognizedNumber": row["recognized_number"],
+        "confidence": row["confidence"],
+        "roiName": row["roi_name"],
+        "imageUrl": row["image_url"] or "",
+        "processingTime": row["processing_time"],
+        "status": row["status"],
+        "sentToPLC": bool(row["sent_to_plc"]),
+        "truckId": f"{row['camera_id']}-{row['track_id']}" if row["track_id"] is not None else None,
+        "cameraId": row["camera_id"],
+    }
+
+
+# === 쓰기 (비디오 서버) ===
+class EventWriter(threading.Thread):
+    """
+    인식 이벤트를 큐에 모아 백그라운드 스레드에서 배치로 기록합니다.
+    submit()은 파이프라인 스레드를 막지 않으며, 큐가 가득 차면 이벤트를 버리고 dropped로 집계합니다.
+    """
+
+    def __init__(self, path=EVENT_DB_FILE, batch_size: int = WRITE_BATCH_SIZE,
+                 flush_interval: float = WRITE_FLUSH_INTERVAL, name: str = "event-writer"):
+        super().__init__(name=name, daemon=True)
+        self.path = Path(path)
+        self.batch_size = int(batch_size)
+        self.flush_interval = float(flush_interval)
+        self._queue: "queue.Queue[Optional[RecognitionEvent]]" = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pruned = 0.0
+
+        # 통계
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.errors = 0
+        self.write_ms = 0.0
+
+    def submit(self, event: RecognitionEvent) -> bool:
+        try:
+            self._queue.put_nowait(event)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def write_batch(self, events: List[RecognitionEvent]):
+        """이벤트 목록과 그 통계 집계를 한 트랜잭션으로 기록합니다. (조회하는 쪽에서 둘이 어긋나 보이지 않음)"""
+        if self._conn is None:
+            self._conn = connect(self.path)
+        started = time.perf_counter()
+        rows = [event.to_row() for event in events]
+        with self._conn:
+            self._conn.executemany(
+                f"INSERT INTO ocr_events ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})", rows)
+            rollups.apply(self._conn, ((row[0], row[6], row[8], row[9], row[4], row[7]) for row in rows))
+            if time.monotonic() - self._pruned >= rollups.PRUNE_INTERVAL:
+                rollups.prune(self._conn)
+                self._pruned = time.monotonic()
+        self.write_ms += (time.perf_counter() - started) * 1000
+        self.written += len(events)
+        self.batches += 1
+
+    def run(self):
+        print(f"🗃️ 이벤트 저장소 기록 시작: {self.path}")
+        stopping = False
+        while not stopping:
+            try:
+                event = self._queue.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            if event is None:
+                break
+            batch = [event]
+            deadline = time.monotonic() + self.flush_interval
+            # 배치가 차거나 flush_interval이 지날 때까지 모음
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    event = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if event is None:
+                    stopping = True
+                    break
+                batch.append(event)
+            try:
+                self.write_batch(batch)
+            except sqlite3.Error as e:
+                self.errors += 1
+                print(f"💥 이벤트 {len(batch)}건 기록 실패: {e}")
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        print("🛑 이벤트 저장소 기록 종료")
+
+    def stop(self, timeout: float = 5.0):
+        """남은 이벤트를 기록하고 스레드를 종료합니다."""
+        self._queue.put(None)
+        self.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": str(self.path),
+            "written": self.written,
+            "batches": self.batches,
+            "pending": self._queue.qsize(),
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "avgBatchMs": round(self.write_ms / self.batches, 2) if self.batches else 0.0,
+        }
+
+
+# === 조회 (메인 백엔드) ===
+def encode_cursor(value: Any, row_id: int) -> str:
+    payload = json.dumps([value, row_id], ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return value, int(row_id)
+    except Exception:
+        raise ValueError(f"잘못된 cursor 값입니다: {cursor}")
+
+
+@dataclass
+class EventQuery:
+    """OcrLogFilter를 인덱스를 타는 SQL로 바꿉니다. 다음 페이지는 offset 대신 마지막 행 기준 (keyset)으로 조회합니다."""
+
+    start: Optional[float] = None
+    end: Optional[float] = None
+    number: str = ""
+    number_match: str = "auto"  # auto | exact | prefix | contains | fuzzy
+    numbers: Optional[List[str]] = None  # 번호 사전에서 찾은 검색어에 맞는 번호들 (EventStore가 채움)
+    min_confidence: float = 0.0
+    roi_name: Optional[str] = None
+    sort_by: str = "timestamp"
+    descending: bool = True
+    limit: int = PAGE_SIZE
+    cursor: Optional[str] = None
+
+    @classmethod
+    def from_filter(cls, filters: Dict[str, Any]) -> "EventQuery":
+        """
+        프론트엔드의 OcrLogFilter (dateRange, numberQuery, minConfidence, roiFilter, sortBy, sortOrder)와
+        이전 형식 (startDate, endDate, confidence, text)을 모두 받습니다. 잘못된 값은 ValueError.
+        numberMatch로 번호 검색 방식을 고를 수 있습니다. (기본 auto: 부분 일치 + 한 글자 차이)
+        """
+        filters = filters or {}
+        date_range = filters.get("dateRange") or {}
+        sort_by = filters.get("sortBy") or "timestamp"
+        if sort_by not in SORT_COLUMNS:
+            raise ValueError(f"지원하지 않는 정렬 기준입니다: {sort_by} ({', '.join(SORT_COLUMNS)})")
+        sort_order = str(filters.get("sortOrder") or "desc").lower()
+        if sort_order not in ("asc", "desc"):
+            raise ValueError(f"sortOrder는 asc 또는 desc여야 합니다: {sort_order}")
+        number_match = str(filters.get("numberMatch") or "auto")
+        if number_match not in MATCH_MODES:
+            raise ValueError(f"지원하지 않는 번호 검색 방식입니다: {number_match} ({', '.join(MATCH_MODES)})")
+        roi = filters.get("roiFilter")
+        # 시간대 없는 날짜는 통계 API (/api/logs/stats)와 같은 서버 지역 시간대로 해석해 같은 기간을 보게 함
+        return cls(
+            start=parse_time(date_range.get("from", filters.get("startDate")), rollups.STATS_TZ),
+            end=parse_time(date_range.get("to", filters.get("endDate")), rollups.STATS_TZ),
+            number=str(filters.get("numberQuery", filters.get("text")) or "").strip(),
+            number_match=number_match,
+            min_confidence=float(filters.get("minConfidence", filters.get("confidence")) or 0),
+            roi_name=None if roi in (None, "", "all") else str(roi),
+            sort_by=sort_by,
+            descending=sort_order == "desc",
+            limit=max(1, min(int(filters.get("limit") or PAGE_SIZE), MAX_PAGE_SIZE)),
+            cursor=filters.get("cursor") or None,
+        )
+
+    def where(self) -> Tuple[List[str], List[Any]]:
+        """정렬/페이지와 무관한 조건 (통계, 내보내기에서도 사용)"""
+        clauses, params = [], []
+        if self.start is not None:
+            clauses.append("timestamp >= ?")
+            params.append(self.start)
+        if self.end is not None:
+            clauses.append("timestamp <= ?")
+            params.append(self.end)
+        if self.roi_name is not None:
+            clauses.append("roi_name = ?")
+            params.append(self.roi_name)
+        if self.min_confidence > 0:
+            clauses.append("confidence >= ?")
+            params.append(self.min_confidence)
+        if self.numbers is not None:
+            # 번호 사전에서 고른 번호들: 이벤트 전체를 LIKE로 훑지 않고 번호 인덱스로 찾음
+            if not self.numbers:
+                clauses.append("0")
+            else:
+                clauses.append("recognized_number IN (SELECT value FROM json_each(?))")
+                params.append(json.dumps(self.numbers, ensure_ascii=False))
+        elif self.number:
+            # 번호 사전 없이 조회하는 경우: 앞부분 일치 (LIKE 대신 범위 조건으로 써야 번호 인덱스를 탐)
+            clauses.append("recognized_number >= ? AND recognized_number < ?")
+            params.extend((self.number, self.number + "\uffff"))
+        return clauses, params
+
+    def to_sql(self, index: Optional[str] = None) -> Tuple[str, List[Any]]:
+        column = SORT_COLUMNS[self.sort_by]
+        clauses, params = self.where()
+        if self.cursor:
+            value, row_id = decode_cursor(self.cursor)
+            clauses.append(f"({column}, id) {'<' if self.descending else '>'} (?, ?)")
+            params.extend((value, row_id))
+        direction = "DESC" if self.descending else "ASC"
+        sql = "SELECT * FROM ocr_events"
+        if index is not None:
+            sql += f" INDEXED BY {index}"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += f" ORDER BY {column} {direction}, id {direction} LIMIT ?"
+        params.append(self.limit + 1)  # 한 행 더 읽어 다음 페이지가 있는지 확인
+        return sql, params
+
+
+class EventStore:
+    """이벤트 DB 조회. 스레드마다 연결을 따로 열어 재사용합니다. (요청은 asyncio.to_thread로 실행)"""
+
+    def __init__(self, path=EVENT_DB_FILE):
+        self.path = Path(path)
+        self._local = threading.local()
+        self.number_index = NumberIndex()
+        self._numbers_lock = threading.Lock()
+        self._numbers_rowid = 0  # 번호 사전에서 마지막으로 읽은 rowid
+        self._numbers_checked = 0.0
+        self.queries = 0
+        self.query_ms = 0.0
+        self.summaries = 0
+        self.summary_ms = 0.0
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = connect(self.path)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def _range_rows(self, conn: sqlite3.Connection, query: EventQuery) -> int:
+        """
+        기간 조건에 걸리는 행 수 추정. 이벤트는 시간 순으로 쌓이므로 id 범위로 셉니다.
+        (기간 인덱스를 두 번 찾아보는 것뿐이라 행 수와 무관하게 빠름)
+        """
+        first = conn.execute("SELECT id FROM ocr_events WHERE timestamp >= ? ORDER BY timestamp LIMIT 1",
+                             (query.start if query.start is not None else float("-inf"),)).fetchone()
+        last = conn.execute("SELECT id FROM ocr_events WHERE timestamp <= ? ORDER BY timestamp DESC LIMIT 1",
+                            (query.end if query.end is not None else float("inf"),)).fetchone()
+        if first is None or last is None:
+            return 0
+        return max(0, last[0] - first[0] + 1)
+
+    def _number_events(self, conn: sqlite3.Connection, numbers: List[str]) -> int:
+        """번호 사전의 이벤트 수로 번호 조건에 걸리는 이벤트 수를 셉니다. (기본 키 조회만 함)"""
+        row = conn.execute("SELECT SUM(events) FROM event_numbers WHERE number IN (SELECT value FROM json_each(?))",
+                           (json.dumps(numbers, ensure_ascii=False),)).fetchone()
+        return row[0] or 0
+
+    def _choose_index(self, conn: sqlite3.Connection, query: EventQuery) -> Optional[str]:
+        if query.numbers and query.sort_by == "timestamp" and query.roi_name is None:
+            # 번호 인덱스로 찾으면 맞는 이벤트를 모두 읽어 정렬하고, 시간 순으로 훑으면 한 페이지를 채울 때까지
+            # 약 limit × 전체 / 맞는 수만큼 읽음. 둘 중 적게 읽는 쪽을 고름 (넓은 부분 일치 검색 등)
+            matches = self._number_events(conn, query.numbers)
+            total = conn.execute("SELECT MAX(id) FROM ocr_events").fetchone()[0] or 0
+            return "ix_ocr_events_timestamp" if matches * matches > query.limit * total else None
+        index = SORT_INDEXES.get(query.sort_by)
+        if index is None or query.roi_name is not None:
+            return None
+        if query.start is None and query.end is None:
+            return index
+        return index if self._range_rows(conn, query) >= SORT_INDEX_MIN_ROWS else None
+
+    def refresh_numbers(self, conn: Optional[sqlite3.Connection] = None):
+        """번호 사전에 새로 생긴 번호만 읽어 검색 인덱스에 추가합니다. (NUMBER_REFRESH_INTERVAL마다 한 번)"""
+        now = time.monotonic()
+        if now - self._numbers_checked < NUMBER_REFRESH_INTERVAL:
+            return
+        with self._numbers_lock:
+            if now - self._numbers_checked < NUMBER_REFRESH_INTERVAL:
+                return
+            conn = conn or self._connection()
+            rows = conn.execute("SELECT rowid, number FROM event_numbers WHERE rowid > ? ORDER BY rowid",
+                                (self._numbers_rowid,)).fetchall()
+            if rows:
+                self.number_index.add(row[1] for row in rows)
+                self._numbers_rowid = rows[-1][0]
+            self._numbers_checked = time.monotonic()
+
+    def resolve_numbers(self, query: EventQuery, table: Optional[ConfusionTable] = None):
+        """numberQuery를 번호 사전에서 검색해 query.numbers를 채웁니다."""
+        if query.number and query.numbers is None:
+            self.refresh_numbers()
+            query.numbers = self.number_index.search(query.number, query.number_match, table)
+
+    def query(self, query: EventQuery, table: Optional[ConfusionTable] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        (로그 항목 목록, 다음 페이지 cursor 또는 None)
+        table은 번호 검색에 쓸 혼동 문자표 (ocr.whitelist 기준)입니다.
+        """
+        started = time.perf_counter()
+        conn = self._connection()
+        self.resolve_numbers(query, table)
+        sql, params = query.to_sql(self._choose_index(conn, query))
+        rows = conn.execute(sql, params).fetchall()
+        next_cursor = None
+        if len(rows) > query.limit:
+            rows = rows[:query.limit]
+            last = rows[-1]
+            next_cursor = encode_cursor(last[SORT_COLUMNS[query.sort_by]], last["id"])
+        self.queries += 1
+        self.query_ms += (time.perf_counter() - started) * 1000
+        return [row_to_log(row) for row in rows], next_cursor
+
+    def tail(self, after: Optional[int] = None, limit: int = PAGE_SIZE) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        id가 after보다 큰 (새로 기록된) 로그를 id 순으로 최대 limit개 반환합니다. (로그, 마지막 id)
+        after가 None이면 로그 없이 지금의 마지막 id만 반환합니다. (실시간 구독의 시작점)
+        """
+        conn = self._connection()
+        if after is None:
+            return [], conn.execute("SELECT MAX(id) FROM ocr_events").fetchone()[0] or 0
+        rows = conn.execute("SELECT * FROM ocr_events WHERE id > ? ORDER BY id LIMIT ?", (after, limit)).fetchall()
+        return [row_to_log(row) for row in rows], rows[-1]["id"] if rows else after
+
+    def scan(self, query: EventQuery, after: Optional[Tuple[float, int]] = None, table: Optional[ConfusionTable] = None,
+             chunk_size: int = SCAN_CHUNK_ROWS) -> Iterator[List[sqlite3.Row]]:
+        """
+        조건에 맞는 이벤트 전체를 시간 순으로 chunk_size개씩 읽습니다. (내보내기용, 정렬/페이지 조건은 무시)
+        묶음마다 (timestamp, id) keyset으로 이어 읽으므로 결과가 아무리 커도 메모리는 묶음 하나만큼만 쓰고,
+        after에 마지막으로 받은 행의 (timestamp, id)를 주면 그 다음 이벤트부터 이어서 읽습니다.
+        """
+        self.resolve_numbers(query, table)
+        clauses, params = query.where()
+        # 번호 조건이 있어도 시간 순 인덱스로 한 번만 훑음 (번호 인덱스를 타면 묶음마다 맞는 행 전체를 다시 정렬함)
+        index = "ix_ocr_events_roi" if query.roi_name is not None else "ix_ocr_events_timestamp"
+        while True:
+            where = list(clauses)
+            values = list(params)
+            if after is not None:
+                where.append("(timestamp, id) > (?, ?)")
+                values.extend(after)
+            sql = f"SELECT * FROM ocr_events INDEXED BY {index}"
+            if where:
+                sql += " WHERE " + " AND ".join(where)
+            # 제너레이터는 호출할 때마다 다른 스레드에서 이어질 수 있으므로 연결은 묶음마다 가져옴
+            rows = self._connection().execute(sql + " ORDER BY timestamp, id LIMIT ?", values + [chunk_size]).fetchall()
+            if not rows:
+                return
+            yield rows
+            if len(rows) < chunk_size:
+                return
+            after = (rows[-1]["timestamp"], rows[-1]["id"])
+
+    def summarize(self, start: Optional[float] = None, end: Optional[float] = None,
+                  group: int = rollups.DAY, histograms: bool = True) -> rollups.RollupSummary:
+        """
+        [start, end) 기간의 통계를 미리 집계된 버킷을 더해 계산합니다. (rollups.summarize 참고)
+        start가 없으면 첫 이벤트부터, end가 없으면 지금까지입니다.
+        """
+        started = time.perf_counter()
+        conn = self._connection()
+        now = time.time()
+        end = now if end is None else end
+        if start is None:
+            start = conn.execute("SELECT MIN(timestamp) FROM ocr_events").fetchone()[0]
+            start = end if start is None else start
+        if start > end:
+            raise ValueError("기간의 시작이 끝보다 늦습니다")
+        summary = rollups.summarize(conn, start, end, group, histograms, now)
+        self.summaries += 1
+        self.summary_ms += (time.perf_counter() - started) * 1000
+        return summary
+
+    def explain(self, query: EventQuery) -> List[str]:
+        """쿼리 계획 (인덱스 사용 확인용)"""
+        conn = self._connection()
+        sql, params = query.to_sql(self._choose_index(conn, query))
+        return [row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": str(self.path),
+            "queries": self.queries,
+            "avgQueryMs": round(self.query_ms / self.queries, 2) if self.queries else 0.0,
+            "summaries": self.summaries,
+            "avgSummaryMs": round(self.summary_ms / self.summaries, 2) if self.summaries else 0.0,
+            "numberIndex": self.number_index.stats(),
+        }
+
+
+def benchmark(rows: int = 1_000_000, path: Optional[str] = None):
+    """
+    가상의 이벤트 rows건 (30일, ROI 5개)을 채운 뒤 로그 화면에서 쓰는 조회들의 시간을 잽니다.
+    이미 이벤트가 있는 DB를 주면 채우지 않고 조회만 측정합니다.
+    """
+    import random
+    import tempfile
+
+    from pipeline.number_search import confusion_table
+
+    path = Path(path or Path(tempfile.mkdtemp()) / "events.db")
+    existing, latest = connect(path).execute("SELECT MAX(id), MAX(timestamp) FROM ocr_events").fetchone()
+    if existing:
+        now = latest
+        print(f"🗃️ 기존 DB 사용: {path} ({existing:,}건)")
+    else:
+        now = time.time()
+        writer = EventWriter(path)
+        rois = ["입구 영역", "출구 영역", "주차장 입구", "하차장", "검수 구역"]
+        rng = random.Random(0)
+        started = time.perf_counter()
+        chunk = []
+        for index in range(rows):
+            roi = rng.randrange(len(rois))
+            number = f"{rng.randrange(10000):04d}" if rng.random() < 0.95 else ""
+            chunk.append(RecognitionEvent(
+                timestamp=now - 30 * 86400 + index * (30 * 86400 / rows),
+                camera_id=f"gate{roi + 1}", track_id=index, recognized_number=number,
+                confidence=rng.uniform(40, 100) if number else rng.uniform(0, 40),
+                roi_id=f"roi-{roi}", roi_name=rois[roi], processing_time=rng.uniform(20, 120),
+                status="success" if number else "error", sent_to_plc=bool(number),
+            ))
+            if len(chunk) == 20000:
+                writer.write_batch(chunk)
+                chunk = []
+        if chunk:
+            writer.write_batch(chunk)
+        print(f"🗃️ {rows:,}건 기록: {time.perf_counter() - started:.1f}초 "
+              f"({writer.written / (time.perf_counter() - started):,.0f}건/초)")
+
+    store = EventStore(path)
+    digits = confusion_table("0123456789")
+    begin = time.perf_counter()
+    store.refresh_numbers()
+    print(f"🔎 번호 사전 로드 {(time.perf_counter() - begin) * 1000:.0f}ms: {store.number_index.stats()}")
+    week = {"from": to_iso(now - 7 * 86400), "to": to_iso(now)}
+    cases = {
+        "최근 7일": {"dateRange": week},
+        "최근 7일 + ROI": {"dateRange": week, "roiFilter": "하차장"},
+        "최근 7일 + 신뢰도 90 이상": {"dateRange": week, "minConfidence": 90},
+        "신뢰도 순": {"dateRange": week, "sortBy": "confidence"},
+        "최근 1시간 신뢰도 순": {"dateRange": {"from": to_iso(now - 3600), "to": to_iso(now)}, "sortBy": "confidence"},
+        "번호 앞부분 '12'": {"dateRange": week, "numberQuery": "12", "numberMatch": "prefix"},
+        "번호 부분 '234'": {"dateRange": week, "numberQuery": "234", "numberMatch": "contains"},
+        "번호 유사 '1B3O' (자동)": {"dateRange": week, "numberQuery": "1B3O"},
+        "번호 유사 '12345' (전체 기간)": {"numberQuery": "12345", "numberMatch": "fuzzy"},
+        "번호 순 (오름차순)": {"sortBy": "recognizedNumber", "sortOrder": "asc"},
+    }
+    for name, filters in cases.items():
+        query = EventQuery.from_filter(filters)
+        timings = []
+        cursor = None
+        for _ in range(5):  # 첫 페이지 + 다음 페이지 4번
+            query.cursor = cursor
+            begin = time.perf_counter()
+            items, cursor = store.query(query, digits)
+            timings.append((time.perf_counter() - begin) * 1000)
+        print(f"⏱️ {name}: 첫 페이지 {timings[0]:.1f}ms, 다음 페이지 평균 {sum(timings[1:]) / 4:.1f}ms "
+              f"({len(items)}건) | {'; '.join(store.explain(query))}")
+
+    # 통계: 버킷 경계와 어긋난 기간으로 (양 끝 자투리 포함) 일별 / 시간대별 집계
+    for days in (1, 7, 30, 90):
+        start = now - days * 86400 + 1234.5
+        timings = {}
+        for label, group, histograms in (("일별", rollups.DAY, True), ("시간대별", rollups.HOUR, False)):
+            begin = time.perf_counter()
+            summary = store.summarize(start, now, group, histograms)
+            timings[label] = ((time.perf_counter() - begin) * 1000, summary)
+        daily = timings["일별"][1]
+        print(f"📊 최근 {days}일 통계: " + ", ".join(
+            f"{label} {ms:.1f}ms (버킷 {result.buckets_read}개, 원본 {result.raw_rows}건)"
+            for label, (ms, result) in timings.items()
+        ) + f" | {daily.totals.events:,}건, 성공률 {daily.totals.success_rate}%, p95 {daily.percentile(0.95)}ms")
+
+
+if __name__ == "__main__":
+    # 예) python -m pipeline.event_store --rows 2000000
+    import argparse
+
+    parser = argparse.ArgumentParser(description="이벤트 저장소 조회 성능 측정")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="채울 가상 이벤트 수")
+    parser.add_argument("--db", default=None, help="DB 파일 경로 (기본: 임시 디렉토리)")
+    args = parser.parse_args()
+    benchmark(args.rows, args.db)
@@ -0,0 +1,207 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+# === 클라이언트별 송신 채널 ===
+class ClientChannel:
+    """
+    구독자 하나에 대한 송신 큐와 전용 writer 태스크.
+
+    큐 깊이를 넘으면 가장 오래된 항목을 버리므로 느린 클라이언트는
+    자기 프레임만 잃고 다른 구독자나 브로드캐스터를 막지 않습니다.
+    """
+
+    def __init__(
+        self,
+        websocket,
+        send: Callable[[Any], Awaitable[None]],
+        depth: int = 2,
+        client_info: str = "",
+        profile=None,
+        controller=None,
+    ):
+        self.websocket = websocket
+        self.send = send
+        self.client_info = client_info
+        self._profile = profile  # 클라이언트가 받을 렌디션 (예: "full", "thumb")
+        self.controller = controller  # 적응형 송출 제어기 (due/profile/on_sent/on_dropped)
+        self.queue = deque(maxlen=depth)
+        self.task: Optional[asyncio.Task] = None
+        self.closed = False
+        self.connected_at = time.time()
+        self._ready = asyncio.Event()
+
+        # 통계
+        self.offered = 0
+        self.sent = 0
+        self.dropped = 0
+        self.bytes_sent = 0
+        self.last_send_ms = 0.0
+        self.avg_send_ms = 0.0
+
+    @property
+    def profile(self):
+        if self.controller is not None:
+            return self.controller.profile
+        return self._profile
+
+    def due(self, timestamp: float) -> bool:
+        """제어기가 있으면 이 시각의 프레임을 보낼 차례인지 묻습니다."""
+        if self.closed:
+            return False
+        return self.controller is None or self.controller.due(timestamp)
+
+    def offer(self, item) -> bool:
+        """항목을 큐에 넣습니다. 큐가 가득 차 있으면 가장 오래된 항목을 버립니다."""
+        if self.closed:
+            return False
+        self.offered += 1
+        if len(self.queue) == self.queue.maxlen:
+            self.dropped += 1
+            if self.controller is not None:
+                self.controller.on_dropped()
+        self.queue.append(item)
+        self._ready.set()
+        return True
+
+    async def _next_item(self):
+        while not self.queue:
+            self._ready.clear()
+            await self._ready.wait()
+        return self.queue.popleft()
+
+    async def run(self, on_closed: Callable[["ClientChannel"], None]):
+        try:
+            while not self.closed:
+                item = await self._next_item()
+                started = time.perf_counter()
+                sent_bytes = await self.send(item)
+                self._record_send(item, (time.perf_counter() - started) * 1000, sent_bytes)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print(f"🔴 송신 실패로 클라이언트 연결 정리 ({self.client_info}): {type(e).__name__} {e}")
+        finally:
+            self.closed = True
+            self.queue.clear()
+            on_closed(self)
+
+    def _record_send(self, item, elapsed_ms: float, sent_bytes: Optional[int] = None):
+        self.sent += 1
+        if isinstance(sent_bytes, int):
+            self.bytes_sent += sent_bytes
+        elif isinstance(item, (bytes, bytearray)):
+            self.bytes_sent += len(item)
+        self.last_send_ms = elapsed_ms
+        # 지수 이동 평균으로 송신 지연 추적
+        self.avg_send_ms = elapsed_ms if self.sent == 1 else self.avg_send_ms * 0.9 + elapsed_ms * 0.1
+        if self.controller is not None:
+            self.controller.on_sent(elapsed_ms)
+
+    def stats(self) -> dict:
+        profile = self.profile
+        stats = {
+            "client": self.client_info,
+            "profile": getattr(profile, "name", profile),
+            "connectedAt": self.connected_at,
+            "queued": len(self.queue),
+            "offered": self.offered,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "bytesSent": self.bytes_sent,
+            "lastSendMs": round(self.last_send_ms, 2),
+            "avgSendMs": round(self.avg_send_ms, 2),
+        }
+        if self.controller is not None:
+            stats["adaptive"] = self.controller.stats()
+        return stats
+
+
+# === 구독자 팬아웃 ===
+class FrameFanout:
+    """
+    한 번 인코딩한 프레임을 모든 구독자 큐에 넣고, 실제 송신은
+    연결마다 하나씩 있는 writer 태스크가 동시에 처리합니다.
+    """
+
+    def __init__(self, depth: int = 2):
+        self.depth = depth
+        self._channels: Dict[Any, ClientChannel] = {}
+        self.total_dropped = 0
+
+    def __len__(self):
+        return len(self._channels)
+
+    def __contains__(self, websocket):
+        return websocket in self._channels
+
+    def add(self, websocket, client_info: str = "", send=None, profile=None, controller=None) -> ClientChannel:
+        if websocket in self._channels:
+            return self._channels[websocket]
+        channel = ClientChannel(
+            websocket,
+            send=send or websocket.send_bytes,
+            depth=self.depth,
+            client_info=client_info,
+            profile=profile,
+            controller=controller,
+        )
+        self._channels[websocket] = channel
+        channel.task = asyncio.create_task(channel.run(self._on_channel_closed))
+        return channel
+
+    def get(self, websocket) -> Optional[ClientChannel]:
+        return self._channels.get(websocket)
+
+    def profiles(self) -> set:
+        """현재 구독자들이 요청한 프로파일 집합"""
+        return {channel.profile for channel in self._channels.values()}
+
+    def due_channels(self, timestamp: float) -> list:
+        """이 시각의 프레임을 받아야 하는 구독자 목록"""
+        return [channel for channel in list(self._channels.values()) if channel.due(timestamp)]
+
+    async def remove(self, websocket):
+        channel = self._channels.pop(websocket, None)
+        if channel is None:
+            return
+        channel.closed = True
+        if channel.task is not None and channel.task is not asyncio.current_task():
+            channel.task.cancel()
+            try:
+                await channel.task
+            except asyncio.CancelledError:
+                pass
+
+    def publish(self, item) -> int:
+        """모든 구독자 큐에 항목을 넣고 전달 대상 수를 반환합니다. (대기하지 않음)"""
+        delivered = 0
+        for channel in list(self._channels.values()):
+            if self.deliver(channel, item):
+                delivered += 1
+        return delivered
+
+    def deliver(self, channel: ClientChannel, item) -> bool:
+        """구독자 한 명에게만 항목을 전달합니다. (구독자마다 다른 렌디션을 보낼 때 사용)"""
+        dropped_before = channel.dropped
+        offered = channel.offer(item)
+        self.total_dropped += channel.dropped - dropped_before
+        return offered
+
+    def _on_channel_closed(self, channel: ClientChannel):
+        if self._channels.get(channel.websocket) is channel:
+            del self._channels[channel.websocket]
+
+    async def close_all(self):
+        for websocket in list(self._channels):
+            await self.remove(websocket)
+
+    def stats(self) -> dict:
+        return {
+            "clients": len(self._channels),
+            "queueDepth": self.depth,
+            "totalDropped": self.total_dropped,
+            "channels": [channel.stats() for channel in self._channels.values()],
+        }
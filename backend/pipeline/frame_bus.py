@@ -0,0 +1,351 @@
+import asyncio
+import os
+import re
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from multiprocessing import shared_memory
+from typing import Optional
+
+import numpy as np
+
+BUS_MAGIC = 0x31425446  # "FTB1"
+BUS_VERSION = 1
+FRAME_BUS_SLOTS = 4
+HEADER_SIZE = 64
+SLOT_HEADER_SIZE = 64
+ALIGNMENT = 64
+SHM_DIR = "/dev/shm"  # Linux에서 POSIX 공유 메모리 세그먼트가 보이는 위치
+
+# 공유 메모리 맨 앞의 전역 헤더
+BUS_HEADER_DTYPE = np.dtype([
+    ("magic", "<u4"),
+    ("version", "<u4"),
+    ("slots", "<u4"),
+    ("closed", "<u4"),  # 작성자가 종료하면 1
+    ("slot_size", "<u8"),  # 슬롯당 픽셀 데이터 최대 바이트 수
+    ("latest_seq", "<u8"),
+    ("writer_pid", "<u8"),
+])
+
+# 슬롯별 헤더 (seqlock: 쓰기 시작 시 seq_begin, 완료 시 seq_end 기록)
+SLOT_HEADER_DTYPE = np.dtype([
+    ("seq_begin", "<u8"),
+    ("seq_end", "<u8"),
+    ("timestamp", "<f8"),  # time.monotonic() (시스템 전역 시계)
+    ("wall_time", "<f8"),  # time.time()
+    ("height", "<u4"),
+    ("width", "<u4"),
+    ("channels", "<u4"),
+    ("nbytes", "<u8"),
+])
+
+
+def bus_name(camera_id: str) -> str:
+    """카메라 ID로 공유 메모리 이름을 만듭니다. (모든 프로세스가 같은 규칙 사용)"""
+    return "truck_frames_" + re.sub(r"[^A-Za-z0-9_]", "_", str(camera_id))
+
+
+def _align(value: int) -> int:
+    return (value + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _layout(slots: int, slot_size: int):
+    headers_offset = HEADER_SIZE
+    data_offset = _align(headers_offset + slots * SLOT_HEADER_SIZE)
+    slot_stride = _align(slot_size)
+    return headers_offset, data_offset, slot_stride, data_offset + slots * slot_stride
+
+
+_attach_lock = threading.Lock()
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """
+    기존 세그먼트에 연결만 합니다. Python 3.12 이하는 연결한 프로세스의
+    resource_tracker에도 세그먼트가 등록되어 종료 시 unlink되므로 등록을 건너뜁니다.
+    (사후 unregister는 spawn 자식과 공유하는 tracker에서 작성자 등록까지 지움)
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, create=False, track=False)
+    if os.name != "posix":
+        return shared_memory.SharedMemory(name=name, create=False)
+
+    from multiprocessing import resource_tracker
+    with _attach_lock:
+        register = resource_tracker.register
+
+        def _skip_shared_memory(resource_name, rtype):
+            if rtype != "shared_memory":
+                register(resource_name, rtype)
+
+        resource_tracker.register = _skip_shared_memory
+        try:
+            return shared_memory.SharedMemory(name=name, create=False)
+        finally:
+            resource_tracker.register = register
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid <= 0 or os.name != "posix":
+        return True  # 확인할 수 없으면 살아 있다고 봄 (closed와 세그먼트 교체 확인에 맡김)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _segment_inode(name: str) -> Optional[int]:
+    """POSIX 공유 메모리 세그먼트 파일의 inode (확인할 수 없는 플랫폼이면 None, 세그먼트가 없으면 -1)"""
+    if not os.path.isdir(SHM_DIR):
+        return None
+    try:
+        return os.stat(os.path.join(SHM_DIR, name)).st_ino
+    except FileNotFoundError:
+        return -1
+
+
+@dataclass
+class BusFrame:
+    seq: int
+    timestamp: float
+    wall_time: float
+    image: np.ndarray = field(repr=False)
+
+
+class _FrameBusBase:
+    def _map(self, shm: shared_memory.SharedMemory, slots: int, slot_size: int):
+        self.shm = shm
+        headers_offset, data_offset, slot_stride, _ = _layout(slots, slot_size)
+        self.slots = slots
+        self.slot_size = slot_size
+        self.header = np.ndarray((), dtype=BUS_HEADER_DTYPE, buffer=shm.buf, offset=0)
+        self.slot_headers = np.ndarray((slots,), dtype=SLOT_HEADER_DTYPE, buffer=shm.buf, offset=headers_offset)
+        self.slot_data = np.ndarray((slots, slot_stride), dtype=np.uint8, buffer=shm.buf, offset=data_offset)
+
+    def _release_views(self):
+        # 공유 메모리를 닫기 전에 numpy 뷰를 먼저 해제해야 함
+        self.header = None
+        self.slot_headers = None
+        self.slot_data = None
+
+
+# === 작성자 (비디오 서버의 캡처 워커) ===
+class FrameBusWriter(_FrameBusBase):
+    """
+    원본 BGR 프레임을 공유 메모리 링에 게시합니다. 카메라당 작성자는 하나입니다.
+    슬롯 크기는 첫 프레임(또는 max_shape)으로 정해지며, 이보다 큰 프레임은 거부됩니다.
+    """
+
+    def __init__(self, camera_id: str, max_shape, slots: int = FRAME_BUS_SLOTS, start_seq: int = 0):
+        self.name = bus_name(camera_id)
+        slot_size = int(np.prod(max_shape))
+        size = _layout(slots, slot_size)[3]
+        try:
+            shm = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+        except FileExistsError:
+            # 이전 프로세스가 비정상 종료하며 남긴 세그먼트 정리
+            stale = shared_memory.SharedMemory(name=self.name, create=False)
+            stale.close()
+            stale.unlink()
+            shm = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+
+        self._map(shm, slots, slot_size)
+        self.slot_headers[...] = 0
+        self.header["version"] = BUS_VERSION
+        self.header["slots"] = slots
+        self.header["closed"] = 0
+        self.header["slot_size"] = slot_size
+        self.header["latest_seq"] = start_seq
+        self.header["writer_pid"] = os.getpid()
+        self.header["magic"] = BUS_MAGIC  # 초기화가 끝난 뒤 magic 기록
+        self.seq = start_seq
+        self.rejected = 0
+
+    def publish(self, image: np.ndarray, timestamp: Optional[float] = None, wall_time: Optional[float] = None) -> int:
+        """프레임을 다음 슬롯에 복사하고 시퀀스 번호를 반환합니다. 실패 시 0."""
+        if image.dtype != np.uint8 or image.nbytes > self.slot_size:
+            self.rejected += 1
+            return 0
+
+        seq = self.seq + 1
+        slot = seq % self.slots
+        header = self.slot_headers[slot]
+        header["seq_begin"] = seq
+        height, width = image.shape[:2]
+        channels = image.shape[2] if image.ndim == 3 else 1
+        target = self.slot_data[slot, :image.nbytes].reshape(image.shape)
+        np.copyto(target, image)
+        header["timestamp"] = timestamp if timestamp is not None else time.monotonic()
+        header["wall_time"] = wall_time if wall_time is not None else time.time()
+        header["height"] = height
+        header["width"] = width
+        header["channels"] = channels
+        header["nbytes"] = image.nbytes
+        header["seq_end"] = seq
+        self.header["latest_seq"] = seq
+        self.seq = seq
+        return seq
+
+    def close(self):
+        if self.shm is None:
+            return
+        self.header["closed"] = 1
+        self._release_views()
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+        self.shm = None
+
+
+class FrameBusPublisher:
+    """
+    캡처 워커용 작성자 래퍼. 첫 프레임 크기로 세그먼트를 만들고, 재연결 후
+    해상도가 커지면 세그먼트를 다시 만듭니다. (독자는 closed를 보고 재연결)
+    시퀀스 번호는 세그먼트를 다시 만들어도 이어집니다.
+    """
+
+    def __init__(self, camera_id: str, slots: int = FRAME_BUS_SLOTS):
+        self.camera_id = camera_id
+        self.slots = slots
+        self.writer: Optional[FrameBusWriter] = None
+        self.seq = 0
+
+    @property
+    def name(self) -> str:
+        return bus_name(self.camera_id)
+
+    def publish(self, image: np.ndarray, timestamp: Optional[float] = None, wall_time: Optional[float] = None) -> int:
+        if self.writer is None or image.nbytes > self.writer.slot_size:
+            self.close()
+            self.writer = FrameBusWriter(self.camera_id, image.shape, slots=self.slots, start_seq=self.seq)
+            print(f"🧠 프레임 버스 생성: {self.writer.name} ({image.shape[1]}x{image.shape[0]}, {self.slots}슬롯)")
+        seq = self.writer.publish(image, timestamp, wall_time)
+        if seq:
+            self.seq = seq
+        return seq
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+# === 독자 (추론 프로세스, 메인 백엔드 등) ===
+class FrameBusReader(_FrameBusBase):
+    """
+    공유 메모리 링에 연결해 최신 프레임을 읽습니다. 독자 수에는 제한이 없습니다.
+
+    copy=False로 읽으면 공유 메모리를 직접 가리키는 뷰를 반환하므로 복사 비용이
+    없지만, 사용이 끝난 뒤 still_valid()로 그 사이 슬롯이 덮어쓰이지 않았는지
+    확인해야 합니다.
+    """
+
+    def __init__(self, camera_id: str):
+        self.camera_id = camera_id
+        self.name = bus_name(camera_id)
+        shm = _attach(self.name)
+        header = np.ndarray((), dtype=BUS_HEADER_DTYPE, buffer=shm.buf, offset=0)
+        if int(header["magic"]) != BUS_MAGIC or int(header["version"]) != BUS_VERSION:
+            del header
+            shm.close()
+            raise ValueError(f"프레임 버스 형식이 올바르지 않습니다: {self.name}")
+        slots, slot_size = int(header["slots"]), int(header["slot_size"])
+        self.writer_pid = int(header["writer_pid"])
+        del header
+        self.inode = _segment_inode(self.name)
+        self._map(shm, slots, slot_size)
+
+    @classmethod
+    def try_attach(cls, camera_id: str) -> Optional["FrameBusReader"]:
+        """작성자가 아직 없으면 None을 반환합니다."""
+        try:
+            return cls(camera_id)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    @property
+    def closed(self) -> bool:
+        return self.shm is None or bool(self.header["closed"])
+
+    @property
+    def stale(self) -> bool:
+        """
+        다시 연결해야 하는지. 작성자가 정상 종료했거나 (closed), closed를 남기지 못하고 죽었거나,
+        새 작성자가 같은 이름으로 세그먼트를 다시 만들어 이 독자가 버려진 세그먼트를 보고 있는 경우입니다.
+        """
+        if self.closed or not _pid_alive(self.writer_pid):
+            return True
+        return self.inode is not None and _segment_inode(self.name) != self.inode
+
+    def latest_seq(self) -> int:
+        return int(self.header["latest_seq"])
+
+    def read(self, seq: Optional[int] = None, copy: bool = True) -> Optional[BusFrame]:
+        """지정한 (기본: 최신) 프레임을 읽습니다. 이미 덮어쓰였으면 None."""
+        if seq is None:
+            seq = self.latest_seq()
+        if seq == 0:
+            return None
+
+        header = self.slot_headers[seq % self.slots]
+        if int(header["seq_end"]) != seq:
+            return None
+        channels, nbytes = int(header["channels"]), int(header["nbytes"])
+        shape = (int(header["height"]), int(header["width"])) + ((channels,) if channels > 1 else ())
+        timestamp, wall_time = float(header["timestamp"]), float(header["wall_time"])
+        # 헤더를 읽는 사이 작성자가 다른 해상도로 슬롯을 다시 쓰기 시작했으면 크기가 맞지 않을 수 있음
+        if (int(header["seq_begin"]) != seq or nbytes != int(np.prod(shape))
+                or nbytes > self.slot_data.shape[1]):
+            return None
+        view = self.slot_data[seq % self.slots, :nbytes].reshape(shape)
+        image = view.copy() if copy else view
+
+        # 읽는 동안 작성자가 같은 슬롯을 쓰기 시작했다면 버림
+        if int(header["seq_begin"]) != seq:
+            return None
+        return BusFrame(seq=seq, timestamp=timestamp, wall_time=wall_time, image=image)
+
+    def still_valid(self, frame: BusFrame) -> bool:
+        """copy=False로 읽은 프레임이 아직 덮어쓰이지 않았는지 확인합니다."""
+        return int(self.slot_headers[frame.seq % self.slots]["seq_begin"]) == frame.seq
+
+    def wait_next(self, after_seq: int, timeout: Optional[float] = None, copy: bool = True,
+                  poll_interval: float = 0.002) -> Optional[BusFrame]:
+        """after_seq 이후 프레임이 나올 때까지 폴링합니다. (블로킹)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            seq = self.latest_seq()
+            if seq > after_seq:
+                frame = self.read(seq, copy=copy)
+                if frame is not None:
+                    return frame
+            if self.closed or (deadline is not None and time.monotonic() >= deadline):
+                return None
+            time.sleep(poll_interval)
+
+    async def wait_next_async(self, after_seq: int, timeout: Optional[float] = None, copy: bool = True,
+                              poll_interval: float = 0.005) -> Optional[BusFrame]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            seq = self.latest_seq()
+            if seq > after_seq:
+                frame = self.read(seq, copy=copy)
+                if frame is not None:
+                    return frame
+            if self.closed or (deadline is not None and time.monotonic() >= deadline):
+                return None
+            await asyncio.sleep(poll_interval)
+
+    def close(self):
+        if self.shm is None:
+            return
+        self._release_views()
+        self.shm.close()
+        self.shm = None
@@ -0,0 +1,147 @@
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, FrozenSet, List, Mapping, Optional, Set, Tuple
+
+SUBSCRIBER_QUEUE_SIZE = 500  # 구독자별 대기 로그 최대 수 (느린 구독자는 오래된 로그부터 버리고 dropped로 알림)
+BATCH_WINDOW = 0.1  # 첫 로그가 온 뒤 더 기다려 한 프레임으로 묶는 시간 (초)
+MAX_BATCH = 200  # 한 프레임에 담는 최대 로그 수
+PUMP_INTERVAL = 0.25  # 새 로그가 없을 때 이벤트 저장소를 다시 확인하는 간격 (초)
+PUMP_BATCH = 500  # 이벤트 저장소에서 한 번에 읽는 최대 로그 수
+
+STATUSES = ("success", "error")
+
+
+def _names(value: Any) -> Optional[FrozenSet[str]]:
+    """쉼표로 구분한 문자열 또는 목록 → 이름 집합. 비었거나 all이 있으면 None (조건 없음)"""
+    if value is None:
+        return None
+    items = value.split(",") if isinstance(value, str) else list(value)
+    names = frozenset(str(item).strip() for item in items if str(item).strip())
+    return None if not names or "all" in names else names
+
+
+# === 구독 조건 ===
+@dataclass(frozen=True)
+class LogFilter:
+    roi_names: Optional[FrozenSet[str]] = None
+    min_confidence: float = 0.0
+    statuses: Optional[FrozenSet[str]] = None
+
+    @classmethod
+    def from_params(cls, params: Mapping[str, Any]) -> "LogFilter":
+        """
+        쿼리 파라미터나 filter 메시지에서 조건을 만듭니다. 잘못된 값은 ValueError.
+        roi (또는 roiFilter): ROI 이름 (쉼표 구분 또는 목록), minConfidence: 0~100, status: success | error
+        """
+        try:
+            min_confidence = float(params.get("minConfidence") or 0)
+        except (TypeError, ValueError):
+            raise ValueError(f"minConfidence는 숫자여야 합니다: {params.get('minConfidence')}")
+        if not 0 <= min_confidence <= 100:
+            raise ValueError(f"minConfidence는 0~100 사이여야 합니다: {min_confidence}")
+        statuses = _names(params.get("status"))
+        if statuses is not None and not statuses <= set(STATUSES):
+            raise ValueError(f"status는 {', '.join(STATUSES)} 중 하나여야 합니다: {', '.join(sorted(statuses))}")
+        roi = params.get("roi", params.get("roiFilter"))
+        return cls(roi_names=_names(roi), min_confidence=min_confidence, statuses=statuses)
+
+    def matches(self, log: Dict[str, Any]) -> bool:
+        return ((self.roi_names is None or log["roiName"] in self.roi_names)
+                and log["confidence"] >= self.min_confidence
+                and (self.statuses is None or log["status"] in self.statuses))
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "roi": sorted(self.roi_names) if self.roi_names is not None else None,
+            "minConfidence": self.min_confidence,
+            "status": sorted(self.statuses) if self.statuses is not None else None,
+        }
+
+
+# === 구독자 ===
+class Subscription:
+    """구독자 하나의 대기열. 버스가 조건에 맞는 로그만 넣고, 구독자는 next_batch()로 묶어서 꺼냅니다."""
+
+    def __init__(self, bus: "LogBus", log_filter: LogFilter, maxsize: int = SUBSCRIBER_QUEUE_SIZE):
+        self.bus = bus
+        self.filter = log_filter
+        self._queue: deque = deque(maxlen=maxsize)
+        self._ready = asyncio.Event()
+        self.delivered = 0
+        self.dropped = 0  # 대기열이 넘쳐 버린 로그 수 (다음 프레임에 알리고 0으로)
+
+    def offer(self, log: Dict[str, Any]):
+        if not self.filter.matches(log):
+            return
+        if len(self._queue) == self._queue.maxlen:
+            self.dropped += 1
+        self._queue.append(log)
+        self._ready.set()
+
+    async def next_batch(self, window: float = BATCH_WINDOW, max_batch: int = MAX_BATCH) -> List[Dict[str, Any]]:
+        """로그가 올 때까지 기다렸다가, window 동안 더 모은 로그를 최대 max_batch개 반환합니다."""
+        await self._ready.wait()
+        if len(self._queue) < max_batch:
+            await asyncio.sleep(window)
+        batch = [self._queue.popleft() for _ in range(min(max_batch, len(self._queue)))]
+        if not self._queue:
+            self._ready.clear()
+        self.delivered += len(batch)
+        return batch
+
+    def take_dropped(self) -> int:
+        dropped, self.dropped = self.dropped, 0
+        return dropped
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+
+# === 버스 ===
+class LogBus:
+    """
+    새 인식 로그를 구독자들에게 나눠 주는 프로세스 내 pub/sub 버스. (이벤트 루프 스레드에서만 사용)
+    로그는 pump() 하나가 이벤트 저장소에서 읽어 publish()하므로, 구독자 수와 관계없이 저장소 확인은 한 곳에서만 하고
+    구독자마다 로그 하나당 조건 검사 한 번만 합니다.
+    """
+
+    def __init__(self):
+        self._subscribers: Set[Subscription] = set()
+        self.published = 0
+
+    def __len__(self):
+        return len(self._subscribers)
+
+    def subscribe(self, log_filter: LogFilter) -> Subscription:
+        subscription = Subscription(self, log_filter)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscribers.discard(subscription)
+
+    def publish(self, logs: List[Dict[str, Any]]):
+        for log in logs:
+            for subscription in self._subscribers:
+                subscription.offer(log)
+        self.published += len(logs)
+
+    async def pump(self, fetch: Callable[[Optional[int], int], Tuple[List[Dict[str, Any]], Optional[int]]],
+                   interval: float = PUMP_INTERVAL):
+        """
+        구독자가 있는 동안 fetch(마지막 id, 최대 수) → (새 로그 목록, 마지막 id)로 새 로그를 읽어 publish합니다.
+        처음 호출에는 마지막 id로 None을 넘기며, fetch는 그 시점 이후의 로그만 돌려주면 됩니다. (지난 로그는 보내지 않음)
+        구독자가 모두 나가면 끝나므로, 새 구독자가 생길 때 다시 시작합니다.
+        """
+        after = None
+        while self._subscribers:
+            try:
+                logs, after = await asyncio.to_thread(fetch, after, PUMP_BATCH)
+            except Exception as e:
+                print(f"💥 로그 구독 버스 읽기 오류: {e}")
+                logs = []
+            if logs:
+                self.publish(logs)
+            if len(logs) < PUMP_BATCH:
+                await asyncio.sleep(interval)
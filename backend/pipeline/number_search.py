@@ -0,0 +1,189 @@
+import bisect
+import re
+import threading
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set
+
+# OCR이 자주 헷갈리는 글자 묶음. 첫 글자가 대표 문자 (번호 골격을 만들 때 사용)
+CONFUSABLE_GROUPS = ("0ODQ", "1IL", "2Z", "5S", "6G", "8B")
+CONFUSION_COST = 0.5  # 헷갈리는 글자끼리 바뀐 경우의 비용 (일반 글자 교체/추가/삭제는 1)
+FUZZY_MAX_COST = 1.0  # 유사 검색에서 허용하는 최대 편집 비용
+
+MATCH_MODES = ("auto", "exact", "prefix", "contains", "fuzzy")
+
+_SEPARATORS = re.compile(r"[\s\-_.,:;'\"|/\\]")
+
+
+# === 혼동 문자표 ===
+class ConfusionTable:
+    """
+    OCR 혼동 문자표. alphabet (ocr.whitelist에서 나온 허용 문자)이 있으면 검색어에서 허용되지 않는
+    글자를 같은 묶음의 허용 글자로 바꿉니다. 예) 숫자 전용일 때 "8B12" → "8812", "1O25" → "1025"
+    """
+
+    def __init__(self, alphabet: str = ""):
+        self.alphabet = "".join(sorted(set(alphabet.upper())))
+        self.group_of: Dict[str, int] = {}
+        self.substitute: Dict[str, str] = {}
+        allowed = set(self.alphabet)
+        for index, group in enumerate(CONFUSABLE_GROUPS):
+            members = [c for c in group if not allowed or c in allowed]
+            for char in group:
+                self.group_of[char] = index
+                if allowed and char not in allowed and members:
+                    self.substitute[char] = members[0]
+
+    @classmethod
+    def from_ocr_config(cls, ocr: dict) -> "ConfusionTable":
+        from pipeline.ocr import OcrSettings
+
+        return confusion_table(OcrSettings.from_config(ocr or {}).allowlist)
+
+    def normalize(self, text: str) -> str:
+        """구분 기호 제거, 대문자화, 허용되지 않는 혼동 글자 치환"""
+        text = _SEPARATORS.sub("", text or "").upper()
+        return "".join(self.substitute.get(char, char) for char in text)
+
+    def cost(self, a: str, b: str) -> float:
+        if a == b:
+            return 0.0
+        group = self.group_of.get(a)
+        return CONFUSION_COST if group is not None and group == self.group_of.get(b) else 1.0
+
+    def distance(self, a: str, b: str, limit: float = FUZZY_MAX_COST) -> float:
+        """혼동 글자 교체를 싸게 치는 편집 거리. limit을 넘는 것이 확실하면 일찍 멈추고 limit보다 큰 값을 반환"""
+        if abs(len(a) - len(b)) > limit:
+            return limit + 1
+        previous = [float(j) for j in range(len(b) + 1)]
+        for i, char in enumerate(a, 1):
+            current = [float(i)]
+            for j, other in enumerate(b, 1):
+                current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + self.cost(char, other)))
+            if min(current) > limit:
+                return limit + 1
+            previous = current
+        return previous[-1]
+
+
+@lru_cache(maxsize=16)
+def confusion_table(alphabet: str = "") -> ConfusionTable:
+    return ConfusionTable(alphabet)
+
+
+def skeleton(text: str) -> str:
+    """혼동 글자를 묶음의 대표 문자로 바꾼 번호 골격 ("B8O1" → "8801")"""
+    return text.translate(_SKELETON)
+
+
+_SKELETON = str.maketrans({char: group[0] for group in CONFUSABLE_GROUPS for char in group[1:]})
+
+
+def _deletes(text: str) -> Set[str]:
+    return {text} | {text[:i] + text[i + 1:] for i in range(len(text))}
+
+
+def _grams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+# === 번호 사전 인덱스 ===
+class NumberIndex:
+    """
+    인식된 서로 다른 번호들 (이벤트 수보다 훨씬 적음)에 대한 메모리 인덱스.
+    검색어에 맞는 번호 목록을 먼저 찾고, 이벤트 조회는 그 번호들로 번호 인덱스를 탑니다.
+
+    모든 인덱스는 번호 골격 기준이라 앞부분/부분 일치도 혼동 글자를 구분하지 않습니다.
+    - 앞부분 일치: 정렬된 골격 목록에서 이진 탐색
+    - 부분 일치: 골격의 3글자 조각 (trigram) 교집합 후 확인 (3글자 미만은 목록 훑기)
+    - 유사 일치: 골격에서 한 글자씩 지운 키 (deletion neighborhood)로 후보를 찾고 편집 거리로 확인
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._variants: Dict[str, Set[str]] = {}  # 골격: 실제 번호들
+        self._sorted: List[str] = []  # 골격 (정렬)
+        self._grams: Dict[str, Set[str]] = {}
+        self._deletes: Dict[str, Set[str]] = {}
+
+    def __len__(self):
+        return sum(len(numbers) for numbers in self._variants.values())
+
+    def add(self, numbers: Iterable[str]):
+        added = []
+        with self._lock:
+            for number in numbers:
+                if not number:
+                    continue
+                key = skeleton(number)
+                variants = self._variants.get(key)
+                if variants is None:
+                    variants = self._variants[key] = set()
+                    added.append(key)
+                variants.add(number)
+            if not added:
+                return
+            for key in added:
+                for gram in _grams(key):
+                    self._grams.setdefault(gram, set()).add(key)
+                for deleted in _deletes(key):
+                    self._deletes.setdefault(deleted, set()).add(key)
+            if len(added) > 64:
+                self._sorted = sorted(self._variants)
+            else:
+                for key in added:
+                    bisect.insort(self._sorted, key)
+
+    def _numbers(self, keys: Iterable[str]) -> Set[str]:
+        return {number for key in keys for number in self._variants.get(key, ())}
+
+    def prefix(self, query: str) -> Set[str]:
+        key = skeleton(query)
+        start = bisect.bisect_left(self._sorted, key)
+        end = bisect.bisect_left(self._sorted, key + "\uffff")
+        return self._numbers(self._sorted[start:end])
+
+    def contains(self, query: str) -> Set[str]:
+        key = skeleton(query)
+        if len(key) < 3:
+            return self._numbers(candidate for candidate in self._sorted if key in candidate)
+        sets = sorted((self._grams.get(gram, set()) for gram in _grams(key)), key=len)
+        candidates = set.intersection(*sets) if sets else set()
+        return self._numbers(candidate for candidate in candidates if key in candidate)
+
+    def fuzzy(self, query: str, table: ConfusionTable, max_cost: float = FUZZY_MAX_COST) -> Set[str]:
+        keys = set()
+        for deleted in _deletes(skeleton(query)):
+            keys |= self._deletes.get(deleted, set())
+        return {number for number in self._numbers(keys) if table.distance(query, number, max_cost) <= max_cost}
+
+    def search(self, query: str, mode: str = "auto", table: Optional[ConfusionTable] = None) -> List[str]:
+        """
+        검색어에 맞는 번호 목록.
+        exact: 같은 번호 (혼동 글자 차이만 허용) / prefix: 앞부분 / contains: 부분 / fuzzy: 편집 비용 1 이하
+        auto: 부분 일치 + 유사 일치 (운영자가 번호 일부만, 또는 OCR이 한 글자 틀린 번호를 찾을 때)
+        """
+        if mode not in MATCH_MODES:
+            raise ValueError(f"지원하지 않는 번호 검색 방식입니다: {mode} ({', '.join(MATCH_MODES)})")
+        table = table or confusion_table()
+        query = table.normalize(query)
+        if not query:
+            return []
+        if mode == "exact":
+            found = self._numbers([skeleton(query)])
+        elif mode == "prefix":
+            found = self.prefix(query)
+        elif mode == "contains":
+            found = self.contains(query)
+        elif mode == "fuzzy":
+            found = self.fuzzy(query, table)
+        else:
+            found = self.contains(query) | self.fuzzy(query, table)
+        return sorted(found)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "numbers": len(self),
+            "skeletons": len(self._variants),
+            "grams": len(self._grams),
+            "deleteKeys": len(self._deletes),
+        }
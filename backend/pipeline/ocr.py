@@ -0,0 +1,604 @@
+import heapq
+import itertools
+import queue
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from pipeline.encoder import LatencyStats
+from pipeline.ocr_preprocess import create_preprocessor, estimate_skew, preprocessor_key
+from pipeline.roi import OCR as OCR_ACTION
+
+SCORE_HEIGHT = 96  # 선명도/기울기 판단용 축소 높이
+SHARPNESS_REF = 150.0  # 라플라시안 분산이 이 값이면 선명도 점수 0.5
+SIZE_REF = 160  # 박스 가로/세로가 이 값(픽셀) 이상이면 크기 점수 1
+EDGE_MARGIN = 2  # 화면 가장자리에 닿은 박스 (잘린 차량) 판정 여유
+EDGE_PENALTY = 0.6
+MAX_CROP_SIDE = 800  # 보관하는 후보 이미지의 최대 변 길이
+TRACK_EXPIRE_SECONDS = 1.5  # 이 시간 동안 보이지 않으면 트랙이 떠난 것으로 봄
+
+
+# === 설정 ===
+@dataclass
+class OcrSettings:
+    engine: str = "easyocr"
+    language: str = "digits"
+    confidence_threshold: float = 0.8
+    min_digits: int = 4
+    max_digits: int = 8
+    digits_only: bool = True
+    whitelist: str = ""
+    blacklist: str = ""
+    preprocessing: bool = True
+    preprocessing_steps: Tuple[str, ...] = ("grayscale", "threshold")
+    auto_rotation: bool = True
+    max_rotation_angle: float = 45.0
+    gpu: bool = False
+    top_k: int = 3  # 트럭당 OCR할 후보 수
+    collect_seconds: float = 3.0  # 트럭이 계속 머물러도 이 시간이 지나면 결과 확정
+
+    @classmethod
+    def from_config(cls, ocr: dict) -> "OcrSettings":
+        threshold = float(ocr.get("confidenceThreshold", 0.8))
+        return cls(
+            engine=str(ocr.get("engine", "easyocr")).lower(),
+            language=str(ocr.get("language", "digits")),
+            confidence_threshold=threshold / 100.0 if threshold > 1.0 else threshold,
+            min_digits=int(ocr.get("minDigits", 4)),
+            max_digits=int(ocr.get("maxDigits", 8)),
+            digits_only=bool(ocr.get("enableDigitsOnly", True)),
+            whitelist=str(ocr.get("whitelist", "")) if ocr.get("enableWhitelist", False) else "",
+            blacklist=str(ocr.get("blacklist", "")) if ocr.get("enableBlacklist", False) else "",
+            preprocessing=bool(ocr.get("enablePreprocessing", True)),
+            preprocessing_steps=tuple(ocr.get("preprocessingSteps", ("grayscale", "threshold"))),
+            auto_rotation=bool(ocr.get("enableAutoRotation", True)),
+            max_rotation_angle=float(ocr.get("maxRotationAngle", 45)),
+            gpu=bool(ocr.get("enableGPU", False)),
+            top_k=max(1, int(ocr.get("maxCandidatesPerTrack", 3))),
+            collect_seconds=float(ocr.get("collectSeconds", 3.0)),
+        )
+
+    @property
+    def allowlist(self) -> str:
+        """엔진에 넘길 허용 문자 (없으면 빈 문자열)"""
+        if self.digits_only or self.language == "digits":
+            return "".join(c for c in (self.whitelist or "0123456789") if c.isdigit()) or "0123456789"
+        return self.whitelist
+
+
+def normalize_text(text: str, settings: OcrSettings) -> str:
+    """공백/구분 기호를 지우고 숫자 전용·화이트리스트·블랙리스트 설정을 적용합니다."""
+    text = re.sub(r"[\s\-_.,:;'\"|/\\]", "", text or "").upper()
+    if settings.digits_only:
+        text = "".join(c for c in text if c.isdigit())
+    if settings.whitelist:
+        allowed = set(settings.whitelist.upper())
+        text = "".join(c for c in text if c in allowed)
+    if settings.blacklist:
+        blocked = set(settings.blacklist.upper())
+        text = "".join(c for c in text if c not in blocked)
+    return text
+
+
+# === OCR 엔진 ===
+@dataclass
+class OcrReading:
+    text: str
+    confidences: np.ndarray  # 글자별 신뢰도 (0~1)
+
+
+class OcrEngine:
+    """이미지 한 장에서 가장 그럴듯한 문자열 하나를 읽습니다."""
+
+    name = "ocr"
+
+    def __init__(self, settings: OcrSettings):
+        self.settings = settings
+
+    def read(self, image: np.ndarray) -> Optional[OcrReading]:
+        raise NotImplementedError
+
+    def read_batch(self, images: Sequence[np.ndarray]) -> List[Optional[OcrReading]]:
+        return [self.read(image) for image in images]
+
+    def _best(self, candidates) -> Optional[OcrReading]:
+        """(문자열, 신뢰도) 후보 중 자릿수 조건을 만족하는 가장 신뢰도 높은 것"""
+        best = None
+        for text, confidence in candidates:
+            text = normalize_text(text, self.settings)
+            if not (self.settings.min_digits <= len(text) <= self.settings.max_digits):
+                continue
+            if best is None or confidence > best[1]:
+                best = (text, confidence)
+        if best is None:
+            return None
+        # 엔진이 문자열 단위 신뢰도만 주므로 모든 글자에 같은 값을 부여
+        return OcrReading(best[0], np.full(len(best[0]), float(best[1]), dtype=np.float32))
+
+
+class TesseractEngine(OcrEngine):
+    name = "tesseract"
+
+    def __init__(self, settings: OcrSettings):
+        super().__init__(settings)
+        import pytesseract
+
+        self._tesseract = pytesseract
+        language = {"digits": "eng", "kor": "kor", "eng": "eng", "kor+eng": "kor+eng"}.get(settings.language, "eng")
+        whitelist = f" -c tessedit_char_whitelist={settings.allowlist}" if settings.allowlist else ""
+        self._language = language
+        self._config = f"--psm 7{whitelist}"
+
+    def read(self, image):
+        data = self._tesseract.image_to_data(image, lang=self._language, config=self._config,
+                                             output_type=self._tesseract.Output.DICT)
+        words = [(text, float(conf) / 100.0) for text, conf in zip(data["text"], data["conf"])
+                 if str(text).strip() and float(conf) >= 0]
+        # 한 줄로 이어 읽은 결과와 단어별 결과를 모두 후보로 사용
+        if words:
+            joined = "".join(text for text, _ in words)
+            words.append((joined, float(np.mean([conf for _, conf in words]))))
+        return self._best(words)
+
+
+class EasyOcrEngine(OcrEngine):
+    name = "easyocr"
+
+    def __init__(self, settings: OcrSettings):
+        super().__init__(settings)
+        import easyocr
+
+        languages = {"kor": ["ko"], "kor+eng": ["ko", "en"]}.get(settings.language, ["en"])
+        self._reader = easyocr.Reader(languages, gpu=settings.gpu, verbose=False)
+
+    def read(self, image):
+        results = self._reader.readtext(image, allowlist=self.settings.allowlist or None, detail=1)
+        candidates = [(text, float(conf)) for _, text, conf in results]
+        if len(results) > 1:
+            # 왼쪽부터 이어 붙인 문자열도 후보 (번호가 두 덩어리로 인식되는 경우)
+            ordered = sorted(results, key=lambda item: min(point[0] for point in item[0]))
+            candidates.append(("".join(text for _, text, _ in ordered),
+                               float(np.mean([conf for _, _, conf in ordered]))))
+        return self._best(candidates)
+
+
+class PaddleOcrEngine(OcrEngine):
+    name = "paddleocr"
+
+    def __init__(self, settings: OcrSettings):
+        super().__init__(settings)
+        from paddleocr import PaddleOCR
+
+        language = "korean" if settings.language.startswith("kor") else "en"
+        self._ocr = PaddleOCR(lang=language, use_gpu=settings.gpu, show_log=False)
+
+    def read(self, image):
+        if image.ndim == 2:
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        results = self._ocr.ocr(image, cls=self.settings.auto_rotation) or []
+        lines = [line for page in results if page for line in page]
+        return self._best([(text, float(conf)) for _, (text, conf) in lines])
+
+
+OCR_ENGINES = {
+    "tesseract": TesseractEngine,
+    "easyocr": EasyOcrEngine,
+    "paddleocr": PaddleOcrEngine,
+}
+
+_engine_cache: Dict[tuple, OcrEngine] = {}
+_engine_lock = threading.Lock()
+
+
+def engine_key(settings: OcrSettings) -> tuple:
+    """엔진을 새로 만들어야 하는 설정 (같으면 기존 엔진에 설정만 바꿔 넣음)"""
+    return settings.engine, settings.language, settings.gpu, settings.allowlist
+
+
+def create_ocr_engine(settings: OcrSettings) -> Optional[OcrEngine]:
+    """
+    설정한 OCR 엔진을 만듭니다. 패키지가 없거나 지원하지 않는 엔진이면 None.
+    모델 로딩이 무거우므로 같은 설정의 엔진은 재사용합니다.
+    """
+    engine_class = OCR_ENGINES.get(settings.engine)
+    if engine_class is None:
+        print(f"⚠️ 지원하지 않는 OCR 엔진입니다: {settings.engine}")
+        return None
+    key = engine_key(settings)
+    with _engine_lock:
+        engine = _engine_cache.get(key)
+        if engine is None:
+            try:
+                engine = engine_class(settings)
+            except ImportError:
+                print(f"⚠️ OCR 엔진 패키지가 설치되어 있지 않습니다: {settings.engine}")
+                return None
+            except Exception as e:
+                print(f"💥 OCR 엔진 초기화 실패 ({settings.engine}): {e}")
+                return None
+            _engine_cache[key] = engine
+            print(f"🔤 OCR 엔진 준비: {settings.engine} ({settings.language})")
+    engine.settings = settings
+    return engine
+
+
+# === 후보 이미지 점수 ===
+def crop_box(image: np.ndarray, box, pad: float = 0.05) -> np.ndarray:
+    height, width = image.shape[:2]
+    x1, y1, x2, y2 = box
+    pad_x, pad_y = (x2 - x1) * pad, (y2 - y1) * pad
+    x1, y1 = max(0, int(x1 - pad_x)), max(0, int(y1 - pad_y))
+    x2, y2 = min(width, int(np.ceil(x2 + pad_x))), min(height, int(np.ceil(y2 + pad_y)))
+    return image[y1:y2, x1:x2]
+
+
+def quick_score(box, shape, confidence: float) -> float:
+    """이미지를 보지 않고 계산하는 점수 상한 (크기 × 감지 신뢰도 × 잘림 여부)"""
+    height, width = shape[:2]
+    x1, y1, x2, y2 = box
+    size = min(1.0, (x2 - x1) / SIZE_REF) * min(1.0, (y2 - y1) / SIZE_REF)
+    truncated = x1 <= EDGE_MARGIN or y1 <= EDGE_MARGIN or x2 >= width - EDGE_MARGIN or y2 >= height - EDGE_MARGIN
+    return size * float(confidence) * (EDGE_PENALTY if truncated else 1.0)
+
+
+def score_crop(crop: np.ndarray, settings: OcrSettings) -> Tuple[float, float, float]:
+    """(선명도 점수, 기울기 점수, 기울기 각도)를 반환합니다. 고정 높이로 줄여 계산합니다."""
+    if crop.size == 0:
+        return 0.0, 0.0, 0.0
+    scale = SCORE_HEIGHT / crop.shape[0]
+    small = cv2.resize(crop, (max(1, round(crop.shape[1] * scale)), SCORE_HEIGHT), interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+
+    _, std = cv2.meanStdDev(cv2.Laplacian(gray, cv2.CV_32F))
+    variance = float(std[0, 0]) ** 2
+    sharpness = variance / (variance + SHARPNESS_REF)
+
+    angle = estimate_skew(gray)
+    angle_score = max(0.0, float(np.cos(np.radians(angle))))
+    if abs(angle) > settings.max_rotation_angle or not settings.auto_rotation:
+        angle_score *= 0.5
+    return sharpness, angle_score, angle
+
+
+# === 글자 단위 신뢰도 투표 ===
+def vote(readings: Sequence[Optional[OcrReading]]) -> Optional[Tuple[str, float]]:
+    """
+    여러 후보의 인식 결과를 글자 위치별 신뢰도 합으로 투표해 하나의 문자열로 합칩니다.
+    길이는 신뢰도 합이 가장 큰 길이를 택하며, 최종 신뢰도는 위치별 득표 비율의 평균입니다.
+    (다른 길이로 읽은 후보도 분모에 포함되므로 불일치가 많으면 신뢰도가 낮아짐)
+    """
+    readings = [reading for reading in readings if reading is not None and reading.text]
+    if not readings:
+        return None
+
+    totals: Dict[int, float] = {}
+    for reading in readings:
+        totals[len(reading.text)] = totals.get(len(reading.text), 0.0) + float(reading.confidences.sum())
+    length = max(totals, key=totals.get)
+    group = [reading for reading in readings if len(reading.text) == length]
+
+    alphabet = sorted({c for reading in group for c in reading.text})
+    index = {c: i for i, c in enumerate(alphabet)}
+    codes = np.array([[index[c] for c in reading.text] for reading in group])
+    confidences = np.stack([reading.confidences for reading in group])
+    votes = np.zeros((length, len(alphabet)), dtype=np.float64)
+    np.add.at(votes, (np.broadcast_to(np.arange(length), codes.shape), codes), confidences)
+
+    text = "".join(alphabet[i] for i in votes.argmax(axis=1))
+    confidence = float((votes.max(axis=1) / len(readings)).mean())
+    return text, confidence
+
+
+# === 트랙별 후보 수집 ===
+@dataclass(order=True)
+class Candidate:
+    score: float
+    order: int
+    crop: np.ndarray = field(compare=False, repr=False)
+    angle: float = field(default=0.0, compare=False)
+
+
+class TrackCandidates:
+    def __init__(self, camera_id: str, track_id: int, timestamp: float):
+        self.camera_id = camera_id
+        self.track_id = track_id
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.observations = 0
+        self.heap: List[Candidate] = []  # 점수 최소 힙 (상위 k개 유지)
+
+    def threshold(self, k: int) -> float:
+        return self.heap[0].score if len(self.heap) >= k else 0.0
+
+
+@dataclass
+class OcrJob:
+    camera_id: str
+    track_id: int
+    first_seen: float
+    candidates: List[Candidate]
+    observations: int
+
+
+@dataclass
+class OcrResult:
+    camera_id: str
+    track_id: int
+    text: Optional[str]  # 조건을 만족하는 결과가 없으면 None
+    confidence: float
+    readings: List[Optional[str]]
+    scores: List[float]
+    observations: int
+    ocr_ms: float
+    wall_time: float
+
+
+class OcrStage(threading.Thread):
+    """
+    프레임마다가 아니라 추적 중인 트럭마다 OCR을 실행합니다.
+
+    observe()는 감지 스레드에서 호출되며, 트럭 박스를 선명도·크기·기울기로 점수
+    매겨 트랙당 상위 top_k개 후보만 보관합니다. (점수 상한이 현재 k번째보다 낮으면
+    이미지를 보지 않고 건너뜀) 트럭이 화면을 떠나거나 collect_seconds가 지나면
+    후보들만 OCR하고 글자 단위 투표로 번호 하나를 확정해 on_result로 넘깁니다.
+    따라서 트럭이 ROI에 오래 머물러도 OCR 호출은 트럭당 최대 top_k번입니다.
+    """
+
+    def __init__(self, engine: OcrEngine, settings: OcrSettings,
+                 on_result: Callable[[OcrResult], None], name: str = "ocr"):
+        super().__init__(name=name, daemon=True)
+        self.engine = engine
+        self.settings = settings
+        self.on_result = on_result
+        self.preprocessor = create_preprocessor(settings)  # OCR 스레드에서만 사용
+        self._preprocessor_key = preprocessor_key(settings)
+        self._tracks: Dict[Tuple[str, int], TrackCandidates] = {}
+        self._finished: Dict[Tuple[str, int], float] = {}  # 결과를 낸 트랙 (재수집 방지)
+        self._jobs: "queue.Queue[Optional[OcrJob]]" = queue.Queue(maxsize=256)
+        self._order = itertools.count()
+
+        # 통계
+        self.crops_scored = 0
+        self.crops_skipped = 0
+        self.ocr_calls = 0
+        self.results = 0
+        self.recognized = 0
+        self.jobs_dropped = 0
+        self.score_latency = LatencyStats()
+        self.ocr_latency = LatencyStats()
+
+    def configure(self, settings: OcrSettings, engine: Optional[OcrEngine] = None):
+        """
+        설정 (및 미리 준비한 엔진)을 교체합니다. 후보 수집 중인 트럭은 유지되고,
+        전처리기는 다음 OCR 작업에서 설정이 바뀐 경우에만 다시 만들어집니다.
+        """
+        if engine is not None:
+            self.engine = engine
+        self.engine.settings = settings
+        self.settings = settings
+
+    # --- 감지 스레드 ---
+    def observe(self, result):
+        """DetectionResult (트랙과 프레임 이미지 포함)를 받아 후보를 갱신합니다."""
+        tracks = result.tracks
+        now = time.monotonic()
+        if tracks is not None and result.image is not None and len(tracks):
+            started = time.perf_counter()
+            # ROI가 설정되어 있으면 번호 인식(performOcr) ROI 안의 트럭만 후보 수집
+            allowed = result.roi_hits.allowed(OCR_ACTION) if result.roi_hits is not None else None
+            for index, track_id in enumerate(tracks.ids.tolist()):
+                if allowed is not None and not allowed[index]:
+                    continue
+                key = (result.camera_id, track_id)
+                if key in self._finished:
+                    continue
+                entry = self._tracks.get(key)
+                if entry is None:
+                    entry = self._tracks[key] = TrackCandidates(result.camera_id, track_id, now)
+                entry.last_seen = now
+                entry.observations += 1
+                self._consider(entry, tracks.boxes[index], float(tracks.scores[index]), result.image)
+            self.score_latency.record((time.perf_counter() - started) * 1000)
+        self._flush(now)
+
+    def _consider(self, entry: TrackCandidates, box, confidence: float, image: np.ndarray):
+        k = self.settings.top_k
+        upper = quick_score(box, image.shape, confidence)
+        if upper <= entry.threshold(k):
+            self.crops_skipped += 1
+            return
+        crop = crop_box(image, box)
+        sharpness, angle_score, angle = score_crop(crop, self.settings)
+        self.crops_scored += 1
+        score = upper * sharpness * angle_score
+        if score <= entry.threshold(k):
+            return
+        # 프레임은 계속 쓰이므로 후보만 복사해 보관 (너무 크면 축소)
+        scale = MAX_CROP_SIDE / max(crop.shape[:2])
+        if scale < 1.0:
+            crop = cv2.resize(crop, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        else:
+            crop = crop.copy()
+        candidate = Candidate(score, next(self._order), crop, angle)
+        if len(entry.heap) < k:
+            heapq.heappush(entry.heap, candidate)
+        else:
+            heapq.heapreplace(entry.heap, candidate)
+
+    def _flush(self, now: float):
+        """떠났거나 수집 시간이 끝난 트랙을 OCR 작업으로 넘깁니다."""
+        for key, entry in list(self._tracks.items()):
+            gone = now - entry.last_seen > TRACK_EXPIRE_SECONDS
+            if not gone and now - entry.first_seen < self.settings.collect_seconds:
+                continue
+            del self._tracks[key]
+            if not gone:
+                self._finished[key] = now
+            if entry.heap:
+                self._submit(OcrJob(entry.camera_id, entry.track_id, entry.first_seen,
+                                    sorted(entry.heap, reverse=True), entry.observations))
+        # 확정된 트랙 기록은 트랙이 사라질 만큼 시간이 지나면 정리
+        expire = now - max(60.0, self.settings.collect_seconds * 10)
+        for key in [key for key, finished in self._finished.items() if finished < expire]:
+            del self._finished[key]
+
+    def _submit(self, job: OcrJob):
+        try:
+            self._jobs.put_nowait(job)
+        except queue.Full:
+            self.jobs_dropped += 1
+
+    def stop(self, timeout: Optional[float] = 2.0):
+        try:
+            self._jobs.put_nowait(None)
+        except queue.Full:
+            pass
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
+
+    # --- OCR 스레드 ---
+    def process(self, job: OcrJob) -> OcrResult:
+        # 전처리 설정이 바뀐 경우에만 체인을 다시 만듦
+        key = preprocessor_key(self.settings)
+        if key != self._preprocessor_key:
+            self.preprocessor = create_preprocessor(self.settings)
+            self._preprocessor_key = key
+
+        started = time.perf_counter()
+        images = self.preprocessor.process([candidate.crop for candidate in job.candidates],
+                                           [candidate.angle for candidate in job.candidates])
+        readings = self.engine.read_batch(images)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.ocr_calls += len(job.candidates)
+        self.ocr_latency.record(elapsed_ms)
+
+        voted = vote(readings)
+        text, confidence = voted if voted is not None else (None, 0.0)
+        if text is not None and confidence < self.settings.confidence_threshold:
+            text = None
+        return OcrResult(
+            camera_id=job.camera_id,
+            track_id=job.track_id,
+            text=text,
+            confidence=confidence,
+            readings=[reading.text if reading is not None else None for reading in readings],
+            scores=[round(candidate.score, 3) for candidate in job.candidates],
+            observations=job.observations,
+            ocr_ms=elapsed_ms,
+            wall_time=time.time(),
+        )
+
+    def run(self):
+        print(f"🔤 OCR 단계 시작 ({self.engine.name}, 트럭당 최대 {self.settings.top_k}회)")
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            try:
+                result = self.process(job)
+            except Exception as e:
+                print(f"💥 OCR 처리 중 예외 발생: {e}")
+                continue
+            self.results += 1
+            if result.text is not None:
+                self.recognized += 1
+            try:
+                self.on_result(result)
+            except Exception as e:
+                print(f"💥 OCR 결과 처리 중 예외 발생: {e}")
+        print("🛑 OCR 단계 종료")
+
+    def stats(self) -> dict:
+        return {
+            "running": self.is_alive(),
+            "engine": self.engine.name,
+            "topK": self.settings.top_k,
+            "collecting": len(self._tracks),
+            "pendingJobs": self._jobs.qsize(),
+            "cropsScored": self.crops_scored,
+            "cropsSkipped": self.crops_skipped,
+            "ocrCalls": self.ocr_calls,
+            "results": self.results,
+            "recognized": self.recognized,
+            "jobsDropped": self.jobs_dropped,
+            "preprocess": self.preprocessor.stats(),
+            "scoreLatency": self.score_latency.summary(),
+            "ocrLatency": self.ocr_latency.summary(),
+        }
+
+
+# === 합성 이미지 테스트 ===
+def render_number(text: str, rng: np.random.Generator, blur: float = 0.0, angle: float = 0.0,
+                  scale: float = 1.0) -> np.ndarray:
+    """흰 번호판에 검은 숫자를 그린 뒤 흐림·회전·축소를 적용한 테스트 이미지"""
+    plate = np.full((120, 60 + 48 * len(text), 3), 235, dtype=np.uint8)
+    cv2.putText(plate, text, (30, 88), cv2.FONT_HERSHEY_SIMPLEX, 2.2, (20, 20, 20), 6, cv2.LINE_AA)
+    canvas = np.full((plate.shape[0] + 80, plate.shape[1] + 80, 3), 90, dtype=np.uint8)
+    canvas[40:40 + plate.shape[0], 40:40 + plate.shape[1]] = plate
+    if angle:
+        center = (canvas.shape[1] / 2, canvas.shape[0] / 2)
+        matrix = cv2.getRotationMatrix2D(center, angle, 1.0)
+        canvas = cv2.warpAffine(canvas, matrix, (canvas.shape[1], canvas.shape[0]), borderValue=(90, 90, 90))
+    if scale != 1.0:
+        canvas = cv2.resize(canvas, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    if blur > 0:
+        canvas = cv2.GaussianBlur(canvas, (0, 0), blur)
+    noise = rng.normal(0, 4, canvas.shape)
+    return np.clip(canvas + noise, 0, 255).astype(np.uint8)
+
+
+def run_ocr_test(ocr: dict, seed: Optional[int] = None) -> dict:
+    """
+    합성 번호 이미지를 여러 품질로 만들어 후보 선택 → OCR → 투표 전 과정을 실행합니다.
+    OCR 엔진을 만들 수 없으면 RuntimeError를 발생시킵니다.
+    """
+    settings = OcrSettings.from_config(ocr)
+    engine = create_ocr_engine(settings)
+    if engine is None:
+        raise RuntimeError(f"OCR 엔진을 사용할 수 없습니다: {settings.engine}")
+
+    rng = np.random.default_rng(seed)
+    digits = int(rng.integers(settings.min_digits, settings.max_digits + 1))
+    expected = "".join(str(d) for d in rng.integers(0, 10, digits))
+    variants = [
+        {"blur": 3.0, "angle": 0.0, "scale": 1.0},
+        {"blur": 0.0, "angle": 12.0, "scale": 1.0},
+        {"blur": 0.0, "angle": 0.0, "scale": 0.35},
+        {"blur": 0.6, "angle": 3.0, "scale": 1.0},
+        {"blur": 0.0, "angle": -2.0, "scale": 0.9},
+        {"blur": 1.5, "angle": 0.0, "scale": 0.7},
+    ]
+
+    stage = OcrStage(engine, settings, on_result=lambda result: None)
+    entry = TrackCandidates("test", 1, time.monotonic())
+    for variant in variants:
+        image = render_number(expected, rng, **variant)
+        box = (0, 0, image.shape[1], image.shape[0])
+        # 테스트 이미지는 박스가 곧 전체 화면이므로 잘림 감점이 없도록 여유 있는 크기로 전달
+        shape = (image.shape[0] + 2 * EDGE_MARGIN + 2, image.shape[1] + 2 * EDGE_MARGIN + 2)
+        upper = quick_score(box, shape, 1.0)
+        sharpness, angle_score, angle = score_crop(image, settings)
+        candidate = Candidate(upper * sharpness * angle_score, next(stage._order), image, angle)
+        if len(entry.heap) < settings.top_k:
+            heapq.heappush(entry.heap, candidate)
+        elif candidate.score > entry.heap[0].score:
+            heapq.heapreplace(entry.heap, candidate)
+        entry.observations += 1
+
+    result = stage.process(OcrJob("test", 1, entry.first_seen, sorted(entry.heap, reverse=True), entry.observations))
+    return {
+        "expected": expected,
+        "text": result.text,
+        "confidence": round(result.confidence, 3),
+        "readings": result.readings,
+        "scores": result.scores,
+        "candidates": len(variants),
+        "ocrCalls": len(result.readings),
+        "ocrMs": round(result.ocr_ms, 1),
+        "engine": engine.name,
+    }
@@ -0,0 +1,305 @@
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+# 후보가 이 수 이하이면 IoU 행렬 한 번으로 NMS (Cluster-NMS), 초과하면 탐욕적 NMS
+MATRIX_NMS_MAX = 64
+# NMS 전에 점수 상위 후보만 남길 최대 개수 (0이면 제한 없음)
+MAX_NMS_CANDIDATES = 30000
+
+
+# === 박스 변환 ===
+def xywh2xyxy(boxes: np.ndarray) -> np.ndarray:
+    """(중심 x, 중심 y, 너비, 높이) → (x1, y1, x2, y2)"""
+    out = np.empty_like(boxes)
+    half = boxes[:, 2:4] * 0.5
+    out[:, 0:2] = boxes[:, 0:2] - half
+    out[:, 2:4] = boxes[:, 0:2] + half
+    return out
+
+
+def scale_boxes(boxes: np.ndarray, ratio: float, pad: Tuple[float, float], shape: Tuple[int, int]) -> np.ndarray:
+    """레터박스 입력 좌표를 원본 이미지 좌표로 되돌리고 이미지 경계로 자릅니다. (제자리 수정)"""
+    boxes[:, [0, 2]] -= pad[0]
+    boxes[:, [1, 3]] -= pad[1]
+    boxes /= ratio
+    height, width = shape[:2]
+    # 팬시 인덱싱은 복사본이라 out=이 원본에 반영되지 않으므로 슬라이스 뷰 사용
+    np.clip(boxes[:, 0::2], 0, width, out=boxes[:, 0::2])
+    np.clip(boxes[:, 1::2], 0, height, out=boxes[:, 1::2])
+    return boxes
+
+
+def box_area(boxes: np.ndarray) -> np.ndarray:
+    return (boxes[:, 2] - boxes[:, 0]).clip(0) * (boxes[:, 3] - boxes[:, 1]).clip(0)
+
+
+def box_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """두 박스 집합 사이의 IoU 행렬 (len(a), len(b))"""
+    top_left = np.maximum(a[:, None, :2], b[None, :, :2])
+    bottom_right = np.minimum(a[:, None, 2:4], b[None, :, 2:4])
+    wh = (bottom_right - top_left).clip(0)
+    inter = wh[..., 0] * wh[..., 1]
+    union = box_area(a)[:, None] + box_area(b)[None, :] - inter
+    return inter / np.maximum(union, 1e-9)
+
+
+# === 후보 선별 ===
+def class_ids_for_names(class_names: Sequence[str], wanted: Sequence[str]) -> Optional[np.ndarray]:
+    """
+    모델 클래스 이름 중 model.classes에 포함된 클래스 ID 배열을 반환합니다.
+    필터가 비어 있거나 일치하는 클래스가 없으면 None (필터 없음)을 반환합니다.
+    """
+    if not wanted:
+        return None
+    wanted = {str(name).lower() for name in wanted}
+    ids = [index for index, name in enumerate(class_names) if str(name).lower() in wanted]
+    if not ids:
+        print(f"⚠️ model.classes {sorted(wanted)}와 일치하는 모델 클래스가 없어 클래스 필터를 사용하지 않습니다")
+        return None
+    return np.asarray(ids, dtype=np.int64)
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """점수 상위 k개 인덱스 (정렬하지 않음). 전체 정렬 대신 argpartition 사용"""
+    if k <= 0 or len(scores) <= k:
+        return np.arange(len(scores))
+    return np.argpartition(-scores, k - 1)[:k]
+
+
+def decode_yolo(
+    prediction: np.ndarray,
+    confidence_threshold: float,
+    has_objectness: bool = False,
+    allowed_classes: Optional[np.ndarray] = None,
+):
+    """
+    이미지 한 장의 YOLO 출력 (후보 수, 4 + [객체성] + 클래스 수)을
+    신뢰도 이상인 후보의 (xyxy 박스, 점수, 클래스 ID)로 변환합니다.
+    YOLOv8은 객체성이 없고, YOLOv5는 has_objectness=True로 호출합니다.
+    allowed_classes를 주면 해당 클래스 열만 보고 최고 점수 클래스를 고릅니다.
+    """
+    class_scores = prediction[:, 5:] if has_objectness else prediction[:, 4:]
+    if allowed_classes is not None:
+        class_scores = class_scores[:, allowed_classes]
+
+    best = class_scores.argmax(axis=1)
+    scores = np.take_along_axis(class_scores, best[:, None], axis=1)[:, 0]
+    if has_objectness:
+        scores = scores * prediction[:, 4]
+
+    mask = scores >= confidence_threshold
+    class_ids = best[mask]
+    if allowed_classes is not None:
+        class_ids = allowed_classes[class_ids]
+    boxes = xywh2xyxy(prediction[mask, :4].astype(np.float32))
+    return boxes, scores[mask].astype(np.float32, copy=False), class_ids
+
+
+# === NMS ===
+def _matrix_nms(boxes: np.ndarray, scores: np.ndarray, order: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """
+    후보가 적을 때 사용하는 Cluster-NMS. 점수순 IoU 행렬의 상삼각 부분으로
+    "앞선 유지 박스에 억제되는가"를 반복 계산하며, 수렴 결과는 탐욕적 NMS와 같습니다.
+    """
+    ordered = boxes[order]
+    overlaps = np.triu(box_iou(ordered, ordered) > iou_threshold, 1).astype(np.float32)
+    keep = np.ones(len(order), dtype=np.float32)
+    for _ in range(len(order)):
+        updated = (keep @ overlaps == 0).astype(np.float32)
+        if np.array_equal(updated, keep):
+            break
+        keep = updated
+    return order[keep.astype(bool)]
+
+
+def _greedy_nms(boxes: np.ndarray, order: np.ndarray, iou_threshold: float, max_detections: int) -> np.ndarray:
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = box_area(boxes)
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        if max_detections and len(keep) >= max_detections:
+            break
+        rest = order[1:]
+        # 고른 박스와 나머지 박스의 IoU를 한 번에 계산
+        inter_w = (np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest])).clip(0)
+        inter_h = (np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest])).clip(0)
+        inter = inter_w * inter_h
+        # 나눗셈 없이 inter / union <= threshold 판정
+        order = rest[inter <= iou_threshold * (areas[i] + areas[rest] - inter)]
+    return np.asarray(keep, dtype=np.int64)
+
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float, max_detections: int = 0) -> np.ndarray:
+    """
+    점수 순으로 박스를 고르고, 고른 박스와 IoU가 iou_threshold를 넘는 박스를 제거합니다.
+    남길 박스의 인덱스를 점수 내림차순으로 반환합니다.
+    """
+    if len(boxes) == 0:
+        return np.empty(0, dtype=np.int64)
+    order = np.argsort(-scores, kind="stable")
+    if len(order) <= MATRIX_NMS_MAX:
+        keep = _matrix_nms(boxes, scores, order, iou_threshold)
+        return keep[:max_detections] if max_detections else keep
+    return _greedy_nms(boxes, order, iou_threshold, max_detections)
+
+
+def batched_nms(
+    boxes: np.ndarray,
+    scores: np.ndarray,
+    class_ids: np.ndarray,
+    iou_threshold: float,
+    max_detections: int = 0,
+) -> np.ndarray:
+    """
+    클래스별 NMS. 클래스마다 좌표를 (좌표 범위 + 1) × 클래스 ID만큼 이동시켜
+    서로 다른 클래스 박스가 겹치지 않게 만든 뒤 NMS를 한 번만 수행합니다.
+    (잘라내기 전의 음수 좌표가 있어도 겹치지 않도록 최대 좌표가 아닌 최대 - 최소 기준)
+    """
+    if len(boxes) == 0:
+        return np.empty(0, dtype=np.int64)
+    offsets = class_ids.astype(boxes.dtype) * (float(boxes.max()) - float(boxes.min()) + 1.0)
+    return nms(boxes + offsets[:, None], scores, iou_threshold, max_detections)
+
+
+# === 전체 후처리 ===
+def postprocess_detections(
+    boxes: np.ndarray,
+    scores: np.ndarray,
+    class_ids: np.ndarray,
+    confidence_threshold: float,
+    iou_threshold: float,
+    max_detections: int = 100,
+    allowed_classes: Optional[np.ndarray] = None,
+    class_agnostic: bool = False,
+    max_candidates: int = MAX_NMS_CANDIDATES,
+):
+    """
+    신뢰도 / 클래스 필터 → 상위 후보 제한 → NMS → maxDetections 자르기를 수행하고
+    점수 내림차순의 (박스, 점수, 클래스 ID)를 반환합니다.
+    """
+    mask = scores >= confidence_threshold
+    if allowed_classes is not None:
+        mask &= np.isin(class_ids, allowed_classes)
+    boxes, scores, class_ids = boxes[mask], scores[mask], class_ids[mask]
+
+    candidates = top_k(scores, max_candidates)
+    if len(candidates) < len(scores):
+        boxes, scores, class_ids = boxes[candidates], scores[candidates], class_ids[candidates]
+
+    if class_agnostic:
+        keep = nms(boxes, scores, iou_threshold, max_detections)
+    else:
+        keep = batched_nms(boxes, scores, class_ids, iou_threshold, max_detections)
+    return boxes[keep], scores[keep], class_ids[keep]
+
+
+def postprocess_yolo(
+    prediction: np.ndarray,
+    confidence_threshold: float,
+    iou_threshold: float,
+    max_detections: int = 100,
+    has_objectness: bool = False,
+    allowed_classes: Optional[np.ndarray] = None,
+    class_agnostic: bool = False,
+    max_candidates: int = MAX_NMS_CANDIDATES,
+):
+    """YOLO 원시 출력 한 장을 최종 (박스, 점수, 클래스 ID)로 변환합니다. (입력 좌표계 기준)"""
+    boxes, scores, class_ids = decode_yolo(prediction, confidence_threshold, has_objectness, allowed_classes)
+    # 신뢰도 / 클래스 필터는 decode 단계에서 이미 적용됨
+    return postprocess_detections(
+        boxes,
+        scores,
+        class_ids,
+        confidence_threshold,
+        iou_threshold,
+        max_detections,
+        class_agnostic=class_agnostic,
+        max_candidates=max_candidates,
+    )
+
+
+# === 벤치마크 ===
+def make_candidates(count: int, rng: np.random.Generator, objects: int = 20, num_classes: int = 3,
+                    clustered: bool = True, image_size: int = 640):
+    """
+    벤치마크용 후보 박스를 만듭니다. clustered=True이면 실제 검출기 출력처럼
+    물체마다 약간씩 어긋난 후보가 몰려 있고, False이면 화면 전체에 고르게 흩어집니다.
+    """
+    if clustered:
+        centers = rng.uniform(0.15, 0.85, (objects, 2)) * image_size
+        sizes = rng.uniform(0.06, 0.3, (objects, 2)) * image_size
+        owner = rng.integers(0, objects, count)
+        center = centers[owner] + rng.normal(0, 0.01 * image_size, (count, 2))
+        size = sizes[owner] * rng.uniform(0.85, 1.15, (count, 2))
+        class_ids = owner % num_classes
+    else:
+        center = rng.uniform(0, image_size, (count, 2))
+        size = rng.uniform(0.015, 0.2, (count, 2)) * image_size
+        class_ids = rng.integers(0, num_classes, count)
+    boxes = np.concatenate([center - size / 2, center + size / 2], axis=1).astype(np.float32)
+    scores = rng.beta(2, 5, count).astype(np.float32)
+    return boxes, scores, class_ids.astype(np.int64)
+
+
+def _time_us(func, repeat: int) -> float:
+    import timeit
+    func()  # 준비 실행
+    return min(timeit.repeat(func, number=1, repeat=repeat)) * 1e6
+
+
+def benchmark(sizes: Sequence[int] = (1000, 10000, 50000), confidence_threshold: float = 0.25,
+              iou_threshold: float = 0.45, max_detections: int = 100, repeat: int = 20):
+    """NumPy 후처리와 cv2.dnn.NMSBoxes(Batched)의 처리 시간을 비교해 출력합니다."""
+    import cv2
+
+    rng = np.random.default_rng(0)
+    rows = []
+    for clustered in (True, False):
+        for count in sizes:
+            boxes, scores, class_ids = make_candidates(count, rng, clustered=clustered)
+            xywh = np.concatenate([boxes[:, :2], boxes[:, 2:] - boxes[:, :2]], axis=1)
+
+            def run_numpy():
+                return postprocess_detections(boxes, scores, class_ids, confidence_threshold, iou_threshold, max_detections)
+
+            def run_numpy_agnostic():
+                return postprocess_detections(boxes, scores, class_ids, confidence_threshold, iou_threshold,
+                                              max_detections, class_agnostic=True)
+
+            # cv2의 top_k는 NMS 전 후보 수 제한이므로 결과를 maxDetections로 자름
+            def run_cv2():
+                return cv2.dnn.NMSBoxes(xywh, scores, confidence_threshold, iou_threshold)[:max_detections]
+
+            def run_cv2_batched():
+                return cv2.dnn.NMSBoxesBatched(xywh, scores, class_ids.astype(np.int32), confidence_threshold,
+                                               iou_threshold)[:max_detections]
+
+            # 클래스 무시 NMS 결과가 OpenCV와 같은지 확인
+            _, kept_scores, _ = run_numpy_agnostic()
+            cv_kept = np.asarray(run_cv2()).reshape(-1)
+            same = np.allclose(np.sort(kept_scores), np.sort(scores[cv_kept]))
+            rows.append((
+                "밀집" if clustered else "분산",
+                count,
+                int((scores >= confidence_threshold).sum()),
+                _time_us(run_numpy, repeat),
+                _time_us(run_cv2_batched, repeat),
+                _time_us(run_numpy_agnostic, repeat),
+                _time_us(run_cv2, repeat),
+                same,
+            ))
+
+    print(f"{'분포':<4} {'후보':>7} {'통과':>7} {'numpy(클래스)':>14} {'cv2 Batched':>12} "
+          f"{'numpy(무시)':>12} {'cv2':>10}  결과일치")
+    for name, count, passed, np_cls, cv_cls, np_agn, cv_agn, same in rows:
+        print(f"{name:<4} {count:>7} {passed:>7} {np_cls:>12.0f}µs {cv_cls:>10.0f}µs "
+              f"{np_agn:>10.0f}µs {cv_agn:>8.0f}µs  {'예' if same else '아니오'}")
+    return rows
+
+
+if __name__ == "__main__":
+    # 예) python -m pipeline.postprocess
+    benchmark()
@@ -0,0 +1,268 @@
+import hashlib
+import json
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+RASTER_MAX_SIDE = 640  # ROI 래스터의 최대 변 길이 (원본이 더 크면 축소해 판정)
+MAX_ROIS = 64  # 픽셀당 비트마스크(uint64)로 표현할 수 있는 ROI 수
+MIN_OVERLAP = 0.3  # 중심이 밖에 있어도 박스가 이 비율 이상 겹치면 ROI 안으로 봄
+
+ACTIONS = ("detectTrucks", "performOcr", "sendToPLC", "triggerAlarm")
+DETECT, OCR, PLC, ALARM = range(len(ACTIONS))
+
+
+def roi_fingerprint(rois: Sequence[dict]) -> str:
+    """판정에 영향을 주는 ROI 내용의 해시 (같으면 다시 컴파일하지 않음)"""
+    payload = json.dumps(list(rois or []), sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def roi_points(roi: dict) -> List[Tuple[float, float]]:
+    """
+    ROI의 다각형 꼭짓점. 편집기의 사각형 도구는 대각선 두 점만 저장하므로 (type: rectangle) 네 꼭짓점으로 펼칩니다.
+    """
+    points = [(float(p.get("x", 0)), float(p.get("y", 0))) for p in roi.get("points", [])]
+    if roi.get("type") == "rectangle" and len(points) == 2:
+        (x1, y1), (x2, y2) = points
+        points = [(x1, y1), (x2, y1), (x2, y2), (x1, y2)]
+    return points
+
+
+def _degenerate(points: List[Tuple[float, float]]) -> bool:
+    """꼭짓점이 3개 미만이거나 넓이가 0인 (한 줄 위의) 다각형"""
+    if len(points) < 3:
+        return True
+    area = sum(x1 * y2 - x2 * y1 for (x1, y1), (x2, y2) in zip(points, points[1:] + points[:1]))
+    return abs(area) < 1e-12
+
+
+# === ROI 목록 ===
+@dataclass(frozen=True)
+class RoiSet:
+    """활성화된 ROI를 배열로 정리한 것. 좌표는 프레임 크기 대비 0~1 비율입니다."""
+
+    ids: Tuple[str, ...]
+    names: Tuple[str, ...]
+    polygons: Tuple[np.ndarray, ...]
+    cameras: Tuple[Optional[str], ...]  # ROI별 카메라 ID (없으면 모든 카메라)
+    actions: np.ndarray  # (M, 4) bool, ACTIONS 순서
+    min_detection_time: np.ndarray  # (M,) 초
+    fingerprint: str
+
+    @classmethod
+    def from_config(cls, rois: Sequence[dict]) -> "RoiSet":
+        ids, names, polygons, cameras, actions, dwell = [], [], [], [], [], []
+        for roi in rois or []:
+            if not roi.get("enabled", True):
+                continue
+            points = roi_points(roi)
+            if _degenerate(points):
+                continue
+            if len(ids) >= MAX_ROIS:
+                print(f"⚠️ ROI는 최대 {MAX_ROIS}개까지 사용합니다. 나머지는 무시합니다")
+                break
+            flags = roi.get("actions", {}) or {}
+            ids.append(str(roi.get("id", f"roi-{len(ids) + 1}")))
+            names.append(str(roi.get("name", ids[-1])))
+            polygons.append(np.asarray(points, dtype=np.float32))
+            cameras.append(roi.get("cameraId"))
+            actions.append([bool(flags.get(action, action == "detectTrucks")) for action in ACTIONS])
+            dwell.append(float(roi.get("minDetectionTime", 0) or 0))
+        return cls(
+            ids=tuple(ids),
+            names=tuple(names),
+            polygons=tuple(polygons),
+            cameras=tuple(cameras),
+            actions=np.asarray(actions, dtype=bool).reshape(-1, len(ACTIONS)),
+            min_detection_time=np.asarray(dwell, dtype=np.float64),
+            fingerprint=roi_fingerprint(rois),
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def for_camera(self, camera_id: Optional[str]) -> np.ndarray:
+        """해당 카메라에 적용되는 ROI 인덱스"""
+        return np.array([i for i, camera in enumerate(self.cameras) if camera is None or camera == camera_id],
+                        dtype=np.int64)
+
+
+# === 판정 결과 ===
+@dataclass
+class RoiHits:
+    membership: np.ndarray  # (N, M) bool, 박스 i가 ROI j 안에 있는지
+    roi_ids: Tuple[str, ...]  # M개 ROI ID
+    roi_index: np.ndarray  # (M,) RoiSet 기준 인덱스 (체류 시간 등 조회용)
+    actions: np.ndarray  # (N, 4) bool, 박스가 속한 ROI들의 동작 플래그 OR
+
+    def ids_for(self, index: int) -> List[str]:
+        return [self.roi_ids[j] for j in np.flatnonzero(self.membership[index])]
+
+    def allowed(self, action: int) -> np.ndarray:
+        return self.actions[:, action]
+
+
+# === 해상도별로 컴파일된 ROI ===
+class CompiledRois:
+    """
+    한 해상도에 대해 ROI를 래스터화한 결과.
+
+    - bits: 픽셀마다 포함된 ROI를 비트로 표시한 uint64 래스터 → 점 N개 × ROI M개 판정이
+      래스터 조회 한 번과 비트 연산으로 끝남
+    - integral: ROI별 마스크의 적분 영상 → 박스와 ROI의 겹친 면적을 모서리 4개 조회로 계산
+    """
+
+    def __init__(self, roi_set: RoiSet, indices: np.ndarray, shape):
+        height, width = shape[:2]
+        self.shape = (height, width)
+        self.roi_set = roi_set
+        self.indices = indices
+        self.roi_ids = tuple(roi_set.ids[i] for i in indices)
+        self.actions = roi_set.actions[indices]
+        self.scale = min(1.0, RASTER_MAX_SIDE / max(height, width))
+        raster_w = max(1, round(width * self.scale))
+        raster_h = max(1, round(height * self.scale))
+        self.raster_size = (raster_w, raster_h)
+
+        count = len(indices)
+        self.bits = np.zeros((raster_h, raster_w), dtype=np.uint64)
+        self.integral = np.zeros((count, raster_h + 1, raster_w + 1), dtype=np.int32)
+        self.areas = np.zeros(count, dtype=np.int64)
+        self.boxes = np.zeros((count, 4), dtype=np.int64)  # 원본 해상도 기준 외접 박스
+        mask = np.zeros((raster_h, raster_w), dtype=np.uint8)
+        raster_scale = np.array([raster_w, raster_h], dtype=np.float32)
+        frame_scale = np.array([width, height], dtype=np.float32)
+        for slot, index in enumerate(indices):
+            polygon = roi_set.polygons[index]
+            mask.fill(0)
+            cv2.fillPoly(mask, [np.round(polygon * raster_scale).astype(np.int32)], 1)
+            np.bitwise_or(self.bits, np.uint64(1 << slot), out=self.bits, where=mask.astype(bool))
+            self.integral[slot] = cv2.integral(mask)
+            self.areas[slot] = int(self.integral[slot, -1, -1])
+            pixels = np.clip(polygon * frame_scale, 0, frame_scale)
+            self.boxes[slot] = [np.floor(pixels[:, 0].min()), np.floor(pixels[:, 1].min()),
+                                np.ceil(pixels[:, 0].max()), np.ceil(pixels[:, 1].max())]
+        self._shifts = np.arange(count, dtype=np.uint64)
+
+    def __len__(self):
+        return len(self.indices)
+
+    def _to_raster(self, values: np.ndarray, axis: int) -> np.ndarray:
+        limit = self.raster_size[axis]
+        return np.clip((values * self.scale).astype(np.int64), 0, limit - 1)
+
+    def contains(self, points: np.ndarray) -> np.ndarray:
+        """점 (N, 2) 픽셀 좌표 → (N, M) ROI 포함 여부"""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        bits = self.bits[self._to_raster(points[:, 1], 1), self._to_raster(points[:, 0], 0)]
+        return ((bits[:, None] >> self._shifts[None]) & np.uint64(1)).astype(bool)
+
+    def overlap(self, boxes: np.ndarray) -> np.ndarray:
+        """박스 (N, 4) xyxy 픽셀 좌표 → (N, M) 박스 면적 대비 ROI와 겹친 비율"""
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4) * self.scale
+        raster_w, raster_h = self.raster_size
+        x1 = np.clip(np.floor(boxes[:, 0]), 0, raster_w).astype(np.int64)
+        y1 = np.clip(np.floor(boxes[:, 1]), 0, raster_h).astype(np.int64)
+        x2 = np.clip(np.ceil(boxes[:, 2]), 0, raster_w).astype(np.int64)
+        y2 = np.clip(np.ceil(boxes[:, 3]), 0, raster_h).astype(np.int64)
+        integral = self.integral
+        inside = integral[:, y2, x2] - integral[:, y1, x2] - integral[:, y2, x1] + integral[:, y1, x1]
+        area = np.maximum((x2 - x1) * (y2 - y1), 1)
+        return (inside / area).T
+
+    def evaluate(self, boxes: np.ndarray, min_overlap: float = MIN_OVERLAP) -> RoiHits:
+        """박스 중심이 ROI 안에 있거나 min_overlap 이상 겹치면 해당 ROI에 속한 것으로 봅니다."""
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        centers = (boxes[:, :2] + boxes[:, 2:]) * 0.5
+        membership = self.contains(centers)
+        if min_overlap > 0 and len(boxes):
+            membership |= self.overlap(boxes) >= min_overlap
+        actions = (membership[:, :, None] & self.actions[None]).any(axis=1)
+        return RoiHits(membership=membership, roi_ids=self.roi_ids, roi_index=self.indices, actions=actions)
+
+    def union_box(self, action: int = DETECT) -> Optional[Tuple[int, int, int, int]]:
+        """해당 동작이 켜진 ROI들을 모두 감싸는 박스 (원본 픽셀 좌표)"""
+        selected = self.boxes[self.actions[:, action]]
+        if not len(selected):
+            return None
+        return (int(selected[:, 0].min()), int(selected[:, 1].min()),
+                int(selected[:, 2].max()), int(selected[:, 3].max()))
+
+
+# === ROI 엔진 ===
+class RoiEngine:
+    """
+    config의 rois를 해상도(및 카메라)별로 한 번만 컴파일해 두고 재사용합니다.
+    update()는 ROI 내용이 실제로 바뀐 경우에만 캐시를 비웁니다.
+    활성화된 ROI가 하나도 없으면 화면 전체를 대상으로 보고 evaluate()가 None을 반환합니다.
+    """
+
+    def __init__(self, rois: Optional[Sequence[dict]] = None):
+        self._lock = threading.Lock()
+        self.roi_set = RoiSet.from_config(rois or [])
+        self._compiled: Dict[tuple, CompiledRois] = {}
+        self.compiles = 0
+        self.updates = 0
+        self.compile_ms = 0.0
+
+    @property
+    def fingerprint(self) -> str:
+        return self.roi_set.fingerprint
+
+    def __len__(self):
+        return len(self.roi_set)
+
+    def update(self, rois: Sequence[dict]) -> bool:
+        """ROI 목록을 교체합니다. 내용이 같으면 아무것도 하지 않고 False를 반환합니다."""
+        if roi_fingerprint(rois) == self.roi_set.fingerprint:
+            return False
+        roi_set = RoiSet.from_config(rois)
+        with self._lock:
+            self.roi_set = roi_set
+            self._compiled = {}
+        self.updates += 1
+        print(f"🗺️ ROI {len(roi_set)}개 적용 (다시 컴파일 예정)")
+        return True
+
+    def compiled(self, shape, camera_id: Optional[str] = None) -> Optional[CompiledRois]:
+        roi_set = self.roi_set
+        key = (shape[0], shape[1], camera_id)
+        compiled = self._compiled.get(key)
+        if compiled is not None and compiled.roi_set is roi_set:
+            return compiled
+        indices = roi_set.for_camera(camera_id)
+        if not len(indices):
+            return None
+        started = time.perf_counter()
+        compiled = CompiledRois(roi_set, indices, shape)
+        with self._lock:
+            if self.roi_set is roi_set:
+                self._compiled[key] = compiled
+        self.compiles += 1
+        self.compile_ms += (time.perf_counter() - started) * 1000
+        return compiled
+
+    def evaluate(self, boxes: np.ndarray, shape, camera_id: Optional[str] = None,
+                 min_overlap: float = MIN_OVERLAP) -> Optional[RoiHits]:
+        compiled = self.compiled(shape, camera_id)
+        if compiled is None:
+            return None
+        return compiled.evaluate(boxes, min_overlap)
+
+    def union_box(self, shape, camera_id: Optional[str] = None, action: int = DETECT):
+        compiled = self.compiled(shape, camera_id)
+        return compiled.union_box(action) if compiled is not None else None
+
+    def stats(self) -> dict:
+        return {
+            "rois": list(self.roi_set.ids),
+            "compiled": [list(key) for key in self._compiled],
+            "compiles": self.compiles,
+            "updates": self.updates,
+            "compileMs": round(self.compile_ms, 2),
+        }
@@ -0,0 +1,387 @@
+import math
+import sqlite3
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+MINUTE, HOUR, DAY = 60, 3600, 86400
+RESOLUTIONS = (MINUTE, HOUR, DAY)  # 집계 버킷 크기 (초)
+# 버킷 경계 (일별 통계의 날짜 바뀜, 시간대별 분포의 시각)는 서버 지역 시간 기준 (KST면 UTC+9).
+# 일광 절약 시간이 있는 지역에서도 버킷이 1년에 두 번 바뀌지 않도록 표준시 오프셋을 씀 (여름에는 1시간 어긋남)
+UTC_OFFSET = -time.timezone
+STATS_TZ = timezone(timedelta(seconds=UTC_OFFSET))
+MINUTE_RETENTION = 2 * DAY  # 분 단위 집계 보관 기간 (그보다 오래된 구간의 자투리는 원본 이벤트로 계산)
+PRUNE_INTERVAL = 600.0  # 오래된 분 단위 집계를 지우는 간격 (초)
+
+CONFIDENCE_BIN_WIDTH = 5  # 신뢰도 히스토그램 칸 너비 (%): (0, 5], (5, 10], ... (95, 100] 20칸
+CONFIDENCE_BINS = 100 // CONFIDENCE_BIN_WIDTH
+# (구간 이름, 구간에 들어가는 최대 신뢰도). 경계가 모두 칸 너비의 배수라 히스토그램을 그대로 묶으면 됨
+LOG_CONFIDENCE_RANGES = (("0-50%", 50), ("51-70%", 70), ("71-85%", 85), ("86-95%", 95), ("96-100%", 100))
+OCR_CONFIDENCE_RANGES = (("<60%", 60), ("60-70%", 70), ("70-80%", 80), ("80-90%", 90), ("90-100%", 100))
+
+# 처리 시간 히스토그램: 칸 경계가 (1+a)/(1-a)배씩 커지는 로그 칸 (DDSketch 방식).
+# 칸별 개수만 더하면 합쳐지므로 버킷끼리 SQL로 더할 수 있고, 백분위의 상대 오차는 a 이하
+LATENCY_ACCURACY = 0.02
+LATENCY_MIN_MS = 0.01
+_GAMMA = (1 + LATENCY_ACCURACY) / (1 - LATENCY_ACCURACY)
+_LOG_GAMMA = math.log(_GAMMA)
+
+# 버킷 시작 시각은 정수 (초). 분/시간/일 버킷은 같은 테이블에 해상도로 구분해 저장
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS event_rollups (
+    resolution INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    roi_name TEXT NOT NULL,
+    events INTEGER NOT NULL DEFAULT 0,
+    successes INTEGER NOT NULL DEFAULT 0,
+    plc_sent INTEGER NOT NULL DEFAULT 0,
+    confidence_sum REAL NOT NULL DEFAULT 0,
+    processing_sum REAL NOT NULL DEFAULT 0,
+    processing_max REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (resolution, bucket, roi_name)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS event_histograms (
+    resolution INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    metric TEXT NOT NULL,
+    bin INTEGER NOT NULL,
+    events INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (resolution, bucket, metric, bin)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollup_settings (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+FIELDS = ("events", "successes", "plc_sent", "confidence_sum", "processing_sum", "processing_max")
+_SUMS = "SUM(events), SUM(successes), SUM(plc_sent), SUM(confidence_sum), SUM(processing_sum), MAX(processing_max)"
+
+ROLLUP_UPSERT = f"""
+INSERT INTO event_rollups (resolution, bucket, roi_name, {', '.join(FIELDS)}) VALUES ({', '.join('?' * (3 + len(FIELDS)))})
+ON CONFLICT (resolution, bucket, roi_name) DO UPDATE SET
+    events = events + excluded.events,
+    successes = successes + excluded.successes,
+    plc_sent = plc_sent + excluded.plc_sent,
+    confidence_sum = confidence_sum + excluded.confidence_sum,
+    processing_sum = processing_sum + excluded.processing_sum,
+    processing_max = MAX(processing_max, excluded.processing_max)
+"""
+HISTOGRAM_UPSERT = """
+INSERT INTO event_histograms (resolution, bucket, metric, bin, events) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (resolution, bucket, metric, bin) DO UPDATE SET events = events + excluded.events
+"""
+
+
+def bucket_of(timestamp: float, resolution: int, offset: int = UTC_OFFSET) -> int:
+    """timestamp가 속한 버킷의 시작 시각 (유닉스 시간). 경계는 UTC+offset 기준으로 맞춤"""
+    return int((timestamp + offset) // resolution) * resolution - offset
+
+
+def _bucket_sql(expression: str, resolution: int, offset: int) -> str:
+    """bucket_of()와 같은 계산의 SQL 식 (expression + offset은 양수라 정수 나눗셈이 내림과 같음)"""
+    return f"CAST(({expression} + {offset}) / {resolution} AS INTEGER) * {resolution} - {offset}"
+
+
+def backfill_sql(offset: int = UTC_OFFSET) -> List[str]:
+    """
+    이벤트 원본으로 집계를 채우는 SQL: 분 단위를 원본에서 만들고, 시간/일 단위는 한 단계 아래 집계를 묶음.
+    (모든 해상도가 같은 오프셋으로 경계를 맞추므로 상위 버킷은 항상 하위 버킷 여러 개로 나뉨)
+    """
+    minute = _bucket_sql("timestamp", MINUTE, offset)
+    statements = [
+        f"""INSERT INTO event_rollups (resolution, bucket, roi_name, {', '.join(FIELDS)})
+            SELECT {MINUTE}, {minute}, roi_name, COUNT(*),
+                   SUM(status = 'success'), SUM(sent_to_plc), SUM(confidence), SUM(processing_time), MAX(processing_time)
+            FROM ocr_events GROUP BY 2, 3""",
+        f"""INSERT INTO event_histograms (resolution, bucket, metric, bin, events)
+            SELECT {MINUTE}, {minute}, 'confidence', confidence_bin(confidence), COUNT(*)
+            FROM ocr_events GROUP BY 2, 4""",
+        f"""INSERT INTO event_histograms (resolution, bucket, metric, bin, events)
+            SELECT {MINUTE}, {minute}, 'latency', latency_bin(processing_time), COUNT(*)
+            FROM ocr_events GROUP BY 2, 4""",
+    ]
+    for finer, coarser in ((MINUTE, HOUR), (HOUR, DAY)):
+        bucket = _bucket_sql("bucket", coarser, offset)
+        statements += [
+            f"""INSERT INTO event_rollups (resolution, bucket, roi_name, {', '.join(FIELDS)})
+                SELECT {coarser}, {bucket}, roi_name, {_SUMS}
+                FROM event_rollups WHERE resolution = {finer} GROUP BY 2, 3""",
+            f"""INSERT INTO event_histograms (resolution, bucket, metric, bin, events)
+                SELECT {coarser}, {bucket}, metric, bin, SUM(events)
+                FROM event_histograms WHERE resolution = {finer} GROUP BY 2, 3, 4""",
+        ]
+    return statements
+
+
+def confidence_bin(confidence: float) -> int:
+    return min(CONFIDENCE_BINS - 1, max(0, math.ceil(float(confidence) / CONFIDENCE_BIN_WIDTH) - 1))
+
+
+def latency_bin(milliseconds: float) -> int:
+    return math.ceil(math.log(max(float(milliseconds), LATENCY_MIN_MS)) / _LOG_GAMMA)
+
+
+def latency_value(bin: int) -> float:
+    """칸의 대표값 (칸 경계 사이에서 상대 오차가 가장 작은 값)"""
+    return 2 * _GAMMA ** bin / (_GAMMA + 1)
+
+
+def register_functions(conn: sqlite3.Connection):
+    """backfill_sql()과 원본 자투리 집계에서 쓰는 칸 계산 함수를 연결에 등록합니다. (Python 쪽 집계와 같은 칸을 쓰도록)"""
+    conn.create_function("confidence_bin", 1, confidence_bin, deterministic=True)
+    conn.create_function("latency_bin", 1, latency_bin, deterministic=True)
+
+
+# === 집계 값 ===
+@dataclass
+class Totals:
+    """버킷 하나 (또는 여러 버킷을 더한 것)의 합계"""
+
+    events: int = 0
+    successes: int = 0
+    plc_sent: int = 0
+    confidence_sum: float = 0.0
+    processing_sum: float = 0.0
+    processing_max: float = 0.0
+
+    def add(self, success: bool, sent_to_plc: bool, confidence: float, processing_time: float):
+        self.events += 1
+        self.successes += int(success)
+        self.plc_sent += int(sent_to_plc)
+        self.confidence_sum += confidence
+        self.processing_sum += processing_time
+        self.processing_max = max(self.processing_max, processing_time)
+
+    def merge(self, other: "Totals"):
+        self.events += other.events
+        self.successes += other.successes
+        self.plc_sent += other.plc_sent
+        self.confidence_sum += other.confidence_sum
+        self.processing_sum += other.processing_sum
+        self.processing_max = max(self.processing_max, other.processing_max)
+
+    def values(self) -> tuple:
+        return (self.events, self.successes, self.plc_sent, self.confidence_sum, self.processing_sum, self.processing_max)
+
+    @property
+    def failures(self) -> int:
+        return self.events - self.successes
+
+    @property
+    def success_rate(self) -> float:
+        """인식 성공률 (%)"""
+        return round(self.successes / self.events * 100, 1) if self.events else 0.0
+
+    @property
+    def avg_confidence(self) -> float:
+        return round(self.confidence_sum / self.events, 1) if self.events else 0.0
+
+    @property
+    def avg_processing(self) -> float:
+        return round(self.processing_sum / self.events, 1) if self.events else 0.0
+
+
+def percentile(histogram: Counter, q: float) -> float:
+    """처리 시간 히스토그램의 q (0~1) 백분위 (ms)"""
+    total = sum(histogram.values())
+    if not total:
+        return 0.0
+    rank = max(1, math.ceil(q * total))
+    seen = 0
+    for bin in sorted(histogram):
+        seen += histogram[bin]
+        if seen >= rank:
+            return round(latency_value(bin), 1)
+    return round(latency_value(max(histogram)), 1)
+
+
+def confidence_counts(histogram: Counter, ranges=LOG_CONFIDENCE_RANGES) -> Dict[str, int]:
+    """신뢰도 히스토그램을 (이름, 최대 신뢰도) 구간별 개수로 묶습니다."""
+    counts = {name: 0 for name, _ in ranges}
+    for bin, events in histogram.items():
+        upper = (bin + 1) * CONFIDENCE_BIN_WIDTH
+        for name, limit in ranges:
+            if upper <= limit:
+                counts[name] += events
+                break
+    return counts
+
+
+# === 쓰기 (이벤트 기록과 같은 트랜잭션) ===
+def aggregate(rows: Iterable[tuple], resolutions=RESOLUTIONS,
+              offset: int = UTC_OFFSET) -> Tuple[Dict[tuple, Totals], Counter]:
+    """
+    (timestamp, roi_name, status, sent_to_plc, confidence, processing_time) 행들을 버킷별로 묶습니다.
+    ({(해상도, 버킷, ROI): Totals}, Counter({(해상도, 버킷, 지표, 칸): 개수}))
+    """
+    cells: Dict[tuple, Totals] = {}
+    histograms: Counter = Counter()
+    for timestamp, roi_name, status, sent_to_plc, confidence, processing_time in rows:
+        success = status == "success"
+        confidence_key, latency_key = confidence_bin(confidence), latency_bin(processing_time)
+        for resolution in resolutions:
+            bucket = bucket_of(timestamp, resolution, offset)
+            totals = cells.get((resolution, bucket, roi_name))
+            if totals is None:
+                totals = cells[(resolution, bucket, roi_name)] = Totals()
+            totals.add(success, sent_to_plc, confidence, processing_time)
+            histograms[(resolution, bucket, "confidence", confidence_key)] += 1
+            histograms[(resolution, bucket, "latency", latency_key)] += 1
+    return cells, histograms
+
+
+def apply(conn: sqlite3.Connection, rows: Iterable[tuple]):
+    """새 이벤트 행들을 분/시간/일 집계에 더합니다. 호출한 쪽의 트랜잭션 안에서 실행합니다."""
+    cells, histograms = aggregate(rows)
+    conn.executemany(ROLLUP_UPSERT, [key + totals.values() for key, totals in cells.items()])
+    conn.executemany(HISTOGRAM_UPSERT, [key + (events,) for key, events in histograms.items()])
+
+
+def prune(conn: sqlite3.Connection, now: Optional[float] = None):
+    """보관 기간이 지난 분 단위 집계를 지웁니다. (시간/일 단위는 계속 보관)"""
+    cutoff = (time.time() if now is None else now) - MINUTE_RETENTION
+    conn.execute("DELETE FROM event_rollups WHERE resolution = ? AND bucket < ?", (MINUTE, cutoff))
+    conn.execute("DELETE FROM event_histograms WHERE resolution = ? AND bucket < ?", (MINUTE, cutoff))
+
+
+def backfill(conn: sqlite3.Connection, offset: int = UTC_OFFSET):
+    for sql in backfill_sql(offset):
+        conn.execute(sql)
+    prune(conn)
+    conn.execute("INSERT OR REPLACE INTO rollup_settings (name, value) VALUES ('utc_offset', ?)", (offset,))
+
+
+def stored_offset(conn: sqlite3.Connection) -> Optional[int]:
+    """집계 버킷을 만들 때 쓴 UTC 오프셋 (초). 기록이 없으면 None"""
+    row = conn.execute("SELECT value FROM rollup_settings WHERE name = 'utc_offset'").fetchone()
+    return None if row is None else row[0]
+
+
+def rebuild(conn: sqlite3.Connection, offset: int = UTC_OFFSET):
+    """서버 시간대가 바뀐 경우: 집계를 지우고 새 오프셋으로 다시 채웁니다. 호출한 쪽의 트랜잭션 안에서 실행합니다."""
+    conn.execute("DELETE FROM event_rollups")
+    conn.execute("DELETE FROM event_histograms")
+    backfill(conn, offset)
+
+
+# === 조회 ===
+def plan(start: float, end: float, coarsest: int = DAY, minute_floor: Optional[float] = None,
+         offset: int = UTC_OFFSET) -> Tuple[List[Tuple[int, int, int]], List[Tuple[float, float]]]:
+    """
+    [start, end) 구간을 가능한 한 큰 버킷으로 덮습니다.
+    ([(해상도, 첫 버킷, 끝 버킷 (미포함))], [버킷으로 덮을 수 없는 원본 구간 (start, end)])
+    90일 구간도 일 버킷 90개 + 양 끝의 시간/분 버킷 몇십 개면 되고, 원본은 1분 미만 자투리만 읽습니다.
+    minute_floor 이전에는 분 단위 집계가 지워졌으므로 그 구간의 1시간 미만 자투리는 원본으로 계산합니다.
+    """
+    levels = [resolution for resolution in (DAY, HOUR, MINUTE) if resolution <= coarsest]
+    spans: List[Tuple[int, int, int]] = []
+    raw: List[Tuple[float, float]] = []
+
+    def cover(lo: float, hi: float, level: int):
+        if lo >= hi:
+            return
+        if level == len(levels):
+            raw.append((lo, hi))
+            return
+        resolution = levels[level]
+        first = math.ceil((lo + offset) / resolution) * resolution - offset
+        last = math.floor((hi + offset) / resolution) * resolution - offset
+        if resolution == MINUTE and minute_floor is not None:
+            first = max(first, math.ceil((minute_floor + offset) / MINUTE) * MINUTE - offset)
+        if first >= last:
+            cover(lo, hi, level + 1)
+            return
+        spans.append((resolution, first, last))
+        cover(lo, first, level + 1)
+        cover(last, hi, level + 1)
+
+    cover(start, end, 0)
+    return spans, raw
+
+
+@dataclass
+class RollupSummary:
+    """기간 집계 결과. group (DAY 또는 HOUR) 단위로 나눈 값도 함께 가집니다."""
+
+    start: float
+    end: float
+    group: int = DAY
+    totals: Totals = field(default_factory=Totals)
+    by_roi: Dict[str, Totals] = field(default_factory=dict)
+    by_group: Dict[int, Totals] = field(default_factory=dict)  # 그룹 시작 시각: 합계
+    histograms: Dict[str, Counter] = field(default_factory=dict)  # 지표: 기간 전체 히스토그램
+    group_histograms: Dict[Tuple[int, str], Counter] = field(default_factory=dict)  # (그룹, 지표): 히스토그램
+    buckets_read: int = 0
+    raw_rows: int = 0
+
+    def add(self, group: int, roi_name: str, totals: Totals):
+        self.totals.merge(totals)
+        for key, table in ((roi_name, self.by_roi), (group, self.by_group)):
+            if key not in table:
+                table[key] = Totals()
+            table[key].merge(totals)
+
+    def add_histogram(self, group: int, metric: str, bin: int, events: int):
+        for key, table in ((metric, self.histograms), ((group, metric), self.group_histograms)):
+            if key not in table:
+                table[key] = Counter()
+            table[key][bin] += events
+
+    def series(self) -> List[Tuple[int, Totals]]:
+        return sorted(self.by_group.items())
+
+    def percentile(self, q: float, group: Optional[int] = None) -> float:
+        histogram = self.histograms.get("latency") if group is None else self.group_histograms.get((group, "latency"))
+        return percentile(histogram or Counter(), q)
+
+    def confidence_counts(self, ranges=LOG_CONFIDENCE_RANGES) -> Dict[str, int]:
+        return confidence_counts(self.histograms.get("confidence") or Counter(), ranges)
+
+
+def summarize(conn: sqlite3.Connection, start: float, end: float, group: int = DAY,
+              histograms: bool = True, now: Optional[float] = None, offset: int = UTC_OFFSET) -> RollupSummary:
+    """
+    [start, end) 구간의 집계. 원본 이벤트 대신 plan()이 고른 버킷들만 더합니다.
+    group=HOUR면 시간대별 분포를 위해 일 버킷 대신 시간 버킷을 씁니다. (90일이면 시간 버킷 2,160개)
+    histograms=False면 신뢰도/처리 시간 히스토그램은 읽지 않습니다.
+    offset은 집계를 만들 때 쓴 값이어야 합니다. (event_store.connect가 맞춰 둠)
+    """
+    now = time.time() if now is None else now
+    spans, raw = plan(start, end, group, now - MINUTE_RETENTION, offset)
+    bucket_group, raw_group = _bucket_sql("bucket", group, offset), _bucket_sql("timestamp", group, offset)
+    summary = RollupSummary(start, end, group)
+    # 그룹 (일/시간) 단위 합계는 SQLite에서 미리 더해 Python으로 넘기는 행 수를 줄임
+    for resolution, first, last in spans:
+        rows = conn.execute(
+            f"SELECT {bucket_group}, roi_name, COUNT(*), {_SUMS} FROM event_rollups "
+            "WHERE resolution = ? AND bucket >= ? AND bucket < ? GROUP BY 1, 2", (resolution, first, last))
+        for row in rows:
+            summary.add(row[0], row[1], Totals(*row[3:]))
+            summary.buckets_read += row[2]
+        if histograms:
+            rows = conn.execute(
+                f"SELECT {bucket_group}, metric, bin, SUM(events) FROM event_histograms "
+                "WHERE resolution = ? AND bucket >= ? AND bucket < ? GROUP BY 1, 2, 3", (resolution, first, last))
+            for row in rows:
+                summary.add_histogram(*row)
+    # 버킷으로 덮지 못한 자투리는 원본 이벤트를 같은 방식으로 묶음 (칸 계산은 register_functions의 함수)
+    for lo, hi in raw:
+        rows = conn.execute(
+            f"SELECT {raw_group}, roi_name, COUNT(*), COUNT(*), "
+            "SUM(status = 'success'), SUM(sent_to_plc), SUM(confidence), SUM(processing_time), MAX(processing_time) "
+            "FROM ocr_events WHERE timestamp >= ? AND timestamp < ? GROUP BY 1, 2", (lo, hi))
+        for row in rows:
+            summary.add(row[0], row[1], Totals(*row[3:]))
+            summary.raw_rows += row[2]
+        if histograms:
+            for metric, expression in (("confidence", "confidence_bin(confidence)"),
+                                       ("latency", "latency_bin(processing_time)")):
+                rows = conn.execute(
+                    f"SELECT {raw_group}, ?, {expression}, COUNT(*) "
+                    "FROM ocr_events WHERE timestamp >= ? AND timestamp < ? GROUP BY 1, 3", (metric, lo, hi))
+                for row in rows:
+                    summary.add_histogram(*row)
+    return summary
@@ -0,0 +1,265 @@
+import time
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from pipeline.encoder import LatencyStats
+from pipeline.roi import DETECT, RoiSet
+
+MOTION_WIDTH = 160  # 움직임 판단용 축소 프레임 가로 크기
+MAX_FPS_TOLERANCE = 0.005  # maxFps 간격 판정 여유 (초)
+
+
+def motion_polygons(config: dict) -> List[np.ndarray]:
+    """
+    움직임 감시 영역으로 쓸 ROI 다각형 목록 (정규화 좌표)을 반환합니다.
+    활성화되어 있고 트럭 감지(actions.detectTrucks)가 켜진 ROI만 사용합니다.
+    """
+    roi_set = RoiSet.from_config(config.get("rois", []) or [])
+    return [roi_set.polygons[i] for i in np.flatnonzero(roi_set.actions[:, DETECT])]
+
+
+# === 움직임 게이트 ===
+class MotionGate:
+    """
+    축소한 흑백 프레임의 이전 프레임 대비 차이로 움직임을 판단합니다.
+    ROI 다각형이 있으면 그 내부 픽셀만 봅니다. (없으면 화면 전체)
+    """
+
+    def __init__(self, polygons: Optional[List[np.ndarray]] = None, threshold: int = 25,
+                 min_area_ratio: float = 0.002, width: int = MOTION_WIDTH):
+        self.polygons = polygons or []
+        self.threshold = int(threshold)
+        self.min_area_ratio = float(min_area_ratio)
+        self.width = int(width)
+        self._size = None
+        self._mask = None
+        self._mask_area = 0
+        self._previous = None
+        self._diff = None
+        self.last_changed = 0  # 직전 판단에서 바뀐 픽셀 수
+
+    def _prepare(self, shape):
+        height, width = shape[:2]
+        small_h = max(1, round(height * self.width / width))
+        self._size = (self.width, small_h)
+        self._previous = None
+        if self.polygons:
+            mask = np.zeros((small_h, self.width), dtype=np.uint8)
+            scale = np.array([self.width, small_h], dtype=np.float32)
+            cv2.fillPoly(mask, [np.round(poly * scale).astype(np.int32) for poly in self.polygons], 255)
+            self._mask = mask
+            self._mask_area = int(cv2.countNonZero(mask))
+        else:
+            self._mask = None
+            self._mask_area = self.width * small_h
+        self._diff = np.empty((small_h, self.width), dtype=np.uint8)
+
+    def set_polygons(self, polygons: List[np.ndarray]):
+        self.polygons = polygons or []
+        self._size = None
+
+    def update(self, image: np.ndarray) -> bool:
+        """프레임을 반영하고 움직임이 있으면 True를 반환합니다. 첫 프레임은 움직임으로 봅니다."""
+        # 처음이거나 해상도가 바뀌면 (재연결 등) 마스크를 다시 만듦
+        if self._size is None or self._expected_height(image.shape) != self._size[1]:
+            self._prepare(image.shape)
+
+        # 원본 전체를 INTER_AREA로 줄이면 1080p에서 수 ms가 걸리므로, 2배 크기로
+        # 최근접 샘플링한 뒤 2×2 평균으로 줄임 (0.1ms 수준)
+        width, height = self._size
+        small = cv2.resize(image, (width * 2, height * 2), interpolation=cv2.INTER_NEAREST)
+        small = cv2.resize(small, self._size, interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        gray = cv2.GaussianBlur(gray, (5, 5), 0)
+
+        previous, self._previous = self._previous, gray
+        if previous is None:
+            self.last_changed = self._mask_area
+            return True
+
+        cv2.absdiff(gray, previous, dst=self._diff)
+        cv2.threshold(self._diff, self.threshold, 255, cv2.THRESH_BINARY, dst=self._diff)
+        if self._mask is not None:
+            cv2.bitwise_and(self._diff, self._mask, dst=self._diff)
+        self.last_changed = int(cv2.countNonZero(self._diff))
+        return self.last_changed >= max(1, self.min_area_ratio * self._mask_area)
+
+    def _expected_height(self, shape) -> int:
+        return max(1, round(shape[0] * self.width / shape[1]))
+
+
+# === 카메라별 추론 일정 ===
+class CameraSchedule:
+    def __init__(self, scheduler: "InferenceScheduler"):
+        self.scheduler = scheduler
+        self.gate = MotionGate(scheduler.polygons, scheduler.motion_threshold, scheduler.motion_min_area)
+        self.last_seq = 0
+        self.last_infer = float("-inf")
+        self.active_until = float("-inf")
+        self.frames_since_infer = 0
+
+        # 통계
+        self.captured = 0
+        self.examined = 0
+        self.inferred = 0
+        self.skipped = {"maxFps": 0, "skipRate": 0, "noMotion": 0}
+        self.motion_events = 0
+        self.gate_latency = LatencyStats()
+
+    def active(self, timestamp: float) -> bool:
+        return timestamp <= self.active_until
+
+    def decide(self, frame) -> bool:
+        scheduler = self.scheduler
+        if self.last_seq:
+            self.captured += max(1, frame.seq - self.last_seq)
+        else:
+            self.captured += 1
+        self.last_seq = frame.seq
+        self.examined += 1
+        timestamp = frame.timestamp
+
+        # 1) 최대 추론 fps 제한
+        if scheduler.max_fps > 0 and timestamp - self.last_infer < 1.0 / scheduler.max_fps - MAX_FPS_TOLERANCE:
+            self.skipped["maxFps"] += 1
+            return False
+
+        # 2) 움직임 게이트: ROI 안에 움직임이 없고 객체도 없으면 추론 생략
+        onset = False
+        if scheduler.motion_gating:
+            was_active = self.active(timestamp)
+            started = time.perf_counter()
+            moving = self.gate.update(frame.image)
+            self.gate_latency.record((time.perf_counter() - started) * 1000)
+            if moving:
+                self.active_until = timestamp + scheduler.hold_seconds
+                if not was_active:
+                    onset = True
+                    self.motion_events += 1
+            elif not was_active:
+                idle_due = scheduler.idle_interval > 0 and timestamp - self.last_infer >= scheduler.idle_interval
+                if not idle_due:
+                    self.skipped["noMotion"] += 1
+                    return False
+
+        # 3) 고정 프레임 건너뛰기 (움직임이 막 시작된 프레임은 바로 추론)
+        self.frames_since_infer += 1
+        if scheduler.skip_rate > 1 and not onset and self.frames_since_infer < scheduler.skip_rate:
+            self.skipped["skipRate"] += 1
+            return False
+
+        self.frames_since_infer = 0
+        self.last_infer = timestamp
+        self.inferred += 1
+        return True
+
+    def stats(self, now: float) -> dict:
+        return {
+            "captured": self.captured,
+            "examined": self.examined,
+            "inferred": self.inferred,
+            "inferRatio": round(self.inferred / self.captured, 3) if self.captured else 0.0,
+            "skipped": dict(self.skipped),
+            "motionActive": self.active(now),
+            "motionEvents": self.motion_events,
+            "motionPixels": self.gate.last_changed,
+            "gate": self.gate_latency.summary(),
+        }
+
+
+# === 추론 스케줄러 ===
+class InferenceScheduler:
+    """
+    카메라별로 어떤 프레임을 감지기에 보낼지 결정합니다.
+
+    - system.maxFps: 카메라당 최대 추론 fps
+    - system.enableFrameSkipping / frameSkipRate: N프레임 중 1프레임만 추론
+    - 움직임 게이트 (system.enableMotionGating, 기본 켜짐): 감지 ROI 안에 움직임이
+      없으면 추론을 생략합니다. 움직임이 시작된 프레임은 건너뛰기 없이 바로 추론하고,
+      움직임이 멈춰도 motionHoldSeconds 동안, 그리고 감지된 객체가 있는 동안은
+      계속 추론합니다. (정차한 트럭도 계속 추적)
+      idleInferenceInterval초마다 한 번은 움직임과 무관하게 추론합니다. (0이면 끔)
+    """
+
+    def __init__(
+        self,
+        max_fps: float = 0.0,
+        skip_rate: int = 1,
+        motion_gating: bool = True,
+        polygons: Optional[List[np.ndarray]] = None,
+        motion_threshold: int = 25,
+        motion_min_area: float = 0.002,
+        hold_seconds: float = 3.0,
+        idle_interval: float = 10.0,
+    ):
+        self.max_fps = max(0.0, float(max_fps))
+        self.skip_rate = max(1, int(skip_rate))
+        self.motion_gating = bool(motion_gating)
+        self.polygons = polygons or []
+        self.motion_threshold = motion_threshold
+        self.motion_min_area = motion_min_area
+        self.hold_seconds = float(hold_seconds)
+        self.idle_interval = float(idle_interval)
+        self.cameras: Dict[str, CameraSchedule] = {}
+
+    @classmethod
+    def from_config(cls, config: dict) -> "InferenceScheduler":
+        system = config.get("system", {})
+        skip_rate = int(system.get("frameSkipRate", 1)) if system.get("enableFrameSkipping", False) else 1
+        return cls(
+            max_fps=float(system.get("maxFps", 0) or 0),
+            skip_rate=skip_rate,
+            motion_gating=bool(system.get("enableMotionGating", True)),
+            polygons=motion_polygons(config),
+            motion_threshold=int(system.get("motionThreshold", 25)),
+            motion_min_area=float(system.get("motionMinArea", 0.002)),
+            hold_seconds=float(system.get("motionHoldSeconds", 3.0)),
+            idle_interval=float(system.get("idleInferenceInterval", 10.0)),
+        )
+
+    def camera(self, camera_id: str) -> CameraSchedule:
+        schedule = self.cameras.get(camera_id)
+        if schedule is None:
+            schedule = self.cameras[camera_id] = CameraSchedule(self)
+        return schedule
+
+    def set_polygons(self, polygons: List[np.ndarray]):
+        """ROI가 바뀌면 카메라별 움직임 마스크를 다시 만들도록 합니다."""
+        self.polygons = polygons or []
+        for schedule in self.cameras.values():
+            schedule.gate.set_polygons(self.polygons)
+
+    def configure(self, other: "InferenceScheduler"):
+        """새 설정으로 만든 스케줄러의 값을 가져옵니다. 카메라별 상태 (움직임 기준 프레임 등)는 유지"""
+        self.max_fps = other.max_fps
+        self.skip_rate = other.skip_rate
+        self.motion_gating = other.motion_gating
+        self.motion_threshold = other.motion_threshold
+        self.motion_min_area = other.motion_min_area
+        self.hold_seconds = other.hold_seconds
+        self.idle_interval = other.idle_interval
+        for schedule in self.cameras.values():
+            schedule.gate.threshold = int(other.motion_threshold)
+            schedule.gate.min_area_ratio = float(other.motion_min_area)
+        self.set_polygons(other.polygons)
+
+    def should_infer(self, camera_id: str, frame) -> bool:
+        return self.camera(camera_id).decide(frame)
+
+    def on_result(self, camera_id: str, detections: int, timestamp: float):
+        """감지된 객체가 있으면 움직임이 없어도 추론을 이어갑니다."""
+        if detections > 0:
+            schedule = self.camera(camera_id)
+            schedule.active_until = max(schedule.active_until, timestamp + self.hold_seconds)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "maxFps": self.max_fps,
+            "skipRate": self.skip_rate,
+            "motionGating": self.motion_gating,
+            "motionRois": len(self.polygons),
+            "cameras": {camera_id: schedule.stats(now) for camera_id, schedule in self.cameras.items()},
+        }
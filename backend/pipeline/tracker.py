@@ -0,0 +1,518 @@
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from pipeline.postprocess import box_iou
+from pipeline.roi import DETECT, RoiEngine
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:  # scipy가 없으면 NumPy 헝가리안 알고리즘 사용
+    linear_sum_assignment = None
+
+INVALID_COST = 1e6
+LOW_SCORE = 0.1  # ByteTrack 2차 매칭에 쓰는 저신뢰 감지 하한
+SECOND_STAGE_IOU = 0.5  # 2차 매칭 IoU 임계값
+MIN_HITS = 3  # 트랙을 확정하기까지 필요한 매칭 횟수
+
+# 칼만 필터 잡음 (박스 크기에 비례, ByteTrack과 같은 값)
+STD_POSITION = 1.0 / 20
+STD_VELOCITY = 1.0 / 160
+
+DIRECTIONS = (None, "right", "left", "down", "up")
+
+
+# === 할당 ===
+def _hungarian(cost: np.ndarray):
+    """행 수 ≤ 열 수인 비용 행렬의 최소 비용 할당 (포텐셜 기반 O(n²m), 열 방향 벡터화)"""
+    n, m = cost.shape
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    p = np.zeros(m + 1, dtype=np.int64)  # p[j]: 열 j에 할당된 행 (1부터, 0은 미할당)
+    way = np.zeros(m + 1, dtype=np.int64)
+
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            free = ~used[1:]
+            reduced = cost[i0 - 1] - u[i0] - v[1:]
+            better = free & (reduced < minv[1:])
+            minv[1:][better] = reduced[better]
+            way[1:][better] = j0
+            candidates = np.where(free, minv[1:], np.inf)
+            j1 = int(np.argmin(candidates)) + 1
+            delta = candidates[j1 - 1]
+            used_cols = np.flatnonzero(used)
+            u[p[used_cols]] += delta
+            v[used_cols] -= delta
+            minv[1:][free] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+
+    rows = p[1:] - 1
+    cols = np.flatnonzero(rows >= 0)
+    rows = rows[cols]
+    order = np.argsort(rows)
+    return rows[order], cols[order]
+
+
+def linear_assignment(cost: np.ndarray, max_cost: float):
+    """
+    비용 행렬에서 최소 비용 매칭을 구하고 max_cost 이상인 쌍은 버립니다.
+    (매칭된 행, 매칭된 열, 미매칭 행, 미매칭 열)을 반환합니다.
+    """
+    rows_n, cols_n = cost.shape
+    if rows_n == 0 or cols_n == 0:
+        return (np.empty(0, np.int64), np.empty(0, np.int64), np.arange(rows_n), np.arange(cols_n))
+
+    if linear_sum_assignment is not None:
+        rows, cols = linear_sum_assignment(cost)
+    elif rows_n <= cols_n:
+        rows, cols = _hungarian(cost)
+    else:
+        cols, rows = _hungarian(cost.T)
+
+    valid = cost[rows, cols] < max_cost
+    rows, cols = rows[valid], cols[valid]
+    unmatched_rows = np.setdiff1d(np.arange(rows_n), rows)
+    unmatched_cols = np.setdiff1d(np.arange(cols_n), cols)
+    return rows, cols, unmatched_rows, unmatched_cols
+
+
+# === 좌표 변환 ===
+def xyxy_to_cxcywh(boxes: np.ndarray) -> np.ndarray:
+    out = np.empty_like(boxes, dtype=np.float64)
+    out[:, 2:] = boxes[:, 2:] - boxes[:, :2]
+    out[:, :2] = boxes[:, :2] + out[:, 2:] * 0.5
+    return out
+
+
+def cxcywh_to_xyxy(state: np.ndarray) -> np.ndarray:
+    half = state[:, 2:4] * 0.5
+    return np.concatenate([state[:, :2] - half, state[:, :2] + half], axis=1)
+
+
+# === 설정 ===
+def _ratio(value, default: float) -> float:
+    """설정 화면은 백분율(1~100), config.toml은 비율(0~1)을 쓰므로 둘 다 허용"""
+    value = float(value if value is not None else default)
+    return value / 100.0 if value > 1.0 else value
+
+
+@dataclass
+class TrackerSettings:
+    algorithm: str = "sort"  # sort | bytetrack (deepsort/custom은 sort로 동작)
+    max_disappeared: int = 30  # 이 횟수만큼 연속으로 매칭되지 않으면 트랙 삭제
+    max_distance: float = 50.0  # IoU가 낮아도 중심 거리가 이 값(픽셀) 이하이면 매칭 후보
+    min_confidence: float = 0.5
+    iou_threshold: float = 0.3
+    kalman: bool = True
+    direction: bool = True
+    direction_threshold: float = 0.7  # 1 초과면 픽셀, 이하면 박스 대각선 대비 비율
+    size_filter: bool = True
+    min_width: float = 0
+    min_height: float = 0
+    max_width: float = 0  # 0이면 제한 없음
+    max_height: float = 0
+    mode: str = "all"  # all | roi_only | high_confidence
+    rois: Optional[RoiEngine] = None  # roi_only: 트럭 감지(detectTrucks) ROI 안의 감지만 추적
+
+    @classmethod
+    def from_config(cls, tracking: dict, rois=None) -> "TrackerSettings":
+        """rois는 config의 ROI 목록 또는 공유할 RoiEngine"""
+        algorithm = str(tracking.get("algorithm", "sort")).lower()
+        if algorithm not in ("sort", "bytetrack"):
+            print(f"⚠️ 추적 알고리즘 '{algorithm}'은(는) 외형 특징 모델이 없어 SORT로 동작합니다")
+            algorithm = "sort"
+        mode = str(tracking.get("trackingMode", "all"))
+        return cls(
+            algorithm=algorithm,
+            max_disappeared=max(1, int(tracking.get("maxDisappeared", 30))),
+            max_distance=float(tracking.get("maxDistance", 50)),
+            min_confidence=_ratio(tracking.get("minConfidence"), 0.5),
+            iou_threshold=_ratio(tracking.get("iouThreshold"), 0.3),
+            kalman=bool(tracking.get("enableKalmanFilter", True)),
+            direction=bool(tracking.get("enableDirectionDetection", True)),
+            direction_threshold=float(tracking.get("directionThreshold", 0.7)),
+            size_filter=bool(tracking.get("enableSizeFiltering", False)),
+            min_width=float(tracking.get("minWidth", 0)),
+            min_height=float(tracking.get("minHeight", 0)),
+            max_width=float(tracking.get("maxWidth", 0)),
+            max_height=float(tracking.get("maxHeight", 0)),
+            mode=mode if mode in ("roi_only", "high_confidence") else "all",
+            rois=rois if isinstance(rois, RoiEngine) else RoiEngine(rois or []),
+        )
+
+
+# === 추적 결과 ===
+@dataclass
+class Tracks:
+    ids: np.ndarray
+    boxes: np.ndarray  # (N, 4) xyxy
+    scores: np.ndarray
+    class_ids: np.ndarray
+    velocities: np.ndarray  # (N, 2) 업데이트당 중심 이동 (픽셀)
+    directions: List[Optional[str]]
+    hits: np.ndarray
+    first_seen: np.ndarray  # 최초 감지 시각 (wall time)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def to_meta(self, shape, class_names: Sequence[str] = ()) -> List[dict]:
+        """/ws/meta 형식 (정규화 좌표)에 트랙 ID와 이동 방향을 더해 반환합니다."""
+        height, width = shape[:2]
+        items = []
+        for index, (x1, y1, x2, y2) in enumerate(self.boxes.tolist()):
+            class_id = int(self.class_ids[index])
+            items.append({
+                "x": round(x1 / width, 4),
+                "y": round(y1 / height, 4),
+                "width": round((x2 - x1) / width, 4),
+                "height": round((y2 - y1) / height, 4),
+                "confidence": round(float(self.scores[index]), 3),
+                "label": class_names[class_id] if class_id < len(class_names) else f"class_{class_id}",
+                "classId": class_id,
+                "trackId": int(self.ids[index]),
+                "direction": self.directions[index],
+                "number": None,
+            })
+        return items
+
+
+# === 다중 객체 추적기 ===
+class Tracker:
+    """
+    SORT / ByteTrack 방식의 다중 객체 추적기.
+
+    모든 트랙의 칼만 필터 상태 (cx, cy, w, h, vx, vy, vw, vh)와 공분산을
+    (N, 8), (N, 8, 8) 배열로 보관해 예측과 보정을 한 번에 계산합니다.
+    예측 박스와 감지 박스의 IoU(및 중심 거리)로 비용 행렬을 만들어
+    헝가리안 알고리즘으로 매칭합니다. bytetrack은 매칭되지 않은 트랙을
+    저신뢰 감지와 한 번 더 매칭합니다.
+    """
+
+    def __init__(self, settings: Optional[TrackerSettings] = None, camera_id: Optional[str] = None):
+        self.settings = settings or TrackerSettings()
+        self.camera_id = camera_id
+        self.next_id = 1
+        self.frame_count = 0
+        self._allocate(0)
+
+        # 통계
+        self.tracks_created = 0
+        self.tracks_confirmed = 0
+        self.update_count = 0
+        self.update_seconds = 0.0
+
+    def _allocate(self, count: int):
+        self.ids = np.zeros(count, dtype=np.int64)
+        self.x = np.zeros((count, 8))
+        self.P = np.zeros((count, 8, 8))
+        self.scores = np.zeros(count)
+        self.class_ids = np.zeros(count, dtype=np.int64)
+        self.hits = np.zeros(count, dtype=np.int64)
+        self.misses = np.zeros(count, dtype=np.int64)
+        self.origin = np.zeros((count, 2))  # 방향 판단 기준 위치
+        self.direction = np.zeros(count, dtype=np.int8)
+        self.first_seen = np.zeros(count)
+        self.last_velocity = np.zeros((count, 2))
+
+    def __len__(self):
+        return len(self.ids)
+
+    # --- 칼만 필터 ---
+    _F = np.eye(8)
+    _F[:4, 4:] = np.eye(4)
+    _DIAG = np.arange(8)
+
+    @staticmethod
+    def _noise(wh: np.ndarray, position: float, velocity: float) -> np.ndarray:
+        """상태 8개 항목의 표준편차 (위치 항목은 position, 속도 항목은 velocity × 박스 크기)"""
+        size = np.tile(wh, 2)
+        return np.concatenate([position * size, velocity * size], axis=1)
+
+    def _predict(self):
+        if not len(self.ids):
+            return
+        if not self.settings.kalman:
+            return
+        self.x = self.x @ self._F.T
+        self.P = self._F @ self.P @ self._F.T
+        std = self._noise(self.x[:, 2:4], STD_POSITION, STD_VELOCITY)
+        self.P[:, self._DIAG, self._DIAG] += std ** 2
+        # 폭/높이가 음수가 되지 않도록
+        np.maximum(self.x[:, 2:4], 1.0, out=self.x[:, 2:4])
+
+    def _correct(self, tracks: np.ndarray, measurements: np.ndarray):
+        previous = self.x[tracks, :2].copy()
+        if not self.settings.kalman:
+            self.x[tracks, :4] = measurements
+        else:
+            x = self.x[tracks]
+            P = self.P[tracks]
+            std = STD_POSITION * np.concatenate([x[:, 2:4], x[:, 2:4]], axis=1)
+            S = P[:, :4, :4].copy()
+            S[:, np.arange(4), np.arange(4)] += std ** 2
+            # K = P Hᵀ S⁻¹ (S, P 대칭이므로 Kᵀ = S⁻¹ H P)
+            K = np.linalg.solve(S, P[:, :4, :]).transpose(0, 2, 1)
+            innovation = measurements - x[:, :4]
+            self.x[tracks] = x + (K @ innovation[..., None])[..., 0]
+            self.P[tracks] = P - K @ P[:, :4, :]
+        self.last_velocity[tracks] = self.x[tracks, :2] - previous
+
+    def _spawn(self, measurements: np.ndarray, scores: np.ndarray, class_ids: np.ndarray, timestamp: float):
+        count = len(measurements)
+        if not count:
+            return
+        x = np.zeros((count, 8))
+        x[:, :4] = measurements
+        std = self._noise(measurements[:, 2:4], 2 * STD_POSITION, 10 * STD_VELOCITY)
+        P = np.zeros((count, 8, 8))
+        P[:, self._DIAG, self._DIAG] = std ** 2
+
+        ids = np.arange(self.next_id, self.next_id + count)
+        self.next_id += count
+        self.tracks_created += count
+        self.ids = np.concatenate([self.ids, ids])
+        self.x = np.concatenate([self.x, x])
+        self.P = np.concatenate([self.P, P])
+        self.scores = np.concatenate([self.scores, scores])
+        self.class_ids = np.concatenate([self.class_ids, class_ids])
+        self.hits = np.concatenate([self.hits, np.ones(count, dtype=np.int64)])
+        self.misses = np.concatenate([self.misses, np.zeros(count, dtype=np.int64)])
+        self.origin = np.concatenate([self.origin, measurements[:, :2]])
+        self.direction = np.concatenate([self.direction, np.zeros(count, dtype=np.int8)])
+        self.first_seen = np.concatenate([self.first_seen, np.full(count, timestamp)])
+        self.last_velocity = np.concatenate([self.last_velocity, np.zeros((count, 2))])
+
+    def _keep(self, mask: np.ndarray):
+        for name in ("ids", "x", "P", "scores", "class_ids", "hits", "misses", "origin",
+                     "direction", "first_seen", "last_velocity"):
+            setattr(self, name, getattr(self, name)[mask])
+
+    # --- 매칭 ---
+    def _cost(self, tracks: np.ndarray, boxes: np.ndarray, iou_threshold: float, use_distance: bool) -> np.ndarray:
+        predicted = cxcywh_to_xyxy(self.x[tracks, :4])
+        iou = box_iou(predicted, boxes)
+        cost = np.where(iou >= iou_threshold, 1.0 - iou, INVALID_COST)
+        if use_distance and self.settings.max_distance > 0:
+            # 저프레임(움직임 게이트, 프레임 건너뛰기)에서는 IoU가 0일 수 있어 중심 거리로 보조
+            centers = (boxes[:, :2] + boxes[:, 2:]) * 0.5
+            distance = np.linalg.norm(self.x[tracks, None, :2] - centers[None], axis=2)
+            near = (cost >= INVALID_COST) & (distance <= self.settings.max_distance)
+            cost = np.where(near, 1.0 + distance / self.settings.max_distance, cost)
+        return cost
+
+    def _filter(self, boxes: np.ndarray, scores: np.ndarray, shape) -> np.ndarray:
+        settings = self.settings
+        keep = np.ones(len(boxes), dtype=bool)
+        if settings.size_filter:
+            w = boxes[:, 2] - boxes[:, 0]
+            h = boxes[:, 3] - boxes[:, 1]
+            keep &= (w >= settings.min_width) & (h >= settings.min_height)
+            if settings.max_width > 0:
+                keep &= w <= settings.max_width
+            if settings.max_height > 0:
+                keep &= h <= settings.max_height
+        if settings.mode == "roi_only" and settings.rois is not None and shape is not None:
+            hits = settings.rois.evaluate(boxes, shape, self.camera_id)
+            if hits is not None:
+                keep &= hits.allowed(DETECT)
+        low = LOW_SCORE if settings.algorithm == "bytetrack" and settings.mode != "high_confidence" else settings.min_confidence
+        keep &= scores >= low
+        return keep
+
+    def _update_directions(self):
+        if not self.settings.direction or not len(self.ids):
+            return
+        displacement = self.x[:, :2] - self.origin
+        distance = np.linalg.norm(displacement, axis=1)
+        threshold = self.settings.direction_threshold
+        if threshold <= 1.0:
+            threshold = threshold * np.linalg.norm(self.x[:, 2:4], axis=1)
+        moved = distance >= threshold
+        horizontal = np.abs(displacement[:, 0]) >= np.abs(displacement[:, 1])
+        code = np.where(horizontal,
+                        np.where(displacement[:, 0] >= 0, 1, 2),
+                        np.where(displacement[:, 1] >= 0, 3, 4)).astype(np.int8)
+        self.direction = np.where(moved, code, self.direction)
+
+    def update(self, boxes: np.ndarray, scores: np.ndarray, class_ids: np.ndarray,
+               timestamp: Optional[float] = None, shape=None) -> Tracks:
+        """
+        한 프레임의 감지 결과 (xyxy 박스, 점수, 클래스 ID)로 트랙을 갱신하고
+        이번 프레임에 매칭된 확정 트랙을 반환합니다.
+        """
+        started = time.perf_counter()
+        timestamp = time.time() if timestamp is None else timestamp
+        settings = self.settings
+        self.frame_count += 1
+
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        scores = np.asarray(scores, dtype=np.float64).reshape(-1)
+        class_ids = np.asarray(class_ids, dtype=np.int64).reshape(-1)
+        keep = self._filter(boxes, scores, shape)
+        boxes, scores, class_ids = boxes[keep], scores[keep], class_ids[keep]
+
+        self._predict()
+
+        high = scores >= settings.min_confidence
+        high_idx = np.flatnonzero(high)
+        low_idx = np.flatnonzero(~high)
+        all_tracks = np.arange(len(self.ids))
+        matched = np.zeros(len(self.ids), dtype=bool)
+
+        # 1차: 고신뢰 감지 ↔ 전체 트랙
+        cost = self._cost(all_tracks, boxes[high_idx], settings.iou_threshold, use_distance=True)
+        rows, cols, unmatched_tracks, unmatched_high = linear_assignment(cost, INVALID_COST)
+        self._assign(all_tracks[rows], high_idx[cols], boxes, scores, class_ids)
+        matched[all_tracks[rows]] = True
+
+        # 2차 (ByteTrack): 남은 트랙 ↔ 저신뢰 감지 (가려짐 등으로 점수가 떨어진 객체 유지)
+        if len(low_idx) and len(unmatched_tracks):
+            remaining = all_tracks[unmatched_tracks]
+            cost = self._cost(remaining, boxes[low_idx], SECOND_STAGE_IOU, use_distance=False)
+            rows, cols, _, _ = linear_assignment(cost, INVALID_COST)
+            self._assign(remaining[rows], low_idx[cols], boxes, scores, class_ids)
+            matched[remaining[rows]] = True
+
+        self.misses[~matched] += 1
+        self.misses[matched] = 0
+        self._keep(self.misses <= settings.max_disappeared)
+        updated = self.misses == 0
+
+        new_idx = high_idx[unmatched_high]
+        self._spawn(xyxy_to_cxcywh(boxes[new_idx]), scores[new_idx], class_ids[new_idx], timestamp)
+        updated = np.concatenate([updated, np.ones(len(new_idx), dtype=bool)])
+
+        self._update_directions()
+
+        # 확정 트랙 (처음 몇 프레임은 바로 출력)
+        confirmed = (self.hits >= MIN_HITS) | (self.frame_count <= MIN_HITS)
+        visible = np.flatnonzero(updated & confirmed)
+
+        self.update_count += 1
+        self.update_seconds += time.perf_counter() - started
+        return Tracks(
+            ids=self.ids[visible],
+            boxes=cxcywh_to_xyxy(self.x[visible, :4]),
+            scores=self.scores[visible],
+            class_ids=self.class_ids[visible],
+            velocities=self.last_velocity[visible],
+            directions=[DIRECTIONS[code] for code in self.direction[visible]],
+            hits=self.hits[visible],
+            first_seen=self.first_seen[visible],
+        )
+
+    def _assign(self, tracks: np.ndarray, detections: np.ndarray, boxes, scores, class_ids):
+        if not len(tracks):
+            return
+        self._correct(tracks, xyxy_to_cxcywh(boxes[detections]))
+        self.scores[tracks] = scores[detections]
+        self.class_ids[tracks] = class_ids[detections]
+        self.hits[tracks] += 1
+        self.tracks_confirmed += int(np.count_nonzero(self.hits[tracks] == MIN_HITS))
+
+    def stats(self) -> dict:
+        return {
+            "algorithm": self.settings.algorithm,
+            "activeTracks": len(self.ids),
+            "tracksCreated": self.tracks_created,
+            "tracksConfirmed": self.tracks_confirmed,
+            "updates": self.update_count,
+            "avgUpdateUs": round(self.update_seconds / self.update_count * 1e6, 1) if self.update_count else 0.0,
+            "assignment": "scipy" if linear_sum_assignment is not None else "numpy",
+        }
+
+
+# === 합성 시나리오 테스트 ===
+def run_tracking_test(tracking: dict, rois: Optional[list] = None, frames: int = 150, trucks: int = 4,
+                      miss_rate: float = 0.15, false_positives: float = 0.3, seed: int = 0,
+                      shape=(720, 1280)) -> dict:
+    """
+    화면을 가로지르는 트럭을 합성해 (위치 잡음, 감지 누락, 오검출 포함) 추적기를 실행하고
+    트랙 수, ID 전환 수, 방향 판정, 프레임당 처리 시간을 반환합니다.
+    """
+    rng = np.random.default_rng(seed)
+    settings = TrackerSettings.from_config(tracking, rois)
+    # 합성 트럭은 ROI와 무관하게 움직이므로 roi_only 필터는 적용하지 않음
+    settings.mode = "all" if settings.mode == "roi_only" else settings.mode
+    tracker = Tracker(settings)
+    height, width = shape
+
+    # 트럭: 왼쪽→오른쪽 또는 오른쪽→왼쪽, 크기와 속도는 무작위
+    size = rng.uniform(0.2, 0.3, (trucks, 2)) * np.array([width, height])
+    size = np.clip(size, settings.min_width + 1, None)
+    if settings.max_width > 0:
+        size[:, 0] = np.minimum(size[:, 0], settings.max_width - 1)
+    if settings.max_height > 0:
+        size[:, 1] = np.minimum(size[:, 1], settings.max_height - 1)
+    rightward = rng.random(trucks) < 0.5
+    speed = rng.uniform(6, 14, trucks) * np.where(rightward, 1, -1)
+    start_x = np.where(rightward, -size[:, 0], width + size[:, 0]) - speed * rng.integers(0, frames // 3, trucks)
+    lane_y = np.linspace(0.2, 0.8, trucks) * height
+
+    truth_to_tracks = [dict() for _ in range(trucks)]
+    for frame in range(frames):
+        cx = start_x + speed * frame
+        visible = (cx > size[:, 0] * 0.5) & (cx < width - size[:, 0] * 0.5)
+        detected = visible & (rng.random(trucks) >= miss_rate)
+        truth = np.flatnonzero(detected)
+
+        centers = np.stack([cx[truth], lane_y[truth]], axis=1) + rng.normal(0, 3, (len(truth), 2))
+        half = size[truth] * rng.uniform(0.95, 1.05, (len(truth), 2)) * 0.5
+        boxes = np.concatenate([centers - half, centers + half], axis=1)
+        scores = rng.uniform(0.6, 0.95, len(truth))
+        if rng.random() < false_positives:
+            center = rng.uniform([0, 0], [width, height])
+            boxes = np.vstack([boxes, np.concatenate([center - 40, center + 40])])
+            scores = np.append(scores, rng.uniform(0.5, 0.7))
+        class_ids = np.zeros(len(boxes), dtype=np.int64)
+
+        tracks = tracker.update(boxes, scores, class_ids, timestamp=frame / 30.0, shape=shape)
+        if len(tracks) and len(truth):
+            iou = box_iou(boxes[:len(truth)], tracks.boxes)
+            best = iou.argmax(axis=1)
+            for index, truck in enumerate(truth):
+                if iou[index, best[index]] > 0.3:
+                    track_id = int(tracks.ids[best[index]])
+                    truth_to_tracks[truck][track_id] = tracks.directions[best[index]]
+
+    id_switches = sum(max(0, len(ids) - 1) for ids in truth_to_tracks)
+    expected = ["right" if value else "left" for value in rightward]
+    directions_correct = sum(
+        1 for truck, ids in enumerate(truth_to_tracks)
+        if ids and list(ids.values())[-1] == expected[truck]
+    )
+    stats = tracker.stats()
+    return {
+        "frames": frames,
+        "trucks": trucks,
+        "tracksCreated": stats["tracksCreated"],
+        "tracksConfirmed": stats["tracksConfirmed"],
+        "idSwitches": id_switches,
+        "directionsCorrect": directions_correct if settings.direction else None,
+        "avgUpdateUs": stats["avgUpdateUs"],
+        "assignment": stats["assignment"],
+        "settings": {
+            "algorithm": settings.algorithm,
+            "iouThreshold": settings.iou_threshold,
+            "minConfidence": settings.min_confidence,
+            "maxDisappeared": settings.max_disappeared,
+            "maxDistance": settings.max_distance,
+            "kalman": settings.kalman,
+        },
+    }
@@ -2,168 +2,277 @@ from fastapi import FastAPI, WebSocket, Request, WebSocketDisconnect
 
 from fastapi.responses import RedirectResponse, Response
 from fastapi.staticfiles import StaticFiles
+from collections import OrderedDict
 from contextlib import asynccontextmanager
 from fastapi.templating import Jinja2Templates
 import cv2
 import asyncio
 from pathlib import Path
 import json
+import os
 import socket
+import sys
 from datetime import datetime
 
+# backend 디렉토리의 pipeline 패키지를 불러오기 위한 경로 추가
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pipeline.adaptive import parse_control_message
+from pipeline.cameras import CameraRegistry
+from pipeline.config_store import ConfigStore
+from pipeline.detector import (ROI_CROP_PADDING, DetectionStage, batch_size_for, create_detector,
+                               create_warm_detector, model_reload_needed)
+from pipeline.dwell import DwellMonitor
+from pipeline.encoder import parse_resolution
+from pipeline.event_store import EventWriter, RecognitionEvent
+from pipeline.scheduler import InferenceScheduler, motion_polygons
+from pipeline.ocr import OcrSettings, OcrStage, create_ocr_engine, engine_key
+from pipeline.roi import RoiEngine
+from pipeline.tracker import Tracker, TrackerSettings
+
 
 # === 앱 초기화 ===
-active_connections = set()
-meta_connections = set()  # 메타데이터 연결을 위한 세트
-broadcast_task = None
+meta_connections = {}  # 메타데이터 연결 (WebSocket: 카메라 ID)
 meta_broadcast_task = None  # 메타데이터 브로드캐스트 태스크
 connection_cleanup_task = None  # 연결 정리 태스크 추가
 is_streaming = True  # 항상 스트리밍 활성화 상태로 유지
-MAX_CONNECTIONS = 10  # 최대 연결 수 제한
-cap = None  # 전역 카메라 변수 추가
+MAX_CONNECTIONS = 100  # 최대 연결 수 제한 (전체 카메라 합계)
+CLIENT_QUEUE_DEPTH = 2  # 클라이언트별 송신 대기 프레임 수 (초과 시 오래된 프레임 폐기)
+CAMERA_IDLE_TIMEOUT = 30  # 구독자가 없는 카메라 캡처를 중지하기까지의 시간 (초)
+
+# 카메라 레지스트리 (카메라별 캡처 워커 / 링 버퍼 / 팬아웃)
+camera_registry = None
+
+# 객체 감지 단계 (모델이 없으면 None)
+detection_stage = None
+latest_detections = {}  # 카메라 ID: 아직 송출하지 않은 최신 DetectionResult
+detections_updated = None  # 새 감지 결과 알림 (asyncio.Event)
+META_IDLE_INTERVAL = 1.0  # 감지 결과가 없을 때 빈 목록을 보내는 간격 (초)
+
+# ROI 판정 엔진 (감지 단계와 추적기가 공유, /rois/reload로 갱신)
+roi_engine = None
+
+# 트럭별 번호 인식 단계 (OCR 엔진이 없으면 None)
+ocr_stage = None
+track_numbers = {}  # 카메라 ID: OrderedDict(트랙 ID: 확정 번호)
+MAX_TRACK_NUMBERS = 256  # 카메라별로 기억하는 확정 번호 수
+
+# ROI 체류 이벤트 (감지 결과는 최신 것만 보내지만 이벤트는 빠짐없이 송출)
+dwell_monitor = None
+pending_roi_events = {}  # 카메라 ID: 아직 송출하지 않은 DwellEvent 목록
+track_rois = {}  # 카메라 ID: OrderedDict(트랙 ID: [마지막으로 들어간 ROI ID, PLC 전송 여부]) (인식 이벤트 기록용)
+event_writer = None  # 인식 이벤트를 이벤트 DB (메인 백엔드의 /api/logs/ocr)에 배치로 기록
+roi_action_counts = {"sendToPLC": 0, "triggerAlarm": 0}
+
+# 설정 핫 리로드 (파일 감시 + 메인 백엔드의 /config/reload 알림)
+CONFIG_WATCH_INTERVAL = 1.0  # config.toml 변경 확인 간격 (초, stat만 수행)
+event_loop = None
+config_watch_task = None
+applied_config = {}  # 실행 중인 단계에 마지막으로 반영한 설정 스냅샷
+tracker_settings = None  # 새로 만드는 추적기와 실행 중인 추적기가 함께 쓰는 설정
+reload_tasks = {}  # 종류: 백그라운드 재로드 태스크 (model, ocr, camera)
+reload_pending = set()  # 재로드 중에 또 바뀐 종류 (끝난 뒤 최신 설정으로 한 번 더 실행)
 
 # 연결 상태 추적을 위한 구조체
 video_pending_connections = {}  # 대기 중인 비디오 연결 (WebSocket: 마지막 활동 시간)
 meta_pending_connections = {}   # 대기 중인 메타 연결 (WebSocket: 마지막 활동 시간)
 CONNECTION_TIMEOUT = 10  # 연결 타임아웃 (초)
 
-# === 카메라 백엔드 상수 추가 ===
-# DirectShow 백엔드 상수 (Windows에서 더 안정적일 수 있음)
-CAP_DSHOW = 700
-
-
-# === WebSocket으로 프레임 송출 ===
-async def video_broadcast():
-    import time
-    import socket
-
-    # OpenCV 최적화 활성화
-    cv2.setUseOptimized(True)
-
-    # 복구 관련 변수
-    consecutive_failures = 0
-    max_consecutive_failures = 5
-    last_reconnect_time = time.time()
-    reconnect_interval = 10  # 재연결 시도 간격(초)
-
-    # 카메라 초기화 함수 개선
-    def init_camera():
-        global cap
-        if cap is not None:
-            cap.release()  # 기존 카메라 리소스 해제
-        
-        # 여러 백엔드를 시도
-        try:
-            # 먼저 DirectShow 백엔드 시도 (Windows에서 더 안정적)
-            print("🔍 DirectShow 백엔드로 카메라 연결 시도...")
-            cap = cv2.VideoCapture(0, CAP_DSHOW)
-            
-            # 해상도 설정
-            cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-            # 버퍼 사이즈 줄이기 (지연 감소)
-            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-            
-            if cap.isOpened():
-                print("✅ DirectShow 백엔드로 카메라 연결 성공")
-                return True
-        except Exception as e:
-            print(f"⚠️ DirectShow 백엔드 연결 실패: {e}")
-        
-        try:
-            # 기본 백엔드 시도
-            print("🔍 기본 백엔드로 카메라 연결 시도...")
-            cap = cv2.VideoCapture(0)
-            
-            # 해상도 설정
-            cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-            # 버퍼 사이즈 줄이기
-            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-            
-            if cap.isOpened():
-                print("✅ 기본 백엔드로 카메라 연결 성공")
-                return True
-        except Exception as e:
-            print(f"⚠️ 기본 백엔드 연결 실패: {e}")
-        
-        return False
 
-    # 초기 카메라 연결
-    if not init_camera():
-        print("🚨 어떤 백엔드로도 카메라 열기 실패")
+# 메인 백엔드와 공유하는 설정 파일
+CONFIG_TOML_FILE = Path(__file__).resolve().parent.parent / "settings" / "config.toml"
+
+
+# 파싱한 설정 스냅샷 (파일이 바뀐 경우에만 다시 읽음)
+config_store = ConfigStore(CONFIG_TOML_FILE)
+
+
+# === 설정 로드 ===
+def load_config():
+    """config.toml의 읽기 전용 스냅샷을 반환합니다. 파일이 없거나 오류가 나면 빈 설정 (또는 마지막 정상 설정)"""
+    return config_store.get()
+
+
+# === 카메라 레지스트리 생성 ===
+def create_camera_registry(config):
+    system = config.get("system", {})
+    # system.maxThreads 만큼 인코딩 스레드 사용 (CPU 수를 넘지 않도록 제한)
+    workers = int(system.get("maxThreads", 2))
+    workers = max(1, min(workers, os.cpu_count() or 1))
+    # system.enableMultiprocessing이면 카메라마다 별도 캡처 프로세스 사용
+    use_process = bool(system.get("enableMultiprocessing", False))
+    registry = CameraRegistry(
+        config,
+        encode_workers=workers,
+        queue_depth=CLIENT_QUEUE_DEPTH,
+        use_process=use_process,
+    )
+    print(f"🎥 카메라 {len(registry)}대 등록 (기본: {registry.default_id}), 인코딩 스레드 {workers}개, "
+          f"캡처 {'프로세스' if use_process else '스레드'} 모드")
+    return registry
+
+
+# === 감지 단계 생성 ===
+def create_detection_stage(config, detector=None):
+    """model 설정으로 감지 단계를 만듭니다. ONNX 모델이 없으면 None (빈 감지 결과 송출)"""
+    global tracker_settings
+    detector = detector or create_detector(config)
+    if detector is None:
+        return None
+    model = config.get("model", {})
+    loop = asyncio.get_running_loop()
+
+    def on_result(result):
+        # OCR 후보 수집은 프레임 이미지가 있는 감지 스레드에서 바로 처리
+        if ocr_stage is not None:
+            ocr_stage.observe(result)
+        # 감지 스레드 → 이벤트 루프로 전달
+        loop.call_soon_threadsafe(publish_detections, result)
+
+    # system.maxFps / frameSkipRate / 움직임 게이트로 추론할 프레임 선택
+    scheduler = InferenceScheduler.from_config(config)
+    # [tracking] 설정으로 카메라별 추적기 생성 (트랙 ID, 이동 방향)
+    tracker_settings = TrackerSettings.from_config(config.get("tracking", {}), roi_engine)
+    # model.roiCropping이면 detectTrucks ROI 영역만 잘라 추론 (유효 해상도 향상)
+    return DetectionStage(detector, on_result, batch_size=batch_size_for(model), scheduler=scheduler,
+                          tracker_factory=lambda camera_id: Tracker(tracker_settings, camera_id),
+                          roi_engine=roi_engine, dwell_monitor=dwell_monitor,
+                          crop_to_rois=bool(model.get("roiCropping", True)),
+                          crop_padding=float(model.get("roiCropPadding", ROI_CROP_PADDING)))
+
+
+def create_ocr_stage(config):
+    """트럭별 OCR 단계를 만듭니다. OCR이 꺼져 있거나 엔진을 쓸 수 없으면 None"""
+    if not config.get("detection", {}).get("ocr_enabled", True):
+        return None
+    settings = OcrSettings.from_config(config.get("ocr", {}))
+    engine = create_ocr_engine(settings)
+    if engine is None:
+        print("⚠️ OCR 엔진이 없어 번호 인식을 건너뜁니다")
+        return None
+    return build_ocr_stage(engine, settings)
+
+
+def build_ocr_stage(engine, settings):
+    loop = event_loop or asyncio.get_running_loop()
+
+    def on_result(result):
+        loop.call_soon_threadsafe(publish_ocr_result, result)
+
+    return OcrStage(engine, settings, on_result)
+
+
+def publish_ocr_result(result):
+    record_recognition(result)
+    if result.text is None:
+        print(f"🔤 [{result.camera_id}] 트랙 {result.track_id} 번호 인식 실패 "
+              f"(후보 {len(result.readings)}개: {result.readings})")
         return
+    numbers = track_numbers.setdefault(result.camera_id, OrderedDict())
+    numbers[result.track_id] = result.text
+    while len(numbers) > MAX_TRACK_NUMBERS:
+        numbers.popitem(last=False)
+    print(f"🔤 [{result.camera_id}] 트랙 {result.track_id} 번호 {result.text} "
+          f"(신뢰도 {result.confidence:.2f}, OCR {len(result.readings)}회)")
 
-    w = cap.get(cv2.CAP_PROP_FRAME_WIDTH)
-    h = cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
-    fps = cap.get(cv2.CAP_PROP_FPS)
-
-    print(f"📷 카메라 송출 시작됨 해상도: {int(w)}×{int(h)}, FPS: {fps}")
-    
-    try:
-        while True:
-            # 스트리밍 항상 활성화 상태
-
-            # 클라이언트가 없으면 프레임 처리 생략
-            if not active_connections:
-                await asyncio.sleep(0.5)
-                continue
-
-            ret, frame = cap.read()
-            if not ret:
-                consecutive_failures += 1
-                print(f"⚠️ 프레임 읽기 실패 ({consecutive_failures}/{max_consecutive_failures})")
-
-                if consecutive_failures >= max_consecutive_failures:
-                    current_time = time.time()
-                    if current_time - last_reconnect_time > reconnect_interval:
-                        print("🔄 카메라 재연결 시도...")
-                        if init_camera():
-                            print("✅ 카메라 재연결 성공")
-                            consecutive_failures = 0
-                            last_reconnect_time = current_time
-                        else:
-                            print("❌ 카메라 재연결 실패")
-
-                await asyncio.sleep(min(0.1 * consecutive_failures, 2.0))
-                continue
-
-            consecutive_failures = 0
-
-            # 이미지 인코딩 (원본 품질)
-            _, buffer = cv2.imencode(".jpg", frame)
-            data = buffer.tobytes()
-
-            del frame
-
-            disconnected = set()
-            for ws in list(active_connections):
-                try:
-                    await ws.send_bytes(data)
-                except WebSocketDisconnect:
-                    print("🔴 WebSocket 연결 해제됨")
-                    disconnected.add(ws)
-                except ConnectionResetError:
-                    print("🔴 클라이언트에 의해 WebSocket 연결이 강제로 종료됨")
-                    disconnected.add(ws)
-                except socket.error:
-                    print("🔴 소켓 오류 발생")
-                    disconnected.add(ws)
-                except Exception as e:
-                    print(f"💥 송신 중 예외 발생: {e}")
-                    disconnected.add(ws)
-
-            for ws in disconnected:
-                active_connections.discard(ws)
-
-            await asyncio.sleep(0.01)
-    finally:
-        if cap is not None:
-            cap.release()
-        print("🛑 카메라 리소스 해제 완료")
 
+def record_recognition(result):
+    """OCR 결과 (실패 포함)를 트럭이 있던 ROI와 함께 이벤트 DB에 기록합니다."""
+    if event_writer is None:
+        return
+    roi_id, sent_to_plc = track_rois.get(result.camera_id, {}).get(result.track_id, (None, False))
+    roi_names = dict(zip(roi_engine.roi_set.ids, roi_engine.roi_set.names))
+    event_writer.submit(RecognitionEvent(
+        timestamp=result.wall_time,
+        camera_id=result.camera_id,
+        track_id=result.track_id,
+        recognized_number=result.text or "",
+        confidence=result.confidence * 100,
+        roi_id=roi_id,
+        roi_name=roi_names.get(roi_id, roi_id or ""),
+        processing_time=result.ocr_ms,
+        status="success" if result.text is not None else "error",
+        sent_to_plc=sent_to_plc,
+    ))
+
+
+def publish_detections(result):
+    latest_detections[result.camera_id] = result
+    if result.dwell_events:
+        pending_roi_events.setdefault(result.camera_id, []).extend(result.dwell_events)
+        rois = track_rois.setdefault(result.camera_id, OrderedDict())
+        for event in result.dwell_events:
+            if event.type == "enter":
+                rois[event.track_id] = [event.roi_id, rois.get(event.track_id, (None, False))[1]]
+            elif event.type == "confirm":
+                dispatch_roi_actions(event)
+                if "sendToPLC" in event.actions:
+                    rois[event.track_id] = [event.roi_id, True]
+        while len(rois) > MAX_TRACK_NUMBERS:
+            rois.popitem(last=False)
+    detections_updated.set()
+
+
+def dispatch_roi_actions(event):
+    """
+    minDetectionTime을 넘겨 확정된 트럭에 대해 ROI의 sendToPLC / triggerAlarm 동작을 실행합니다.
+    PLC 드라이버가 아직 없으므로 로그를 남기고, 동작은 /ws/meta의 roi_events로 전달됩니다.
+    """
+    number = track_numbers.get(event.camera_id, {}).get(event.track_id)
+    for action in event.actions:
+        if action not in roi_action_counts:
+            continue
+        roi_action_counts[action] += 1
+        if action == "sendToPLC":
+            print(f"📟 [{event.camera_id}] PLC 전송: ROI {event.roi_id}, 트랙 {event.track_id}, 번호 {number}")
+        else:
+            print(f"🚨 [{event.camera_id}] 알람: ROI {event.roi_id}, 트랙 {event.track_id} "
+                  f"({event.dwell:.1f}초 체류)")
+
+
+def drop_meta_connection(websocket):
+    """메타 연결을 제거하고 감지 대상 카메라 구독을 해제합니다."""
+    camera_id = meta_connections.pop(websocket, None)
+    if camera_id is None or detection_stage is None:
+        return
+    stream = camera_registry.get(camera_id)
+    if stream is None:  # 설정 변경으로 삭제된 카메라
+        return
+    detection_stage.unwatch(stream)
+    stream.release()
+
+
+def roi_events_message(camera_id, events):
+    numbers = track_numbers.get(camera_id, {})
+    items = []
+    for event in events:
+        item = event.to_meta()
+        item["number"] = numbers.get(event.track_id)
+        items.append(item)
+    return {"type": "roi_events", "cameraId": camera_id, "events": items}
+
+
+def detection_message(camera_id, result=None):
+    if result is None:
+        return {"type": "detections", "cameraId": camera_id, "detections": []}
+    items = (result.tracks if result.tracks is not None else result.detections).to_meta(
+        result.shape, detection_stage.detector.class_names)
+    numbers = track_numbers.get(camera_id)
+    if numbers:
+        for item in items:
+            item["number"] = numbers.get(item.get("trackId"))
+    if result.roi_hits is not None:
+        for index, item in enumerate(items):
+            item["roiIds"] = result.roi_hits.ids_for(index)
+    return {
+        "type": "detections",
+        "cameraId": camera_id,
+        "seq": result.seq,
+        "timestamp": result.wall_time,
+        "inferMs": round(result.infer_ms, 1),
+        "detections": items,
+    }
 
-# 감지 통계 데이터 생성 기능 제거됨
 
 # === WebSocket으로 메타데이터 송출 ===
 async def meta_broadcast():
@@ -172,28 +281,33 @@ async def meta_broadcast():
             if not meta_connections:
                 await asyncio.sleep(0.5)
                 continue
-            
-            # 기본 감지 메타데이터만 전송 (통계 데이터 제거)
-            data = {
-                "type": "detections",
-                "detections": [
-                    {
-                        "x": 100,
-                        "y": 100,
-                        "width": 200,
-                        "height": 100,
-                        "confidence": 0.95,
-                        "label": "truck",
-                        "number": "1234"
-                    }
-                ]
-            }
-
-            # 감지 메타데이터 전송
+
+            # 새 감지 결과를 기다림 (모델이 없으면 주기적으로 빈 목록 송출)
+            try:
+                await asyncio.wait_for(detections_updated.wait(), timeout=META_IDLE_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            detections_updated.clear()
+            results = dict(latest_detections)
+            latest_detections.clear()
+            roi_events = dict(pending_roi_events)
+            pending_roi_events.clear()
+            if detection_stage is not None and not results:
+                continue
+
+            # 카메라별 메시지는 한 번만 만들어 구독자에게 전송
+            messages = {}
             disconnected = set()
-            for ws in list(meta_connections):
+            for ws, camera_id in list(meta_connections.items()):
+                if detection_stage is not None and camera_id not in results:
+                    continue
+                if camera_id not in messages:
+                    messages[camera_id] = [detection_message(camera_id, results.get(camera_id))]
+                    if camera_id in roi_events:
+                        messages[camera_id].insert(0, roi_events_message(camera_id, roi_events[camera_id]))
                 try:
-                    await ws.send_json(data)
+                    for message in messages[camera_id]:
+                        await ws.send_json(message)
                 except WebSocketDisconnect:
                     print("🔴 메타 WebSocket 연결 해제됨")
                     disconnected.add(ws)
@@ -208,9 +322,7 @@ async def meta_broadcast():
                     disconnected.add(ws)
 
             for ws in disconnected:
-                meta_connections.discard(ws)
-
-            await asyncio.sleep(0.1)  # 10 FPS
+                drop_meta_connection(ws)
     except Exception as e:
         print(f"💥 메타데이터 브로드캐스트 오류: {e}")
 
@@ -252,6 +364,9 @@ async def cleanup_inactive_connections():
                 except Exception as e:
                     print(f"연결 닫기 오류: {e}")
             
+            # 구독자가 없는 카메라 캡처 중지
+            await camera_registry.stop_idle(CAMERA_IDLE_TIMEOUT)
+
             # 5초마다 확인
             await asyncio.sleep(5)
         
@@ -260,17 +375,169 @@ async def cleanup_inactive_connections():
             await asyncio.sleep(5)
 
 
+# === 설정 변경 반영 (핫 리로드) ===
+def on_config_change(config, version, sections):
+    """ConfigStore 변경 알림. 어느 스레드에서 불려도 이벤트 루프에서 반영합니다."""
+    if event_loop is not None:
+        event_loop.call_soon_threadsafe(apply_config_change, config, version, sections)
+
+
+def apply_config_change(config, version, sections):
+    """
+    바뀐 섹션만 실행 중인 단계에 반영합니다.
+    임계값, ROI, 추적/스케줄 설정은 다음 프레임부터 바로 적용하고, 모델 경로나 카메라 소스처럼
+    무거운 변경은 백그라운드에서 새로 준비한 뒤 교체합니다. (준비되는 동안 기존 단계가 계속 처리)
+    """
+    global applied_config, tracker_settings
+    previous, applied_config = applied_config, config
+    if not sections:
+        return
+    print(f"⚙️ 설정 v{version} 반영: {', '.join(sections)}")
+
+    if "rois" in sections:
+        roi_engine.update(config.get("rois", []))
+    if detection_stage is not None:
+        if detection_stage.scheduler is not None and ("rois" in sections or "system" in sections):
+            detection_stage.scheduler.configure(InferenceScheduler.from_config(config))
+        if "tracking" in sections:
+            tracker_settings = TrackerSettings.from_config(config.get("tracking", {}), roi_engine)
+            detection_stage.set_tracker_settings(tracker_settings)
+    if "model" in sections:
+        model = config.get("model", {})
+        if detection_stage is None or model_reload_needed(previous.get("model", {}), model):
+            schedule_reload("model", reload_detection_model)
+        else:
+            detection_stage.configure(model)
+    if "ocr" in sections or "detection" in sections:
+        schedule_reload("ocr", reload_ocr_stage)
+    if "camera" in sections:
+        schedule_reload("camera", reload_cameras)
+
+
+def schedule_reload(kind, reload):
+    """같은 종류의 재로드는 하나씩 실행하고, 실행 중에 또 바뀌면 끝난 뒤 최신 설정으로 한 번 더 실행합니다."""
+    task = reload_tasks.get(kind)
+    if task is not None and not task.done():
+        reload_pending.add(kind)
+        return
+
+    async def run():
+        while True:
+            reload_pending.discard(kind)
+            try:
+                await reload(applied_config)
+            except Exception as e:
+                print(f"💥 {kind} 설정 반영 중 예외 발생: {e}")
+            if kind not in reload_pending:
+                break
+
+    reload_tasks[kind] = asyncio.create_task(run())
+
+
+async def reload_detection_model(config):
+    """새 모델을 백그라운드에서 로드/준비한 뒤 교체합니다. 실패하면 기존 모델을 유지합니다."""
+    global detection_stage
+    width, height = parse_resolution(config.get("camera", {}).get("resolution", "1920x1080"))
+    detector = await asyncio.to_thread(create_warm_detector, config, (height, width, 3))
+    if detector is None:
+        print("⚠️ 새 감지 모델을 준비하지 못해 기존 설정을 유지합니다")
+        return
+    if detection_stage is not None:
+        detection_stage.swap_detector(detector)
+        detection_stage.configure(config.get("model", {}))
+        return
+    # 모델 없이 시작한 경우: 감지 단계를 새로 만들고 이미 연결된 메타 구독자의 카메라를 감시
+    # (연결이 끊길 때 drop_meta_connection이 연결마다 unwatch/release하므로 같은 카메라라도 연결마다 한 번씩)
+    stage = create_detection_stage(config, detector)
+    for camera_id in list(meta_connections.values()):
+        stream = camera_registry.get(camera_id)
+        if stream is not None:
+            stream.acquire()
+            stage.watch(stream)
+    stage.start()
+    detection_stage = stage
+
+
+async def reload_ocr_stage(config):
+    """OCR 설정을 반영합니다. 엔진 종류/언어가 바뀐 경우에만 새 엔진을 백그라운드에서 준비해 교체합니다."""
+    global ocr_stage
+    if not config.get("detection", {}).get("ocr_enabled", True):
+        if ocr_stage is not None:
+            stage, ocr_stage = ocr_stage, None
+            await asyncio.to_thread(stage.stop)
+            print("🔤 OCR 단계 중지 (ocr_enabled = false)")
+        return
+    settings = OcrSettings.from_config(config.get("ocr", {}))
+    if ocr_stage is not None and engine_key(settings) == engine_key(ocr_stage.settings):
+        ocr_stage.configure(settings)
+        return
+    engine = await asyncio.to_thread(create_ocr_engine, settings)
+    if engine is None:
+        print("⚠️ 새 OCR 엔진을 준비하지 못해 기존 설정을 유지합니다")
+        return
+    if ocr_stage is not None:
+        ocr_stage.configure(settings, engine)
+        print(f"🔁 OCR 엔진 교체: {engine.name}")
+        return
+    stage = build_ocr_stage(engine, settings)
+    stage.start()
+    ocr_stage = stage
+
+
+async def reload_cameras(config):
+    changes = await camera_registry.apply(config)
+    summary = ", ".join(f"{key} {values}" for key, values in changes.items() if values)
+    if summary:
+        print(f"🎥 카메라 설정 반영: {summary}")
+
+
+async def config_watch():
+    """config.toml을 주기적으로 stat해 직접 편집한 변경도 반영합니다. (파싱은 바뀐 경우에만)"""
+    while True:
+        await asyncio.sleep(CONFIG_WATCH_INTERVAL)
+        try:
+            config_store.get()
+        except Exception as e:
+            print(f"💥 설정 파일 확인 중 예외 발생: {e}")
+
+
 # === lifespan 기반 프레임 수신 태스크 관리 ===
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global broadcast_task, meta_broadcast_task, connection_cleanup_task
-    broadcast_task = asyncio.create_task(video_broadcast())
+    global camera_registry, meta_broadcast_task, connection_cleanup_task, detection_stage, detections_updated, ocr_stage
+    global roi_engine, dwell_monitor, event_loop, config_watch_task, applied_config, event_writer
+    event_loop = asyncio.get_running_loop()
+    config = load_config()
+    applied_config = config
+    event_writer = EventWriter()
+    event_writer.start()
+    camera_registry = create_camera_registry(config)
+    roi_engine = RoiEngine(config.get("rois", []))
+    dwell_monitor = DwellMonitor(roi_engine)
+    detections_updated = asyncio.Event()
+    ocr_stage = create_ocr_stage(config)
+    if ocr_stage is not None:
+        ocr_stage.start()
+    detection_stage = create_detection_stage(config)
+    if detection_stage is not None:
+        detection_stage.start()
     meta_broadcast_task = asyncio.create_task(meta_broadcast())
     connection_cleanup_task = asyncio.create_task(cleanup_inactive_connections())
+    unsubscribe = config_store.subscribe(on_config_change)
+    config_watch_task = asyncio.create_task(config_watch())
     yield
-    broadcast_task.cancel()
+    unsubscribe()
+    config_watch_task.cancel()
+    for task in reload_tasks.values():
+        task.cancel()
     meta_broadcast_task.cancel()
     connection_cleanup_task.cancel()
+    if detection_stage is not None:
+        await asyncio.to_thread(detection_stage.stop)
+    if ocr_stage is not None:
+        await asyncio.to_thread(ocr_stage.stop)
+    await asyncio.to_thread(event_writer.stop)
+    await camera_registry.stop_all()
     print("🛑 영상 및 메타데이터 송출 태스크 종료")
 
 
@@ -287,21 +554,40 @@ app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
 # === WebSocket 엔드포인트 ===
 @app.websocket("/ws/video")
 async def video_feed_ws(websocket: WebSocket):
+    # 기본 카메라
+    await serve_video(websocket, None)
+
+
+@app.websocket("/ws/video/{camera_id}")
+async def camera_video_feed_ws(websocket: WebSocket, camera_id: str):
+    await serve_video(websocket, camera_id)
+
+
+async def serve_video(websocket: WebSocket, camera_id):
     import time
     
     # 중복 연결 확인
     client_info = f"{websocket.client.host}:{websocket.client.port}"
+
+    stream = camera_registry.get(camera_id)
+    if stream is None:
+        await websocket.close(code=1008, reason="알 수 없는 카메라")
+        return
     
     # 최대 연결 수 제한
-    if len(active_connections) >= MAX_CONNECTIONS:
+    if camera_registry.total_clients() >= MAX_CONNECTIONS:
         await websocket.close(code=1008, reason="최대 연결 수 초과")
         return
 
     await websocket.accept()
-    print(f"🟡 비디오 WebSocket 수락됨 ({client_info}, ping 대기 중...)")
+    print(f"🟡 비디오 WebSocket 수락됨 ({client_info}, 카메라 {stream.id}, ping 대기 중...)")
+
+    # 클라이언트별 fps / 해상도 / 품질 제어기
+    controller = stream.create_controller(websocket.query_params)
     
     # 대기 중인 연결에 추가
     video_pending_connections[websocket] = time.time()
+    registered = False
     
     try:
         while True:
@@ -312,15 +598,30 @@ async def video_feed_ws(websocket: WebSocket):
                 # 대기 중인 연결 상태 업데이트
                 if websocket in video_pending_connections:
                     video_pending_connections[websocket] = time.time()
+
+                # 제어 메시지: {"type": "config", "fps": 10, "maxWidth": 640, "quality": 60}
+                control = parse_control_message(message)
+                if control is not None:
+                    try:
+                        controller.configure_from_message(control)
+                    except (TypeError, ValueError):
+                        await websocket.send_json({"type": "error", "message": "잘못된 제어 메시지입니다"})
+                        continue
+                    await websocket.send_json(controller.describe())
+                    print(f"🎛️ 비디오 송출 설정 변경 ({client_info}): {controller.describe()['effective']}")
+                    continue
                 
                 # ping 메시지를 받았고 아직 등록되지 않은 경우에만 등록
-                if message == "ping" and websocket not in active_connections:
+                if message == "ping" and not registered:
                     # 대기 목록에서 제거하고 활성 목록에 추가
                     if websocket in video_pending_connections:
                         del video_pending_connections[websocket]
                     
-                    active_connections.add(websocket)
-                    print(f"🟢 비디오 WebSocket ping 수신 - 접속 등록됨 ({client_info}, 총 {len(active_connections)}명)")
+                    # 첫 구독자가 오면 카메라 캡처 시작
+                    stream.acquire()
+                    registered = True
+                    stream.fanout.add(websocket, client_info, controller=controller)
+                    print(f"🟢 비디오 WebSocket ping 수신 - 접속 등록됨 ({client_info}, 카메라 {stream.id}, 총 {len(stream.fanout)}명)")
             except asyncio.TimeoutError:
                 # 타임아웃은 정상임, 계속 대기
                 continue
@@ -328,18 +629,35 @@ async def video_feed_ws(websocket: WebSocket):
     except WebSocketDisconnect:
         print(f"🔴 비디오 WebSocket 연결 해제됨 ({client_info})")
     finally:
-        active_connections.discard(websocket)
+        await stream.fanout.remove(websocket)
+        if registered:
+            stream.release()
         if websocket in video_pending_connections:
             del video_pending_connections[websocket]
-        print(f"🔵 비디오 WebSocket 연결 제거됨 ({client_info}, 총 {len(active_connections)}명)")
+        print(f"🔵 비디오 WebSocket 연결 제거됨 ({client_info}, 카메라 {stream.id}, 총 {len(stream.fanout)}명)")
 
 
 @app.websocket("/ws/meta")
 async def meta_feed_ws(websocket: WebSocket):
+    # 기본 카메라
+    await serve_meta(websocket, None)
+
+
+@app.websocket("/ws/meta/{camera_id}")
+async def camera_meta_feed_ws(websocket: WebSocket, camera_id: str):
+    await serve_meta(websocket, camera_id)
+
+
+async def serve_meta(websocket: WebSocket, camera_id):
     import time
     
     # 클라이언트 정보
     client_info = f"{websocket.client.host}:{websocket.client.port}"
+
+    stream = camera_registry.get(camera_id)
+    if stream is None:
+        await websocket.close(code=1008, reason="알 수 없는 카메라")
+        return
     
     if len(meta_connections) >= MAX_CONNECTIONS:
         await websocket.close(code=1008, reason="최대 연결 수 초과")
@@ -367,8 +685,12 @@ async def meta_feed_ws(websocket: WebSocket):
                     if websocket in meta_pending_connections:
                         del meta_pending_connections[websocket]
                     
-                    meta_connections.add(websocket)
-                    print(f"🟢 메타 WebSocket ping 수신 - 접속 등록됨 ({client_info}, 총 {len(meta_connections)}명)")
+                    meta_connections[websocket] = stream.id
+                    # 감지 모델이 있으면 이 카메라를 감지 대상에 추가 (캡처도 시작)
+                    if detection_stage is not None:
+                        stream.acquire()
+                        detection_stage.watch(stream)
+                    print(f"🟢 메타 WebSocket ping 수신 - 접속 등록됨 ({client_info}, 카메라 {stream.id}, 총 {len(meta_connections)}명)")
             except asyncio.TimeoutError:
                 # 타임아웃은 정상임, 계속 대기
                 continue
@@ -376,7 +698,7 @@ async def meta_feed_ws(websocket: WebSocket):
     except WebSocketDisconnect:
         print(f"🔴 메타 WebSocket 연결 해제됨 ({client_info})")
     finally:
-        meta_connections.discard(websocket)
+        drop_meta_connection(websocket)
         if websocket in meta_pending_connections:
             del meta_pending_connections[websocket]
         print(f"🔵 메타 WebSocket 연결 제거됨 ({client_info}, 총 {len(meta_connections)}명)")
@@ -388,6 +710,45 @@ async def home(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
 
+@app.get("/cameras")
+async def list_cameras():
+    """등록된 카메라 목록과 캡처 상태"""
+    return camera_registry.describe()
+
+
+@app.get("/stats")
+async def stream_stats():
+    """카메라별 캡처, 인코딩 및 클라이언트별 송신 통계 (프레임 폐기 수 포함)"""
+    return {
+        "totalClients": camera_registry.total_clients(),
+        "cameras": [stream.stats() for stream in camera_registry],
+        "detection": detection_stage.stats() if detection_stage is not None else None,
+        "ocr": ocr_stage.stats() if ocr_stage is not None else None,
+        "roiActions": dict(roi_action_counts),
+        "eventStore": event_writer.stats() if event_writer is not None else None,
+        "config": dict(config_store.stats(), reloading=[kind for kind, task in reload_tasks.items() if not task.done()]),
+    }
+
+
+@app.post("/config/reload")
+async def reload_config():
+    """메인 백엔드가 설정을 저장한 뒤 호출합니다. 파일을 바로 확인해 바뀐 섹션을 실행 중인 단계에 반영합니다."""
+    config_store.invalidate()
+    config_store.get()
+    return {"success": True, "version": config_store.version}
+
+
+@app.post("/rois/reload")
+async def reload_rois():
+    """config.toml의 ROI를 다시 읽습니다. 내용이 바뀐 경우에만 ROI를 다시 컴파일합니다."""
+    config_store.invalidate()
+    config = load_config()
+    changed = roi_engine.update(config.get("rois", []))
+    if changed and detection_stage is not None and detection_stage.scheduler is not None:
+        detection_stage.scheduler.set_polygons(motion_polygons(config))
+    return {"success": True, "changed": changed, "rois": len(roi_engine)}
+
+
 # @app.get("/favicon.ico")
 # async def favicon():
 #     return RedirectResponse(url="/static/favicon.ico")
@@ -132,6 +132,9 @@ export function subscribeToNewLogs(
       const data = JSON.parse(event.data);
       if (data.type === "newLog") {
         callback(data.log);
+      } else if (data.type === "newLogs") {
+        // 짧은 시간에 몰려 온 로그는 한 프레임으로 묶여 옴
+        data.logs.forEach((log: OcrLogEntry) => callback(log));
       }
     } catch {
       // 무시